@@ -2,7 +2,11 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Transaction, Ledger, Account, FinancialReport
+from .models import (
+    Transaction, Ledger, Account, FinancialReport, OutboxEvent,
+    JournalEntry, JournalLine, AccountBalanceSnapshot, BankStatement, BankStatementLine,
+    ReceivableItem, ClientBalance,
+)
 
 
 @admin.register(Transaction)
@@ -115,6 +119,40 @@ class AccountAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('company')
 
 
+class JournalLineInline(admin.TabularInline):
+    model = JournalLine
+    extra = 2
+
+
+@admin.register(JournalEntry)
+class JournalEntryAdmin(admin.ModelAdmin):
+    list_display = ['date', 'description', 'company', 'is_posted', 'posted_at']
+    list_filter = ['is_posted', 'date', 'company']
+    search_fields = ['description', 'company__company_name']
+    readonly_fields = ['transaction', 'is_posted', 'posted_at', 'created_at']
+    date_hierarchy = 'date'
+    inlines = [JournalLineInline]
+    actions = ['post_entries', 'unpost_entries']
+    
+    def post_entries(self, request, queryset):
+        for entry in queryset:
+            entry.post()
+    post_entries.short_description = 'Post selected entries'
+    
+    def unpost_entries(self, request, queryset):
+        for entry in queryset:
+            entry.unpost()
+    unpost_entries.short_description = 'Unpost selected entries'
+
+
+@admin.register(AccountBalanceSnapshot)
+class AccountBalanceSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['account', 'date', 'debit', 'credit', 'balance']
+    list_filter = ['date']
+    search_fields = ['account__name', 'account__account_number']
+    date_hierarchy = 'date'
+
+
 @admin.register(FinancialReport)
 class FinancialReportAdmin(admin.ModelAdmin):
     list_display = [
@@ -157,6 +195,50 @@ class FinancialReportAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('company', 'created_by')
 
 
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['source_app', 'reference_id', 'attempts', 'created_at']
+    list_filter = ['source_app', 'attempts']
+    search_fields = ['reference_id', 'last_error']
+    readonly_fields = ['created_at']
+
+
+class BankStatementLineInline(admin.TabularInline):
+    model = BankStatementLine
+    extra = 0
+    fields = ['date', 'description', 'reference', 'amount', 'status', 'transaction']
+    raw_id_fields = ['transaction']
+
+
+@admin.register(BankStatement)
+class BankStatementAdmin(admin.ModelAdmin):
+    list_display = ['name', 'company', 'file_format', 'start_date', 'end_date', 'reconciled_at', 'created_at']
+    list_filter = ['file_format', 'company']
+    search_fields = ['name', 'company__company_name']
+    readonly_fields = ['created_at', 'reconciled_at']
+    inlines = [BankStatementLineInline]
+
+
+
+@admin.register(ReceivableItem)
+class ReceivableItemAdmin(admin.ModelAdmin):
+    list_display = ['invoice', 'client_name', 'company', 'due_date', 'balance', 'updated_at']
+    list_filter = ['company']
+    search_fields = ['client_name', 'invoice__invoice_number']
+    raw_id_fields = ['invoice']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(ClientBalance)
+class ClientBalanceAdmin(admin.ModelAdmin):
+    list_display = [
+        'client_name', 'company', 'open_balance', 'invoice_count',
+        'days_0_30', 'days_31_60', 'days_61_90', 'days_over_90', 'aged_on'
+    ]
+    list_filter = ['company', 'aged_on']
+    search_fields = ['client_name', 'company__company_name']
+    readonly_fields = ['aged_on', 'updated_at']
+
 # Custom admin site configuration
 admin.site.site_header = "Business App Administration"
 admin.site.site_title = "Business App Admin"
@@ -1,9 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import api_views
 
 router = DefaultRouter()
 # Register viewsets here
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('receivables/aging/', api_views.receivables_aging, name='receivables_aging'),
 ]
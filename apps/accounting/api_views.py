@@ -0,0 +1,30 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .receivables import get_aging_report
+from .serializers import ClientBalanceSerializer
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def receivables_aging(request):
+    """
+    Receivables aging of the signed-in user's company: per-client open
+    balances and aging buckets, and the company totals
+    """
+    company = getattr(request.user, 'company_profile', None)
+    if not company:
+        return Response({'success': False, 'error': 'Company profile not found'}, status=400)
+
+    report = get_aging_report(company)
+    return Response({
+        'success': True,
+        'data': {
+            'as_of': report['as_of'],
+            'currency_code': company.currency_code,
+            'buckets': report['buckets'],
+            'totals': report['totals'],
+            'clients': ClientBalanceSerializer(report['clients'], many=True).data,
+        }
+    })
@@ -244,3 +244,44 @@ class ImportTransactionForm(forms.Form):
                 )
         
         return file
+
+
+class BankStatementImportForm(forms.Form):
+    """Form for importing a bank statement to reconcile"""
+    
+    file = forms.FileField(
+        label="Bank Statement",
+        help_text="Upload a CSV export or an OFX/QFX file from your bank",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.ofx,.qfx'})
+    )
+    
+    date_format = forms.ChoiceField(
+        choices=[
+            ('%Y-%m-%d', 'YYYY-MM-DD'),
+            ('%d/%m/%Y', 'DD/MM/YYYY'),
+            ('%m/%d/%Y', 'MM/DD/YYYY'),
+        ],
+        initial='%Y-%m-%d',
+        help_text="Date format used in CSV files",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    
+    def clean_file(self):
+        """Validate uploaded file"""
+        file = self.cleaned_data.get('file')
+        if file:
+            allowed_extensions = ['.csv', '.ofx', '.qfx']
+            file_extension = file.name.lower()
+            
+            if not any(file_extension.endswith(ext) for ext in allowed_extensions):
+                raise forms.ValidationError(
+                    "Please upload a CSV, OFX or QFX file."
+                )
+            
+            # Check file size (max 5MB)
+            if file.size > 5 * 1024 * 1024:
+                raise forms.ValidationError(
+                    "File size must be less than 5MB."
+                )
+        
+        return file
@@ -0,0 +1,139 @@
+"""
+Double-entry journal on top of the chart of accounts.
+
+Posting a ``JournalEntry`` moves ``Account.current_balance`` and the
+account's daily ``AccountBalanceSnapshot`` rows with F() updates, so balances
+are never recomputed by scanning lines. A trial balance or an account's
+balance history is read straight from the snapshots.
+
+Transactions are journaled against the company's default accounts: the
+first active asset account (cash), revenue account and expense account by
+account number. Companies without those accounts simply have no journal.
+"""
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import Account, AccountBalanceSnapshot, JournalEntry, JournalLine
+
+
+def get_default_accounts(company):
+    """{'asset': Account, 'revenue': Account, 'expense': Account} or None when any is missing"""
+    defaults = {}
+    for account in Account.objects.filter(
+        company=company,
+        is_active=True,
+        account_type__in=['asset', 'revenue', 'expense'],
+    ).order_by('account_number'):
+        defaults.setdefault(account.account_type, account)
+    if len(defaults) < 3:
+        return None
+    return defaults
+
+
+def transaction_lines(txn, accounts):
+    """(account, debit, credit) lines that record ``txn``"""
+    amount = txn.net_amount
+    if txn.type == 'income':
+        return [(accounts['asset'], amount, 0), (accounts['revenue'], 0, amount)]
+    return [(accounts['expense'], amount, 0), (accounts['asset'], 0, amount)]
+
+
+def journal_transaction(txn, accounts=None):
+    """
+    Bring ``txn``'s journal entry in line with the transaction.
+
+    Any existing entry is reversed and replaced; void transactions end up
+    with no entry. Returns the posted entry, or None.
+    """
+    with db_transaction.atomic():
+        existing = JournalEntry.objects.filter(transaction=txn).first()
+        if existing:
+            existing.unpost()
+            existing.delete()
+
+        if txn.is_void or not txn.net_amount:
+            return None
+        accounts = accounts or get_default_accounts(txn.company_id)
+        if not accounts:
+            return None
+
+        entry = JournalEntry.objects.create(
+            company_id=txn.company_id,
+            date=txn.transaction_date,
+            description=txn.title[:255],
+            transaction=txn,
+        )
+        JournalLine.objects.bulk_create([
+            JournalLine(entry=entry, account=account, debit=debit, credit=credit)
+            for account, debit, credit in transaction_lines(txn, accounts)
+        ])
+        entry.post()
+        return entry
+
+
+def unjournal_transaction(txn):
+    """Reverse and remove ``txn``'s journal entry, if it has one"""
+    with db_transaction.atomic():
+        for entry in JournalEntry.objects.filter(transaction=txn):
+            entry.unpost()
+            entry.delete()
+
+
+def get_trial_balance(company, as_of_date):
+    """
+    Every account's balance as of ``as_of_date`` in a single query.
+
+    Each account's latest snapshot on or before the date is picked with a
+    correlated subquery over the (account, date) index.
+    """
+    latest = AccountBalanceSnapshot.objects.filter(
+        account=OuterRef('pk'),
+        date__lte=as_of_date,
+    ).order_by('-date').values('balance')[:1]
+
+    rows = []
+    total_debit = Decimal('0')
+    total_credit = Decimal('0')
+    for account in Account.objects.filter(company=company).annotate(
+        posted_balance=Subquery(latest)
+    ).order_by('account_number'):
+        balance = account.opening_balance + (account.posted_balance or 0)
+        debit_side = account.account_type in Account.DEBIT_NORMAL_TYPES
+        # A negative balance is shown on the opposite side
+        if (balance >= 0) == debit_side:
+            debit, credit = abs(balance), Decimal('0')
+        else:
+            debit, credit = Decimal('0'), abs(balance)
+        total_debit += debit
+        total_credit += credit
+        rows.append({
+            'account': account,
+            'balance': balance,
+            'debit': debit,
+            'credit': credit,
+        })
+
+    return {
+        'as_of_date': as_of_date,
+        'accounts': rows,
+        'total_debit': total_debit,
+        'total_credit': total_credit,
+        'is_balanced': total_debit == total_credit,
+    }
+
+
+def get_account_history(account, start_date, end_date):
+    """Daily movement and closing balance (including the opening balance) over a period"""
+    return [
+        {
+            'date': snapshot['date'],
+            'debit': snapshot['debit'],
+            'credit': snapshot['credit'],
+            'balance': account.opening_balance + snapshot['balance'],
+        }
+        for snapshot in account.balance_snapshots.filter(
+            date__gte=start_date, date__lte=end_date
+        ).order_by('date').values('date', 'debit', 'credit', 'balance')
+    ]
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.accounting.receivables import age_receivables, rebuild_receivables
+from apps.core.models import CompanyProfile
+
+
+class Command(BaseCommand):
+    help = 'Re-age client receivable balances for today, or rebuild them from invoices'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            help='Only process a specific company ID',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recreate receivable items and client balances from invoices',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running as a worker, re-aging balances as days roll over',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=3600.0,
+            help='Seconds to wait between runs (with --loop)',
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        if options.get('company_id'):
+            company = CompanyProfile.objects.filter(id=options['company_id']).first()
+            if company is None:
+                raise CommandError(f"Company with ID {options['company_id']} not found")
+
+        if options['rebuild']:
+            companies = [company] if company else CompanyProfile.objects.all()
+            for profile in companies:
+                items = rebuild_receivables(profile)
+                self.stdout.write(f"{profile.company_name}: {items} open invoices")
+            self.stdout.write(self.style.SUCCESS('Receivables rebuilt'))
+            return
+
+        while True:
+            aged = age_receivables(company)
+            if aged:
+                self.stdout.write(f'Re-aged receivables of {aged} companies')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Receivables aged'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.accounting.journal import get_default_accounts, journal_transaction
+from apps.accounting.models import Transaction
+from apps.core.models import CompanyProfile
+
+
+class Command(BaseCommand):
+    help = 'Create journal entries for transactions that do not have one yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            help='Only journal transactions of a specific company ID',
+        )
+
+    def handle(self, *args, **options):
+        company_id = options.get('company_id')
+
+        companies = CompanyProfile.objects.all()
+        if company_id:
+            companies = companies.filter(id=company_id)
+            if not companies.exists():
+                raise CommandError(f"Company with ID {company_id} not found")
+
+        total = 0
+        for company in companies:
+            accounts = get_default_accounts(company)
+            if not accounts:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{company.company_name}: needs an active asset, revenue and expense account, skipped"
+                    )
+                )
+                continue
+
+            pending = Transaction.objects.filter(
+                company=company,
+                is_void=False,
+                journal_entry__isnull=True,
+            ).order_by('transaction_date')
+            count = 0
+            for txn in pending.iterator():
+                if journal_transaction(txn, accounts):
+                    count += 1
+            total += count
+            self.stdout.write(f"{company.company_name}: journaled {count} transactions")
+
+        self.stdout.write(self.style.SUCCESS(f"Journaled {total} transactions"))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.accounting.outbox import OUTBOX_BATCH_SIZE, process_outbox
+
+
+class Command(BaseCommand):
+    help = 'Sync queued invoice, receipt and job order events into accounting transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=OUTBOX_BATCH_SIZE,
+            help='Number of outbox events to process per batch',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running as a worker, polling for new events',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when the outbox is empty (with --loop)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            processed = process_outbox(batch_size)
+            total += processed
+            if processed:
+                self.stdout.write(f'Processed {processed} outbox events')
+            elif not options['loop']:
+                break
+            else:
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} outbox events'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.accounting.models import DailyRollup
+from apps.accounting.services import bump_accounting_data_version
+from apps.core.models import CompanyProfile
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily per-source transaction rollups from transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            help='Only rebuild rollups for a specific company ID',
+        )
+
+    def handle(self, *args, **options):
+        company_id = options.get('company_id')
+
+        companies = CompanyProfile.objects.all()
+        if company_id:
+            companies = companies.filter(id=company_id)
+            if not companies.exists():
+                raise CommandError(f"Company with ID {company_id} not found")
+
+        for company in companies:
+            DailyRollup.rebuild_company(company.id)
+            bump_accounting_data_version(company.id)
+            rows = DailyRollup.objects.filter(company=company).count()
+            self.stdout.write(f"{company.company_name}: {rows} rollup rows")
+
+        self.stdout.write(self.style.SUCCESS('Daily rollups rebuilt'))
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models.functions import ExtractMonth, ExtractYear
+from apps.accounting.models import Transaction, Ledger
+from apps.core.models import CompanyProfile
+
+
+class Command(BaseCommand):
+    help = 'Recompute monthly ledgers from transactions and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            help='Only rebuild ledgers for a specific company ID',
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report drift between stored ledgers and transactions, without writing',
+        )
+
+    def handle(self, *args, **options):
+        company_id = options.get('company_id')
+        verify = options.get('verify')
+
+        companies = CompanyProfile.objects.all()
+        if company_id:
+            companies = companies.filter(id=company_id)
+            if not companies.exists():
+                raise CommandError(f"Company with ID {company_id} not found")
+
+        drift_count = 0
+        checked_count = 0
+        for company in companies:
+            for year, month in self.get_months(company):
+                checked_count += 1
+                expected = Ledger.compute_totals(company.id, year, month)
+                stored = Ledger.objects.filter(company=company, year=year, month=month).first()
+
+                differences = []
+                for field, value in expected.items():
+                    stored_value = getattr(stored, field) if stored else None
+                    if stored_value != value:
+                        differences.append(f"{field}: {stored_value} -> {value}")
+
+                if differences:
+                    drift_count += 1
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f"{company.company_name} {year}/{month:02d}: " + ', '.join(differences)
+                        )
+                    )
+                    if not verify:
+                        Ledger.rebuild(company.id, year, month)
+
+        summary = f"Checked {checked_count} ledger months, {drift_count} with drift"
+        if verify and drift_count:
+            raise CommandError(summary)
+        if verify:
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{summary} (rebuilt)"))
+
+    def get_months(self, company):
+        """Every month that has a ledger row or at least one transaction"""
+        months = set(
+            Ledger.objects.filter(company=company).values_list('year', 'month')
+        )
+        months.update(
+            Transaction.objects.filter(company=company)
+            .annotate(year=ExtractYear('transaction_date'), month=ExtractMonth('transaction_date'))
+            .order_by()
+            .values_list('year', 'month')
+            .distinct()
+        )
+        return sorted(months)
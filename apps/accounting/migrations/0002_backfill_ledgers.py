@@ -0,0 +1,51 @@
+# Generated manually to rebuild monthly ledgers for reports
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
+
+
+def backfill_ledgers(apps, schema_editor):
+    """Recompute every company's monthly ledger rows from its transactions"""
+    Transaction = apps.get_model('accounting', 'Transaction')
+    Ledger = apps.get_model('accounting', 'Ledger')
+
+    rows = Transaction.objects.filter(is_void=False).annotate(
+        year=ExtractYear('transaction_date'),
+        month=ExtractMonth('transaction_date'),
+    ).order_by().values('company_id', 'year', 'month').annotate(
+        income=Coalesce(Sum('net_amount', filter=Q(type='income')), Decimal('0')),
+        expense=Coalesce(Sum('net_amount', filter=Q(type='expense')), Decimal('0')),
+    )
+
+    totals = {}
+    for row in rows:
+        totals[(row['company_id'], row['year'], row['month'])] = (row['income'], row['expense'])
+
+    # Months whose transactions were all voided or removed drop back to zero
+    for ledger in Ledger.objects.all().only('company_id', 'year', 'month'):
+        totals.setdefault((ledger.company_id, ledger.year, ledger.month), (Decimal('0'), Decimal('0')))
+
+    for (company_id, year, month), (income, expense) in totals.items():
+        Ledger.objects.update_or_create(
+            company_id=company_id,
+            year=year,
+            month=month,
+            defaults={
+                'total_income': income,
+                'total_expense': expense,
+                'net_profit': income - expense,
+            },
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ledgers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0002_backfill_ledgers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialreport',
+            name='data_version',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:45
+
+from django.db import migrations, models
+
+
+SEARCH_INDEX_NAME = 'accounting_txn_search_idx'
+
+
+def _search_index():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return GinIndex(
+        SearchVector('title', 'description', 'notes', config='english'),
+        name=SEARCH_INDEX_NAME,
+    )
+
+
+def add_search_index(apps, schema_editor):
+    """Full-text index backing transaction search; PostgreSQL only"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.add_index(apps.get_model('accounting', 'Transaction'), _search_index())
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('accounting', 'Transaction'), _search_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0003_financialreport_data_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['company', 'is_void', '-transaction_date', '-created_at', '-id'], name='accounting_txn_keyset_idx'),
+        ),
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
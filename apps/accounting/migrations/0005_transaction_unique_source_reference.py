@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:42
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_syncs(apps, schema_editor):
+    """Keep the oldest transaction per synced document and rebuild the ledgers it touched"""
+    Transaction = apps.get_model('accounting', 'Transaction')
+    Ledger = apps.get_model('accounting', 'Ledger')
+
+    duplicated = Transaction.objects.filter(reference_id__isnull=False).values(
+        'source_app', 'reference_id'
+    ).annotate(copies=Count('pk')).filter(copies__gt=1)
+
+    months = set()
+    for group in duplicated:
+        copies = list(Transaction.objects.filter(
+            source_app=group['source_app'],
+            reference_id=group['reference_id'],
+        ).order_by('created_at', 'pk'))
+        for extra in copies[1:]:
+            months.add((extra.company_id, extra.transaction_date.year, extra.transaction_date.month))
+            extra.delete()
+
+    for company_id, year, month in months:
+        totals = Transaction.objects.filter(
+            company_id=company_id,
+            transaction_date__year=year,
+            transaction_date__month=month,
+            is_void=False,
+        ).aggregate(
+            income=Coalesce(Sum('net_amount', filter=Q(type='income')), Decimal('0')),
+            expense=Coalesce(Sum('net_amount', filter=Q(type='expense')), Decimal('0')),
+        )
+        Ledger.objects.update_or_create(
+            company_id=company_id,
+            year=year,
+            month=month,
+            defaults={
+                'total_income': totals['income'],
+                'total_expense': totals['expense'],
+                'net_profit': totals['income'] - totals['expense'],
+            },
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0004_transaction_keyset_and_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_syncs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('source_app', 'reference_id'), name='accounting_txn_unique_source_ref'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0005_transaction_unique_source_reference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_app', models.CharField(choices=[('manual', 'Manual Entry'), ('invoice', 'Invoice'), ('receipt', 'Receipt'), ('job_order', 'Job Order'), ('waybill', 'Waybill'), ('inventory', 'Inventory'), ('expense', 'Expense Tracker')], max_length=20)),
+                ('reference_id', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['attempts', 'id'], name='accounting__attempt_01f820_idx')],
+            },
+        ),
+    ]
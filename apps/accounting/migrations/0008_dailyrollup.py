@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:48
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def backfill_daily_rollups(apps, schema_editor):
+    """Build rollup rows for every existing transaction day"""
+    Transaction = apps.get_model('accounting', 'Transaction')
+    DailyRollup = apps.get_model('accounting', 'DailyRollup')
+
+    rows = Transaction.objects.filter(is_void=False).order_by().values(
+        'company_id', 'transaction_date', 'type', 'source_app'
+    ).annotate(total=Sum('net_amount'), count=Count('pk'))
+    DailyRollup.objects.bulk_create([
+        DailyRollup(
+            company_id=row['company_id'],
+            date=row['transaction_date'],
+            type=row['type'],
+            source_app=row['source_app'],
+            total=row['total'] or 0,
+            count=row['count'],
+        )
+        for row in rows.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('accounting', '0007_journal_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('source_app', models.CharField(choices=[('manual', 'Manual Entry'), ('invoice', 'Invoice'), ('receipt', 'Receipt'), ('job_order', 'Job Order'), ('waybill', 'Waybill'), ('inventory', 'Inventory'), ('expense', 'Expense Tracker')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='core.companyprofile')),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrollup',
+            constraint=models.UniqueConstraint(fields=('company', 'date', 'type', 'source_app'), name='accounting_rollup_unique_day'),
+        ),
+        migrations.RunPython(backfill_daily_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_company_branding_assets'),
+        ('invoices', '0009_invoice_number_per_user'),
+        ('accounting', '0009_bank_statements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceivableItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_key', models.CharField(max_length=200)),
+                ('client_name', models.CharField(max_length=200)),
+                ('due_date', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receivable_items', to='core.companyprofile')),
+                ('invoice', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='receivable', to='invoices.invoice')),
+            ],
+            options={
+                'ordering': ['due_date'],
+                'indexes': [models.Index(fields=['company', 'client_key'], name='accounting__company_c8e335_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ClientBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_key', models.CharField(max_length=200)),
+                ('client_name', models.CharField(max_length=200)),
+                ('open_balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('invoice_count', models.IntegerField(default=0)),
+                ('days_0_30', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('days_31_60', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('days_61_90', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('days_over_90', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('oldest_due_date', models.DateField(blank=True, null=True)),
+                ('aged_on', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='client_balances', to='core.companyprofile')),
+            ],
+            options={
+                'ordering': ['-open_balance'],
+                'indexes': [models.Index(fields=['company', 'aged_on'], name='accounting__company_518934_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='clientbalance',
+            constraint=models.UniqueConstraint(fields=('company', 'client_key'), name='accounting_client_balance_unique'),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated manually to materialize receivables for existing invoices
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+# Frozen copies of the receivables rules as of this migration, so later
+# changes to the app code do not change what it does
+OPEN_STATUSES = ['unpaid', 'partial']
+AGING_BUCKETS = [
+    ('days_0_30', None, 30),
+    ('days_31_60', 31, 60),
+    ('days_61_90', 61, 90),
+    ('days_over_90', 91, None),
+]
+
+
+def client_key(client_name):
+    return ' '.join((client_name or '').split()).casefold()[:200]
+
+
+def aging_aggregates(today):
+    aggregates = {}
+    for name, min_days, max_days in AGING_BUCKETS:
+        condition = Q()
+        if min_days is not None:
+            condition &= Q(due_date__lte=today - timedelta(days=min_days))
+        if max_days is not None:
+            condition &= Q(due_date__gte=today - timedelta(days=max_days))
+        aggregates[name] = Coalesce(Sum('balance', filter=condition), Decimal('0'))
+    return aggregates
+
+
+def backfill_receivables(apps, schema_editor):
+    """Create receivable items for open invoices and age every client's balance"""
+    Invoice = apps.get_model('invoices', 'Invoice')
+    CompanyProfile = apps.get_model('core', 'CompanyProfile')
+    ReceivableItem = apps.get_model('accounting', 'ReceivableItem')
+    ClientBalance = apps.get_model('accounting', 'ClientBalance')
+
+    companies = dict(CompanyProfile.objects.values_list('user_id', 'pk'))
+    invoices = Invoice.objects.filter(status__in=OPEN_STATUSES, balance_due__gt=0).values(
+        'pk', 'user_id', 'client_name', 'due_date', 'invoice_date', 'balance_due',
+    )
+    items = []
+    for invoice in invoices.iterator():
+        company_id = companies.get(invoice['user_id'])
+        if company_id is None:
+            continue
+        name = (invoice['client_name'] or '').strip()
+        items.append(ReceivableItem(
+            company_id=company_id,
+            invoice_id=invoice['pk'],
+            client_key=client_key(name),
+            client_name=name[:200],
+            due_date=invoice['due_date'] or invoice['invoice_date'],
+            balance=invoice['balance_due'],
+        ))
+    ReceivableItem.objects.bulk_create(items, batch_size=1000)
+
+    today = timezone.localdate()
+    rows = ReceivableItem.objects.order_by().values('company_id', 'client_key').annotate(
+        open_balance=Sum('balance'),
+        invoice_count=Count('pk'),
+        oldest_due_date=Min('due_date'),
+        # The name on the client's most recent invoice
+        display_name=Subquery(
+            ReceivableItem.objects.filter(company_id=OuterRef('company_id'), client_key=OuterRef('client_key'))
+            .order_by('-invoice_id').values('client_name')[:1]
+        ),
+        **aging_aggregates(today),
+    )
+    ClientBalance.objects.bulk_create([
+        ClientBalance(aged_on=today, client_name=row.pop('display_name'), **row)
+        for row in rows
+    ], batch_size=1000)
+
+
+def remove_receivables(apps, schema_editor):
+    apps.get_model('accounting', 'ClientBalance').objects.all().delete()
+    apps.get_model('accounting', 'ReceivableItem').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0010_receivables'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_receivables, remove_receivables),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_company_branding_assets'),
+        ('accounting', '0011_backfill_receivables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='accounting_data_version', serialize=False, to='core.companyprofile')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0012_data_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='journalline',
+            name='account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='journal_lines', to='accounting.account'),
+        ),
+    ]
@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
-from django.db.models import Sum, Q
+from django.db.models import Sum, Q, F
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from datetime import date, timedelta
 from decimal import Decimal
 import uuid
 
@@ -64,56 +67,121 @@ class Transaction(models.Model):
             models.Index(fields=['company', 'transaction_date']),
             models.Index(fields=['source_app', 'reference_id']),
             models.Index(fields=['type', 'transaction_date']),
+            # Keyset pagination of the transaction list
+            models.Index(
+                fields=['company', 'is_void', '-transaction_date', '-created_at', '-id'],
+                name='accounting_txn_keyset_idx',
+            ),
+        ]
+        constraints = [
+            # A source document is synced into at most one transaction
+            models.UniqueConstraint(
+                fields=['source_app', 'reference_id'],
+                name='accounting_txn_unique_source_ref',
+            ),
         ]
     
     def __str__(self):
         return f"{self.title} ({self.type}) - {self.amount} {self.currency}"
     
-    def save(self, *args, **kwargs):
-        # Calculate net amount
+    # Fields that determine how a transaction contributes to the monthly ledger
+    LEDGER_FIELDS = ('company_id', 'transaction_date', 'type', 'net_amount', 'is_void')
+    # ... and to the daily per-source rollup
+    ROLLUP_FIELDS = ('company_id', 'transaction_date', 'type', 'source_app', 'net_amount', 'is_void')
+    
+    @staticmethod
+    def ledger_contribution(company_id, transaction_date, type, net_amount, is_void):
+        """Return ((company_id, year, month), income, expense), or None when void"""
+        if is_void:
+            return None
+        net_amount = Decimal(net_amount or 0)
+        key = (company_id, transaction_date.year, transaction_date.month)
+        if type == 'income':
+            return key, net_amount, Decimal('0')
+        return key, Decimal('0'), net_amount
+    
+    @staticmethod
+    def rollup_contribution(company_id, transaction_date, type, source_app, net_amount, is_void):
+        """Return ((company_id, date, type, source_app), amount), or None when void"""
+        if is_void:
+            return None
+        return (company_id, transaction_date, type, source_app), Decimal(net_amount or 0)
+    
+    def get_ledger_contribution(self):
+        """This transaction's current contribution to its monthly ledger"""
+        return self.ledger_contribution(*(getattr(self, field) for field in self.LEDGER_FIELDS))
+    
+    def get_rollup_contribution(self):
+        """This transaction's current contribution to its daily rollup"""
+        return self.rollup_contribution(*(getattr(self, field) for field in self.ROLLUP_FIELDS))
+    
+    def get_saved_states(self):
+        """
+        (ledger, rollup) contributions of the row as currently stored in the database.
+        
+        The row is locked until the surrounding transaction ends, so concurrent
+        edits of the same transaction apply their deltas one after the other.
+        """
+        if self._state.adding:
+            return None, None
+        stored = Transaction.objects.select_for_update().filter(pk=self.pk).values(*self.ROLLUP_FIELDS).first()
+        if not stored:
+            return None, None
+        ledger_state = self.ledger_contribution(**{field: stored[field] for field in self.LEDGER_FIELDS})
+        return ledger_state, self.rollup_contribution(**stored)
+    
+    def calculate_net_amount(self):
+        """Set net_amount from amount, tax and discount"""
         self.net_amount = self.amount
         if self.tax:
             self.net_amount += self.tax
         if self.discount:
             self.net_amount -= self.discount
+    
+    def save(self, *args, **kwargs):
+        # Calculate net amount
+        self.calculate_net_amount()
         
-        super().save(*args, **kwargs)
-        
-        # Update ledger
-        self.update_ledger()
-    
-    def update_ledger(self):
-        """Update the ledger for this transaction's month/year"""
-        if not self.is_void:
-            ledger, created = Ledger.objects.get_or_create(
-                company=self.company,
-                year=self.transaction_date.year,
-                month=self.transaction_date.month,
-                defaults={
-                    'total_income': 0,
-                    'total_expense': 0,
-                    'net_profit': 0
-                }
-            )
-            
-            # Recalculate totals for this month
-            transactions = Transaction.objects.filter(
-                company=self.company,
-                transaction_date__year=self.transaction_date.year,
-                transaction_date__month=self.transaction_date.month,
-                is_void=False
-            )
-            
-            ledger.total_income = transactions.filter(type='income').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
+        with transaction.atomic():
+            previous, previous_rollup = self.get_saved_states()
+            super().save(*args, **kwargs)
             
-            ledger.total_expense = transactions.filter(type='expense').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
+            # Update ledger and daily rollup
+            self.update_ledger(previous)
+            self.update_rollup(previous_rollup)
             
-            ledger.net_profit = ledger.total_income - ledger.total_expense
-            ledger.save()
+            # Keep the double-entry journal in step with the amounts
+            if previous != self.get_ledger_contribution():
+                from .journal import journal_transaction
+                journal_transaction(self)
+    
+    def update_ledger(self, previous=None):
+        """Apply the change from ``previous`` to this transaction's current state to the ledgers"""
+        deltas = {}
+        if previous:
+            key, income, expense = previous
+            deltas[key] = (-income, -expense)
+        current = self.get_ledger_contribution()
+        if current:
+            key, income, expense = current
+            old_income, old_expense = deltas.get(key, (Decimal('0'), Decimal('0')))
+            deltas[key] = (old_income + income, old_expense + expense)
+        
+        for (company_id, year, month), (income, expense) in deltas.items():
+            if income or expense:
+                Ledger.apply_delta(company_id, year, month, income, expense)
+    
+    def update_rollup(self, previous=None):
+        """Apply the change from ``previous`` to this transaction's current state to the daily rollups"""
+        current = self.get_rollup_contribution()
+        if previous == current:
+            return
+        if previous:
+            key, amount = previous
+            DailyRollup.apply_delta(*key, amount=-amount, count=-1)
+        if current:
+            key, amount = current
+            DailyRollup.apply_delta(*key, amount=amount, count=1)
 
 
 class Ledger(models.Model):
@@ -145,6 +213,67 @@ class Ledger(models.Model):
     def __str__(self):
         return f"{self.company.company_name} - {self.year}/{self.month:02d}"
     
+    @staticmethod
+    def month_bounds(year, month):
+        """First day of the month and first day of the following month"""
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        return start, end
+    
+    @classmethod
+    def compute_totals(cls, company_id, year, month):
+        """Recompute a month's totals from its transactions in one query"""
+        start, end = cls.month_bounds(year, month)
+        totals = Transaction.objects.filter(
+            company_id=company_id,
+            transaction_date__gte=start,
+            transaction_date__lt=end,
+            is_void=False
+        ).aggregate(
+            total_income=Coalesce(Sum('net_amount', filter=Q(type='income')), Decimal('0')),
+            total_expense=Coalesce(Sum('net_amount', filter=Q(type='expense')), Decimal('0')),
+        )
+        totals['net_profit'] = totals['total_income'] - totals['total_expense']
+        return totals
+    
+    @classmethod
+    def rebuild(cls, company_id, year, month):
+        """Recompute and store a month's ledger from scratch"""
+        ledger, _ = cls.objects.update_or_create(
+            company_id=company_id,
+            year=year,
+            month=month,
+            defaults=cls.compute_totals(company_id, year, month)
+        )
+        return ledger
+    
+    @classmethod
+    def apply_delta(cls, company_id, year, month, income=0, expense=0, rebuild_missing=True):
+        """
+        Atomically add income/expense deltas to a month's ledger.
+        
+        A missing ledger row is rebuilt from the month's transactions instead,
+        so months that predate incremental maintenance start out correct.
+        Deletions pass ``rebuild_missing=False``: a company cascade removes the
+        ledgers before its transactions, and rebuilding would re-insert rows
+        for the company being deleted.
+        """
+        income = Decimal(income)
+        expense = Decimal(expense)
+        updated = cls.objects.filter(company_id=company_id, year=year, month=month).update(
+            total_income=F('total_income') + income,
+            total_expense=F('total_expense') + expense,
+            net_profit=F('net_profit') + (income - expense),
+            updated_at=timezone.now()
+        )
+        if not updated and rebuild_missing:
+            try:
+                with transaction.atomic():
+                    cls.rebuild(company_id, year, month)
+            except IntegrityError:
+                # Another writer created the row concurrently; recompute against it
+                cls.rebuild(company_id, year, month)
+    
     @property
     def month_name(self):
         """Get month name"""
@@ -153,15 +282,10 @@ class Ledger(models.Model):
     
     def update_outstanding_amounts(self):
         """Update outstanding invoices and pending receipts"""
-        from apps.invoices.models import Invoice
-        from apps.receipts.models import Receipt
+        from .receivables import get_receivables_total
         
-        # Outstanding invoices
-        outstanding = Invoice.objects.filter(
-            user=self.company.user,
-            status__in=['unpaid', 'partial']
-        ).aggregate(total=Sum('balance_due'))['total'] or 0
-        self.outstanding_invoices = outstanding
+        # Outstanding invoices, from the materialized client balances
+        self.outstanding_invoices = get_receivables_total(self.company)
         
         # Pending receipts (if any logic needed)
         self.pending_receipts = 0
@@ -169,6 +293,93 @@ class Ledger(models.Model):
         self.save()
 
 
+class DailyRollup(models.Model):
+    """Per-day totals of non-void transactions by type and source app"""
+    company = models.ForeignKey('core.CompanyProfile', on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPE)
+    source_app = models.CharField(max_length=20, choices=Transaction.SOURCE_APP_CHOICES)
+    
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company', 'date', 'type', 'source_app'],
+                name='accounting_rollup_unique_day',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.company_id} {self.date} {self.type}/{self.source_app}: {self.total}"
+    
+    @classmethod
+    def rebuild(cls, company_id, date, type, source_app):
+        """Recompute and store one rollup row from its transactions"""
+        totals = Transaction.objects.filter(
+            company_id=company_id,
+            transaction_date=date,
+            type=type,
+            source_app=source_app,
+            is_void=False
+        ).aggregate(
+            total=Coalesce(Sum('net_amount'), Decimal('0')),
+            count=models.Count('pk'),
+        )
+        cls.objects.update_or_create(
+            company_id=company_id, date=date, type=type, source_app=source_app,
+            defaults=totals,
+        )
+    
+    @classmethod
+    def apply_delta(cls, company_id, date, type, source_app, amount=0, count=0, rebuild_missing=True):
+        """
+        Atomically add ``amount`` and ``count`` to one rollup row.
+        
+        A missing row is rebuilt from its transactions instead, so days that
+        predate the rollup start out correct. Deletions pass
+        ``rebuild_missing=False``: a company cascade removes the rollup rows
+        before its transactions, and rebuilding would re-insert rows for the
+        company being deleted.
+        """
+        updated = cls.objects.filter(
+            company_id=company_id, date=date, type=type, source_app=source_app
+        ).update(total=F('total') + Decimal(amount), count=F('count') + count)
+        if not updated and rebuild_missing:
+            try:
+                with transaction.atomic():
+                    cls.rebuild(company_id, date, type, source_app)
+            except IntegrityError:
+                # Another writer created the row concurrently; recompute against it
+                cls.rebuild(company_id, date, type, source_app)
+    
+    @classmethod
+    def rebuild_company(cls, company_id):
+        """Replace all of a company's rollup rows with a fresh grouped aggregate"""
+        rows = Transaction.objects.filter(
+            company_id=company_id,
+            is_void=False
+        ).order_by().values('transaction_date', 'type', 'source_app').annotate(
+            total=Sum('net_amount'),
+            count=models.Count('pk'),
+        )
+        with transaction.atomic():
+            cls.objects.filter(company_id=company_id).delete()
+            cls.objects.bulk_create([
+                cls(
+                    company_id=company_id,
+                    date=row['transaction_date'],
+                    type=row['type'],
+                    source_app=row['source_app'],
+                    total=row['total'] or 0,
+                    count=row['count'],
+                )
+                for row in rows
+            ], batch_size=1000)
+
+
 class Account(models.Model):
     """Chart of accounts for better financial organization"""
     ACCOUNT_TYPE_CHOICES = [
@@ -203,17 +414,207 @@ class Account(models.Model):
     def __str__(self):
         return f"{self.account_number} - {self.name}"
     
+    # Account types whose balance grows with debits; the rest grow with credits
+    DEBIT_NORMAL_TYPES = ('asset', 'expense')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_opening_balance = instance.__dict__.get('opening_balance')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # current_balance is maintained with F() updates by journal posting, so a
+        # plain save must not write back a possibly stale in-memory value
+        if self._state.adding:
+            self.current_balance = self.opening_balance
+            super().save(*args, **kwargs)
+        else:
+            if kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name != 'current_balance'
+                ]
+            previous_opening = getattr(self, '_saved_opening_balance', self.opening_balance)
+            super().save(*args, **kwargs)
+            opening_change = Decimal(self.opening_balance) - Decimal(previous_opening or 0)
+            if opening_change:
+                Account.objects.filter(pk=self.pk).update(current_balance=F('current_balance') + opening_change)
+        self._saved_opening_balance = self.opening_balance
+    
+    def balance_change(self, debit, credit):
+        """Change in this account's balance from a debit and credit"""
+        if self.account_type in self.DEBIT_NORMAL_TYPES:
+            return Decimal(debit) - Decimal(credit)
+        return Decimal(credit) - Decimal(debit)
+    
     def update_balance(self):
-        """Update current balance based on transactions"""
-        transactions = Transaction.objects.filter(
-            company=self.company,
-            is_void=False
-        )
+        """Recompute current balance from the latest daily balance snapshot"""
+        latest = self.balance_snapshots.order_by('-date').values_list('balance', flat=True).first()
+        self.current_balance = self.opening_balance + (latest or 0)
+        self.save(update_fields=['current_balance', 'updated_at'])
+
+
+class JournalEntry(models.Model):
+    """A balanced set of journal lines; balances only move once it is posted"""
+    company = models.ForeignKey('core.CompanyProfile', on_delete=models.CASCADE, related_name='journal_entries')
+    date = models.DateField(default=timezone.now)
+    description = models.CharField(max_length=255, blank=True)
+    
+    # Source transaction for entries generated from the transaction list
+    transaction = models.OneToOneField(
+        Transaction, on_delete=models.SET_NULL, null=True, blank=True, related_name='journal_entry'
+    )
+    
+    is_posted = models.BooleanField(default=False)
+    posted_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-date', '-created_at']
+        verbose_name_plural = 'Journal entries'
+        indexes = [
+            models.Index(fields=['company', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} - {self.description}"
+    
+    def account_totals(self):
+        """{account: (debit, credit)} summed over this entry's lines"""
+        totals = {}
+        for line in self.lines.select_related('account'):
+            debit, credit = totals.get(line.account, (Decimal('0'), Decimal('0')))
+            totals[line.account] = (debit + line.debit, credit + line.credit)
+        return totals
+    
+    def post(self):
+        """Validate the entry and apply its lines to the account balances"""
+        if self.is_posted:
+            return
+        totals = self.account_totals()
+        debit = sum((d for d, _ in totals.values()), Decimal('0'))
+        credit = sum((c for _, c in totals.values()), Decimal('0'))
+        if not debit or debit != credit:
+            raise ValidationError(f"Journal entry is not balanced: debits {debit} != credits {credit}")
+        with transaction.atomic():
+            for account, (debit, credit) in totals.items():
+                AccountBalanceSnapshot.apply_change(account, self.date, debit, credit)
+            self.is_posted = True
+            self.posted_at = timezone.now()
+            self.save(update_fields=['is_posted', 'posted_at'])
+    
+    def unpost(self):
+        """Reverse a posted entry's effect on the account balances"""
+        if not self.is_posted:
+            return
+        with transaction.atomic():
+            for account, (debit, credit) in self.account_totals().items():
+                AccountBalanceSnapshot.apply_change(account, self.date, -debit, -credit)
+            self.is_posted = False
+            self.posted_at = None
+            self.save(update_fields=['is_posted', 'posted_at'])
+
+
+class JournalLine(models.Model):
+    """One debit or credit against an account"""
+    entry = models.ForeignKey(JournalEntry, on_delete=models.CASCADE, related_name='lines')
+    account = models.ForeignKey(Account, on_delete=models.RESTRICT, related_name='journal_lines')
+    debit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    memo = models.CharField(max_length=255, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['account', 'entry']),
+        ]
+    
+    def __str__(self):
+        return f"{self.account} Dr {self.debit} Cr {self.credit}"
+
+
+class AccountBalanceSnapshot(models.Model):
+    """
+    An account's posted movement on one day and its closing balance.
+    
+    ``balance`` is the cumulative posted movement up to and including
+    ``date``, excluding the account's opening balance, so a balance as of
+    any day is one indexed lookup of the latest snapshot on or before it.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='balance_snapshots')
+    date = models.DateField()
+    debit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['account', 'date']
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'date'], name='accounting_snapshot_unique_day'),
+        ]
+    
+    def __str__(self):
+        return f"{self.account} {self.date}: {self.balance}"
+    
+    @classmethod
+    def apply_change(cls, account, day, debit, credit):
+        """
+        Atomically post ``debit`` and ``credit`` to the account as of ``day``.
         
-        # This is a simplified balance calculation
-        # In a real system, you'd have proper double-entry bookkeeping
-        self.current_balance = self.opening_balance
-        self.save()
+        The day's snapshot records the movement, and it plus every later
+        snapshot and ``Account.current_balance`` move by the resulting
+        balance change. Pass negated amounts to reverse a posting.
+        """
+        debit = Decimal(debit)
+        credit = Decimal(credit)
+        if not debit and not credit:
+            return
+        change = account.balance_change(debit, credit)
+        
+        updated = cls.objects.filter(account=account, date=day).update(
+            debit=F('debit') + debit,
+            credit=F('credit') + credit,
+            balance=F('balance') + change,
+        )
+        if not updated:
+            previous = cls.objects.filter(
+                account=account, date__lt=day
+            ).order_by('-date').values_list('balance', flat=True).first() or Decimal('0')
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        account=account, date=day, debit=debit, credit=credit, balance=previous + change
+                    )
+            except IntegrityError:
+                # Another writer created the day concurrently; post on top of it
+                cls.objects.filter(account=account, date=day).update(
+                    debit=F('debit') + debit,
+                    credit=F('credit') + credit,
+                    balance=F('balance') + change,
+                )
+        if change:
+            cls.objects.filter(account=account, date__gt=day).update(balance=F('balance') + change)
+            Account.objects.filter(pk=account.pk).update(
+                current_balance=F('current_balance') + change, updated_at=timezone.now()
+            )
+
+
+class DataVersion(models.Model):
+    """
+    Version of a company's accounting data.
+    
+    Bumped in the same database transaction as every transaction or invoice
+    write, so every process sees a new version exactly when the data it
+    describes is committed. Cached figures and stored report snapshots are
+    keyed by it.
+    """
+    company = models.OneToOneField(
+        'core.CompanyProfile', on_delete=models.CASCADE, primary_key=True, related_name='accounting_data_version'
+    )
+    version = models.PositiveBigIntegerField(default=1)
+    
+    def __str__(self):
+        return f"{self.company_id} v{self.version}"
 
 
 class FinancialReport(models.Model):
@@ -236,6 +637,8 @@ class FinancialReport(models.Model):
     
     # Report data (stored as JSON)
     report_data = models.JSONField(default=dict)
+    # Accounting data version the stored report_data was computed at
+    data_version = models.BigIntegerField(null=True, blank=True)
     
     # File attachments
     pdf_file = models.FileField(upload_to='reports/pdf/', blank=True, null=True)
@@ -253,3 +656,237 @@ class FinancialReport(models.Model):
     
     def __str__(self):
         return f"{self.title} - {self.start_date} to {self.end_date}"
+
+
+class OutboxEvent(models.Model):
+    """
+    A source document that may need an accounting transaction.
+
+    Written by the document post_save signals in the same database transaction
+    as the document itself and consumed in batches by ``process_outbox``.
+    """
+    source_app = models.CharField(max_length=20, choices=Transaction.SOURCE_APP_CHOICES)
+    reference_id = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    # Failed processing attempts, kept for retries
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['attempts', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.source_app} {self.reference_id}"
+
+
+class BankStatement(models.Model):
+    """An imported bank statement and the state of its reconciliation"""
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('ofx', 'OFX'),
+    ]
+    
+    company = models.ForeignKey('core.CompanyProfile', on_delete=models.CASCADE, related_name='bank_statements')
+    name = models.CharField(max_length=255)
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv')
+    
+    # Statement period, taken from the imported lines
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bank_statements')
+    created_at = models.DateTimeField(auto_now_add=True)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.name} ({self.start_date} to {self.end_date})"
+
+
+class BankStatementLine(models.Model):
+    """
+    One line of a bank statement.
+    
+    ``amount`` is signed the way the bank sees it: money in is positive,
+    money out is negative. Ambiguous lines keep the ids of every candidate
+    transaction for the review screen.
+    """
+    STATUS_CHOICES = [
+        ('unmatched', 'Unmatched'),
+        ('matched', 'Matched'),
+        ('ambiguous', 'Needs Review'),
+        ('reconciled', 'Reconciled'),
+        ('ignored', 'Ignored'),
+    ]
+    
+    statement = models.ForeignKey(BankStatement, on_delete=models.CASCADE, related_name='lines')
+    date = models.DateField()
+    description = models.CharField(max_length=255, blank=True)
+    reference = models.CharField(max_length=100, blank=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='unmatched')
+    transaction = models.ForeignKey(
+        Transaction, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='statement_lines'
+    )
+    candidate_ids = models.JSONField(default=list, blank=True)
+    
+    class Meta:
+        ordering = ['date', 'id']
+        indexes = [
+            models.Index(fields=['statement', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.description} {self.amount}"
+
+
+# Aging buckets as (field, fewest days overdue, most days overdue); invoices
+# not yet due count as 0-30 days
+AGING_BUCKETS = [
+    ('days_0_30', None, 30),
+    ('days_31_60', 31, 60),
+    ('days_61_90', 61, 90),
+    ('days_over_90', 91, None),
+]
+
+
+def aging_aggregates(today, field='balance', date_field='due_date'):
+    """``Sum`` of ``field`` per aging bucket as of ``today``, for aggregate()/annotate()"""
+    aggregates = {}
+    for name, min_days, max_days in AGING_BUCKETS:
+        condition = Q()
+        if min_days is not None:
+            condition &= Q(**{f'{date_field}__lte': today - timedelta(days=min_days)})
+        if max_days is not None:
+            condition &= Q(**{f'{date_field}__gte': today - timedelta(days=max_days)})
+        aggregates[name] = Coalesce(Sum(field, filter=condition), Decimal('0'))
+    return aggregates
+
+
+class ReceivableItem(models.Model):
+    """
+    An invoice with a balance still to collect.
+    
+    Kept in step with its invoice by ``apps.accounting.receivables``; paid
+    and deleted invoices have no row. ``due_date`` falls back to the
+    invoice date for invoices without one.
+    """
+    company = models.ForeignKey('core.CompanyProfile', on_delete=models.CASCADE, related_name='receivable_items')
+    invoice = models.OneToOneField('invoices.Invoice', on_delete=models.CASCADE, related_name='receivable')
+    client_key = models.CharField(max_length=200)
+    client_name = models.CharField(max_length=200)
+    due_date = models.DateField()
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['due_date']
+        indexes = [
+            models.Index(fields=['company', 'client_key']),
+        ]
+    
+    def __str__(self):
+        return f"{self.client_name}: {self.balance} due {self.due_date}"
+
+
+class ClientBalance(models.Model):
+    """
+    A client's open receivables and their aging as of ``aged_on``.
+    
+    Clients are the invoices' client names, compared case-insensitively
+    (``client_key``). Rows are recomputed from the client's receivable items
+    whenever one of them changes and re-aged when the day rolls over, so
+    reports read one row per client instead of scanning invoices.
+    """
+    company = models.ForeignKey('core.CompanyProfile', on_delete=models.CASCADE, related_name='client_balances')
+    client_key = models.CharField(max_length=200)
+    client_name = models.CharField(max_length=200)
+    
+    open_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    invoice_count = models.IntegerField(default=0)
+    days_0_30 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    days_31_60 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    days_61_90 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    days_over_90 = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    oldest_due_date = models.DateField(null=True, blank=True)
+    
+    aged_on = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-open_balance']
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'client_key'], name='accounting_client_balance_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['company', 'aged_on']),
+        ]
+    
+    def __str__(self):
+        return f"{self.client_name}: {self.open_balance}"
+    
+    @staticmethod
+    def latest_client_name(company_id, client_key):
+        """The client's name as written on its most recent open invoice"""
+        return ReceivableItem.objects.filter(
+            company_id=company_id, client_key=client_key
+        ).order_by('-invoice_id').values('client_name')[:1]
+    
+    @classmethod
+    def _totals(cls, items, today):
+        return items.aggregate(
+            open_balance=Sum('balance'),
+            invoice_count=models.Count('pk'),
+            oldest_due_date=models.Min('due_date'),
+            **aging_aggregates(today),
+        )
+    
+    @classmethod
+    def refresh(cls, company_id, client_key, today=None):
+        """Recompute one client's row from its receivable items; clients with none lose their row"""
+        today = today or timezone.localdate()
+        totals = cls._totals(
+            ReceivableItem.objects.filter(company_id=company_id, client_key=client_key), today
+        )
+        if not totals['invoice_count']:
+            cls.objects.filter(company_id=company_id, client_key=client_key).delete()
+            return
+        totals['client_name'] = cls.latest_client_name(company_id, client_key).get()['client_name']
+        try:
+            with transaction.atomic():
+                cls.objects.update_or_create(
+                    company_id=company_id, client_key=client_key,
+                    defaults=dict(totals, aged_on=today),
+                )
+        except IntegrityError:
+            # Another writer created the row concurrently; recompute against it
+            cls.objects.update_or_create(
+                company_id=company_id, client_key=client_key,
+                defaults=dict(totals, aged_on=today),
+            )
+    
+    @classmethod
+    def rebuild_company(cls, company_id, today=None):
+        """Replace all of a company's rows with a fresh grouped aggregate of its receivable items"""
+        today = today or timezone.localdate()
+        rows = ReceivableItem.objects.filter(company_id=company_id).order_by().values('client_key').annotate(
+            open_balance=Sum('balance'),
+            invoice_count=models.Count('pk'),
+            oldest_due_date=models.Min('due_date'),
+            display_name=models.Subquery(cls.latest_client_name(company_id, models.OuterRef('client_key'))),
+            **aging_aggregates(today),
+        )
+        with transaction.atomic():
+            cls.objects.filter(company_id=company_id).delete()
+            cls.objects.bulk_create([
+                cls(company_id=company_id, aged_on=today, client_name=row.pop('display_name'), **row)
+                for row in rows
+            ], batch_size=1000)
@@ -0,0 +1,75 @@
+"""
+Transactional outbox for syncing other apps' documents into accounting.
+
+Document saves only record an ``OutboxEvent`` row. Invoices, receipts and
+job orders wrap their save in ``atomic()``, so the post_save handler writes
+the event in the same database transaction as the document. The outbox
+worker (``process_accounting_outbox``) drains events in batches, collapses
+repeated events for the same document, refreshes the transactions already
+synced from those documents and hands the rest to the set-based sync
+engine. Failed batches stay in the outbox with their error and are retried
+up to ``MAX_ATTEMPTS`` times.
+"""
+import logging
+
+from django.db import transaction as db_transaction
+
+from .models import OutboxEvent
+from .sync import SYNC_SOURCES, refresh_synced, sync_source
+
+logger = logging.getLogger(__name__)
+
+
+OUTBOX_BATCH_SIZE = 500
+MAX_ATTEMPTS = 5
+
+
+def enqueue(source_app, reference_id):
+    """Record that ``source_app`` document ``reference_id`` may need syncing"""
+    OutboxEvent.objects.create(source_app=source_app, reference_id=str(reference_id))
+
+
+def process_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Process one batch of pending outbox events.
+
+    Returns the number of events consumed. Events are locked with SKIP LOCKED
+    where the database supports it, so several workers can drain the outbox
+    side by side.
+    """
+    with db_transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(attempts__lt=MAX_ATTEMPTS)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        # Many saves of one document collapse into a single sync
+        ids_by_source = {}
+        for event in events:
+            ids_by_source.setdefault(event.source_app, set()).add(event.reference_id)
+
+        failed = {}
+        for source_app, ids in ids_by_source.items():
+            if source_app not in SYNC_SOURCES:
+                continue
+            try:
+                with db_transaction.atomic():
+                    refresh_synced(source_app, ids)
+                    sync_source(source_app, ids=ids)
+            except Exception as e:
+                logger.exception("Accounting outbox sync failed for %s", source_app)
+                failed[source_app] = str(e)
+
+        done = [event.pk for event in events if event.source_app not in failed]
+        OutboxEvent.objects.filter(pk__in=done).delete()
+        retry = [event for event in events if event.source_app in failed]
+        for event in retry:
+            event.attempts += 1
+            event.last_error = failed[event.source_app]
+        if retry:
+            OutboxEvent.objects.bulk_update(retry, ['attempts', 'last_error'])
+    return len(events)
+
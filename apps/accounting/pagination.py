@@ -0,0 +1,134 @@
+"""
+Keyset pagination for the transaction list.
+
+Pages are addressed by an opaque cursor holding the sort key of the row next
+to the page boundary, so fetching any page is an index range scan of
+``per_page`` rows however deep into history it is. The cursor also carries
+the position of the page's first row, which keeps "Showing X - Y" and the
+page number working without OFFSET or a count per page.
+"""
+import base64
+import json
+import math
+from datetime import date
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+# Newest first; id breaks ties between rows created in the same instant
+KEYSET_ORDERING = ('-transaction_date', '-created_at', '-id')
+
+
+def encode_cursor(row, start):
+    payload = [row.transaction_date.isoformat(), row.created_at.isoformat(), str(row.pk), start]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token):
+    """Return ((transaction_date, created_at, id), start) or None for a malformed token"""
+    try:
+        day, created, pk, start = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        key = (date.fromisoformat(day), parse_datetime(created), pk)
+        if key[1] is None:
+            return None
+        return key, int(start)
+    except (ValueError, TypeError, UnicodeError):
+        return None
+
+
+def _older_than(key):
+    day, created, pk = key
+    return (
+        Q(transaction_date__lt=day) |
+        Q(transaction_date=day, created_at__lt=created) |
+        Q(transaction_date=day, created_at=created, id__lt=pk)
+    )
+
+
+def _newer_than(key):
+    day, created, pk = key
+    return (
+        Q(transaction_date__gt=day) |
+        Q(transaction_date=day, created_at__gt=created) |
+        Q(transaction_date=day, created_at=created, id__gt=pk)
+    )
+
+
+class KeysetPage:
+    """One page of transactions, exposing what the list template needs"""
+
+    def __init__(self, object_list, start, count, per_page):
+        self.object_list = object_list
+        self.count = count
+        self.per_page = per_page
+        # 0-based position of the first row
+        self.start = start
+        self.number = start // per_page + 1
+        self.num_pages = max(1, math.ceil(count / per_page))
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.start + len(self.object_list) < self.count
+
+    def has_previous(self):
+        return self.start > 0
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def start_index(self):
+        return self.start + 1 if self.object_list else 0
+
+    def end_index(self):
+        return self.start + len(self.object_list)
+
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return encode_cursor(self.object_list[-1], self.start + len(self.object_list))
+
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return encode_cursor(self.object_list[0], max(0, self.start - self.per_page))
+
+
+def paginate_keyset(queryset, count, per_page=25, after=None, before=None, last=False):
+    """
+    Fetch one page of ``queryset`` in ``KEYSET_ORDERING``.
+
+    ``after`` / ``before`` are cursors from ``KeysetPage.next_cursor`` /
+    ``previous_cursor``; ``last`` jumps to the final page. ``count`` is the
+    size of the whole filtered queryset, which the caller already has.
+    """
+    ascending = [field.lstrip('-') for field in KEYSET_ORDERING]
+
+    if last:
+        start = (max(1, math.ceil(count / per_page)) - 1) * per_page
+        rows = list(queryset.order_by(*ascending)[:count - start or per_page])
+        rows.reverse()
+        return KeysetPage(rows, start, count, per_page)
+
+    cursor = decode_cursor(before) if before else None
+    if cursor:
+        key, start = cursor
+        rows = list(queryset.filter(_newer_than(key)).order_by(*ascending)[:per_page])
+        # A short page means we reached the newest rows: show the real first page
+        if len(rows) == per_page:
+            rows.reverse()
+            return KeysetPage(rows, start, count, per_page)
+
+    cursor = decode_cursor(after) if after else None
+    if cursor:
+        key, start = cursor
+        rows = list(queryset.filter(_older_than(key)).order_by(*KEYSET_ORDERING)[:per_page])
+        return KeysetPage(rows, start, count, per_page)
+
+    rows = list(queryset.order_by(*KEYSET_ORDERING)[:per_page])
+    return KeysetPage(rows, 0, count, per_page)
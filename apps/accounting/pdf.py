@@ -0,0 +1,55 @@
+"""
+Styles for the accounting PDF exports, built once per process on top of the
+shared resources in ``apps.core.pdf``.
+"""
+from functools import lru_cache
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.styles import ParagraphStyle
+
+from apps.core.pdf import get_stylesheet
+
+
+@lru_cache(maxsize=None)
+def get_pdf_styles():
+    """Paragraph styles shared by the transaction, ledger and report PDFs"""
+    styles = get_stylesheet()
+    return {
+        'normal': styles['Normal'],
+        'heading3': styles['Heading3'],
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=16,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=colors.darkblue
+        ),
+        'report_title': ParagraphStyle(
+            'ReportTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=colors.darkblue
+        ),
+        'report_subtitle': ParagraphStyle(
+            'Subtitle',
+            parent=styles['Heading2'],
+            fontSize=14,
+            spaceAfter=20,
+            alignment=TA_CENTER,
+            textColor=colors.darkgreen
+        ),
+        'table_cell': ParagraphStyle(
+            'TableCell',
+            parent=styles['Normal'],
+            fontSize=8,
+            leading=10,
+            spaceAfter=2,
+            spaceBefore=2,
+            leftIndent=2,
+            rightIndent=2,
+        ),
+    }
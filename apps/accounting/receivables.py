@@ -0,0 +1,176 @@
+"""
+Accounts receivable: open invoice balances per client and their aging.
+
+Every invoice with a balance still to collect has a ``ReceivableItem`` and
+every client with at least one has a ``ClientBalance`` holding the open
+balance split into 0-30/31-60/61-90/90+ days overdue. Invoice and receipt
+signals queue ``sync_invoice_receivable`` for after the transaction
+commits; it re-reads the one invoice and recomputes only the clients it
+moved between. Balances age with the calendar, so rows last aged before
+today are recomputed by ``age_receivables`` (run daily by the
+``age_receivables`` command) or, failing that, when they are next read.
+Nothing here scans a company's invoices except ``rebuild_receivables``.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import AGING_BUCKETS, ClientBalance, ReceivableItem
+
+
+OPEN_STATUSES = ['unpaid', 'partial']
+ITEM_BATCH_SIZE = 1000
+
+
+def client_key(client_name):
+    """How invoices' client names are grouped: case and spacing are ignored"""
+    return ' '.join((client_name or '').split()).casefold()[:200]
+
+
+def _receivable_row(invoice):
+    """``(company_id, fields)`` of the invoice's receivable item, or None when nothing is owed"""
+    if invoice['status'] not in OPEN_STATUSES or not invoice['balance_due'] or invoice['balance_due'] <= 0:
+        return None
+    if invoice['company_id'] is None:
+        return None
+    name = (invoice['client_name'] or '').strip()
+    return invoice['company_id'], {
+        'client_key': client_key(name),
+        'client_name': name[:200],
+        'due_date': invoice['due_date'] or invoice['invoice_date'],
+        'balance': invoice['balance_due'],
+    }
+
+
+def _invoice_values(invoices):
+    return invoices.values(
+        'pk', 'status', 'balance_due', 'client_name', 'due_date', 'invoice_date',
+        company_id=F('user__company_profile__id'),
+    )
+
+
+def sync_invoice_receivable(invoice_id, today=None):
+    """
+    Bring one invoice's receivable item and its client's balance up to date.
+
+    The invoice is re-read, so this is safe to run after any change, and a
+    client the invoice moved away from (a renamed client) is recomputed too.
+    """
+    from apps.invoices.models import Invoice
+
+    with transaction.atomic():
+        invoice = _invoice_values(Invoice.objects.filter(pk=invoice_id)).first()
+        previous = (
+            ReceivableItem.objects.select_for_update()
+            .filter(invoice_id=invoice_id)
+            .values_list('company_id', 'client_key')
+            .first()
+        )
+        touched = {previous} if previous else set()
+
+        row = _receivable_row(invoice) if invoice else None
+        if row:
+            company_id, fields = row
+            ReceivableItem.objects.update_or_create(
+                invoice_id=invoice_id,
+                defaults=dict(fields, company_id=company_id),
+            )
+            touched.add((company_id, fields['client_key']))
+        elif previous:
+            ReceivableItem.objects.filter(invoice_id=invoice_id).delete()
+
+        for company_id, key in touched:
+            ClientBalance.refresh(company_id, key, today)
+
+
+def queue_receivable_sync(invoice_id):
+    """Run ``sync_invoice_receivable`` once the current transaction commits"""
+    transaction.on_commit(lambda: sync_invoice_receivable(invoice_id))
+
+
+def queue_receivable_release(invoice_id):
+    """
+    Recompute the client of an invoice about to be deleted once the
+    deletion commits; its receivable item is deleted along with it.
+    """
+    previous = ReceivableItem.objects.filter(invoice_id=invoice_id).values_list('company_id', 'client_key').first()
+    if previous:
+        transaction.on_commit(lambda: ClientBalance.refresh(*previous))
+
+
+def rebuild_receivables(company, today=None):
+    """Recreate a company's receivable items and client balances from its invoices"""
+    from apps.invoices.models import Invoice
+
+    invoices = _invoice_values(
+        Invoice.objects.filter(
+            user_id=company.user_id,
+            status__in=OPEN_STATUSES,
+            balance_due__gt=0,
+        )
+    )
+    items = []
+    for invoice in invoices.iterator():
+        row = _receivable_row(invoice)
+        if row:
+            items.append(ReceivableItem(invoice_id=invoice['pk'], company_id=company.pk, **row[1]))
+
+    with transaction.atomic():
+        ReceivableItem.objects.filter(company=company).delete()
+        ReceivableItem.objects.bulk_create(items, batch_size=ITEM_BATCH_SIZE)
+        ClientBalance.rebuild_company(company.pk, today)
+    return len(items)
+
+
+def age_receivables(company=None, today=None):
+    """
+    Re-age client balances last aged before ``today``.
+
+    Returns the number of companies whose balances were recomputed.
+    """
+    today = today or timezone.localdate()
+    stale = ClientBalance.objects.filter(aged_on__lt=today)
+    if company is not None:
+        stale = stale.filter(company=company)
+    company_ids = list(stale.order_by().values_list('company_id', flat=True).distinct())
+    for company_id in company_ids:
+        ClientBalance.rebuild_company(company_id, today)
+    return len(company_ids)
+
+
+def get_client_balances(company, today=None):
+    """The company's client balances, largest first, aged as of ``today``"""
+    today = today or timezone.localdate()
+    age_receivables(company, today)
+    return company.client_balances.all()
+
+
+def get_receivables_total(company):
+    """Balance due over all of the company's open invoices"""
+    return company.client_balances.aggregate(total=Sum('open_balance'))['total'] or Decimal('0')
+
+
+def get_aging_report(company, today=None):
+    """
+    Aging report: one row per client with its buckets, plus company totals.
+
+    ``clients`` holds ``ClientBalance`` rows; ``totals`` has the open
+    balance, invoice and client counts and every bucket for the company.
+    """
+    today = today or timezone.localdate()
+    balances = get_client_balances(company, today)
+    totals = balances.aggregate(
+        open_balance=Sum('open_balance'),
+        invoice_count=Sum('invoice_count'),
+        client_count=Count('pk'),
+        **{name: Sum(name) for name, _, _ in AGING_BUCKETS},
+    )
+    totals = {key: value or 0 for key, value in totals.items()}
+    return {
+        'as_of': today,
+        'buckets': [name for name, _, _ in AGING_BUCKETS],
+        'clients': balances,
+        'totals': totals,
+    }
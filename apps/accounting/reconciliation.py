@@ -0,0 +1,303 @@
+"""
+Bank statement import and bulk reconciliation.
+
+A statement (CSV or OFX) is parsed into ``BankStatementLine`` rows and then
+matched against the company's unreconciled transactions in memory: every
+candidate transaction in the statement's date range is loaded with one query
+and indexed by (signed amount, date) and by reference, so each line is
+matched with a handful of dictionary probes instead of a query. Lines with
+exactly one candidate are matched, lines with several go to the review
+screen, and all matched lines are reconciled with a single UPDATE.
+"""
+import csv
+import io
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .models import Transaction, BankStatement, BankStatementLine
+
+
+# How many days a bank posting date may differ from the transaction date
+DATE_WINDOW_DAYS = 3
+LINE_BATCH_SIZE = 1000
+
+DATE_COLUMNS = ('date', 'transaction date', 'posting date', 'posted date', 'value date', 'trans date')
+DESCRIPTION_COLUMNS = ('description', 'narration', 'details', 'memo', 'remarks', 'particulars', 'name')
+REFERENCE_COLUMNS = ('reference', 'ref', 'ref no', 'reference no', 'reference number', 'cheque no', 'check number', 'transaction id')
+AMOUNT_COLUMNS = ('amount', 'transaction amount')
+CREDIT_COLUMNS = ('credit', 'credits', 'deposit', 'deposits', 'money in', 'credit amount')
+DEBIT_COLUMNS = ('debit', 'debits', 'withdrawal', 'withdrawals', 'money out', 'debit amount')
+
+_OFX_TRANSACTION = re.compile(r'<STMTTRN>(.*?)(?=</STMTTRN>|<STMTTRN>|</BANKTRANLIST>|\Z)', re.S | re.I)
+
+
+def _normalize_reference(value):
+    return re.sub(r'\s+', '', value or '').upper()
+
+
+def _parse_amount(value):
+    """Decimal from a statement amount such as '₦1,200.50' or '(300.00)'; None when blank"""
+    value = re.sub(r'[₦$€£¥,\s]', '', value or '')
+    if not value:
+        return None
+    negative = value.startswith('(') and value.endswith(')')
+    if negative:
+        value = value[1:-1]
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount '{value}'")
+    return -amount if negative else amount
+
+
+def _pick(row, columns):
+    for column in columns:
+        value = row.get(column)
+        if value not in (None, ''):
+            return value.strip()
+    return ''
+
+
+def parse_csv_statement(content, date_format='%Y-%m-%d'):
+    """
+    Statement lines from CSV text.
+
+    Column names are matched case-insensitively against common bank export
+    headings. Amounts come either from a signed amount column or from
+    separate credit and debit columns.
+    """
+    reader = csv.DictReader(io.StringIO(content))
+    if not reader.fieldnames:
+        raise ValueError("The statement file is empty.")
+    reader.fieldnames = [(name or '').strip().lower() for name in reader.fieldnames]
+    if not any(column in reader.fieldnames for column in DATE_COLUMNS):
+        raise ValueError("The statement has no date column.")
+
+    lines = []
+    for number, row in enumerate(reader, start=2):
+        date_value = _pick(row, DATE_COLUMNS)
+        if not date_value and not any((value or '').strip() for value in row.values()):
+            continue
+        try:
+            day = datetime.strptime(date_value, date_format).date()
+            amount = _parse_amount(_pick(row, AMOUNT_COLUMNS))
+            if amount is None:
+                credit = _parse_amount(_pick(row, CREDIT_COLUMNS)) or Decimal('0')
+                debit = _parse_amount(_pick(row, DEBIT_COLUMNS)) or Decimal('0')
+                amount = credit - abs(debit)
+        except ValueError as e:
+            raise ValueError(f"Row {number}: {e}")
+        lines.append({
+            'date': day,
+            'description': _pick(row, DESCRIPTION_COLUMNS)[:255],
+            'reference': _pick(row, REFERENCE_COLUMNS)[:100],
+            'amount': amount,
+        })
+    return lines
+
+
+def _ofx_field(block, tag):
+    match = re.search(rf'<{tag}>([^<\r\n]*)', block, re.I)
+    return match.group(1).strip() if match else ''
+
+
+def parse_ofx_statement(content):
+    """Statement lines from the STMTTRN records of an OFX/QFX file (SGML or XML)"""
+    lines = []
+    for number, block in enumerate(_OFX_TRANSACTION.findall(content), start=1):
+        try:
+            day = datetime.strptime(_ofx_field(block, 'DTPOSTED')[:8], '%Y%m%d').date()
+            amount = _parse_amount(_ofx_field(block, 'TRNAMT'))
+        except ValueError as e:
+            raise ValueError(f"Transaction {number}: {e}")
+        if amount is None:
+            raise ValueError(f"Transaction {number}: missing amount")
+        description = ' - '.join(
+            value for value in (_ofx_field(block, 'NAME'), _ofx_field(block, 'MEMO')) if value
+        )
+        lines.append({
+            'date': day,
+            'description': description[:255],
+            'reference': (_ofx_field(block, 'REFNUM') or _ofx_field(block, 'CHECKNUM'))[:100],
+            'amount': amount,
+        })
+    if not lines:
+        raise ValueError("No transactions found in the OFX file.")
+    return lines
+
+
+def import_statement(company, user, uploaded_file, date_format='%Y-%m-%d'):
+    """Create a statement from an uploaded CSV or OFX file and match its lines"""
+    raw = uploaded_file.read()
+    try:
+        content = raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        content = raw.decode('latin-1')
+
+    name = uploaded_file.name
+    if name.lower().endswith(('.ofx', '.qfx')):
+        file_format = 'ofx'
+        parsed = parse_ofx_statement(content)
+    else:
+        file_format = 'csv'
+        parsed = parse_csv_statement(content, date_format)
+    if not parsed:
+        raise ValueError("The statement has no transactions.")
+
+    with db_transaction.atomic():
+        statement = BankStatement.objects.create(
+            company=company,
+            name=name[:255],
+            file_format=file_format,
+            start_date=min(line['date'] for line in parsed),
+            end_date=max(line['date'] for line in parsed),
+            uploaded_by=user,
+        )
+        BankStatementLine.objects.bulk_create(
+            [BankStatementLine(statement=statement, **line) for line in parsed],
+            batch_size=LINE_BATCH_SIZE,
+        )
+        match_statement(statement)
+    return statement
+
+
+def _claimed_transaction_ids(company):
+    """Transactions already matched to a line of any of the company's statements"""
+    return set(
+        BankStatementLine.objects.filter(
+            statement__company=company,
+            status='matched',
+            transaction__isnull=False,
+        ).values_list('transaction_id', flat=True)
+    )
+
+
+def match_statement(statement, window_days=DATE_WINDOW_DAYS):
+    """
+    Match the statement's open lines to unreconciled transactions.
+
+    Income counts as money in and expenses as money out, compared on
+    ``net_amount``. A line whose reference equals a transaction's
+    ``reference_id`` is matched on that first; otherwise candidates are
+    the transactions with the same amount within ``window_days`` of the
+    line, narrowed by the reference when one appears in their title.
+    Returns the number of lines in each resulting status.
+    """
+    lines = list(statement.lines.filter(status__in=['unmatched', 'ambiguous']))
+    counts = {'matched': 0, 'ambiguous': 0, 'unmatched': 0}
+    if not lines:
+        return counts
+
+    window = timedelta(days=window_days)
+    start = min(line.date for line in lines) - window
+    end = max(line.date for line in lines) + window
+    claimed = _claimed_transaction_ids(statement.company_id)
+
+    by_amount_day = defaultdict(list)
+    by_reference = defaultdict(list)
+    for pk, txn_type, amount, day, reference_id, title in Transaction.objects.filter(
+        company_id=statement.company_id,
+        is_reconciled=False,
+        is_void=False,
+        transaction_date__range=(start, end),
+    ).values_list('pk', 'type', 'net_amount', 'transaction_date', 'reference_id', 'title').iterator():
+        if pk in claimed:
+            continue
+        signed = amount if txn_type == 'income' else -amount
+        candidate = (pk, signed, day, _normalize_reference(f"{reference_id or ''}{title}"))
+        by_amount_day[(signed, day)].append(candidate)
+        if reference_id:
+            by_reference[_normalize_reference(reference_id)].append(candidate)
+
+    offsets = [timedelta(days=offset) for offset in range(-window_days, window_days + 1)]
+    # Lines carrying a reference get first pick of the transactions
+    for line in sorted(lines, key=lambda line: (not line.reference, line.date, line.pk)):
+        reference = _normalize_reference(line.reference)
+        candidates = []
+        if reference:
+            candidates = [
+                c for c in by_reference.get(reference, ())
+                if c[1] == line.amount and abs(c[2] - line.date) <= window and c[0] not in claimed
+            ]
+        if not candidates:
+            candidates = [
+                c for offset in offsets
+                for c in by_amount_day.get((line.amount, line.date + offset), ())
+                if c[0] not in claimed
+            ]
+            if reference and len(candidates) > 1:
+                candidates = [c for c in candidates if reference in c[3]] or candidates
+
+        if len(candidates) == 1:
+            line.status = 'matched'
+            line.transaction_id = candidates[0][0]
+            line.candidate_ids = []
+            claimed.add(candidates[0][0])
+        elif candidates:
+            line.status = 'ambiguous'
+            line.transaction_id = None
+            line.candidate_ids = [str(c[0]) for c in candidates]
+        else:
+            line.status = 'unmatched'
+            line.transaction_id = None
+            line.candidate_ids = []
+        counts[line.status] += 1
+
+    BankStatementLine.objects.bulk_update(
+        lines, ['status', 'transaction', 'candidate_ids'], batch_size=LINE_BATCH_SIZE
+    )
+    return counts
+
+
+def resolve_lines(statement, choices):
+    """
+    Apply review-screen decisions, ``{line_id: transaction_id | 'ignore' | 'unmatch'}``.
+
+    A transaction is only accepted for a line that listed it as a candidate
+    and that no other line has claimed. Returns the number of lines changed.
+    """
+    lines = statement.lines.filter(pk__in=list(choices)).exclude(status='reconciled')
+    claimed = _claimed_transaction_ids(statement.company_id)
+    changed = []
+    for line in lines:
+        choice = choices[line.pk]
+        if choice == 'ignore':
+            line.status, line.transaction_id = 'ignored', None
+        elif choice == 'unmatch':
+            line.status, line.transaction_id = 'unmatched', None
+        elif choice in line.candidate_ids:
+            txn_id = Transaction._meta.pk.to_python(choice)
+            if txn_id in claimed:
+                continue
+            line.status, line.transaction_id = 'matched', txn_id
+            claimed.add(txn_id)
+        else:
+            continue
+        changed.append(line)
+    BankStatementLine.objects.bulk_update(changed, ['status', 'transaction'], batch_size=LINE_BATCH_SIZE)
+    return len(changed)
+
+
+def reconcile_statement(statement):
+    """
+    Mark every matched line's transaction as reconciled in one UPDATE.
+
+    ``is_reconciled`` plays no part in ledgers, rollups or the journal, so
+    the transactions are updated in bulk without going through ``save()``.
+    Returns the number of lines reconciled.
+    """
+    with db_transaction.atomic():
+        matched = statement.lines.filter(status='matched', transaction__isnull=False)
+        Transaction.objects.filter(
+            company_id=statement.company_id,
+            pk__in=matched.values('transaction_id'),
+        ).update(is_reconciled=True, updated_at=timezone.now())
+        reconciled = matched.update(status='reconciled')
+        if reconciled:
+            BankStatement.objects.filter(pk=statement.pk).update(reconciled_at=timezone.now())
+    return reconciled
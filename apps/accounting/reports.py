@@ -0,0 +1,245 @@
+"""
+Financial report generators backed by the monthly ledger.
+
+Whole months are read from ``Ledger`` rollups and the partial months at
+either end of a period from ``DailyRollup`` rows, so the cost of a report
+depends on the number of months and days it covers rather than on the
+number of transactions behind it.
+
+Report results are snapshotted per (company, report type, period, accounting
+data version): in the cache for every report sharing that key, and on the
+``FinancialReport`` row itself, so repeat views and downloads reuse them
+until the company's transactions change.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Ledger, DailyRollup, FinancialReport
+from .receivables import get_receivables_total
+from .services import get_accounting_data_version
+
+
+REPORT_CACHE_TIMEOUT = 3600
+
+
+def _month_index(year, month):
+    return year * 100 + month
+
+
+def _next_month(day):
+    return Ledger.month_bounds(day.year, day.month)[1]
+
+
+def get_period_totals(company, start_date, end_date):
+    """
+    Income and expense for ``start_date``..``end_date`` (inclusive).
+
+    ``start_date`` may be None for "since the beginning". Returns a dict with
+    Decimal ``income`` and ``expense``.
+    """
+    if start_date and start_date > end_date:
+        return {'income': Decimal('0'), 'expense': Decimal('0')}
+
+    # Whole months covered by the period
+    if start_date is None:
+        first_full = None
+    elif start_date.day == 1:
+        first_full = start_date
+    else:
+        first_full = _next_month(start_date)
+    if end_date + timedelta(days=1) == _next_month(end_date):
+        last_full = end_date.replace(day=1)
+    else:
+        last_full = end_date.replace(day=1) - timedelta(days=1)
+        last_full = last_full.replace(day=1)
+
+    has_full_months = first_full is None or first_full <= last_full
+    income = Decimal('0')
+    expense = Decimal('0')
+
+    if has_full_months:
+        ledgers = Ledger.objects.filter(company=company).annotate(
+            period=F('year') * 100 + F('month')
+        ).filter(period__lte=_month_index(last_full.year, last_full.month))
+        if first_full is not None:
+            ledgers = ledgers.filter(period__gte=_month_index(first_full.year, first_full.month))
+        rollup = ledgers.aggregate(
+            income=Coalesce(Sum('total_income'), Decimal('0')),
+            expense=Coalesce(Sum('total_expense'), Decimal('0')),
+        )
+        income += rollup['income']
+        expense += rollup['expense']
+
+        # Partial months at the head and tail of the period
+        partial = Q()
+        if first_full is not None and start_date < first_full:
+            partial |= Q(date__gte=start_date, date__lt=first_full)
+        tail_start = _next_month(last_full)
+        if tail_start <= end_date:
+            partial |= Q(date__gte=tail_start, date__lte=end_date)
+    else:
+        # The whole period sits inside a single month
+        partial = Q(date__gte=start_date, date__lte=end_date)
+
+    if partial:
+        tail = DailyRollup.objects.filter(partial, company=company).aggregate(
+            income=Coalesce(Sum('total', filter=Q(type='income')), Decimal('0')),
+            expense=Coalesce(Sum('total', filter=Q(type='expense')), Decimal('0')),
+        )
+        income += tail['income']
+        expense += tail['expense']
+
+    return {'income': income, 'expense': expense}
+
+
+def generate_income_statement(company, start_date, end_date):
+    """Generate income statement data"""
+    totals = get_period_totals(company, start_date, end_date)
+    income = totals['income']
+    expenses = totals['expense']
+
+    # Calculate net income
+    net_income = income - expenses
+
+    return {
+        'income': float(income),
+        'expenses': float(expenses),
+        'net_income': float(net_income),
+        'period': f"{start_date} to {end_date}",
+    }
+
+
+def generate_balance_sheet(company, as_of_date):
+    """Generate balance sheet data with proper accounting equation"""
+    totals = get_period_totals(company, None, as_of_date)
+    total_income = totals['income']
+    total_expenses = totals['expense']
+
+    # Calculate retained earnings (net income)
+    retained_earnings = total_income - total_expenses
+
+    # Outstanding invoices as accounts receivable, from the client balances
+    accounts_receivable = get_receivables_total(company)
+
+    # Assets = Cash + Accounts Receivable + Other Assets
+    cash = retained_earnings  # Simplified: cash equals retained earnings
+    total_assets = cash + accounts_receivable
+
+    # Liabilities = Accounts Payable + Other Liabilities
+    try:
+        from apps.expenses.models import Expense
+        accounts_payable = Expense.objects.filter(
+            user=company.user,
+            status__in=['pending', 'unpaid']
+        ).aggregate(total=Sum('amount'))['total'] or 0
+    except Exception:
+        accounts_payable = 0
+
+    total_liabilities = accounts_payable
+
+    # Equity = Owner's Equity + Retained Earnings, with owner's equity
+    # balancing the equation
+    owner_equity = total_assets - total_liabilities - retained_earnings
+
+    # Negative owner's equity means accumulated losses
+    if owner_equity < 0:
+        retained_earnings = total_assets - total_liabilities
+        owner_equity = 0
+
+    # Verify the accounting equation: Assets = Liabilities + Equity
+    calculated_equity = total_liabilities + owner_equity + retained_earnings
+    balance_check = abs(total_assets - calculated_equity)
+
+    return {
+        'total_assets': float(total_assets),
+        'total_liabilities': float(total_liabilities),
+        'owner_equity': float(owner_equity),
+        'retained_earnings': float(retained_earnings),
+        'accounts_receivable': float(accounts_receivable),
+        'accounts_payable': float(accounts_payable),
+        'cash': float(cash),
+        'as_of_date': as_of_date.strftime('%Y-%m-%d'),
+        'period': f"As of {as_of_date.strftime('%B %d, %Y')}",
+        'balance_check': float(balance_check),
+        'accounting_equation_balanced': balance_check < 0.01,
+    }
+
+
+def generate_report_data(report, start_date, end_date):
+    """Report data for ``report``'s type over the given period"""
+    if report.report_type == 'income_statement':
+        return generate_income_statement(report.company, start_date, end_date)
+    if report.report_type == 'balance_sheet':
+        return generate_balance_sheet(report.company, end_date)
+    return dict(report.report_data)
+
+
+def build_report_data(report):
+    """
+    Fresh report data for viewing or exporting a stored report.
+
+    When the report's period has no transactions the range is extended to
+    include the most recent transaction, and the adjustment is noted in
+    the returned data.
+    """
+    company = report.company
+    has_transactions = DailyRollup.objects.filter(
+        company=company,
+        date__range=[report.start_date, report.end_date],
+        count__gt=0
+    ).exists()
+
+    latest_date = None
+    if not has_transactions:
+        latest_date = DailyRollup.objects.filter(
+            company=company,
+            count__gt=0
+        ).order_by('-date').values_list('date', flat=True).first()
+
+    if latest_date:
+        adjusted_start_date = min(report.start_date, latest_date)
+        adjusted_end_date = max(report.end_date, latest_date)
+        report_data = generate_report_data(report, adjusted_start_date, adjusted_end_date)
+        report_data['date_adjusted'] = True
+        report_data['original_period'] = f"{report.start_date} to {report.end_date}"
+        report_data['adjusted_period'] = f"{adjusted_start_date} to {adjusted_end_date}"
+    else:
+        report_data = generate_report_data(report, report.start_date, report.end_date)
+        report_data['date_adjusted'] = False
+    return report_data
+
+
+def get_report_snapshot(report):
+    """
+    Report data for ``report`` at the current accounting data version.
+
+    Looks in the cache first, then at the data stored on the report, and
+    only recomputes when neither matches the current version. A recomputed
+    snapshot is written back to both.
+    """
+    version = get_accounting_data_version(report.company_id)
+    cache_key = (
+        f'accounting_report_{report.company_id}_{report.report_type}_'
+        f'{report.start_date.isoformat()}_{report.end_date.isoformat()}_{version}'
+    )
+
+    report_data = cache.get(cache_key)
+    if report_data is None:
+        if report.data_version == version and report.report_data:
+            report_data = report.report_data
+        else:
+            report_data = build_report_data(report)
+        cache.set(cache_key, report_data, REPORT_CACHE_TIMEOUT)
+
+    if report.data_version != version:
+        FinancialReport.objects.filter(pk=report.pk).update(
+            report_data=report_data, data_version=version
+        )
+        report.report_data = report_data
+        report.data_version = version
+    # Callers annotate the data they are handed, so never share the cached dict
+    return dict(report_data)
@@ -1,3 +1,13 @@
 from rest_framework import serializers
 
-# Serializers will be added here
+from .models import ClientBalance
+
+
+class ClientBalanceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ClientBalance
+        fields = [
+            'client_name', 'open_balance', 'invoice_count',
+            'days_0_30', 'days_31_60', 'days_61_90', 'days_over_90',
+            'oldest_due_date', 'aged_on',
+        ]
@@ -0,0 +1,218 @@
+"""
+Read-side services for the accounting dashboard and transaction list.
+
+Derived figures are cached per company under an accounting data version that
+is stored in the database and bumped whenever a transaction or invoice
+changes, so cached values never outlive the data they were computed from,
+whichever process computed them.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import Ledger, DailyRollup, DataVersion
+
+
+DASHBOARD_CACHE_TIMEOUT = 600
+TREND_MONTHS = 12
+
+
+def get_accounting_data_version(company_id):
+    """Current accounting data version for a company"""
+    version = DataVersion.objects.filter(company_id=company_id).values_list('version', flat=True).first()
+    if version is None:
+        version = DataVersion.objects.get_or_create(company_id=company_id)[0].version
+    return version
+
+
+def bump_accounting_data_version(company_id):
+    """
+    Invalidate every cached accounting figure for a company.
+
+    Runs in the caller's transaction: until it commits, other processes keep
+    reading the old version together with the old data. A missing version
+    row is left for the next read to create, so a company being deleted is
+    never given a new one.
+    """
+    DataVersion.objects.filter(company_id=company_id).update(version=F('version') + 1)
+
+
+def get_trend_months(today, months=TREND_MONTHS):
+    """The last ``months`` calendar months up to ``today`` as (year, month), oldest first"""
+    year, month = today.year, today.month
+    result = []
+    for _ in range(months):
+        result.append((year, month))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return list(reversed(result))
+
+
+def get_transaction_totals(queryset):
+    """Income, expense and row count of a filtered transaction queryset in one query"""
+    totals = queryset.order_by().aggregate(
+        total_income=Coalesce(Sum('net_amount', filter=Q(type='income')), Decimal('0')),
+        total_expense=Coalesce(Sum('net_amount', filter=Q(type='expense')), Decimal('0')),
+        total_count=Count('pk'),
+    )
+    totals['net_total'] = totals['total_income'] - totals['total_expense']
+    return totals
+
+
+SEARCH_CONFIG = 'english'
+SEARCH_FIELDS = ('title', 'description', 'notes')
+
+
+def search_transactions(queryset, term):
+    """
+    Filter transactions by a free-text search over title, description and notes.
+
+    On PostgreSQL this is a full-text match served by the GIN index on the
+    same search vector; other backends fall back to substring matching.
+    """
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchVector
+
+        return queryset.annotate(
+            search=SearchVector(*SEARCH_FIELDS, config=SEARCH_CONFIG)
+        ).filter(search=SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch'))
+
+    match = Q()
+    for field in SEARCH_FIELDS:
+        match |= Q(**{f'{field}__icontains': term})
+    return queryset.filter(match)
+
+
+def get_monthly_trend(company, today=None, months=TREND_MONTHS):
+    """
+    Income, expense and profit for the last ``months`` calendar months.
+
+    Months are read from ledger rows in one query; months without a ledger
+    row are filled from a single TruncMonth-grouped aggregate of the daily
+    rollups over their combined date range.
+    """
+    today = today or timezone.now().date()
+    month_keys = get_trend_months(today, months)
+
+    month_filter = Q()
+    for year, month in month_keys:
+        month_filter |= Q(year=year, month=month)
+    totals = {
+        (ledger['year'], ledger['month']): (ledger['total_income'], ledger['total_expense'])
+        for ledger in Ledger.objects.filter(company=company).filter(month_filter).values(
+            'year', 'month', 'total_income', 'total_expense'
+        )
+    }
+
+    missing = [key for key in month_keys if key not in totals]
+    if missing:
+        start = date(missing[0][0], missing[0][1], 1)
+        end = Ledger.month_bounds(*missing[-1])[1]
+        rows = DailyRollup.objects.filter(
+            company=company,
+            date__gte=start,
+            date__lt=end
+        ).annotate(
+            period=TruncMonth('date')
+        ).order_by().values('period').annotate(
+            income=Coalesce(Sum('total', filter=Q(type='income')), Decimal('0')),
+            expense=Coalesce(Sum('total', filter=Q(type='expense')), Decimal('0')),
+        )
+        for row in rows:
+            key = (row['period'].year, row['period'].month)
+            if key in missing:
+                totals[key] = (row['income'], row['expense'])
+
+    monthly_data = []
+    for year, month in month_keys:
+        income, expense = totals.get((year, month), (0, 0))
+        monthly_data.append({
+            'month': date(year, month, 1).strftime('%b %Y'),
+            'year': year,
+            'month_num': month,
+            'income': float(income),
+            'expense': float(expense),
+            'profit': float(income) - float(expense),
+        })
+    return monthly_data
+
+
+def get_today_totals(company, today=None):
+    """Today's income and expense, from the daily rollups"""
+    today = today or timezone.now().date()
+    totals = get_rollup_totals(company, today, today)
+    today_income, today_expense = totals['income'], totals['expense']
+
+    return {
+        'today_income': float(today_income),
+        'today_expense': float(today_expense),
+        'has_today_data': bool(today_income or today_expense),
+    }
+
+
+def get_rollup_totals(company, start_date, end_date):
+    """Income and expense between two dates (inclusive), summed over daily rollups"""
+    return DailyRollup.objects.filter(
+        company=company,
+        date__gte=start_date,
+        date__lte=end_date
+    ).aggregate(
+        income=Coalesce(Sum('total', filter=Q(type='income')), Decimal('0')),
+        expense=Coalesce(Sum('total', filter=Q(type='expense')), Decimal('0')),
+    )
+
+
+def get_source_breakdown(company):
+    """Total and transaction count per source app, largest first"""
+    breakdown = DailyRollup.objects.filter(company=company).values('source_app').annotate(
+        total=Sum('total'),
+        count=Sum('count'),
+    ).filter(count__gt=0).order_by('-total')
+    return [
+        {'source_app': row['source_app'], 'total': float(row['total']), 'count': row['count']}
+        for row in breakdown
+    ]
+
+
+def get_outstanding_invoices(company):
+    """Balance due over the company's unpaid and partially paid invoices"""
+    from .receivables import get_receivables_total
+
+    return float(get_receivables_total(company))
+
+
+def get_dashboard_summary(company):
+    """
+    Trend, current month, today, outstanding and per-source figures for the dashboard.
+
+    Cached per company and accounting data version; the date is part of the
+    key so the "today" figures roll over at midnight. The outstanding total
+    is read from the materialized client balances on every call, since
+    receivables are updated after the accounting version moves.
+    """
+    today = timezone.now().date()
+    version = get_accounting_data_version(company.id)
+    cache_key = f'accounting_dashboard_{company.id}_{version}_{today.isoformat()}'
+
+    summary = cache.get(cache_key)
+    if summary is None:
+        monthly_data = get_monthly_trend(company, today)
+        current = monthly_data[-1]
+        summary = {
+            'monthly_data': monthly_data,
+            'current_month': {
+                'total_income': current['income'],
+                'total_expense': current['expense'],
+                'net_profit': current['profit'],
+            },
+            'source_breakdown': get_source_breakdown(company),
+        }
+        summary.update(get_today_totals(company, today))
+        cache.set(cache_key, summary, DASHBOARD_CACHE_TIMEOUT)
+    return dict(summary, outstanding_invoices=get_outstanding_invoices(company))
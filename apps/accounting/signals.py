@@ -1,11 +1,13 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from .models import Transaction
+from .services import bump_accounting_data_version
+from .outbox import enqueue
+from .receivables import queue_receivable_sync, queue_receivable_release
 from apps.invoices.models import Invoice
 from apps.receipts.models import Receipt
 from apps.job_orders.models import Product as JobOrder
-from apps.waybills.models import Waybill
 # from apps.expenses.models import Expense  # Commented out until Expense model is created
 from decimal import Decimal
 
@@ -14,116 +16,38 @@ User = get_user_model()
 
 @receiver(post_save, sender=Invoice)
 def sync_invoice_to_accounting(sender, instance, created, **kwargs):
-    """Sync invoice payments to accounting transactions"""
-    if instance.status == 'paid' and instance.grand_total > 0:
-        # Check if transaction already exists
-        existing_transaction = Transaction.objects.filter(
-            source_app='invoice',
-            reference_id=str(instance.id)
-        ).first()
-        
-        if not existing_transaction:
-            # Create income transaction for paid invoice
-            Transaction.objects.create(
-                user=instance.user,
-                company=instance.user.company_profile,
-                type='income',
-                title=f"Invoice Payment - {instance.invoice_number}",
-                description=f"Payment for invoice {instance.invoice_number} from {instance.client_name}",
-                amount=instance.grand_total,
-                currency=instance.user.company_profile.currency_symbol,
-                tax=instance.total_tax,
-                discount=instance.total_discount,
-                source_app='invoice',
-                reference_id=str(instance.id),
-                reference_model='Invoice',
-                transaction_date=instance.updated_at.date(),
-                notes=f"Auto-synced from paid invoice {instance.invoice_number}"
-            )
+    """Queue paid invoices, and every later edit, for syncing to accounting transactions"""
+    if not created or (instance.status == 'paid' and instance.grand_total > 0):
+        enqueue('invoice', instance.id)
 
 
 @receiver(post_save, sender=Receipt)
 def sync_receipt_to_accounting(sender, instance, created, **kwargs):
-    """Sync receipt payments to accounting transactions"""
-    if created and instance.amount_received > 0:
-        # Check if transaction already exists
-        existing_transaction = Transaction.objects.filter(
-            source_app='receipt',
-            reference_id=str(instance.id)
-        ).first()
-        
-        if not existing_transaction:
-            # Create income transaction for receipt
-            Transaction.objects.create(
-                user=instance.created_by,
-                company=instance.created_by.company_profile,
-                type='income',
-                title=f"Receipt Payment - {instance.receipt_no}",
-                description=f"Payment receipt {instance.receipt_no} from {instance.client_name}",
-                amount=instance.amount_received,
-                currency=instance.created_by.company_profile.currency_symbol,
-                source_app='receipt',
-                reference_id=str(instance.id),
-                reference_model='Receipt',
-                transaction_date=instance.date_received,
-                notes=f"Auto-synced from receipt {instance.receipt_no}"
-            )
+    """Queue new receipts, and every later edit, for syncing to accounting transactions"""
+    if not created or instance.amount_received > 0:
+        enqueue('receipt', instance.id)
+
+
+@receiver(post_save, sender=Receipt)
+@receiver(post_delete, sender=Receipt)
+def sync_invoice_paid_by_receipt(sender, instance, **kwargs):
+    """
+    Queue the invoice a receipt has settled.
+
+    Receipts record payments on their invoice with a queryset update, which
+    sends no Invoice post_save; the receipts app's own handlers are
+    connected first, so the invoice instance already carries its new status.
+    The invoice is queued whatever its status, so a payment that is removed
+    voids the transaction synced from it.
+    """
+    enqueue('invoice', instance.invoice_id)
 
 
 @receiver(post_save, sender=JobOrder)
 def sync_job_order_to_accounting(sender, instance, created, **kwargs):
-    """Sync job order costs to accounting transactions"""
-    if instance.approval_status == 'approved' and instance.total and instance.total > 0:
-        # Check if transaction already exists
-        existing_transaction = Transaction.objects.filter(
-            source_app='job_order',
-            reference_id=str(instance.id)
-        ).first()
-        
-        if not existing_transaction:
-            # Create expense transaction for job order costs
-            Transaction.objects.create(
-                user=instance.created_by,
-                company=instance.created_by.company_profile,
-                type='expense',
-                title=f"Job Order Cost - {instance.job_order}",
-                description=f"Cost for approved job order {instance.job_order}",
-                amount=instance.total,
-                currency=instance.created_by.company_profile.currency_symbol,
-                source_app='job_order',
-                reference_id=str(instance.id),
-                reference_model='Product',
-                transaction_date=instance.actual_delivery_date or instance.date_created.date(),
-                notes=f"Auto-synced from approved job order {instance.job_order}"
-            )
-
-
-@receiver(post_save, sender=Waybill)
-def sync_waybill_to_accounting(sender, instance, created, **kwargs):
-    """Sync waybill charges to accounting transactions"""
-    if instance.status == 'delivered' and instance.total_amount > 0:
-        # Check if transaction already exists
-        existing_transaction = Transaction.objects.filter(
-            source_app='waybill',
-            reference_id=str(instance.id)
-        ).first()
-        
-        if not existing_transaction:
-            # Create income transaction for waybill charges
-            Transaction.objects.create(
-                user=instance.created_by,
-                company=instance.created_by.company_profile,
-                type='income',
-                title=f"Waybill Charges - {instance.waybill_number}",
-                description=f"Charges for delivered waybill {instance.waybill_number}",
-                amount=instance.total_amount,
-                currency=instance.created_by.company_profile.currency_symbol,
-                source_app='waybill',
-                reference_id=str(instance.id),
-                reference_model='Waybill',
-                transaction_date=instance.delivery_date or instance.created_at.date(),
-                notes=f"Auto-synced from delivered waybill {instance.waybill_number}"
-            )
+    """Queue approved job orders, and every later edit, for syncing their costs to accounting transactions"""
+    if not created or (instance.approval_status == 'approved' and instance.total and instance.total > 0):
+        enqueue('job_order', instance.id)
 
 
 # @receiver(post_save, sender=Expense)
@@ -154,41 +78,76 @@ def sync_waybill_to_accounting(sender, instance, created, **kwargs):
 #             )
 
 
+@receiver(pre_delete, sender=Transaction)
+def reverse_transaction_journal(sender, instance, **kwargs):
+    """Reverse the transaction's journal entry while it still exists"""
+    from .journal import unjournal_transaction
+    unjournal_transaction(instance)
+
+
+@receiver(pre_delete, sender=Transaction)
+def capture_transaction_contribution(sender, instance, **kwargs):
+    """Lock the stored row and remember what it contributes, for post_delete to remove"""
+    instance._deleted_states = instance.get_saved_states()
+
+
 @receiver(post_delete, sender=Transaction)
 def handle_transaction_deletion(sender, instance, **kwargs):
-    """Handle transaction deletion by updating ledgers"""
-    if not instance.is_void:
-        # Update the ledger for the deleted transaction's month/year
-        from .models import Ledger
-        
-        ledger = Ledger.objects.filter(
-            company=instance.company,
-            year=instance.transaction_date.year,
-            month=instance.transaction_date.month
-        ).first()
-        
-        if ledger:
-            # Recalculate totals for this month
-            transactions = Transaction.objects.filter(
-                company=instance.company,
-                transaction_date__year=instance.transaction_date.year,
-                transaction_date__month=instance.transaction_date.month,
-                is_void=False
-            )
-            
-            from django.db.models import Sum
-            
-            ledger.total_income = transactions.filter(type='income').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            ledger.total_expense = transactions.filter(type='expense').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            ledger.net_profit = ledger.total_income - ledger.total_expense
-            ledger.save()
+    """Handle transaction deletion by removing its amount from the ledger and daily rollup"""
+    from .models import Ledger, DailyRollup
+    
+    # Prefer the stored state over unsaved in-memory edits
+    contribution, rollup = getattr(instance, '_deleted_states', (None, None))
+    
+    # Rows that are already gone were removed by the same cascade; never re-insert them
+    if contribution:
+        (company_id, year, month), income, expense = contribution
+        Ledger.apply_delta(company_id, year, month, -income, -expense, rebuild_missing=False)
+    if rollup:
+        key, amount = rollup
+        DailyRollup.apply_delta(*key, amount=-amount, count=-1, rebuild_missing=False)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_transaction_caches(sender, instance, **kwargs):
+    """
+    Move the company to a new accounting data version.
+
+    Transaction saves and deletes run in atomic(), and the version is stored
+    in the database, so the bump commits together with the change: no reader
+    can see the new version before the new figures.
+    """
+    bump_accounting_data_version(instance.company_id)
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invalidate_invoice_caches(sender, instance, **kwargs):
+    """Outstanding invoice figures are part of the cached accounting data"""
+    company = getattr(instance.user, 'company_profile', None)
+    if company:
+        bump_accounting_data_version(company.id)
+
+
+
+@receiver(post_save, sender=Invoice)
+def update_invoice_receivable(sender, instance, **kwargs):
+    """Keep the invoice's open balance and its client's aging current"""
+    queue_receivable_sync(instance.pk)
+
+
+@receiver(post_save, sender=Receipt)
+@receiver(post_delete, sender=Receipt)
+def update_receivable_on_receipt_change(sender, instance, **kwargs):
+    """Receipts change their invoice's balance with a queryset update, so no Invoice post_save is sent"""
+    queue_receivable_sync(instance.invoice_id)
+
 
+@receiver(pre_delete, sender=Invoice)
+def release_invoice_receivable(sender, instance, **kwargs):
+    """Drop the invoice's balance from its client while its receivable item still exists"""
+    queue_receivable_release(instance.pk)
 
 # Import signals when the app is ready
 def ready():
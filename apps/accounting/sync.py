@@ -0,0 +1,220 @@
+"""
+Set-based sync of documents from other apps into accounting transactions.
+
+For each source the documents that still lack a transaction are found with a
+single anti-join against ``Transaction(source_app, reference_id)``, turned
+into transactions in memory and inserted with ``bulk_create``. The unique
+constraint on (source_app, reference_id) makes the insert idempotent, and
+every ledger month touched by the batch is rebuilt once at the end instead
+of once per transaction, as is every touched daily rollup row.
+"""
+from django.db import transaction as db_transaction
+from django.db.models import CharField, Exists, OuterRef
+from django.db.models.functions import Cast
+
+from .models import Transaction, Ledger, DailyRollup
+from .services import bump_accounting_data_version
+
+
+SYNC_BATCH_SIZE = 1000
+
+
+def _paid_invoices(user=None):
+    from apps.invoices.models import Invoice
+
+    invoices = Invoice.objects.filter(status='paid', grand_total__gt=0)
+    if user is not None:
+        invoices = invoices.filter(user=user)
+    return invoices.select_related('user__company_profile'), 'user'
+
+
+def _invoice_transaction(invoice, company):
+    return Transaction(
+        user=invoice.user,
+        company=company,
+        type='income',
+        title=f"Invoice Payment - {invoice.invoice_number}",
+        description=f"Payment for invoice {invoice.invoice_number} from {invoice.client_name}",
+        amount=invoice.grand_total,
+        currency=company.currency_symbol,
+        tax=invoice.total_tax,
+        discount=invoice.total_discount,
+        source_app='invoice',
+        reference_id=str(invoice.id),
+        reference_model='Invoice',
+        transaction_date=invoice.updated_at.date(),
+        notes=f"Auto-synced from paid invoice {invoice.invoice_number}"
+    )
+
+
+def _receipts(user=None):
+    from apps.receipts.models import Receipt
+
+    receipts = Receipt.objects.filter(amount_received__gt=0, created_by__isnull=False)
+    if user is not None:
+        receipts = receipts.filter(created_by=user)
+    return receipts.select_related('created_by__company_profile'), 'created_by'
+
+
+def _receipt_transaction(receipt, company):
+    return Transaction(
+        user=receipt.created_by,
+        company=company,
+        type='income',
+        title=f"Receipt Payment - {receipt.receipt_no}",
+        description=f"Payment receipt {receipt.receipt_no} from {receipt.client_name}",
+        amount=receipt.amount_received,
+        currency=company.currency_symbol,
+        source_app='receipt',
+        reference_id=str(receipt.id),
+        reference_model='Receipt',
+        transaction_date=receipt.date_received,
+        notes=f"Auto-synced from receipt {receipt.receipt_no}"
+    )
+
+
+def _approved_job_orders(user=None):
+    from apps.job_orders.models import Product
+
+    jobs = Product.objects.filter(approval_status='approved', total__gt=0, created_by__isnull=False)
+    if user is not None:
+        jobs = jobs.filter(created_by=user)
+    return jobs.select_related('created_by__company_profile'), 'created_by'
+
+
+def _job_order_transaction(job, company):
+    return Transaction(
+        user=job.created_by,
+        company=company,
+        type='expense',
+        title=f"Job Order Cost - {job.job_order}",
+        description=f"Cost for approved job order {job.job_order}",
+        amount=job.total,
+        currency=company.currency_symbol,
+        source_app='job_order',
+        reference_id=str(job.id),
+        reference_model='Product',
+        transaction_date=job.actual_delivery_date or job.date_created.date(),
+        notes=f"Auto-synced from approved job order {job.job_order}"
+    )
+
+
+# source_app -> (documents queryset factory, transaction builder)
+SYNC_SOURCES = {
+    'invoice': (_paid_invoices, _invoice_transaction),
+    'receipt': (_receipts, _receipt_transaction),
+    'job_order': (_approved_job_orders, _job_order_transaction),
+}
+
+# Transaction fields that follow later edits of their document
+REFRESHED_FIELDS = ('title', 'description', 'amount', 'tax', 'discount')
+# Sources whose transaction date is a document field; an invoice's date is when it was paid
+DATED_SOURCES = {'receipt', 'job_order'}
+
+
+def unsynced_documents(source_app, user=None, ids=None):
+    """Documents of ``source_app`` with no transaction yet, as one anti-join"""
+    get_documents, _ = SYNC_SOURCES[source_app]
+    documents, owner_field = get_documents(user)
+    if ids is not None:
+        documents = documents.filter(pk__in=ids)
+    synced = Transaction.objects.filter(
+        source_app=source_app,
+        reference_id=Cast(OuterRef('pk'), output_field=CharField()),
+    )
+    return documents.filter(~Exists(synced)), owner_field
+
+
+def refresh_synced(source_app, ids):
+    """
+    Bring the transactions already synced from documents ``ids`` in line with them.
+
+    Documents that no longer qualify (an invoice that is no longer paid, a
+    job order that lost its approval) void their transaction, and one that
+    qualifies again restores it. Only changed transactions are saved, which
+    keeps their ledgers, rollups and journal entries in step. Returns the
+    number of transactions updated.
+    """
+    transactions = list(
+        Transaction.objects.filter(source_app=source_app, reference_id__in=[str(pk) for pk in ids])
+        .select_related('company')
+    )
+    if not transactions:
+        return 0
+
+    get_documents, build = SYNC_SOURCES[source_app]
+    documents, _ = get_documents()
+    qualifying = {
+        str(document.pk): document
+        for document in documents.filter(pk__in=[txn.reference_id for txn in transactions])
+    }
+    fields = REFRESHED_FIELDS + (('transaction_date',) if source_app in DATED_SOURCES else ())
+
+    updated = 0
+    for txn in transactions:
+        document = qualifying.get(txn.reference_id)
+        if document is None:
+            changes = {'is_void': True}
+        else:
+            expected = build(document, txn.company)
+            changes = {field: getattr(expected, field) for field in fields}
+            changes['is_void'] = False
+        if all(getattr(txn, field) == value for field, value in changes.items()):
+            continue
+        for field, value in changes.items():
+            setattr(txn, field, value)
+        txn.save()
+        updated += 1
+    return updated
+
+
+def sync_source(source_app, user=None, company=None, ids=None):
+    """
+    Create the missing transactions for one source.
+
+    ``user`` limits the sync to that user's documents and ``company`` then
+    overrides the owner's company profile; ``ids`` limits it to the given
+    document ids. Returns the number of transactions inserted.
+    """
+    documents, owner_field = unsynced_documents(source_app, user, ids)
+    _, build = SYNC_SOURCES[source_app]
+
+    pending = []
+    for document in documents.iterator(chunk_size=SYNC_BATCH_SIZE):
+        target = company or getattr(getattr(document, owner_field), 'company_profile', None)
+        if target is None:
+            continue
+        txn = build(document, target)
+        txn.calculate_net_amount()
+        pending.append(txn)
+
+    if not pending:
+        return 0
+
+    months = {
+        (txn.company_id, txn.transaction_date.year, txn.transaction_date.month)
+        for txn in pending
+    }
+    days = {
+        (txn.company_id, txn.transaction_date, txn.type, txn.source_app)
+        for txn in pending
+    }
+    with db_transaction.atomic():
+        # Documents synced concurrently (outbox worker, manual sync) are skipped by the constraint
+        Transaction.objects.bulk_create(pending, batch_size=SYNC_BATCH_SIZE, ignore_conflicts=True)
+        for company_id, year, month in sorted(months):
+            Ledger.rebuild(company_id, year, month)
+        for key in sorted(days):
+            DailyRollup.rebuild(*key)
+        # In the same transaction, so no reader sees the new version before the new rows
+        for company_id in sorted({company_id for company_id, _, _ in months}):
+            bump_accounting_data_version(company_id)
+    return len(pending)
+
+
+def sync_all_sources(user=None, company=None, sources=None):
+    """Run ``sync_source`` for every (or the given) source; returns {source_app: count}"""
+    return {
+        source_app: sync_source(source_app, user=user, company=company)
+        for source_app in (sources or SYNC_SOURCES)
+    }
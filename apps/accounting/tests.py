@@ -0,0 +1,426 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import RestrictedError
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.core.models import CompanyProfile
+from apps.invoices.models import Invoice
+from apps.receipts.models import Receipt
+
+from .journal import get_trial_balance
+from .models import (
+    Account, ClientBalance, DataVersion, JournalEntry, JournalLine, Ledger, OutboxEvent, ReceivableItem, Transaction,
+)
+from .outbox import process_outbox
+from .receivables import get_aging_report, get_receivables_total, rebuild_receivables
+from .reconciliation import (
+    import_statement, parse_csv_statement, parse_ofx_statement, reconcile_statement, resolve_lines,
+)
+from .services import get_accounting_data_version
+
+
+class LedgerMaintenanceTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='ledger@example.com', password='testpass123')
+        self.company = CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Ledger Co',
+            email='ledger@example.com',
+            phone='+1234567890',
+            address='1 Ledger Street'
+        )
+
+    def create_transaction(self, type='income', amount='100.00', transaction_date=date(2026, 3, 10), **kwargs):
+        return Transaction.objects.create(
+            user=self.user,
+            company=self.company,
+            type=type,
+            title=f'{type} {amount}',
+            amount=Decimal(amount),
+            transaction_date=transaction_date,
+            **kwargs
+        )
+
+    def assertLedgersMatchTransactions(self):
+        """Every stored month equals a fresh aggregate of its transactions"""
+        for ledger in Ledger.objects.filter(company=self.company):
+            totals = Ledger.compute_totals(self.company.id, ledger.year, ledger.month)
+            self.assertEqual(ledger.total_income, totals['total_income'], ledger)
+            self.assertEqual(ledger.total_expense, totals['total_expense'], ledger)
+            self.assertEqual(ledger.net_profit, totals['net_profit'], ledger)
+
+    def test_ledger_follows_creates_edits_and_deletes(self):
+        income = self.create_transaction('income', '250.00', tax=Decimal('10.00'))
+        expense = self.create_transaction('expense', '40.00')
+        moved = self.create_transaction('income', '75.00', transaction_date=date(2026, 4, 2))
+        self.assertLedgersMatchTransactions()
+
+        income.amount = Decimal('300.00')
+        income.save()
+        moved.transaction_date = date(2026, 3, 28)
+        moved.save()
+        expense.is_void = True
+        expense.save()
+        self.assertLedgersMatchTransactions()
+
+        march = Ledger.objects.get(company=self.company, year=2026, month=3)
+        self.assertEqual(march.total_income, Decimal('385.00'))
+        self.assertEqual(march.total_expense, Decimal('0.00'))
+
+        income.delete()
+        self.assertLedgersMatchTransactions()
+
+    def test_stale_instance_does_not_double_apply(self):
+        transaction = self.create_transaction('income', '100.00')
+        first = Transaction.objects.get(pk=transaction.pk)
+        second = Transaction.objects.get(pk=transaction.pk)
+
+        first.amount = Decimal('150.00')
+        first.save()
+        second.amount = Decimal('120.00')
+        second.save()
+
+        march = Ledger.objects.get(company=self.company, year=2026, month=3)
+        self.assertEqual(march.total_income, Decimal('120.00'))
+        self.assertLedgersMatchTransactions()
+
+    def test_company_delete_cascades_through_ledgers(self):
+        self.create_transaction('income', '100.00')
+        self.create_transaction('expense', '30.00', transaction_date=date(2026, 5, 1))
+
+        self.company.delete()
+
+        self.assertFalse(CompanyProfile.objects.filter(pk=self.company.pk).exists())
+        self.assertFalse(Ledger.objects.exists())
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_user_delete_cascades_through_ledgers(self):
+        self.create_transaction('income', '100.00')
+
+        self.user.delete()
+
+        self.assertFalse(CompanyProfile.objects.exists())
+        self.assertFalse(Ledger.objects.exists())
+
+
+class OutboxSyncTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='outbox@example.com', password='testpass123')
+        self.company = CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Outbox Co',
+            email='outbox@example.com',
+            phone='+1234567890',
+            address='1 Outbox Street'
+        )
+
+    def test_invoice_edits_follow_synced_transaction(self):
+        invoice = Invoice.objects.create(
+            user=self.user,
+            client_name='Acme',
+            shipping_fee=Decimal('100.00'),
+            grand_total=Decimal('100.00'),
+            amount_paid=Decimal('100.00'),
+            status='paid',
+        )
+        process_outbox()
+        transaction = Transaction.objects.get(source_app='invoice', reference_id=str(invoice.id))
+        self.assertEqual(transaction.amount, Decimal('100.00'))
+
+        invoice.shipping_fee = Decimal('150.00')
+        invoice.amount_paid = Decimal('150.00')
+        invoice.save()
+        process_outbox()
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.amount, Decimal('150.00'))
+        self.assertFalse(transaction.is_void)
+
+        invoice.amount_paid = Decimal('0.00')
+        invoice.save()
+        process_outbox()
+        transaction.refresh_from_db()
+        self.assertTrue(transaction.is_void)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+        ledger = Ledger.objects.get(company=self.company, year=transaction.transaction_date.year,
+                                    month=transaction.transaction_date.month)
+        self.assertEqual(ledger.total_income, Decimal('0.00'))
+
+
+class DataVersionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='version@example.com', password='testpass123')
+        self.company = CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Version Co',
+            email='version@example.com',
+            phone='+1234567890',
+            address='1 Version Street'
+        )
+
+    def test_transaction_writes_move_the_stored_version(self):
+        version = get_accounting_data_version(self.company.id)
+        transaction = Transaction.objects.create(
+            user=self.user,
+            company=self.company,
+            type='income',
+            title='Sale',
+            amount=Decimal('10.00'),
+        )
+        self.assertGreater(DataVersion.objects.get(company=self.company).version, version)
+
+        version = get_accounting_data_version(self.company.id)
+        transaction.delete()
+        self.assertGreater(get_accounting_data_version(self.company.id), version)
+
+
+class JournalTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='journal@example.com', password='testpass123')
+        self.company = CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Journal Co',
+            email='journal@example.com',
+            phone='+1234567890',
+            address='1 Journal Street'
+        )
+        self.cash = Account.objects.create(
+            company=self.company, name='Cash', account_number='1000', account_type='asset'
+        )
+        self.sales = Account.objects.create(
+            company=self.company, name='Sales', account_number='4000', account_type='revenue'
+        )
+        self.costs = Account.objects.create(
+            company=self.company, name='Costs', account_number='5000', account_type='expense'
+        )
+
+    def create_transaction(self, type='income', amount='100.00'):
+        return Transaction.objects.create(
+            user=self.user,
+            company=self.company,
+            type=type,
+            title=f'{type} {amount}',
+            amount=Decimal(amount),
+            transaction_date=date(2026, 3, 10),
+        )
+
+    def assertBalances(self, cash, sales, costs):
+        for account, balance in ((self.cash, cash), (self.sales, sales), (self.costs, costs)):
+            account.refresh_from_db()
+            self.assertEqual(account.current_balance, Decimal(balance), account)
+        self.assertTrue(get_trial_balance(self.company, date(2026, 12, 31))['is_balanced'])
+
+    def test_journal_follows_creates_edits_and_deletes(self):
+        income = self.create_transaction('income', '100.00')
+        expense = self.create_transaction('expense', '30.00')
+        self.assertBalances('70.00', '100.00', '30.00')
+        entry = income.journal_entry
+        self.assertTrue(entry.is_posted)
+        self.assertEqual(entry.lines.count(), 2)
+
+        income.amount = Decimal('150.00')
+        income.save()
+        self.assertBalances('120.00', '150.00', '30.00')
+        self.assertEqual(JournalEntry.objects.filter(transaction=income).count(), 1)
+
+        expense.delete()
+        self.assertBalances('150.00', '150.00', '0.00')
+        self.assertEqual(JournalEntry.objects.count(), 1)
+
+    def test_journaled_account_cannot_be_deleted_alone(self):
+        self.create_transaction('income', '10.00')
+
+        with self.assertRaises(RestrictedError):
+            self.cash.delete()
+
+    def test_company_delete_cascades_through_journal(self):
+        self.create_transaction('income', '10.00')
+
+        self.company.delete()
+
+        self.assertFalse(Account.objects.exists())
+        self.assertFalse(JournalLine.objects.exists())
+
+    def test_user_delete_cascades_through_journal(self):
+        self.create_transaction('income', '10.00')
+
+        self.user.delete()
+
+        self.assertFalse(CompanyProfile.objects.exists())
+        self.assertFalse(JournalEntry.objects.exists())
+
+
+class ReconciliationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='bank@example.com', password='testpass123')
+        self.company = CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Bank Co',
+            email='bank@example.com',
+            phone='+1234567890',
+            address='1 Bank Street'
+        )
+
+    def create_transaction(self, type, amount, day, **kwargs):
+        return Transaction.objects.create(
+            user=self.user,
+            company=self.company,
+            type=type,
+            title=f'{type} {amount}',
+            amount=Decimal(amount),
+            transaction_date=date(2026, 3, day),
+            **kwargs
+        )
+
+    def import_csv(self, content, name='statement.csv'):
+        return import_statement(self.company, self.user, SimpleUploadedFile(name, content.encode()))
+
+    def test_parse_csv_statement(self):
+        lines = parse_csv_statement(
+            'Posting Date,Narration,Ref No,Credit,Debit\n'
+            '2026-03-10,Sale,A1,"₦1,200.50",\n'
+            '2026-03-11,Fuel,,,(300.00)\n'
+            ',,,,\n'
+        )
+        self.assertEqual([(line['date'], line['reference'], line['amount']) for line in lines], [
+            (date(2026, 3, 10), 'A1', Decimal('1200.50')),
+            (date(2026, 3, 11), '', Decimal('-300.00')),
+        ])
+
+        with self.assertRaises(ValueError):
+            parse_csv_statement('Narration,Amount\nSale,10\n')
+
+    def test_parse_ofx_statement(self):
+        lines = parse_ofx_statement(
+            '<OFX><BANKTRANLIST>'
+            '<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260310120000<TRNAMT>250.00<REFNUM>R-9<NAME>Acme<MEMO>Invoice'
+            '<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260312<TRNAMT>-40.00<CHECKNUM>101<NAME>Rent'
+            '</BANKTRANLIST></OFX>'
+        )
+        self.assertEqual([(line['date'], line['description'], line['reference'], line['amount']) for line in lines], [
+            (date(2026, 3, 10), 'Acme - Invoice', 'R-9', Decimal('250.00')),
+            (date(2026, 3, 12), 'Rent', '101', Decimal('-40.00')),
+        ])
+
+    def test_matching_and_reconciliation(self):
+        sale = self.create_transaction('income', '100.00', 10, reference_id='INV-1')
+        fuel = self.create_transaction('expense', '50.00', 11)
+        other_fuel = self.create_transaction('expense', '50.00', 12)
+
+        statement = self.import_csv(
+            'Date,Description,Reference,Amount\n'
+            '2026-03-11,Payment,inv-1,100.00\n'
+            '2026-03-10,Payment again,,100.00\n'
+            '2026-03-11,Fuel,,(50.00)\n'
+            '2026-03-20,Interest,,5.00\n'
+        )
+        lines = {line.description: line for line in statement.lines.all()}
+        self.assertEqual(lines['Payment'].status, 'matched')
+        self.assertEqual(lines['Payment'].transaction_id, sale.pk)
+        # The only candidate is already claimed by the referenced line
+        self.assertEqual(lines['Payment again'].status, 'unmatched')
+        self.assertEqual(lines['Fuel'].status, 'ambiguous')
+        self.assertEqual(sorted(lines['Fuel'].candidate_ids), sorted([str(fuel.pk), str(other_fuel.pk)]))
+        self.assertEqual(lines['Interest'].status, 'unmatched')
+
+        # Transactions matched on one statement are not offered to another
+        second = self.import_csv('Date,Description,Amount\n2026-03-10,Duplicate,100.00\n', 'second.csv')
+        self.assertEqual(second.lines.get().status, 'unmatched')
+
+        self.assertEqual(resolve_lines(statement, {lines['Fuel'].pk: str(fuel.pk)}), 1)
+        self.assertEqual(reconcile_statement(statement), 2)
+
+        self.assertEqual(
+            set(Transaction.objects.filter(is_reconciled=True).values_list('pk', flat=True)), {sale.pk, fuel.pk}
+        )
+        self.assertEqual(statement.lines.filter(status='reconciled').count(), 2)
+        statement.refresh_from_db()
+        self.assertIsNotNone(statement.reconciled_at)
+
+
+class ReceivablesTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='owed@example.com', password='testpass123')
+        self.company = CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Owed Co',
+            email='owed@example.com',
+            phone='+1234567890',
+            address='1 Owed Street'
+        )
+        self.today = timezone.localdate()
+
+    def create_invoice(self, client_name, amount, days_overdue):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Invoice.objects.create(
+                user=self.user,
+                client_name=client_name,
+                shipping_fee=Decimal(amount),
+                grand_total=Decimal(amount),
+                balance_due=Decimal(amount),
+                due_date=self.today - timedelta(days=days_overdue),
+            )
+
+    def pay(self, invoice, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Receipt.objects.create(
+                invoice=invoice,
+                client_name=invoice.client_name,
+                amount_received=Decimal(amount),
+                amount_in_words='',
+                payment_method='cash',
+                received_by='Cashier',
+                balance_after_payment=Decimal('0'),
+            )
+
+    def balance(self, client_key):
+        return ClientBalance.objects.filter(company=self.company, client_key=client_key).first()
+
+    def test_balances_follow_invoices_and_receipts(self):
+        late = self.create_invoice('Acme Ltd', '300.00', 45)
+        recent = self.create_invoice('  ACME  ltd ', '100.00', 5)
+
+        acme = self.balance('acme ltd')
+        self.assertEqual(acme.open_balance, Decimal('400.00'))
+        self.assertEqual(acme.invoice_count, 2)
+        self.assertEqual(acme.days_31_60, Decimal('300.00'))
+        self.assertEqual(acme.days_0_30, Decimal('100.00'))
+
+        self.pay(late, '100.00')
+        self.assertEqual(ReceivableItem.objects.get(invoice=late).balance, Decimal('200.00'))
+        self.assertEqual(self.balance('acme ltd').open_balance, Decimal('300.00'))
+
+        receipt = self.pay(late, '200.00')
+        self.assertFalse(ReceivableItem.objects.filter(invoice=late).exists())
+        self.assertEqual(self.balance('acme ltd').invoice_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            receipt.delete()
+        self.assertEqual(self.balance('acme ltd').open_balance, Decimal('300.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            late.delete()
+            recent.delete()
+        self.assertIsNone(self.balance('acme ltd'))
+
+    def test_aging_buckets_move_with_the_calendar(self):
+        self.create_invoice('Acme', '100.00', 5)
+        self.create_invoice('Beta', '50.00', 120)
+        self.create_invoice('Gamma', '70.00', -10)
+
+        report = get_aging_report(self.company, self.today)
+        self.assertEqual(report['totals']['days_0_30'], Decimal('170.00'))
+        self.assertEqual(report['totals']['days_over_90'], Decimal('50.00'))
+        self.assertEqual(report['totals']['client_count'], 3)
+
+        later = get_aging_report(self.company, self.today + timedelta(days=40))
+        self.assertEqual(later['totals']['days_0_30'], Decimal('70.00'))
+        self.assertEqual(later['totals']['days_31_60'], Decimal('100.00'))
+        self.assertEqual(self.balance('acme').aged_on, self.today + timedelta(days=40))
+
+        rebuild_receivables(self.company, self.today)
+        self.assertEqual(get_receivables_total(self.company), Decimal('220.00'))
@@ -8,6 +8,7 @@ urlpatterns = [
     path('', views.accounting_dashboard, name='dashboard'),
     path('transactions/', views.transaction_list, name='transaction_list'),
     path('ledger/', views.ledger_summary, name='ledger_summary'),
+    path('receivables/', views.receivables_aging, name='receivables_aging'),
     
     # Transaction management
     path('transactions/add/', views.add_transaction, name='add_transaction'),
@@ -17,6 +18,10 @@ urlpatterns = [
     path('transactions/<uuid:transaction_id>/unreconcile/', views.unreconcile_transaction, name='unreconcile_transaction'),
     path('transactions/update_currencies/', views.update_transaction_currencies, name='update_transaction_currencies'),
     
+    # Bank reconciliation
+    path('reconciliation/', views.bank_reconciliation, name='bank_reconciliation'),
+    path('reconciliation/<int:statement_id>/', views.review_bank_statement, name='review_bank_statement'),
+    
     # Export and reports
     path('export/', views.export_accounting_data, name='export_data'),
     path('reports/generate/', views.generate_report, name='generate_report'),
@@ -2,26 +2,37 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
-from django.core.paginator import Paginator
-from django.db.models import Sum, Q, Count, Min, Max
+from django.db.models import Q, Count
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.template.loader import render_to_string
 from django.urls import reverse
-from datetime import datetime, timedelta
+from django.core.paginator import Paginator
+from datetime import datetime
 import json
 import csv
 from decimal import Decimal
 import re
 
-from .models import Transaction, Ledger, Account, FinancialReport
+from .models import (
+    Transaction, Ledger, Account, FinancialReport, BankStatement, BankStatementLine
+)
 from .forms import (
     TransactionForm, TransactionFilterForm, AccountForm, 
     FinancialReportForm, BulkTransactionForm, ReconciliationForm,
-    ImportTransactionForm
+    ImportTransactionForm, BankStatementImportForm
 )
+from .services import get_dashboard_summary, get_transaction_totals, search_transactions
+from .pagination import paginate_keyset
+from .sync import sync_all_sources
+from .reports import generate_report_data, get_report_snapshot
+from .pdf import get_pdf_styles
+from .reconciliation import import_statement, match_statement, resolve_lines, reconcile_statement
+from .receivables import get_aging_report
 from apps.core.models import CompanyProfile
+from apps.core.currency import change_company_currency, rewrite_company_currency
+from apps.core.pdf import get_pdf_currency, get_pdf_fonts
 
 def get_currency_display(currency_symbol):
     """Convert currency symbol to display text for better compatibility"""
@@ -72,142 +83,6 @@ def clean_transaction_text(text):
     return text
 
 
-def get_pdf_currency_symbol(currency_symbol, use_symbol=True):
-    """Convert currency symbol to PDF-compatible format"""
-    if not currency_symbol or currency_symbol.strip() == '':
-        return 'NGN '  # Default fallback with space
-    
-    # Clean the symbol
-    currency_symbol = currency_symbol.strip()
-    
-    # If use_symbol is True, try to use the actual symbol first
-    if use_symbol:
-        # For common symbols that usually work well in PDFs
-        if currency_symbol in ['$', '€', '£', '¥']:
-            return f"{currency_symbol} "
-        
-        # For Naira symbol, try the actual symbol first
-        if currency_symbol == '₦':
-            try:
-                # Test if the symbol can be properly encoded
-                test_str = f"{currency_symbol}1000.00"
-                test_str.encode('utf-8')
-                return f"{currency_symbol} "
-            except UnicodeEncodeError:
-                pass  # Fall through to text representation
-        
-        # For other symbols, try them with a space
-        try:
-            # Test if the symbol can be properly encoded
-            test_str = f"{currency_symbol}1000.00"
-            test_str.encode('utf-8')
-            return f"{currency_symbol} "
-        except UnicodeEncodeError:
-            pass  # Fall through to text representation
-    
-    # Use text representations for better compatibility
-    currency_mapping = {
-        '₦': 'NGN ',  # Naira - use code instead of symbol with space
-        '$': '$',     # Dollar - works well
-        '€': 'EUR ',  # Euro - use code instead of symbol with space
-        '£': 'GBP ',  # Pound - use code instead of symbol with space
-        '¥': 'JPY ',  # Yen - use code instead of symbol with space
-        '₹': 'INR ',  # Rupee - use code instead of symbol with space
-        '₽': 'RUB ',  # Ruble - use code instead of symbol with space
-        '₩': 'KRW ',  # Won - use code instead of symbol with space
-        '₪': 'ILS ',  # Shekel - use code instead of symbol with space
-        '₨': 'PKR ',  # Rupee (Pakistani) - use code instead of symbol with space
-        '₴': 'UAH ',  # Hryvnia - use code instead of symbol with space
-        '₸': 'KZT ',  # Tenge - use code instead of symbol with space
-        '₺': 'TRY ',  # Lira - use code instead of symbol with space
-        '₼': 'AZN ',  # Manat - use code instead of symbol with space
-        '₾': 'GEL ',  # Lari - use code instead of symbol with space
-        '₿': 'BTC ',  # Bitcoin - use code instead of symbol with space
-    }
-    
-    # If the symbol is in our mapping, use the text representation
-    if currency_symbol in currency_mapping:
-        return currency_mapping[currency_symbol]
-    
-    # For currency codes (like 'USD', 'EUR', etc.), add a space for readability
-    if len(currency_symbol) == 3 and currency_symbol.isupper():
-        return f"{currency_symbol} "
-    
-    # For unknown symbols, try to use them directly with a space
-    try:
-        # Test if the symbol can be properly encoded
-        test_str = f"{currency_symbol}1000.00"
-        test_str.encode('utf-8')
-        # For safety, use a space after the symbol
-        return f"{currency_symbol} "
-    except UnicodeEncodeError:
-        # If encoding fails, use a text fallback
-        return f"{currency_symbol} "  # Add space for readability
-
-
-def sync_ledgers_from_transactions(company):
-    """Sync ledgers from existing transactions for all months"""
-    
-    # Get date range of transactions
-    date_range = Transaction.objects.filter(
-        company=company,
-        is_void=False
-    ).aggregate(
-        min_date=Min('transaction_date'),
-        max_date=Max('transaction_date')
-    )
-    
-    if not date_range['min_date'] or not date_range['max_date']:
-        return
-    
-    # Create ledgers for each month in the range
-    current_date = date_range['min_date'].replace(day=1)
-    end_date = date_range['max_date'].replace(day=1)
-    
-    while current_date <= end_date:
-        # Check if ledger exists for this month
-        existing_ledger = Ledger.objects.filter(
-            company=company,
-            year=current_date.year,
-            month=current_date.month
-        ).first()
-        
-        if not existing_ledger:
-            # Calculate totals from transactions
-            month_transactions = Transaction.objects.filter(
-                company=company,
-                transaction_date__year=current_date.year,
-                transaction_date__month=current_date.month,
-                is_void=False
-            )
-            
-            total_income = month_transactions.filter(type='income').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            total_expense = month_transactions.filter(type='expense').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            net_profit = total_income - total_expense
-            
-            # Create ledger
-            Ledger.objects.create(
-                company=company,
-                year=current_date.year,
-                month=current_date.month,
-                total_income=total_income,
-                total_expense=total_expense,
-                net_profit=net_profit
-            )
-        
-        # Move to next month
-        if current_date.month == 12:
-            current_date = current_date.replace(year=current_date.year + 1, month=1)
-        else:
-            current_date = current_date.replace(month=current_date.month + 1)
-
-
 @login_required
 def accounting_dashboard(request):
     """Main accounting dashboard with charts and summary"""
@@ -218,28 +93,15 @@ def accounting_dashboard(request):
         messages.error(request, "Company profile not found. Please set up your company profile first.")
         return redirect('core:company_profile')
     
-    # Sync ledgers from existing transactions
-    sync_ledgers_from_transactions(company)
-    
     # Get current month/year
     current_date = timezone.now()
     current_month = current_date.month
     current_year = current_date.year
     
-    # Get current month ledger
-    current_ledger = Ledger.objects.filter(
-        company=company,
-        year=current_year,
-        month=current_month
-    ).first()
-    
-    # Create a default ledger if none exists
-    if not current_ledger:
-        current_ledger = type('obj', (object,), {
-            'total_income': 0,
-            'total_expense': 0,
-            'net_profit': 0
-        })()
+    # Trend, current month, today and outstanding figures (cached by data version)
+    summary = get_dashboard_summary(company)
+    current_ledger = summary['current_month']
+    monthly_data = summary['monthly_data']
     
     # Get recent transactions
     recent_transactions = Transaction.objects.filter(
@@ -247,114 +109,16 @@ def accounting_dashboard(request):
         is_void=False
     ).order_by('-created_at')[:10]
     
-    # Get monthly data for charts (last 12 months) - improved with real transaction data
-    monthly_data = []
-    for i in range(12):
-        date = current_date - timedelta(days=30*i)
-        
-        # Get or create ledger for this month
-        month_ledger = Ledger.objects.filter(
-            company=company,
-            year=date.year,
-            month=date.month
-        ).first()
-        
-        # If no ledger exists, calculate from actual transactions
-        if not month_ledger:
-            month_transactions = Transaction.objects.filter(
-                company=company,
-                transaction_date__year=date.year,
-                transaction_date__month=date.month,
-                is_void=False
-            )
-            
-            month_income = month_transactions.filter(type='income').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            month_expense = month_transactions.filter(type='expense').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            month_profit = month_income - month_expense
-        else:
-            month_income = float(month_ledger.total_income)
-            month_expense = float(month_ledger.total_expense)
-            month_profit = float(month_ledger.net_profit)
-        
-        monthly_data.append({
-            'month': date.strftime('%b %Y'),
-            'year': date.year,
-            'month_num': date.month,
-            'income': month_income,
-            'expense': month_expense,
-            'profit': month_profit,
-        })
-    
-    # Get outstanding invoices
-    from apps.invoices.models import Invoice
-    outstanding_invoices = Invoice.objects.filter(
-        user=user,
-        status__in=['unpaid', 'partial']
-    ).aggregate(total=Sum('balance_due'))['total'] or 0
-    
-    # Get today's transactions
-    today_transactions = Transaction.objects.filter(
-        company=company,
-        transaction_date=current_date.date(),
-        is_void=False
-    )
-    
-    today_income = today_transactions.filter(type='income').aggregate(
-        total=Sum('net_amount')
-    )['total'] or 0
-    
-    today_expense = today_transactions.filter(type='expense').aggregate(
-        total=Sum('net_amount')
-    )['total'] or 0
-    
-    # If no transactions today, use recent transactions for demonstration
-    if today_income == 0 and today_expense == 0:
-        # Get recent transactions for demonstration
-        recent_income = Transaction.objects.filter(
-            company=company,
-            type='income',
-            is_void=False
-        ).order_by('-transaction_date')[:3].aggregate(
-            total=Sum('net_amount')
-        )['total'] or 0
-        
-        recent_expense = Transaction.objects.filter(
-            company=company,
-            type='expense',
-            is_void=False
-        ).order_by('-transaction_date')[:3].aggregate(
-            total=Sum('net_amount')
-        )['total'] or 0
-        
-        today_income = recent_income
-        today_expense = recent_expense
-    
-    # Get source app breakdown - optimized
-    source_breakdown = list(Transaction.objects.filter(
-        company=company,
-        is_void=False
-    ).values('source_app').annotate(
-        total=Sum('net_amount'),
-        count=Count('id')
-    ).order_by('-total'))
-    
-    # Convert Decimal values to float for JSON serialization
-    for item in source_breakdown:
-        item['total'] = float(item['total'])
+    # Source app breakdown from the daily rollups
+    source_breakdown = summary['source_breakdown']
     
     context = {
         'current_ledger': current_ledger,
         'recent_transactions': recent_transactions,
-        'monthly_data': list(reversed(monthly_data)),  # Reverse for chronological order
-        'outstanding_invoices': float(outstanding_invoices),
-        'today_income': float(today_income),
-        'today_expense': float(today_expense),
+        'monthly_data': monthly_data,
+        'outstanding_invoices': summary['outstanding_invoices'],
+        'today_income': summary['today_income'],
+        'today_expense': summary['today_expense'],
         'source_breakdown': source_breakdown,
         'current_month': current_month,
         'current_year': current_year,
@@ -408,46 +172,38 @@ def transaction_list(request):
                 transactions = transactions.filter(net_amount__lte=data['max_amount'])
             
             if data.get('search'):
-                search_term = data['search']
-                transactions = transactions.filter(
-                    Q(title__icontains=search_term) |
-                    Q(description__icontains=search_term) |
-                    Q(notes__icontains=search_term)
-                )
+                transactions = search_transactions(transactions, data['search'])
             
             if data.get('is_reconciled'):
                 is_reconciled = data['is_reconciled'] == 'true'
                 transactions = transactions.filter(is_reconciled=is_reconciled)
         
-        # Order by date
-        transactions = transactions.order_by('-transaction_date', '-created_at')
-        
-        # Pagination
-        paginator = Paginator(transactions, 25)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-        
-        # Summary totals - calculate on filtered data
-        total_income = transactions.filter(type='income').aggregate(
-            total=Sum('net_amount')
-        )['total'] or 0
-        
-        total_expense = transactions.filter(type='expense').aggregate(
-            total=Sum('net_amount')
-        )['total'] or 0
-        
-        net_total = total_income - total_expense
+        # Summary totals and count of the filtered data in one query
+        totals = get_transaction_totals(transactions)
+        
+        # Keyset pagination, newest first
+        page_obj = paginate_keyset(
+            transactions,
+            totals['total_count'],
+            per_page=25,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            last=request.GET.get('page') == 'last',
+        )
         
-        # Get total count for pagination info
-        total_count = transactions.count()
+        # Filters carried over to the pagination links
+        filter_params = request.GET.copy()
+        for param in ('after', 'before', 'page'):
+            filter_params.pop(param, None)
         
         context = {
             'page_obj': page_obj,
             'filter_form': filter_form,
-            'total_income': total_income,
-            'total_expense': total_expense,
-            'net_total': net_total,
-            'total_count': total_count,
+            'filter_query': filter_params.urlencode(),
+            'total_income': totals['total_income'],
+            'total_expense': totals['total_expense'],
+            'net_total': totals['net_total'],
+            'total_count': totals['total_count'],
         }
         
         return render(request, 'accounting/transactions.html', context)
@@ -588,6 +344,120 @@ def unreconcile_transaction(request, transaction_id):
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+@login_required
+def bank_reconciliation(request):
+    """Import a bank statement and list previous statements"""
+    user = request.user
+    company = getattr(user, 'company_profile', None)
+    
+    if not company:
+        messages.error(request, "Company profile not found.")
+        return redirect('core:company_profile')
+    
+    if request.method == 'POST':
+        form = BankStatementImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                statement = import_statement(
+                    company, user, form.cleaned_data['file'], form.cleaned_data['date_format']
+                )
+            except ValueError as e:
+                messages.error(request, f"Could not import statement: {e}")
+            else:
+                messages.success(request, f"Imported {statement.lines.count()} statement lines.")
+                return redirect('accounting:review_bank_statement', statement_id=statement.id)
+    else:
+        form = BankStatementImportForm()
+    
+    statements = company.bank_statements.annotate(
+        line_count=Count('lines'),
+        open_count=Count('lines', filter=Q(lines__status__in=['unmatched', 'ambiguous'])),
+        matched_count=Count('lines', filter=Q(lines__status='matched')),
+    )[:20]
+    
+    context = {
+        'form': form,
+        'statements': statements,
+    }
+    
+    return render(request, 'accounting/bank_reconciliation.html', context)
+
+
+@login_required
+def review_bank_statement(request, statement_id):
+    """Review statement matches, resolve ambiguous lines and reconcile"""
+    user = request.user
+    company = getattr(user, 'company_profile', None)
+    
+    if not company:
+        messages.error(request, "Company profile not found.")
+        return redirect('core:company_profile')
+    
+    statement = get_object_or_404(BankStatement, id=statement_id, company=company)
+    
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action == 'reconcile':
+            reconciled = reconcile_statement(statement)
+            messages.success(request, f"Reconciled {reconciled} transactions.")
+        elif action == 'rematch':
+            counts = match_statement(statement)
+            messages.success(
+                request,
+                f"Matched {counts['matched']} lines; {counts['ambiguous']} need review "
+                f"and {counts['unmatched']} are unmatched."
+            )
+        else:
+            choices = {}
+            for key, value in request.POST.items():
+                if key.startswith('line_') and value and key[5:].isdigit():
+                    choices[int(key[5:])] = value
+            changed = resolve_lines(statement, choices)
+            messages.success(request, f"Updated {changed} statement lines.")
+        
+        status = request.POST.get('status', '')
+        url = reverse('accounting:review_bank_statement', args=[statement.id])
+        return redirect(f"{url}?status={status}" if status else url)
+    
+    status_counts = dict(
+        statement.lines.order_by().values_list('status').annotate(count=Count('id'))
+    )
+    status = request.GET.get('status') or ('ambiguous' if status_counts.get('ambiguous') else 'matched')
+    
+    lines = statement.lines.filter(status=status).select_related('transaction')
+    page_obj = Paginator(lines, 100).get_page(request.GET.get('page'))
+    
+    # One query for every candidate shown on this page
+    candidate_ids = {pk for line in page_obj for pk in line.candidate_ids}
+    candidates = Transaction.objects.filter(pk__in=candidate_ids, company=company).in_bulk()
+    rows = [
+        {
+            'line': line,
+            'candidates': [
+                candidates[pk] for pk in (Transaction._meta.pk.to_python(c) for c in line.candidate_ids)
+                if pk in candidates
+            ],
+        }
+        for line in page_obj
+    ]
+    
+    status_tabs = [
+        {'value': value, 'label': label, 'count': status_counts.get(value, 0)}
+        for value, label in BankStatementLine.STATUS_CHOICES
+    ]
+    
+    context = {
+        'statement': statement,
+        'status': status,
+        'status_tabs': status_tabs,
+        'page_obj': page_obj,
+        'rows': rows,
+        'matched_count': status_counts.get('matched', 0),
+    }
+    
+    return render(request, 'accounting/review_bank_statement.html', context)
+
+
 @login_required
 def ledger_summary(request):
     """Show ledger summary by month/year"""
@@ -637,6 +507,24 @@ def ledger_summary(request):
     return render(request, 'accounting/ledger_summary.html', context)
 
 
+@login_required
+def receivables_aging(request):
+    """Open invoice balances per client, split into aging buckets"""
+    user = request.user
+    company = getattr(user, 'company_profile', None)
+    
+    if not company:
+        messages.error(request, "Company profile not found.")
+        return redirect('core:company_profile')
+    
+    context = {
+        'report': get_aging_report(company),
+        'currency_symbol': getattr(company, 'currency_symbol', '₦'),
+    }
+    
+    return render(request, 'accounting/receivables_aging.html', context)
+
+
 @login_required
 def export_accounting_data(request):
     """Export accounting data to CSV/Excel/PDF"""
@@ -766,10 +654,8 @@ def export_accounting_data(request):
             try:
                 from reportlab.lib.pagesizes import letter, A4
                 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-                from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
                 from reportlab.lib.units import inch
                 from reportlab.lib import colors
-                from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
                 from io import BytesIO
                 
                 # Create the HttpResponse object with PDF headers
@@ -784,22 +670,14 @@ def export_accounting_data(request):
                 elements = []
                 
                 # Get styles
-                styles = getSampleStyleSheet()
-                title_style = ParagraphStyle(
-                    'CustomTitle',
-                    parent=styles['Heading1'],
-                    fontSize=16,
-                    spaceAfter=30,
-                    alignment=TA_CENTER,
-                    textColor=colors.darkblue
-                )
+                styles = get_pdf_styles()
                 
                 # Add title
-                title = Paragraph(f"Transaction Report - {company.company_name}", title_style)
+                title = Paragraph(f"Transaction Report - {company.company_name}", styles['title'])
                 elements.append(title)
                 
                 # Add company info
-                company_info = Paragraph(f"Generated on: {timezone.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal'])
+                company_info = Paragraph(f"Generated on: {timezone.now().strftime('%B %d, %Y at %I:%M %p')}", styles['normal'])
                 elements.append(company_info)
                 elements.append(Spacer(1, 20))
                 
@@ -838,17 +716,8 @@ def export_accounting_data(request):
                 # Prepare table data with serial numbers
                 table_data = [['S/N', 'Date', 'Type', 'Title', 'Amount', 'Currency', 'Tax', 'Discount', 'Net Amount', 'Source', 'Reconciled']]
                 
-                # Create paragraph style for text cells
-                text_style = ParagraphStyle(
-                    'TableCell',
-                    parent=styles['Normal'],
-                    fontSize=8,
-                    leading=10,
-                    spaceAfter=2,
-                    spaceBefore=2,
-                    leftIndent=2,
-                    rightIndent=2,
-                )
+                # Paragraph style for text cells
+                text_style = styles['table_cell']
                 
                 for index, transaction in enumerate(transactions, 1):
                     # Get proper currency display
@@ -1098,10 +967,8 @@ def export_accounting_data(request):
             try:
                 from reportlab.lib.pagesizes import letter, A4
                 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-                from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
                 from reportlab.lib.units import inch
                 from reportlab.lib import colors
-                from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
                 from io import BytesIO
                 
                 # Create the HttpResponse object with PDF headers
@@ -1116,22 +983,14 @@ def export_accounting_data(request):
                 elements = []
                 
                 # Get styles
-                styles = getSampleStyleSheet()
-                title_style = ParagraphStyle(
-                    'CustomTitle',
-                    parent=styles['Heading1'],
-                    fontSize=16,
-                    spaceAfter=30,
-                    alignment=TA_CENTER,
-                    textColor=colors.darkblue
-                )
+                styles = get_pdf_styles()
                 
                 # Add title
-                title = Paragraph(f"Ledger Summary Report - {year} - {company.company_name}", title_style)
+                title = Paragraph(f"Ledger Summary Report - {year} - {company.company_name}", styles['title'])
                 elements.append(title)
                 
                 # Add company info
-                company_info = Paragraph(f"Generated on: {timezone.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal'])
+                company_info = Paragraph(f"Generated on: {timezone.now().strftime('%B %d, %Y at %I:%M %p')}", styles['normal'])
                 elements.append(company_info)
                 elements.append(Spacer(1, 20))
                 
@@ -1251,103 +1110,43 @@ def update_ledger_ajax(request):
         if not company:
             return JsonResponse({'error': 'Company profile not found'}, status=400)
         
-        # Update ledger for the specified month
+        # Ledger for the specified month
         ledger = Ledger.objects.filter(
             company=company,
             year=year,
             month=month
         ).first()
         
-        if ledger:
-            ledger.update_outstanding_amounts()
-        
-        # Get outstanding invoices
-        from apps.invoices.models import Invoice
-        outstanding_invoices = Invoice.objects.filter(
-            user=user,
-            status__in=['unpaid', 'partial']
-        ).aggregate(total=Sum('balance_due'))['total'] or 0
+        # Trend, today and outstanding figures (cached by data version)
+        summary = get_dashboard_summary(company)
         
-        # Get today's transactions
-        current_date = timezone.now()
-        today_transactions = Transaction.objects.filter(
-            company=company,
-            transaction_date=current_date.date(),
-            is_void=False
-        )
-        
-        today_income = today_transactions.filter(type='income').aggregate(
-            total=Sum('net_amount')
-        )['total'] or 0
-        
-        today_expense = today_transactions.filter(type='expense').aggregate(
-            total=Sum('net_amount')
-        )['total'] or 0
+        if ledger and float(ledger.outstanding_invoices) != summary['outstanding_invoices']:
+            Ledger.objects.filter(pk=ledger.pk).update(
+                outstanding_invoices=summary['outstanding_invoices'],
+                pending_receipts=0
+            )
         
         response_data = {
             'success': True,
             'total_income': float(ledger.total_income) if ledger else 0,
             'total_expense': float(ledger.total_expense) if ledger else 0,
             'net_profit': float(ledger.net_profit) if ledger else 0,
-            'outstanding_invoices': float(outstanding_invoices),
-            'today_income': float(today_income),
-            'today_expense': float(today_expense),
+            'outstanding_invoices': summary['outstanding_invoices'],
+            'today_income': summary['today_income'],
+            'today_expense': summary['today_expense'],
             'currency_symbol': company.currency_symbol if company else '₦',
             'currency_code': company.currency_code if company else 'NGN',
         }
         
         # Include chart data if requested
         if include_charts:
-            # Monthly data for charts (last 12 months) - improved with real transaction data
-            monthly_data = []
-            for i in range(12):
-                date = current_date - timedelta(days=30*i)
-                
-                # Get or create ledger for this month
-                month_ledger = Ledger.objects.filter(
-                    company=company,
-                    year=date.year,
-                    month=date.month
-                ).first()
-                
-                # If no ledger exists, calculate from actual transactions
-                if not month_ledger:
-                    month_transactions = Transaction.objects.filter(
-                        company=company,
-                        transaction_date__year=date.year,
-                        transaction_date__month=date.month,
-                        is_void=False
-                    )
-                    
-                    month_income = month_transactions.filter(type='income').aggregate(
-                        total=Sum('net_amount')
-                    )['total'] or 0
-                    
-                    month_expense = month_transactions.filter(type='expense').aggregate(
-                        total=Sum('net_amount')
-                    )['total'] or 0
-                    
-                    month_profit = month_income - month_expense
-                else:
-                    month_income = float(month_ledger.total_income)
-                    month_expense = float(month_ledger.total_expense)
-                    month_profit = float(month_ledger.net_profit)
-                
-                monthly_data.append({
-                    'month': date.strftime('%b %Y'),
-                    'income': month_income,
-                    'expense': month_expense,
-                    'profit': month_profit,
-                })
+            monthly_data = [
+                {key: row[key] for key in ('month', 'income', 'expense', 'profit')}
+                for row in summary['monthly_data']
+            ]
             
             # Source breakdown data
-            source_breakdown = Transaction.objects.filter(
-                company=company,
-                is_void=False
-            ).values('source_app').annotate(
-                total=Sum('net_amount'),
-                count=Count('id')
-            ).order_by('-total')
+            source_breakdown = summary['source_breakdown']
             
             # Recent transactions
             recent_transactions = Transaction.objects.filter(
@@ -1356,10 +1155,10 @@ def update_ledger_ajax(request):
             ).order_by('-created_at')[:10]
             
             response_data.update({
-                'monthly_data': list(reversed(monthly_data)),
+                'monthly_data': monthly_data,
                 'today_data': {
-                    'income': float(today_income),
-                    'expense': float(today_expense)
+                    'income': summary['today_income'],
+                    'expense': summary['today_expense']
                 },
                 'source_data': list(source_breakdown),
                 'recent_transactions': [
@@ -1399,72 +1198,9 @@ def sync_from_other_apps(request):
         return redirect('core:company_profile')
     
     if request.method == 'POST':
-        # Sync from invoices
-        from apps.invoices.models import Invoice
-        from apps.receipts.models import Receipt
-        
-        # Sync paid invoices
-        paid_invoices = Invoice.objects.filter(
-            user=user,
-            status='paid'
-        )
-        
-        synced_count = 0
-        for invoice in paid_invoices:
-            # Check if transaction already exists
-            existing_transaction = Transaction.objects.filter(
-                company=company,
-                source_app='invoice',
-                reference_id=str(invoice.id)
-            ).first()
-            
-            if not existing_transaction:
-                Transaction.objects.create(
-                    user=user,
-                    company=company,
-                    type='income',
-                    title=f"Invoice Payment - {invoice.invoice_number}",
-                    description=f"Payment for invoice {invoice.invoice_number} from {invoice.client_name}",
-                    amount=invoice.grand_total,
-                    currency=company.currency_symbol,
-                    tax=invoice.total_tax,
-                    discount=invoice.total_discount,
-                    source_app='invoice',
-                    reference_id=str(invoice.id),
-                    reference_model='Invoice',
-                    transaction_date=invoice.updated_at.date(),
-                    notes=f"Auto-synced from invoice {invoice.invoice_number}"
-                )
-                synced_count += 1
-        
-        # Sync from receipts
-        receipts = Receipt.objects.filter(
-            created_by=user
-        )
-        
-        for receipt in receipts:
-            existing_transaction = Transaction.objects.filter(
-                company=company,
-                source_app='receipt',
-                reference_id=str(receipt.id)
-            ).first()
-            
-            if not existing_transaction:
-                Transaction.objects.create(
-                    user=user,
-                    company=company,
-                    type='income',
-                    title=f"Receipt Payment - {receipt.receipt_no}",
-                    description=f"Payment receipt {receipt.receipt_no} from {receipt.client_name}",
-                    amount=receipt.amount_received,
-                    currency=company.currency_symbol,
-                    source_app='receipt',
-                    reference_id=str(receipt.id),
-                    reference_model='Receipt',
-                    transaction_date=receipt.date_received,
-                    notes=f"Auto-synced from receipt {receipt.receipt_no}"
-                )
-                synced_count += 1
+        # Sync paid invoices and receipts that have no transaction yet
+        synced = sync_all_sources(user=user, company=company, sources=['invoice', 'receipt'])
+        synced_count = sum(synced.values())
         
         messages.success(request, f"Successfully synced {synced_count} transactions from other apps.")
         return redirect('accounting:transaction_list')
@@ -1490,10 +1226,8 @@ def generate_report(request):
             report.created_by = user
             
             # Generate report data based on type
-            if report.report_type == 'income_statement':
-                report.report_data = generate_income_statement(company, report.start_date, report.end_date)
-            elif report.report_type == 'balance_sheet':
-                report.report_data = generate_balance_sheet(company, report.end_date)
+            if report.report_type in ('income_statement', 'balance_sheet'):
+                report.report_data = generate_report_data(report, report.start_date, report.end_date)
             
             report.save()
             
@@ -1521,130 +1255,22 @@ def export_report_pdf(request, report_id):
     
     report = get_object_or_404(FinancialReport, id=report_id, company=company)
     
-    # Calculate fresh report data dynamically (same logic as view_report)
-    original_transactions_count = Transaction.objects.filter(
-        company=company,
-        transaction_date__range=[report.start_date, report.end_date],
-        is_void=False
-    ).count()
-    
-    # If no transactions in original range, extend the range to include recent transactions
-    if original_transactions_count == 0:
-        latest_transaction = Transaction.objects.filter(
-            company=company,
-            is_void=False
-        ).order_by('-transaction_date').first()
-        
-        if latest_transaction:
-            adjusted_start_date = min(report.start_date, latest_transaction.transaction_date)
-            adjusted_end_date = max(report.end_date, latest_transaction.transaction_date)
-            
-            if report.report_type == 'income_statement':
-                fresh_report_data = generate_income_statement(company, adjusted_start_date, adjusted_end_date)
-            elif report.report_type == 'balance_sheet':
-                fresh_report_data = generate_balance_sheet(company, adjusted_end_date)
-            else:
-                fresh_report_data = report.report_data
-            
-            fresh_report_data['date_adjusted'] = True
-            fresh_report_data['original_period'] = f"{report.start_date} to {report.end_date}"
-            fresh_report_data['adjusted_period'] = f"{adjusted_start_date} to {adjusted_end_date}"
-        else:
-            if report.report_type == 'income_statement':
-                fresh_report_data = generate_income_statement(company, report.start_date, report.end_date)
-            elif report.report_type == 'balance_sheet':
-                fresh_report_data = generate_balance_sheet(company, report.end_date)
-            else:
-                fresh_report_data = report.report_data
-            fresh_report_data['date_adjusted'] = False
-    else:
-        if report.report_type == 'income_statement':
-            fresh_report_data = generate_income_statement(company, report.start_date, report.end_date)
-        elif report.report_type == 'balance_sheet':
-            fresh_report_data = generate_balance_sheet(company, report.end_date)
-        else:
-            fresh_report_data = report.report_data
-        fresh_report_data['date_adjusted'] = False
+    # Reuse the report snapshot unless the company's transactions changed (same as view_report)
+    fresh_report_data = get_report_snapshot(report)
     
     try:
         from reportlab.lib.pagesizes import letter, A4
         from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
         from reportlab.lib.units import inch
         from reportlab.lib import colors
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.pdfbase.ttfonts import TTFont
         from io import BytesIO
-        import os
         
         # Create the HttpResponse object with PDF headers
         response = HttpResponse(content_type='application/pdf')
         response['Content-Disposition'] = f'attachment; filename="{report.title}_{timezone.now().strftime("%Y%m%d")}.pdf"'
         
-        # Register fonts for better Unicode support
-        try:
-            # Try to register a Unicode-compatible font if available
-            font_path = os.path.join(os.path.dirname(__file__), '..', '..', 'static', 'fonts')
-            
-            # Try to find a Unicode-compatible font
-            unicode_fonts = [
-                'DejaVuSans.ttf',
-                'Arial.ttf',
-                'arial.ttf',
-                'LiberationSans-Regular.ttf',
-                'FreeSans.ttf'
-            ]
-            
-            default_font = 'Helvetica'  # Default fallback
-            font_registered = False
-            
-            for font_file in unicode_fonts:
-                font_path_full = os.path.join(font_path, font_file)
-                if os.path.exists(font_path_full):
-                    try:
-                        font_name = font_file.replace('.ttf', '')
-                        pdfmetrics.registerFont(TTFont(font_name, font_path_full))
-                        default_font = font_name
-                        font_registered = True
-                        break
-                    except:
-                        continue
-            
-            # If no font found in static directory, try system fonts
-            if not font_registered:
-                # Try to use a system font that supports Unicode
-                system_fonts = [
-                    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-                    '/System/Library/Fonts/Arial.ttf',
-                    'C:/Windows/Fonts/arial.ttf',
-                    'C:/Windows/Fonts/calibri.ttf'
-                ]
-                
-                for system_font in system_fonts:
-                    if os.path.exists(system_font):
-                        try:
-                            font_name = os.path.basename(system_font).replace('.ttf', '')
-                            pdfmetrics.registerFont(TTFont(font_name, system_font))
-                            default_font = font_name
-                            font_registered = True
-                            break
-                        except:
-                            continue
-            
-            # If we registered a custom font, we need to be careful about bold variants
-            # Most TTF fonts don't automatically have bold variants in ReportLab
-            # So we'll use the regular font for everything and rely on font weight
-            if font_registered:
-                # Use the registered font name without bold suffix
-                default_font = default_font
-            else:
-                # Use Helvetica which has built-in bold variants
-                default_font = 'Helvetica'
-                            
-        except Exception as e:
-            print(f"Font registration error: {e}")
-            default_font = 'Helvetica'
+        # Unicode fonts are registered once per process by the shared PDF registry
+        fonts = get_pdf_fonts()
         
         # Create the PDF object using BytesIO as its "file."
         buffer = BytesIO()
@@ -1654,62 +1280,45 @@ def export_report_pdf(request, report_id):
         elements = []
         
         # Get styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.darkblue
-        )
-        
-        subtitle_style = ParagraphStyle(
-            'Subtitle',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            textColor=colors.darkgreen
-        )
+        styles = get_pdf_styles()
         
         # Add title
-        title = Paragraph(f"{report.title}", title_style)
+        title = Paragraph(f"{report.title}", styles['report_title'])
         elements.append(title)
         
         # Add subtitle
-        subtitle = Paragraph(f"{report.get_report_type_display()} - {company.company_name}", subtitle_style)
+        subtitle = Paragraph(f"{report.get_report_type_display()} - {company.company_name}", styles['report_subtitle'])
         elements.append(subtitle)
         
         # Add report info with currency
         currency_symbol = getattr(company, 'currency_symbol', '₦')
         if report.report_type == 'balance_sheet':
-            report_info = Paragraph(f"As of: {fresh_report_data.get('as_of_date', report.end_date)}<br/>Generated on: {timezone.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal'])
+            report_info = Paragraph(f"As of: {fresh_report_data.get('as_of_date', report.end_date)}<br/>Generated on: {timezone.now().strftime('%B %d, %Y at %I:%M %p')}", styles['normal'])
         else:
-            report_info = Paragraph(f"Period: {fresh_report_data.get('period', f'{report.start_date} to {report.end_date}')}<br/>Generated on: {timezone.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal'])
+            report_info = Paragraph(f"Period: {fresh_report_data.get('period', f'{report.start_date} to {report.end_date}')}<br/>Generated on: {timezone.now().strftime('%B %d, %Y at %I:%M %p')}", styles['normal'])
         elements.append(report_info)
         
         # Add date adjustment notice if applicable
         if fresh_report_data.get('date_adjusted'):
-            adjustment_notice = Paragraph(f"<b>Note:</b> Date range adjusted to include actual data. Original: {fresh_report_data['original_period']} → Adjusted: {fresh_report_data['adjusted_period']}", styles['Normal'])
+            adjustment_notice = Paragraph(f"<b>Note:</b> Date range adjusted to include actual data. Original: {fresh_report_data['original_period']} → Adjusted: {fresh_report_data['adjusted_period']}", styles['normal'])
             elements.append(adjustment_notice)
         
         elements.append(Spacer(1, 30))
         
         # Generate report content based on type with fresh data
         if report.report_type == 'income_statement':
-            elements.extend(generate_income_statement_pdf_content(fresh_report_data, currency_symbol, default_font))
+            elements.extend(generate_income_statement_pdf_content(fresh_report_data, currency_symbol))
         elif report.report_type == 'balance_sheet':
-            elements.extend(generate_balance_sheet_pdf_content(fresh_report_data, currency_symbol, default_font))
+            elements.extend(generate_balance_sheet_pdf_content(fresh_report_data, currency_symbol))
         else:
             # Generic report display
-            elements.append(Paragraph("Report Data:", styles['Heading3']))
+            elements.append(Paragraph("Report Data:", styles['heading3']))
             elements.append(Spacer(1, 10))
             
             # Display report data as table
             if fresh_report_data:
-                # Handle currency symbol for PDF compatibility - try symbol first, fallback to text
-                pdf_currency = get_pdf_currency_symbol(currency_symbol, use_symbol=False)
+                # Handle currency symbol for PDF compatibility
+                pdf_currency = get_pdf_currency(currency_symbol)
                 
                 table_data = [['Item', 'Value']]
                 for key, value in fresh_report_data.items():
@@ -1719,21 +1328,12 @@ def export_report_pdf(request, report_id):
                         else:
                             table_data.append([key.replace('_', ' ').title(), str(value)])
                 
-                # Determine font names based on whether we're using a custom font or built-in Helvetica
-                if default_font == 'Helvetica':
-                    header_font = 'Helvetica-Bold'
-                    bold_font = 'Helvetica-Bold'
-                else:
-                    # For custom fonts, use the regular font name (no bold variant available)
-                    header_font = default_font
-                    bold_font = default_font
-                
                 table = Table(table_data, colWidths=[3*inch, 2*inch])
                 style = TableStyle([
                     ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
                     ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
                     ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), header_font),
+                    ('FONTNAME', (0, 0), (-1, 0), fonts['bold']),
                     ('FONTSIZE', (0, 0), (-1, -1), 10),
                     ('GRID', (0, 0), (-1, -1), 1, colors.black),
                     ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
@@ -1756,18 +1356,18 @@ def export_report_pdf(request, report_id):
         return redirect('accounting:view_report', report_id=report.id)
 
 
-def generate_income_statement_pdf_content(report_data, currency_symbol, default_font='Helvetica'):
+def generate_income_statement_pdf_content(report_data, currency_symbol):
     """Generate PDF content for income statement"""
     from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
     from reportlab.lib.units import inch
     from reportlab.lib import colors
     
     elements = []
-    styles = getSampleStyleSheet()
+    styles = get_pdf_styles()
+    fonts = get_pdf_fonts()
     
     # Handle currency symbol for PDF compatibility
-    pdf_currency = get_pdf_currency_symbol(currency_symbol, use_symbol=False)
+    pdf_currency = get_pdf_currency(currency_symbol)
     
     # Income Statement table
     table_data = [
@@ -1781,20 +1381,13 @@ def generate_income_statement_pdf_content(report_data, currency_symbol, default_
     ]
     
     table = Table(table_data, colWidths=[3*inch, 2*inch])
-    # Determine font names based on whether we're using a custom font or built-in Helvetica
-    if default_font == 'Helvetica':
-        header_font = 'Helvetica-Bold'
-        bold_font = 'Helvetica-Bold'
-    else:
-        # For custom fonts, use the regular font name (no bold variant available)
-        header_font = default_font
-        bold_font = default_font
+    bold_font = fonts['bold']
     
     style = TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), header_font),
+        ('FONTNAME', (0, 0), (-1, 0), bold_font),
         ('FONTSIZE', (0, 0), (-1, -1), 12),
         ('GRID', (0, 0), (-1, -1), 1, colors.black),
         ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
@@ -1811,24 +1404,24 @@ def generate_income_statement_pdf_content(report_data, currency_symbol, default_
     # Add period information
     if report_data.get('period'):
         elements.append(Spacer(1, 20))
-        period_info = Paragraph(f"<b>Period:</b> {report_data['period']}", styles['Normal'])
+        period_info = Paragraph(f"<b>Period:</b> {report_data['period']}", styles['normal'])
         elements.append(period_info)
     
     return elements
 
 
-def generate_balance_sheet_pdf_content(report_data, currency_symbol, default_font='Helvetica'):
+def generate_balance_sheet_pdf_content(report_data, currency_symbol):
     """Generate PDF content for balance sheet"""
     from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
     from reportlab.lib.units import inch
     from reportlab.lib import colors
     
     elements = []
-    styles = getSampleStyleSheet()
+    styles = get_pdf_styles()
+    fonts = get_pdf_fonts()
     
-    # Handle currency symbol for PDF compatibility - try symbol first, fallback to text
-    pdf_currency = get_pdf_currency_symbol(currency_symbol, use_symbol=False)
+    # Handle currency symbol for PDF compatibility
+    pdf_currency = get_pdf_currency(currency_symbol)
     
     # Balance Sheet table with detailed breakdown
     table_data = [
@@ -1851,21 +1444,14 @@ def generate_balance_sheet_pdf_content(report_data, currency_symbol, default_fon
         ['Total Liabilities & Equity', f"{pdf_currency} {report_data.get('total_liabilities', 0) + report_data.get('owner_equity', 0) + report_data.get('retained_earnings', 0):,.2f}"],
     ]
     
-    # Determine font names based on whether we're using a custom font or built-in Helvetica
-    if default_font == 'Helvetica':
-        header_font = 'Helvetica-Bold'
-        bold_font = 'Helvetica-Bold'
-    else:
-        # For custom fonts, use the regular font name (no bold variant available)
-        header_font = default_font
-        bold_font = default_font
+    bold_font = fonts['bold']
     
     table = Table(table_data, colWidths=[3*inch, 2*inch])
     style = TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), header_font),
+        ('FONTNAME', (0, 0), (-1, 0), bold_font),
         ('FONTSIZE', (0, 0), (-1, -1), 12),
         ('GRID', (0, 0), (-1, -1), 1, colors.black),
         ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
@@ -1890,164 +1476,18 @@ def generate_balance_sheet_pdf_content(report_data, currency_symbol, default_fon
     # Add as of date information
     if report_data.get('as_of_date'):
         elements.append(Spacer(1, 20))
-        as_of_info = Paragraph(f"<b>As of Date:</b> {report_data['as_of_date']}", styles['Normal'])
+        as_of_info = Paragraph(f"<b>As of Date:</b> {report_data['as_of_date']}", styles['normal'])
         elements.append(as_of_info)
     
     # Add period information
     if report_data.get('period'):
         elements.append(Spacer(1, 10))
-        period_info = Paragraph(f"<b>Period:</b> {report_data['period']}", styles['Normal'])
+        period_info = Paragraph(f"<b>Period:</b> {report_data['period']}", styles['normal'])
         elements.append(period_info)
     
     return elements
 
 
-def generate_income_statement(company, start_date, end_date):
-    """Generate income statement data"""
-    # Get all transactions in the date range
-    transactions = Transaction.objects.filter(
-        company=company,
-        transaction_date__range=[start_date, end_date],
-        is_void=False
-    )
-    
-    # Calculate income (positive amounts)
-    income_transactions = transactions.filter(type='income')
-    income = income_transactions.aggregate(
-        total=Sum('net_amount')
-    )['total'] or 0
-    
-    # Calculate expenses (negative amounts)
-    expense_transactions = transactions.filter(type='expense')
-    expenses = expense_transactions.aggregate(
-        total=Sum('net_amount')
-    )['total'] or 0
-    
-    # Calculate net income
-    net_income = income - expenses
-    
-    # Debug information
-    print(f"DEBUG: Income Statement for {company.company_name}")
-    print(f"DEBUG: Date range: {start_date} to {end_date}")
-    print(f"DEBUG: Total transactions found: {transactions.count()}")
-    print(f"DEBUG: Income transactions: {income_transactions.count()}")
-    print(f"DEBUG: Expense transactions: {expense_transactions.count()}")
-    print(f"DEBUG: Total income: {income}")
-    print(f"DEBUG: Total expenses: {expenses}")
-    print(f"DEBUG: Net income: {net_income}")
-    
-    return {
-        'income': float(income),
-        'expenses': float(expenses),
-        'net_income': float(net_income),
-        'period': f"{start_date} to {end_date}",
-        'debug_info': {
-            'total_transactions': transactions.count(),
-            'income_transactions': income_transactions.count(),
-            'expense_transactions': expense_transactions.count(),
-        }
-    }
-
-
-def generate_balance_sheet(company, as_of_date):
-    """Generate balance sheet data with proper accounting equation"""
-    # Get all transactions up to the as_of_date
-    transactions = Transaction.objects.filter(
-        company=company,
-        transaction_date__lte=as_of_date,
-        is_void=False
-    )
-    
-    # Calculate total income and expenses
-    total_income = transactions.filter(type='income').aggregate(
-        total=Sum('net_amount')
-    )['total'] or 0
-    
-    total_expenses = transactions.filter(type='expense').aggregate(
-        total=Sum('net_amount')
-    )['total'] or 0
-    
-    # Calculate retained earnings (net income)
-    retained_earnings = total_income - total_expenses
-    
-    # Get outstanding invoices as accounts receivable
-    try:
-        from apps.invoices.models import Invoice
-        accounts_receivable = Invoice.objects.filter(
-            user=company.user,
-            status__in=['unpaid', 'partial']
-        ).aggregate(total=Sum('balance_due'))['total'] or 0
-    except:
-        accounts_receivable = 0
-    
-    # FIXED: Proper balance sheet calculation
-    # Assets = Cash + Accounts Receivable + Other Assets
-    cash = retained_earnings  # Simplified: cash equals retained earnings
-    total_assets = cash + accounts_receivable
-    
-    # Liabilities = Accounts Payable + Other Liabilities
-    # For now, we'll calculate payables from outstanding expenses
-    try:
-        from apps.expenses.models import Expense
-        accounts_payable = Expense.objects.filter(
-            user=company.user,
-            status__in=['pending', 'unpaid']
-        ).aggregate(total=Sum('amount'))['total'] or 0
-    except:
-        accounts_payable = 0
-    
-    total_liabilities = accounts_payable
-    
-    # Equity = Owner's Equity + Retained Earnings
-    # For simplicity, we'll assume owner's equity is the initial investment
-    # and calculate it to balance the equation
-    owner_equity = total_assets - total_liabilities - retained_earnings
-    
-    # If owner's equity is negative, it means we have accumulated losses
-    # In this case, we should adjust retained earnings
-    if owner_equity < 0:
-        retained_earnings = total_assets - total_liabilities
-        owner_equity = 0
-    
-    # Verify the accounting equation: Assets = Liabilities + Equity
-    calculated_equity = total_liabilities + owner_equity + retained_earnings
-    balance_check = abs(total_assets - calculated_equity)
-    
-    # Debug information
-    print(f"DEBUG: Balance Sheet for {company.company_name}")
-    print(f"DEBUG: As of date: {as_of_date}")
-    print(f"DEBUG: Total transactions found: {transactions.count()}")
-    print(f"DEBUG: Total income: {total_income}")
-    print(f"DEBUG: Total expenses: {total_expenses}")
-    print(f"DEBUG: Retained earnings: {retained_earnings}")
-    print(f"DEBUG: Accounts receivable: {accounts_receivable}")
-    print(f"DEBUG: Cash: {cash}")
-    print(f"DEBUG: Total assets: {total_assets}")
-    print(f"DEBUG: Accounts payable: {accounts_payable}")
-    print(f"DEBUG: Total liabilities: {total_liabilities}")
-    print(f"DEBUG: Owner's equity: {owner_equity}")
-    print(f"DEBUG: Balance check (should be 0): {balance_check}")
-    
-    return {
-        'total_assets': float(total_assets),
-        'total_liabilities': float(total_liabilities),
-        'owner_equity': float(owner_equity),
-        'retained_earnings': float(retained_earnings),
-        'accounts_receivable': float(accounts_receivable),
-        'accounts_payable': float(accounts_payable),
-        'cash': float(cash),
-        'as_of_date': as_of_date.strftime('%Y-%m-%d'),
-        'period': f"As of {as_of_date.strftime('%B %d, %Y')}",
-        'balance_check': float(balance_check),
-        'debug_info': {
-            'total_transactions': transactions.count(),
-            'income_transactions': transactions.filter(type='income').count(),
-            'expense_transactions': transactions.filter(type='expense').count(),
-            'accounting_equation_balanced': balance_check < 0.01,  # Allow for small rounding differences
-        }
-    }
-
-
 @login_required
 def view_report(request, report_id):
     """View a generated financial report"""
@@ -2060,100 +1500,42 @@ def view_report(request, report_id):
     
     report = get_object_or_404(FinancialReport, id=report_id, company=company)
     
-    # Check if there are transactions in the original date range
-    original_transactions_count = Transaction.objects.filter(
-        company=company,
-        transaction_date__range=[report.start_date, report.end_date],
-        is_void=False
-    ).count()
+    fresh_report_data = get_report_snapshot(report)
     
-    # If no transactions in original range, extend the range to include recent transactions
-    if original_transactions_count == 0:
-        # Get the most recent transaction date
-        latest_transaction = Transaction.objects.filter(
+    # Diagnostics are only shown when the report came out empty
+    if report.report_type == 'income_statement':
+        is_empty = not fresh_report_data.get('income') and not fresh_report_data.get('expenses')
+    elif report.report_type == 'balance_sheet':
+        is_empty = not fresh_report_data.get('total_assets') and not fresh_report_data.get('total_liabilities')
+    else:
+        is_empty = False
+    
+    debug_info = {'date_range': f"{report.start_date} to {report.end_date}"}
+    if is_empty and not fresh_report_data.get('date_adjusted'):
+        counts = Transaction.objects.filter(company=company).aggregate(
+            total_transactions=Count('pk'),
+            transactions_in_period=Count('pk', filter=Q(
+                transaction_date__range=[report.start_date, report.end_date],
+                is_void=False
+            )),
+        )
+        debug_info.update(counts)
+        debug_info['original_transactions_count'] = counts['transactions_in_period']
+        debug_info['sample_transactions'] = Transaction.objects.filter(
             company=company,
             is_void=False
-        ).order_by('-transaction_date').first()
-        
-        if latest_transaction:
-            # Extend the date range to include the latest transaction
-            adjusted_start_date = min(report.start_date, latest_transaction.transaction_date)
-            adjusted_end_date = max(report.end_date, latest_transaction.transaction_date)
-            
-            # Use adjusted dates for calculation
-            if report.report_type == 'income_statement':
-                fresh_report_data = generate_income_statement(company, adjusted_start_date, adjusted_end_date)
-            elif report.report_type == 'balance_sheet':
-                fresh_report_data = generate_balance_sheet(company, adjusted_end_date)
-            else:
-                fresh_report_data = report.report_data
-            
-            # Add note about date adjustment
-            fresh_report_data['date_adjusted'] = True
-            fresh_report_data['original_period'] = f"{report.start_date} to {report.end_date}"
-            fresh_report_data['adjusted_period'] = f"{adjusted_start_date} to {adjusted_end_date}"
-        else:
-            # No transactions at all, use original data
-            if report.report_type == 'income_statement':
-                fresh_report_data = generate_income_statement(company, report.start_date, report.end_date)
-            elif report.report_type == 'balance_sheet':
-                fresh_report_data = generate_balance_sheet(company, report.end_date)
-            else:
-                fresh_report_data = report.report_data
-            fresh_report_data['date_adjusted'] = False
-    else:
-        # Use original date range
-        if report.report_type == 'income_statement':
-            fresh_report_data = generate_income_statement(company, report.start_date, report.end_date)
-        elif report.report_type == 'balance_sheet':
-            fresh_report_data = generate_balance_sheet(company, report.end_date)
-        else:
-            fresh_report_data = report.report_data
-        fresh_report_data['date_adjusted'] = False
-    
-    # Debug: Check if there are any transactions
-    total_transactions = Transaction.objects.filter(company=company).count()
-    transactions_in_period = Transaction.objects.filter(
-        company=company,
-        transaction_date__range=[report.start_date, report.end_date],
-        is_void=False
-    ).count()
-    
-    # Debug: Get some sample transactions
-    sample_transactions = Transaction.objects.filter(
-        company=company,
-        is_void=False
-    ).order_by('-transaction_date')[:5]
+        ).order_by('-transaction_date')[:5]
     
     context = {
         'report': report,
         'company': company,
         'report_data': fresh_report_data,  # Use fresh data instead of stored data
-        'debug_info': {
-            'total_transactions': total_transactions,
-            'transactions_in_period': transactions_in_period,
-            'sample_transactions': sample_transactions,
-            'date_range': f"{report.start_date} to {report.end_date}",
-            'original_transactions_count': original_transactions_count,
-        }
+        'debug_info': debug_info,
     }
     
     return render(request, 'accounting/view_report.html', context)
 
 
-def update_transactions_currency(company_profile, new_currency_symbol):
-    """Update all existing transactions to use the new currency symbol"""
-    from .models import Transaction
-    
-    # Get all transactions for this company
-    transactions = Transaction.objects.filter(company=company_profile)
-    
-    # Update currency for all transactions
-    updated_count = transactions.update(currency=new_currency_symbol)
-    
-    return updated_count
-
-
 @login_required
 @require_POST
 @csrf_exempt
@@ -2167,21 +1549,22 @@ def update_accounting_currency(request):
         if not currency_code or not currency_symbol:
             return JsonResponse({'success': False, 'error': 'Currency code and symbol are required'})
         
-        # Update company profile currency
+        # Update company profile currency and rewrite existing transactions in bulk
         company_profile = request.user.company_profile
-        company_profile.currency_code = currency_code
-        company_profile.currency_symbol = currency_symbol
-        company_profile.save()
+        updated_count, migration = change_company_currency(company_profile, currency_code, currency_symbol)
         
-        # Update all existing transactions to use the new currency
-        updated_count = update_transactions_currency(company_profile, currency_symbol)
+        if migration:
+            message = f'Currency updated to {currency_code} ({currency_symbol}). Existing transactions are being updated in the background.'
+        else:
+            message = f'Successfully updated {updated_count} transactions to use {currency_code} ({currency_symbol})'
         
         return JsonResponse({
             'success': True,
             'currency_code': currency_code,
             'currency_symbol': currency_symbol,
             'transactions_updated': updated_count,
-            'message': f'Successfully updated {updated_count} transactions to use {currency_code} ({currency_symbol})'
+            'queued': migration is not None,
+            'message': message
         })
         
     except Exception as e:
@@ -2204,7 +1587,7 @@ def update_transaction_currencies(request):
         current_currency = company.currency_symbol
         
         # Update all transactions for this company
-        updated_count = update_transactions_currency(company, current_currency)
+        updated_count = rewrite_company_currency(company, current_currency)
         
         return JsonResponse({
             'success': True,
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import CompanyProfile, BankAccount
+from .models import CompanyProfile, BankAccount, CurrencyMigration, DocumentSequence, DocumentExport
 
 
 @admin.register(CompanyProfile)
@@ -114,6 +114,29 @@ class BankAccountAdmin(admin.ModelAdmin):
 CompanyProfileAdmin.inlines = [BankAccountInline]
 
 
+@admin.register(CurrencyMigration)
+class CurrencyMigrationAdmin(admin.ModelAdmin):
+    list_display = ['company', 'currency_code', 'currency_symbol', 'status', 'rows_updated', 'created_at', 'completed_at']
+    list_filter = ['status', 'currency_code']
+    search_fields = ['company__company_name']
+    readonly_fields = ['created_at', 'completed_at', 'rows_updated', 'error']
+
+
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    list_display = ['doc_type', 'period', 'user', 'last_value']
+    list_filter = ['doc_type']
+    search_fields = ['doc_type', 'period', 'user__email']
+
+
+@admin.register(DocumentExport)
+class DocumentExportAdmin(admin.ModelAdmin):
+    list_display = ['user', 'doc_type', 'status', 'document_count', 'failed_count', 'created_at', 'completed_at']
+    list_filter = ['status', 'doc_type']
+    search_fields = ['user__email']
+    readonly_fields = ['document_ids', 'created_at', 'started_at', 'completed_at', 'document_count', 'failed_count', 'error']
+
+
 # Custom admin site configuration
 admin.site.site_header = "Multi-Purpose App Administration"
 admin.site.site_title = "Multi-Purpose App Admin"
@@ -5,3 +5,8 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
     verbose_name = 'Core'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .pdf import load_pdf_resources
+        load_pdf_resources()
@@ -0,0 +1,141 @@
+"""
+Company branding assets for PDFs and print layouts.
+
+Uploaded logos and signatures can be several megabytes. When one is
+uploaded, a copy downscaled for documents is stored next to it (PNG when
+the image has transparency, JPEG otherwise) together with its data URI, so
+documents embed a few kilobytes of prepared text instead of re-reading and
+re-encoding the original on every render. Profiles that predate the
+pipeline get their assets built the first time they are asked for. An
+image that cannot be processed is marked as failed rather than left
+empty, so it is not retried on every render; uploading a new file
+clears the mark.
+"""
+import base64
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db.models import F
+from PIL import Image
+
+from .company_context import bump_company_data_version
+
+logger = logging.getLogger(__name__)
+
+
+# Bounding boxes in pixels, about 2x the size documents print them at
+ASSET_SIZES = {
+    'logo': (600, 300),
+    'signature': (500, 200),
+}
+JPEG_QUALITY = 85
+
+# Stored in place of a data URI when the source image could not be processed
+FAILED_ASSET = 'failed'
+
+
+def _has_alpha(img):
+    return img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+
+
+def optimize_image(source, max_size):
+    """``(content, extension, mime type)`` of ``source`` scaled to fit ``max_size``"""
+    with Image.open(source) as img:
+        img.load()
+        img.thumbnail(max_size, Image.LANCZOS)
+        output = BytesIO()
+        if _has_alpha(img):
+            img.convert('RGBA').save(output, format='PNG', optimize=True)
+            return output.getvalue(), 'png', 'image/png'
+        img.convert('RGB').save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+        return output.getvalue(), 'jpg', 'image/jpeg'
+
+
+def _build_asset(company, kind):
+    """Regenerate one asset from its source field; returns the fields changed"""
+    source = getattr(company, kind)
+    variant = getattr(company, f'branding_{kind}')
+    if variant:
+        variant.delete(save=False)
+
+    if not source:
+        setattr(company, f'{kind}_data_uri', '')
+        return [f'branding_{kind}', f'{kind}_data_uri']
+
+    try:
+        with source.open('rb') as handle:
+            content, extension, mime = optimize_image(handle, ASSET_SIZES[kind])
+    except Exception:
+        logger.exception("Could not prepare the %s of company %s", kind, company.pk)
+        setattr(company, f'{kind}_data_uri', FAILED_ASSET)
+        return [f'branding_{kind}', f'{kind}_data_uri']
+
+    name = f"{os.path.splitext(os.path.basename(source.name))[0]}_{kind}.{extension}"
+    variant.save(name, ContentFile(content), save=False)
+    setattr(company, f'{kind}_data_uri', f"data:{mime};base64,{base64.b64encode(content).decode('ascii')}")
+    return [f'branding_{kind}', f'{kind}_data_uri']
+
+
+def build_branding_assets(company, kinds=('logo', 'signature')):
+    """
+    Rebuild the document variants of ``company``'s logo and/or signature.
+
+    The new values are written with a queryset update, so no model
+    ``save()`` runs again, and ``branding_version`` and the cached company
+    context are bumped so caches keyed on them move on.
+    """
+    fields = []
+    for kind in kinds:
+        fields.extend(_build_asset(company, kind))
+    if not fields or not company.pk:
+        return
+    type(company).objects.filter(pk=company.pk).update(
+        branding_version=F('branding_version') + 1,
+        **{field: getattr(company, field) for field in fields},
+    )
+    company.branding_version += 1
+    bump_company_data_version(company.user_id)
+
+
+def get_branding(company):
+    """
+    Branding of ``company`` for document contexts.
+
+    ``company_logo``/``company_signature`` are the original files' URLs for
+    web pages; the ``*_base64`` data URIs and ``*_path`` files are the
+    optimized copies for PDFs. Every value is None when absent.
+    """
+    branding = {
+        'company_logo': None,
+        'company_signature': None,
+        'company_logo_base64': None,
+        'company_signature_base64': None,
+        'logo_path': None,
+        'signature_path': None,
+    }
+    if company is None:
+        return branding
+
+    missing = [
+        kind for kind in ASSET_SIZES
+        if getattr(company, kind) and not getattr(company, f'{kind}_data_uri')
+    ]
+    if missing:
+        build_branding_assets(company, missing)
+
+    for kind in ASSET_SIZES:
+        source = getattr(company, kind)
+        if not source:
+            continue
+        branding[f'company_{kind}'] = source.url
+        data_uri = getattr(company, f'{kind}_data_uri')
+        branding[f'company_{kind}_base64'] = data_uri if data_uri and data_uri != FAILED_ASSET else None
+        variant = getattr(company, f'branding_{kind}')
+        if variant:
+            try:
+                branding[f'{kind}_path'] = variant.path
+            except NotImplementedError:
+                pass
+    return branding
@@ -0,0 +1,120 @@
+"""
+Company context shared by templates, middleware and document views.
+
+Every page needs the signed-in user's company profile, its logo and
+signature URLs, its currency and the bank account printed on documents.
+They are loaded together with one query (the default bank account, or the
+first one, is selected by subqueries of the profile query), cached under a
+per-user version that is stored in the database and moves whenever the
+profile or one of its bank accounts changes, and memoised on the user object
+so a request reads the cache at most once however many context processors
+ask. Because the version is committed together with the change, every
+process moves to the new cache key as soon as the change is visible, even
+with a per-process cache.
+"""
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Subquery
+
+from .models import BankAccount, CompanyContextVersion, CompanyProfile
+
+
+COMPANY_CONTEXT_TIMEOUT = 60 * 60
+
+DEFAULT_COMPANY_CONTEXT = {
+    'company_profile': None,
+    'company_logo': None,
+    'company_signature': None,
+    'currency_symbol': '$',
+    'currency_code': 'USD',
+    'default_bank_account': None,
+}
+
+# BankAccount columns selected alongside the profile, as (attname, annotation)
+_BANK_FIELDS = [
+    (field.attname, f'default_bank_{field.attname}')
+    for field in BankAccount._meta.concrete_fields
+    if field.name != 'company'
+]
+
+
+def get_company_data_version(user_id):
+    """Current version of a user's cached company context"""
+    version = CompanyContextVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first()
+    if version is None:
+        version = CompanyContextVersion.objects.get_or_create(user_id=user_id)[0].version
+    return version
+
+
+def bump_company_data_version(user_id):
+    """
+    Invalidate a user's cached company context.
+
+    Runs in the caller's transaction: until it commits, other processes keep
+    reading the old version together with the old rows. A missing version
+    row is left for the next read to create, so a user being deleted is
+    never given a new one.
+    """
+    CompanyContextVersion.objects.filter(user_id=user_id).update(version=F('version') + 1)
+
+
+def load_company_context(user):
+    """Build the company context of ``user`` from the database with one query"""
+    bank_accounts = BankAccount.objects.filter(company=OuterRef('pk')).order_by('-is_default', 'pk')
+    company_profile = (
+        CompanyProfile.objects.filter(user_id=user.pk)
+        .annotate(**{
+            annotation: Subquery(bank_accounts.values(attname)[:1])
+            for attname, annotation in _BANK_FIELDS
+        })
+        .first()
+    )
+    if company_profile is None:
+        return dict(DEFAULT_COMPANY_CONTEXT)
+
+    bank_values = {attname: getattr(company_profile, annotation) for attname, annotation in _BANK_FIELDS}
+    for _, annotation in _BANK_FIELDS:
+        delattr(company_profile, annotation)
+    default_bank_account = None
+    if bank_values['id'] is not None:
+        default_bank_account = BankAccount(company=company_profile, **bank_values)
+        default_bank_account._state.adding = False
+
+    return {
+        'company_profile': company_profile,
+        'company_logo': company_profile.logo.url if company_profile.logo else None,
+        'company_signature': company_profile.signature.url if company_profile.signature else None,
+        'currency_symbol': company_profile.currency_symbol,
+        'currency_code': company_profile.currency_code,
+        'default_bank_account': default_bank_account,
+    }
+
+
+def get_company_context(user):
+    """
+    Company context of ``user`` for templates and documents.
+
+    The result is memoised on ``user`` (``request.user`` lives for one
+    request) and shared through the cache between requests.
+    ``user.company_profile`` is primed with the same instance, so code that
+    reads the relation afterwards runs no query either. Treat the returned
+    dict as read-only; code that saves the profile loads it from the
+    database.
+    """
+    context = getattr(user, '_company_context', None)
+    if context is not None:
+        return context
+
+    if not getattr(user, 'is_authenticated', False) or user.pk is None:
+        return dict(DEFAULT_COMPANY_CONTEXT)
+
+    key = f'company_context_{user.pk}_{get_company_data_version(user.pk)}'
+    context = cache.get(key)
+    if context is None:
+        context = load_company_context(user)
+        cache.set(key, context, COMPANY_CONTEXT_TIMEOUT)
+
+    # A missing profile is cached as None, which the descriptor turns into DoesNotExist;
+    # __class__ rather than type() sees through the lazy request.user
+    user.__class__.company_profile.related.set_cached_value(user, context['company_profile'])
+    user._company_context = context
+    return context
@@ -0,0 +1,135 @@
+"""
+Company currency changes.
+
+The company profile is the source of truth for the currency shown by
+invoices, job orders and inventory, so a change only has to rewrite the rows
+that store a symbol of their own (accounting transactions) and invalidate
+each app's caches once. Stored rows are rewritten with one set-based UPDATE
+per table inside a single database transaction. Companies with more than
+``CURRENCY_INLINE_LIMIT`` rows to rewrite get a ``CurrencyMigration`` that
+the currency worker runs in the background instead.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .models import CurrencyMigration
+
+logger = logging.getLogger(__name__)
+
+
+# Companies with more stored rows to rewrite than this are migrated in the background
+CURRENCY_INLINE_LIMIT = 5000
+CURRENCY_BATCH_SIZE = 10
+
+
+def _stale_transactions(company, currency_symbol):
+    """The company's accounting transactions still on another currency, or None without accounting"""
+    try:
+        from apps.accounting.models import Transaction
+    except ImportError:
+        return None
+    return Transaction.objects.filter(company=company).exclude(currency=currency_symbol)
+
+
+def invalidate_currency_caches(company):
+    """Drop every cached figure that may show the old currency"""
+    try:
+        from apps.accounting.services import bump_accounting_data_version
+        bump_accounting_data_version(company.pk)
+    except ImportError:
+        pass
+    try:
+        from apps.inventory.utils import bump_inventory_data_version
+        bump_inventory_data_version(company.user_id)
+        cache.delete_many([
+            f'inventory_user_{company.user_id}',
+            'inventory_list_cache',
+            'inventory_dashboard_cache',
+            'inventory_export_cache',
+        ])
+    except ImportError:
+        pass
+
+
+def rewrite_company_currency(company, currency_symbol):
+    """
+    Rewrite the company's stored currency symbols in one database transaction.
+
+    Rows are updated in bulk, so no model ``save()`` or signal runs per row;
+    caches are invalidated once the transaction commits. Returns the number
+    of rows updated.
+    """
+    updated = 0
+    with db_transaction.atomic():
+        transactions = _stale_transactions(company, currency_symbol)
+        if transactions is not None:
+            updated += transactions.update(currency=currency_symbol, updated_at=timezone.now())
+        db_transaction.on_commit(lambda: invalidate_currency_caches(company))
+    return updated
+
+
+def change_company_currency(company, currency_code, currency_symbol):
+    """
+    Switch ``company`` to a new currency.
+
+    Returns ``(rows_updated, migration)``: the rows rewritten during the
+    call, or 0 and the queued ``CurrencyMigration`` when the company has
+    too many rows to rewrite inline.
+    """
+    with db_transaction.atomic():
+        company.currency_code = currency_code
+        company.currency_symbol = currency_symbol
+        company.save(update_fields=['currency_code', 'currency_symbol', 'updated_at'])
+
+        # A newer change supersedes any rewrite still waiting for the worker
+        company.currency_migrations.filter(status='pending').delete()
+
+        transactions = _stale_transactions(company, currency_symbol)
+        if transactions is not None and transactions.values('pk')[CURRENCY_INLINE_LIMIT:].exists():
+            migration = CurrencyMigration.objects.create(
+                company=company,
+                currency_code=currency_code,
+                currency_symbol=currency_symbol,
+            )
+            db_transaction.on_commit(lambda: invalidate_currency_caches(company))
+            return 0, migration
+
+        return rewrite_company_currency(company, currency_symbol), None
+
+
+def process_currency_migrations(batch_size=CURRENCY_BATCH_SIZE):
+    """
+    Run up to ``batch_size`` pending currency migrations, one transaction each.
+
+    Returns the number of migrations processed. Rows are claimed with SKIP
+    LOCKED where the database supports it, so several workers can run side
+    by side.
+    """
+    processed = 0
+    while processed < batch_size:
+        with db_transaction.atomic():
+            migration = (
+                CurrencyMigration.objects.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .order_by('id')
+                .first()
+            )
+            if migration is None:
+                break
+            try:
+                with db_transaction.atomic():
+                    migration.rows_updated = rewrite_company_currency(
+                        migration.company, migration.currency_symbol
+                    )
+                migration.status = 'done'
+            except Exception as e:
+                logger.exception("Currency migration %s failed", migration.pk)
+                migration.status = 'failed'
+                migration.error = str(e)
+            migration.completed_at = timezone.now()
+            migration.save(update_fields=['status', 'rows_updated', 'error', 'completed_at'])
+        processed += 1
+    return processed
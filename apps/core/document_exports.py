@@ -0,0 +1,211 @@
+"""
+Batch PDF exports.
+
+A ``DocumentExport`` lists the documents a user picked (the filtered list of
+invoices, quotations, receipts or waybills) and is built by the export
+worker. xhtml2pdf is CPU-bound and holds the GIL, so the worker renders each
+document's HTML in its own process and converts the HTML to PDF in a process
+pool, one conversion per core. Each PDF is written into the ZIP as soon as it
+is ready. Documents whose PDF is already in the PDF cache are copied from
+disk without rendering, and freshly rendered PDFs are added to the cache.
+An export left running by a worker that stopped is queued again once it is
+older than ``STALE_EXPORT_TIMEOUT``.
+"""
+import logging
+import os
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import DocumentExport
+from .pdf_cache import cached_pdf_path, html_to_pdf, store_pdf
+
+logger = logging.getLogger(__name__)
+
+
+# doc_type: (model, owner field, PDF source function)
+EXPORT_TYPES = {
+    'invoice': ('invoices.Invoice', 'user', 'apps.invoices.views.invoice_pdf_source'),
+    'quotation': ('quotations.Quotation', 'user', 'apps.quotations.views.quotation_pdf_source'),
+    'receipt': ('receipts.Receipt', 'created_by', 'apps.receipts.views.receipt_pdf_source'),
+    'waybill': ('waybills.Waybill', 'user', 'apps.waybills.views.waybill_pdf_source'),
+}
+
+EXPORT_BATCH_SIZE = 5
+MAX_EXPORT_DOCUMENTS = 2000
+# Conversions queued per pool process, enough to keep every core busy
+IN_FLIGHT_PER_WORKER = 2
+# A running export older than this was abandoned by a worker that stopped
+STALE_EXPORT_TIMEOUT = timedelta(hours=1)
+
+
+def queue_document_export(user, doc_type, queryset, ids=None):
+    """
+    Queue a ZIP of PDFs for the documents in ``queryset``.
+
+    ``ids`` narrows the export to selected documents. At most
+    ``MAX_EXPORT_DOCUMENTS`` are included.
+    """
+    if doc_type not in EXPORT_TYPES:
+        raise ValueError(f"Unknown document type '{doc_type}'")
+    if ids:
+        queryset = queryset.filter(pk__in=ids)
+    document_ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:MAX_EXPORT_DOCUMENTS])
+    return DocumentExport.objects.create(user=user, doc_type=doc_type, document_ids=document_ids)
+
+
+def _export_workers():
+    return getattr(settings, 'PDF_EXPORT_WORKERS', None) or os.cpu_count() or 1
+
+
+def _sources(export):
+    model_label, owner_field, source_path = EXPORT_TYPES[export.doc_type]
+    model = apps.get_model(model_label)
+    pdf_source = import_string(source_path)
+    documents = model.objects.filter(
+        **{owner_field: export.user, 'pk__in': export.document_ids}
+    ).order_by('pk')
+    for document in documents.iterator(chunk_size=200):
+        try:
+            yield pdf_source(document, export.user)
+        except Exception:
+            logger.exception("Could not prepare %s %s for export %s", export.doc_type, document.pk, export.pk)
+            yield None
+
+
+class _Archive:
+    """A ZIP being written, with unique member names"""
+
+    def __init__(self, handle):
+        self.zip = zipfile.ZipFile(handle, 'w', zipfile.ZIP_STORED)
+        self.names = set()
+        self.count = 0
+
+    def _name(self, filename):
+        name, stem, ext = filename, *os.path.splitext(filename)
+        suffix = 2
+        while name in self.names:
+            name = f"{stem}_{suffix}{ext}"
+            suffix += 1
+        self.names.add(name)
+        return name
+
+    def add_file(self, path, filename):
+        self.zip.write(path, self._name(filename))
+        self.count += 1
+
+    def add_bytes(self, content, filename):
+        self.zip.writestr(self._name(filename), content)
+        self.count += 1
+
+
+def _collect(future, source, archive):
+    """Write a finished conversion into the archive and the PDF cache; False when it failed"""
+    try:
+        content = future.result()
+    except Exception:
+        logger.exception("Rendering %s %s failed", source.kind, source.key)
+        return False
+    if content is None:
+        return False
+    archive.add_bytes(content, source.filename)
+    try:
+        store_pdf(source.kind, source.key, source.fingerprint, content)
+    except OSError:
+        logger.exception("Could not cache %s PDF %s", source.kind, source.key)
+    return True
+
+
+def build_export(export, max_workers=None):
+    """
+    Render the export's documents into a ZIP and attach it to ``export``.
+
+    Returns ``(written, failed)``.
+    """
+    max_workers = max_workers or _export_workers()
+    failed = 0
+    with tempfile.TemporaryFile() as handle:
+        archive = _Archive(handle)
+        with archive.zip, ProcessPoolExecutor(max_workers=max_workers) as pool:
+            in_flight = {}
+            for source in _sources(export):
+                if source is None:
+                    failed += 1
+                    continue
+                path = cached_pdf_path(source.kind, source.key, source.fingerprint)
+                if path:
+                    archive.add_file(path, source.filename)
+                    continue
+                try:
+                    html = source.render_html()
+                except Exception:
+                    logger.exception("Rendering %s %s failed", source.kind, source.key)
+                    failed += 1
+                    continue
+                in_flight[pool.submit(html_to_pdf, html)] = source
+
+                # Bound the HTML held in memory while the pool catches up
+                if len(in_flight) >= max_workers * IN_FLIGHT_PER_WORKER:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        failed += not _collect(future, in_flight.pop(future), archive)
+
+            for future in list(in_flight):
+                failed += not _collect(future, in_flight.pop(future), archive)
+
+        handle.seek(0)
+        stamp = timezone.localtime().strftime('%Y%m%d_%H%M%S')
+        export.file.save(f"{export.doc_type}s_{export.pk}_{stamp}.zip", File(handle), save=False)
+    return archive.count, failed
+
+
+def reclaim_stale_exports(timeout=STALE_EXPORT_TIMEOUT):
+    """Put exports abandoned in ``running`` back in the queue; returns how many"""
+    return DocumentExport.objects.filter(
+        status='running', started_at__lt=timezone.now() - timeout
+    ).update(status='pending', started_at=None)
+
+
+def process_document_exports(batch_size=EXPORT_BATCH_SIZE, max_workers=None):
+    """
+    Build up to ``batch_size`` pending exports.
+
+    Exports are claimed with SKIP LOCKED where the database supports it, so
+    several workers can run side by side, and exports abandoned in
+    ``running`` are queued again first. Returns the number processed.
+    """
+    reclaim_stale_exports()
+    processed = 0
+    while processed < batch_size:
+        with db_transaction.atomic():
+            export = (
+                DocumentExport.objects.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .order_by('id')
+                .first()
+            )
+            if export is None:
+                break
+            export.status = 'running'
+            export.started_at = timezone.now()
+            export.save(update_fields=['status', 'started_at'])
+
+        try:
+            export.document_count, export.failed_count = build_export(export, max_workers)
+            export.status = 'done'
+        except Exception as e:
+            logger.exception("Document export %s failed", export.pk)
+            export.status = 'failed'
+            export.error = str(e)
+        export.completed_at = timezone.now()
+        export.save(update_fields=['status', 'file', 'document_count', 'failed_count', 'error', 'completed_at'])
+        processed += 1
+    return processed
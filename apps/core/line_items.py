@@ -0,0 +1,64 @@
+"""
+Bulk line-item persistence for invoices, quotations and waybills.
+
+Document forms post their lines as ``items[<index>][<field>]`` keys. The
+views collect those rows, build unsaved item instances, validate them all
+in memory and insert them with one ``bulk_create``; the document's totals
+are then computed once from the same in-memory lines instead of re-reading
+``items.all()`` after every row. ``bulk_create`` does not call ``save()``,
+so the per-line normalisation an item's ``save()`` would apply (its
+``calculate_line_total()``) is applied here.
+"""
+from django.core.exceptions import ValidationError
+
+
+LINE_ITEM_BATCH_SIZE = 500
+
+
+def collect_item_rows(data):
+    """
+    ``{index: {field: value}}`` from ``items[<index>][<field>]`` keys of
+    ``data``, in the order the rows were posted.
+    """
+    rows = {}
+    for key, value in data.items():
+        if key.startswith('items[') and '][' in key:
+            index = key.split('[')[1].split(']')[0]
+            field_name = key.split('[')[2].split(']')[0]
+            rows.setdefault(index, {})[field_name] = value
+    return rows
+
+
+def validate_line_items(items, exclude=()):
+    """
+    Field errors of unsaved ``items`` as messages such as
+    ``"Line 2: Quantity: Ensure this value is greater than or equal to 0."``.
+
+    ``exclude`` names fields not to check, typically the parent document
+    that has not been saved yet.
+    """
+    errors = []
+    for number, item in enumerate(items, start=1):
+        try:
+            item.clean_fields(exclude=list(exclude))
+        except ValidationError as e:
+            for field_name, messages in e.message_dict.items():
+                label = item._meta.get_field(field_name).verbose_name.capitalize()
+                errors.extend(f"Line {number}: {label}: {message}" for message in messages)
+    return errors
+
+
+def bulk_create_line_items(items, batch_size=LINE_ITEM_BATCH_SIZE):
+    """
+    Insert unsaved ``items`` of one model with a single ``bulk_create``.
+
+    Items may have been built against a parent that was saved afterwards;
+    its primary key is picked up at insert time. Returns the items.
+    """
+    if not items:
+        return []
+    for item in items:
+        calculate_line_total = getattr(item, 'calculate_line_total', None)
+        if calculate_line_total is not None:
+            calculate_line_total()
+    return type(items[0]).objects.bulk_create(items, batch_size=batch_size)
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.core.currency import CURRENCY_BATCH_SIZE, process_currency_migrations
+
+
+class Command(BaseCommand):
+    help = 'Rewrite stored currency symbols for companies whose currency change was queued'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=CURRENCY_BATCH_SIZE,
+            help='Number of currency migrations to run per batch',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running as a worker, polling for new migrations',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=30.0,
+            help='Seconds to wait between polls when nothing is queued (with --loop)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            processed = process_currency_migrations(batch_size)
+            total += processed
+            if processed:
+                self.stdout.write(f'Processed {processed} currency migrations')
+            elif not options['loop']:
+                break
+            else:
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} currency migrations'))
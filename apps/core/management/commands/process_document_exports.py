@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.core.document_exports import EXPORT_BATCH_SIZE, process_document_exports
+
+
+class Command(BaseCommand):
+    help = 'Render queued batch PDF exports into ZIP files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EXPORT_BATCH_SIZE,
+            help='Number of exports to build per batch',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Rendering processes per export (defaults to PDF_EXPORT_WORKERS or the CPU count)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running as a worker, polling for new exports',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when nothing is queued (with --loop)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            processed = process_document_exports(batch_size, options['workers'])
+            total += processed
+            if processed:
+                self.stdout.write(f'Processed {processed} document exports')
+            elif not options['loop']:
+                break
+            else:
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} document exports'))
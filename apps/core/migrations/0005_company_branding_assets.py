@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:09
+
+import apps.core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_document_export'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companyprofile',
+            name='branding_logo',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=apps.core.models.company_branding_upload_path),
+        ),
+        migrations.AddField(
+            model_name='companyprofile',
+            name='branding_signature',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=apps.core.models.company_branding_upload_path),
+        ),
+        migrations.AddField(
+            model_name='companyprofile',
+            name='branding_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='companyprofile',
+            name='logo_data_uri',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='companyprofile',
+            name='signature_data_uri',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
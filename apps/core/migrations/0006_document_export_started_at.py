@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_company_branding_assets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentexport',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -23,6 +23,11 @@ def company_signature_upload_path(instance, filename):
     return f'company/signatures/{instance.user.id}/{filename}'
 
 
+def company_branding_upload_path(instance, filename):
+    """Generate upload path for the document copies of company images"""
+    return f'company/branding/{instance.user.id}/{filename}'
+
+
 User = get_user_model()
 
 
@@ -44,6 +49,13 @@ class CompanyProfile(models.Model):
     logo = models.ImageField(upload_to=company_logo_upload_path, blank=True, null=True)
     signature = models.ImageField(upload_to=company_signature_upload_path, blank=True, null=True)
     
+    # Downscaled copies and data URIs for documents, built by apps.core.branding
+    branding_logo = models.ImageField(upload_to=company_branding_upload_path, blank=True, null=True, editable=False)
+    branding_signature = models.ImageField(upload_to=company_branding_upload_path, blank=True, null=True, editable=False)
+    logo_data_uri = models.TextField(blank=True, editable=False)
+    signature_data_uri = models.TextField(blank=True, editable=False)
+    branding_version = models.PositiveIntegerField(default=0, editable=False)
+    
     # Financial defaults
     default_tax = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
     default_discount = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
@@ -81,14 +93,18 @@ class CompanyProfile(models.Model):
             os.remove(self.signature.path)
 
     def save(self, *args, **kwargs):
-        # Track if a new logo is being uploaded
+        # Track if a new logo or signature is being uploaded
         new_logo = False
+        new_signature = False
         if self.pk:
-            old = CompanyProfile.objects.filter(pk=self.pk).first()
+            old = CompanyProfile.objects.filter(pk=self.pk).only('logo', 'signature').first()
             if old and old.logo != self.logo:
                 new_logo = True
-        elif self.logo:
-            new_logo = True
+            if old and old.signature != self.signature:
+                new_signature = True
+        else:
+            new_logo = bool(self.logo)
+            new_signature = bool(self.signature)
         super().save(*args, **kwargs)
         # Auto-convert logo to PNG if needed
         if self.logo and new_logo:
@@ -112,6 +128,12 @@ class CompanyProfile(models.Model):
                 except Exception as e:
                     # Optionally log the error
                     pass
+        
+        # Rebuild the document copies of whatever changed
+        changed = [kind for kind, is_new in (('logo', new_logo), ('signature', new_signature)) if is_new]
+        if changed:
+            from .branding import build_branding_assets
+            build_branding_assets(self, changed)
 
 
 def format_currency(value, currency_symbol=None):
@@ -177,3 +199,114 @@ class BankAccount(models.Model):
         if self.is_default:
             BankAccount.objects.filter(company=self.company, is_default=True).update(is_default=False)
         super().save(*args, **kwargs)
+
+
+class CompanyContextVersion(models.Model):
+    """
+    Version of a user's cached company context.
+
+    Bumped in the same database transaction as every profile or bank account
+    write, so every process moves to a new cache key exactly when the change
+    is committed. Kept per user, since users without a profile have a
+    context too.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='company_context_version'
+    )
+    version = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
+
+
+class CurrencyMigration(models.Model):
+    """A queued rewrite of a company's stored currency symbols, run by the currency worker"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    company = models.ForeignKey(CompanyProfile, on_delete=models.CASCADE, related_name='currency_migrations')
+    currency_code = models.CharField(max_length=3)
+    currency_symbol = models.CharField(max_length=5)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    rows_updated = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.company} -> {self.currency_code} ({self.status})"
+
+
+class DocumentSequence(models.Model):
+    """
+    The last number issued for one document type, tenant and period.
+
+    ``user`` is the tenant; sequences shared by every tenant leave it empty.
+    Numbers are taken through ``apps.core.sequences``.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='document_sequences')
+    doc_type = models.CharField(max_length=30)
+    period = models.CharField(max_length=20, blank=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'doc_type', 'period'], name='core_sequence_unique'),
+            models.UniqueConstraint(
+                fields=['doc_type', 'period'],
+                condition=models.Q(user__isnull=True),
+                name='core_sequence_unique_shared',
+            ),
+        ]
+
+    def __str__(self):
+        period = f" {self.period}" if self.period else ""
+        return f"{self.doc_type}{period}: {self.last_value}"
+
+
+class DocumentExport(models.Model):
+    """A queued batch of document PDFs, zipped by the export worker"""
+    DOC_TYPE_CHOICES = [
+        ('invoice', 'Invoices'),
+        ('quotation', 'Quotations'),
+        ('receipt', 'Receipts'),
+        ('waybill', 'Waybills'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='document_exports')
+    doc_type = models.CharField(max_length=20, choices=DOC_TYPE_CHOICES)
+    document_ids = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to='exports/', blank=True)
+    document_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_doc_type_display()} export for {self.user} ({self.status})"
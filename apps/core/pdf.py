@@ -0,0 +1,133 @@
+"""
+Process-wide ReportLab resources shared by every PDF generator.
+
+TrueType fonts are discovered and registered once per process (the core app
+warms them at startup), the sample style sheet is built once, and the text
+used for each currency symbol is memoised. Generators build their own
+paragraph styles on top of ``get_stylesheet()`` once per process and cache
+them the same way.
+"""
+import os
+from functools import lru_cache
+
+from django.conf import settings
+
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+
+# Unicode-capable fonts looked for in static/fonts, in order of preference
+UNICODE_FONT_FILES = [
+    'DejaVuSans.ttf',
+    'Arial.ttf',
+    'arial.ttf',
+    'LiberationSans-Regular.ttf',
+    'FreeSans.ttf',
+]
+
+# System-wide fallbacks when the project ships no font
+SYSTEM_FONT_PATHS = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/System/Library/Fonts/Arial.ttf',
+    'C:/Windows/Fonts/arial.ttf',
+    'C:/Windows/Fonts/calibri.ttf',
+]
+
+# Bold companions registered next to a regular font when they exist
+BOLD_FONT_FILES = {
+    'DejaVuSans.ttf': 'DejaVuSans-Bold.ttf',
+    'Arial.ttf': 'Arial Bold.ttf',
+    'arial.ttf': 'arialbd.ttf',
+    'LiberationSans-Regular.ttf': 'LiberationSans-Bold.ttf',
+    'FreeSans.ttf': 'FreeSansBold.ttf',
+    'calibri.ttf': 'calibrib.ttf',
+}
+
+# Symbols the built-in Helvetica font cannot draw are replaced by their codes
+CURRENCY_TEXT = {
+    '₦': 'NGN ',
+    '$': '$',
+    '€': 'EUR ',
+    '£': 'GBP ',
+    '¥': 'JPY ',
+    '₹': 'INR ',
+    '₽': 'RUB ',
+    '₩': 'KRW ',
+    '₪': 'ILS ',
+    '₨': 'PKR ',
+    '₴': 'UAH ',
+    '₸': 'KZT ',
+    '₺': 'TRY ',
+    '₼': 'AZN ',
+    '₾': 'GEL ',
+    '₿': 'BTC ',
+}
+
+
+def _font_candidates():
+    font_dir = os.path.join(settings.BASE_DIR, 'static', 'fonts')
+    for font_file in UNICODE_FONT_FILES:
+        yield os.path.join(font_dir, font_file)
+    yield from SYSTEM_FONT_PATHS
+
+
+def _register_font(name, path):
+    try:
+        pdfmetrics.registerFont(TTFont(name, path))
+    except Exception:
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def get_pdf_fonts():
+    """
+    ``{'regular': name, 'bold': name}`` for the first usable Unicode font.
+
+    Font files are parsed and registered only on the first call in each
+    process. Without a TrueType font the built-in Helvetica pair is used;
+    a TrueType font without a bold companion uses its regular face for both.
+    """
+    for path in _font_candidates():
+        if not os.path.exists(path):
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        if not _register_font(name, path):
+            continue
+
+        bold = name
+        bold_file = BOLD_FONT_FILES.get(os.path.basename(path))
+        if bold_file:
+            bold_path = os.path.join(os.path.dirname(path), bold_file)
+            if os.path.exists(bold_path) and _register_font(f'{name}-Bold', bold_path):
+                bold = f'{name}-Bold'
+        return {'regular': name, 'bold': bold}
+
+    return {'regular': 'Helvetica', 'bold': 'Helvetica-Bold'}
+
+
+@lru_cache(maxsize=None)
+def get_stylesheet():
+    """ReportLab's sample style sheet, built once per process; treat it as read-only"""
+    return getSampleStyleSheet()
+
+
+@lru_cache(maxsize=None)
+def get_pdf_currency(currency_symbol):
+    """Get the appropriate currency symbol for PDF display"""
+    if not currency_symbol or currency_symbol.strip() == '':
+        return 'NGN '
+
+    currency_symbol = currency_symbol.strip()
+    if currency_symbol in CURRENCY_TEXT:
+        return CURRENCY_TEXT[currency_symbol]
+
+    # Currency codes and unknown symbols get a space for readability
+    return f"{currency_symbol} "
+
+
+def load_pdf_resources():
+    """Register fonts and build the shared style sheet ahead of the first PDF"""
+    get_pdf_fonts()
+    get_stylesheet()
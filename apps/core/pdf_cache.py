@@ -0,0 +1,202 @@
+"""
+On-disk cache of rendered PDF documents.
+
+A PDF is stored under ``PDF_CACHE_ROOT/<kind>/<key>/<fingerprint>.pdf``. The
+fingerprint hashes everything the PDF is rendered from: the document row, its
+items, the user's templates, the company's branding rows and the HTML
+template file. Any change produces a new fingerprint, so stale files are
+never served; the superseded file for the same document is removed when the
+new one is written. The fingerprint doubles as the response ETag, and
+cached files are streamed from disk or handed to the web server through
+``PDF_SENDFILE_HEADER``.
+
+Each document type describes one PDF as a ``PDFSource``: where it is cached,
+its download name, its fingerprint and how to render its HTML. Download
+views and batch exports both work from sources.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from io import BytesIO
+from typing import Callable, NamedTuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.template.loader import get_template
+
+logger = logging.getLogger(__name__)
+
+
+class PDFSource(NamedTuple):
+    """Everything needed to serve, cache or batch-render one document PDF"""
+    kind: str
+    key: object
+    filename: str
+    fingerprint: str
+    render_html: Callable[[], str]
+
+
+def html_to_pdf(html):
+    """
+    PDF bytes for an HTML document, or None when xhtml2pdf reports errors.
+
+    Module-level and free of Django state, so it can run in a process pool.
+    """
+    from xhtml2pdf import pisa
+
+    result = BytesIO()
+    pdf = pisa.pisaDocument(BytesIO(html.encode('UTF-8')), result)
+    return None if pdf.err else result.getvalue()
+
+
+# Large prepared values whose changes another field already records
+# (CompanyProfile.branding_version)
+UNHASHED_FIELDS = {'logo_data_uri', 'signature_data_uri'}
+
+
+def _row(instance):
+    return {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+        if field.attname not in UNHASHED_FIELDS
+    }
+
+
+def _fingerprint_value(part):
+    if isinstance(part, models.Model):
+        return [part._meta.label, _row(part)]
+    if isinstance(part, models.QuerySet):
+        names = [field.attname for field in part.model._meta.concrete_fields if field.attname not in UNHASHED_FIELDS]
+        return [part.model._meta.label, list(part.order_by('pk').values(*names))]
+    return part
+
+
+def _template_version(template_name):
+    """Modification time of a template file, so template edits invalidate cached PDFs"""
+    try:
+        return os.path.getmtime(get_template(template_name).origin.name)
+    except (OSError, TypeError, AttributeError):
+        return None
+
+
+def branding_parts(user):
+    """What every document PDF of ``user`` shows about the company: profile, bank accounts and account details"""
+    from .branding import get_branding
+    from .models import CompanyProfile, BankAccount
+
+    company = CompanyProfile.objects.filter(user=user).first()
+    # Prepare missing branding assets first, so the fingerprint already
+    # carries the branding version the PDF is rendered with
+    get_branding(company)
+    return [
+        [user.get_full_name(), user.email] + [getattr(user, name, None) for name in ('phone', 'location', 'website')],
+        company,
+        BankAccount.objects.filter(company=company) if company else None,
+    ]
+
+
+def pdf_fingerprint(template_name, *parts):
+    """
+    Hash of everything a PDF is rendered from.
+
+    ``parts`` may be model instances (their concrete field values),
+    querysets (every row) or plain JSON-serialisable values.
+    """
+    payload = [template_name, _template_version(template_name)]
+    payload.extend(_fingerprint_value(part) for part in parts)
+    encoded = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _cache_dir(kind, key):
+    return os.path.join(str(settings.PDF_CACHE_ROOT), kind, str(key))
+
+
+def cached_pdf_path(kind, key, fingerprint):
+    """Path of the cached PDF for this fingerprint, or None when it has not been rendered"""
+    path = os.path.join(_cache_dir(kind, key), f'{fingerprint}.pdf')
+    return path if os.path.exists(path) else None
+
+
+def store_pdf(kind, key, fingerprint, content):
+    """Write a rendered PDF atomically and drop the document's superseded versions"""
+    directory = _cache_dir(kind, key)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{fingerprint}.pdf')
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(content)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    for name in os.listdir(directory):
+        if name.endswith('.pdf') and name != os.path.basename(path):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+    return path
+
+
+def pdf_file_response(path, fingerprint, filename):
+    """Serve a cached PDF, through the web server when a sendfile header is configured"""
+    header = getattr(settings, 'PDF_SENDFILE_HEADER', '')
+    if header:
+        response = HttpResponse(content_type='application/pdf')
+        if header.lower() == 'x-accel-redirect':
+            relative = os.path.relpath(path, str(settings.PDF_CACHE_ROOT)).replace(os.sep, '/')
+            response[header] = settings.PDF_SENDFILE_URL.rstrip('/') + '/' + relative
+        else:
+            response[header] = path
+    else:
+        response = FileResponse(open(path, 'rb'), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['ETag'] = f'"{fingerprint}"'
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def serve_cached_pdf(request, kind, key, fingerprint, render, filename):
+    """
+    Respond with the PDF for ``fingerprint``, rendering it only on a cache miss.
+
+    ``render`` is called without arguments and returns the PDF bytes, or
+    None when rendering failed; None is then returned so the caller can
+    answer with its own error. A client that already holds this version
+    gets a 304.
+    """
+    if request.META.get('HTTP_IF_NONE_MATCH', '').strip() == f'"{fingerprint}"':
+        response = HttpResponseNotModified()
+        response['ETag'] = f'"{fingerprint}"'
+        return response
+
+    path = cached_pdf_path(kind, key, fingerprint)
+    if path is None:
+        content = render()
+        if content is None:
+            return None
+        try:
+            path = store_pdf(kind, key, fingerprint, content)
+        except OSError:
+            logger.exception("Could not cache %s PDF %s", kind, key)
+            response = HttpResponse(content, content_type='application/pdf')
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            response['ETag'] = f'"{fingerprint}"'
+            return response
+    return pdf_file_response(path, fingerprint, filename)
+
+
+def serve_pdf_source(request, source):
+    """``serve_cached_pdf`` for a ``PDFSource``"""
+    return serve_cached_pdf(
+        request, source.kind, source.key, source.fingerprint,
+        lambda: html_to_pdf(source.render_html()), source.filename,
+    )
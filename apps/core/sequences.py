@@ -0,0 +1,97 @@
+"""
+Sequential document numbers.
+
+Every (tenant, document type, period) has a ``DocumentSequence`` counter row.
+A number is taken by incrementing that row in place: a single
+``UPDATE ... RETURNING`` on PostgreSQL, an UPDATE followed by a read of the
+same row elsewhere. The row stays locked until the surrounding transaction
+ends, so numbers must be taken inside the transaction that saves the
+document: concurrent writers of the same sequence queue on the row lock.
+The increment commits or rolls back with that transaction, so a number is
+only returned when the transaction that took it rolls back; a document
+deleted later, or a failure after the number's transaction has committed,
+still leaves a gap.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from .models import DocumentSequence
+
+
+def _user_id(user):
+    return getattr(user, 'pk', user)
+
+
+def _increment(user_id, doc_type, period):
+    """The incremented value of an existing sequence, or None when it has no row yet"""
+    if connection.vendor == 'postgresql':
+        table = connection.ops.quote_name(DocumentSequence._meta.db_table)
+        params = [doc_type, period]
+        if user_id is None:
+            user_clause = 'user_id IS NULL'
+        else:
+            user_clause = 'user_id = %s'
+            params.append(user_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET last_value = last_value + 1 "
+                f"WHERE doc_type = %s AND period = %s AND {user_clause} "
+                f"RETURNING last_value",
+                params,
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    sequence = DocumentSequence.objects.filter(user_id=user_id, doc_type=doc_type, period=period)
+    if not sequence.update(last_value=F('last_value') + 1):
+        return None
+    return sequence.values_list('last_value', flat=True).get()
+
+
+def next_number(doc_type, user=None, period='', seed=None):
+    """
+    Take the next number of a sequence.
+
+    ``user`` (a user or its id) is the tenant; leave it out for a sequence
+    shared by all tenants. ``seed`` is only called when the sequence is used
+    for the first time and returns the last number already issued without
+    the counter, so existing documents are continued rather than repeated.
+    """
+    user_id = _user_id(user)
+    with transaction.atomic():
+        value = _increment(user_id, doc_type, period)
+        if value is not None:
+            return value
+
+        first = (seed() if seed else 0) + 1
+        try:
+            with transaction.atomic():
+                DocumentSequence.objects.create(
+                    user_id=user_id, doc_type=doc_type, period=period, last_value=first
+                )
+            return first
+        except IntegrityError:
+            # Another writer created the row first; queue behind it
+            return _increment(user_id, doc_type, period)
+
+
+def peek_number(doc_type, user=None, period='', seed=None):
+    """The number ``next_number`` would issue now, without taking it"""
+    last_value = DocumentSequence.objects.filter(
+        user_id=_user_id(user), doc_type=doc_type, period=period
+    ).values_list('last_value', flat=True).first()
+    if last_value is None:
+        last_value = seed() if seed else 0
+    return last_value + 1
+
+
+def last_issued(numbers, pattern):
+    """
+    The highest sequence value among existing document numbers.
+
+    ``pattern`` is a compiled regex whose first group captures the sequence
+    part of a number; numbers that do not match are ignored. Used to seed
+    sequences for documents numbered before the counter existed.
+    """
+    values = [int(match.group(1)) for match in map(pattern.match, numbers) if match]
+    return max(values, default=0)
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .company_context import bump_company_data_version
+from .models import CompanyProfile, BankAccount
+
+
+def _forget_company_context(company):
+    """Drop the context memoised on the profile's user when this request holds it"""
+    if CompanyProfile.user.is_cached(company):
+        company.user.__dict__.pop('_company_context', None)
+
+
+@receiver(post_save, sender=CompanyProfile)
+@receiver(post_delete, sender=CompanyProfile)
+def invalidate_company_context_on_profile_change(sender, instance, **kwargs):
+    """Move the owner's cached company context to a new version"""
+    bump_company_data_version(instance.user_id)
+    _forget_company_context(instance)
+
+
+@receiver(post_save, sender=BankAccount)
+@receiver(post_delete, sender=BankAccount)
+def invalidate_company_context_on_bank_account_change(sender, instance, **kwargs):
+    """The default bank account is part of the cached company context"""
+    if BankAccount.company.is_cached(instance):
+        bump_company_data_version(instance.company.user_id)
+        _forget_company_context(instance.company)
+        return
+    user_id = CompanyProfile.objects.filter(pk=instance.company_id).values_list('user_id', flat=True).first()
+    # Accounts deleted along with their profile are covered by the profile's own signal
+    if user_id is not None:
+        bump_company_data_version(user_id)
@@ -1,11 +1,16 @@
 from django.test import TestCase, Client
+from django.core.cache import cache
 from apps.accounts.models import User
+from apps.quotations.models import Quotation
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.exceptions import ValidationError
 import json
+import re
 
-from .models import CompanyProfile, BankAccount
+from .company_context import bump_company_data_version, get_company_context, get_company_data_version
+from .models import CompanyProfile, BankAccount, CompanyContextVersion
+from .sequences import last_issued, next_number, peek_number
 from .forms import CompanyProfileForm, BankAccountForm
 from .utils import generate_auto_number, get_currency_info, format_currency
 
@@ -249,7 +254,7 @@ class UtilsTest(TestCase):
         self.assertTrue(auto_number.endswith('-0001'))
         
         quotation_number = generate_auto_number('quotation', self.company_profile)
-        self.assertIn('QUO-', quotation_number)
+        self.assertTrue(quotation_number.startswith('QT-'))
 
 
 class ViewsTest(TestCase):
@@ -374,3 +379,92 @@ class APITest(TestCase):
         # Check if profile was updated
         self.company_profile.refresh_from_db()
         self.assertEqual(self.company_profile.currency_code, 'EUR')
+
+
+class CompanyContextTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='context@example.com', password='testpass123')
+
+    def fresh_context(self):
+        """The context a new request would see"""
+        return get_company_context(User.objects.get(pk=self.user.pk))
+
+    def create_profile(self):
+        return CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Context Co',
+            email='context@example.com',
+            phone='+1234567890',
+            address='1 Context Street'
+        )
+
+    def test_profile_changes_reach_cached_context(self):
+        self.assertIsNone(self.fresh_context()['company_profile'])
+
+        profile = self.create_profile()
+        self.assertEqual(self.fresh_context()['company_profile'].company_name, 'Context Co')
+
+        profile = CompanyProfile.objects.get(pk=profile.pk)
+        profile.company_name = 'Renamed Co'
+        profile.save()
+        self.assertEqual(self.fresh_context()['company_profile'].company_name, 'Renamed Co')
+
+    def test_bank_account_changes_reach_cached_context(self):
+        profile = self.create_profile()
+        self.assertIsNone(self.fresh_context()['default_bank_account'])
+
+        account = BankAccount.objects.create(
+            company=profile, bank_name='Bank', account_name='Context Co', account_number='12345678'
+        )
+        self.assertEqual(self.fresh_context()['default_bank_account'].pk, account.pk)
+
+        account.delete()
+        self.assertIsNone(self.fresh_context()['default_bank_account'])
+
+    def test_version_is_stored_in_the_database(self):
+        version = get_company_data_version(self.user.pk)
+        bump_company_data_version(self.user.pk)
+        self.assertEqual(CompanyContextVersion.objects.get(user=self.user).version, version + 1)
+
+
+class DocumentSequenceTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='numbers@example.com', password='testpass123')
+        self.other = User.objects.create_user(email='others@example.com', password='testpass123')
+
+    def test_numbers_are_sequential_per_tenant_and_period(self):
+        self.assertEqual([next_number('invoice', self.user) for _ in range(3)], [1, 2, 3])
+        self.assertEqual(next_number('invoice', self.other), 1)
+        self.assertEqual(next_number('invoice', self.user, period='2026'), 1)
+        self.assertEqual(next_number('invoice'), 1)
+        self.assertEqual(next_number('invoice', self.user.pk), 4)
+
+    def test_seed_continues_existing_numbers_once(self):
+        seed = lambda: last_issued(['QT-000007', 'QT-000012', 'OTHER-99'], re.compile(r'^QT-?(\d+)$'))
+        self.assertEqual(next_number('quotation:QT', self.user, seed=seed), 13)
+        self.assertEqual(next_number('quotation:QT', self.user, seed=lambda: 100), 14)
+
+    def test_peek_does_not_take_a_number(self):
+        self.assertEqual(peek_number('receipt', self.user, seed=lambda: 41), 42)
+        self.assertEqual(peek_number('receipt', self.user, seed=lambda: 41), 42)
+        self.assertEqual(next_number('receipt', self.user, seed=lambda: 41), 42)
+        self.assertEqual(peek_number('receipt', self.user), 43)
+
+    def test_auto_number_preview_matches_the_saved_document(self):
+        profile = CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Numbers Co',
+            email='numbers@example.com',
+            phone='+1234567890',
+            address='1 Numbers Street'
+        )
+        preview = generate_auto_number('quotation', profile)
+        self.assertEqual(generate_auto_number('quotation', profile), preview)
+
+        quotation = Quotation.objects.create(user=self.user)
+        self.assertEqual(quotation.quotation_number, preview)
+        self.assertNotEqual(generate_auto_number('quotation', profile), preview)
+
+        with self.assertRaises(ValueError):
+            generate_auto_number('memo', profile)
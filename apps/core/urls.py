@@ -12,5 +12,7 @@ urlpatterns = [
     path('bank-accounts/<int:pk>/delete/', views.delete_bank_account, name='delete_bank_account'),
     path('bank-accounts/<int:pk>/set-default/', views.set_default_bank_account, name='set_default_bank_account'),
     path('update-currency/', views.update_currency, name='update_currency'),
+    path('exports/<int:pk>/', views.document_export, name='document_export'),
+    path('exports/<int:pk>/download/', views.document_export_download, name='document_export_download'),
     path('db-test/', views.db_test, name='db_test'),  # Temporary debug endpoint
 ]
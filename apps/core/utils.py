@@ -1,6 +1,4 @@
 import re
-from datetime import datetime
-from django.db import models
 from django.apps import apps
 
 
@@ -54,84 +52,38 @@ def get_available_currencies():
 
 def generate_auto_number(doc_type, company_profile, prefix=None):
     """
-    Generate auto number for documents
+    Preview the next auto number for a document type
     
     Args:
-        doc_type (str): Type of document (invoice, quotation, receipt, etc.)
+        doc_type (str): Type of document (invoice, quotation, receipt or waybill)
         company_profile: CompanyProfile instance
-        prefix (str): Optional prefix for the number
+        prefix (str): Optional template number prefix for quotations and waybills
     
     Returns:
-        str: Generated auto number
-    """
-    current_year = datetime.now().year
-    current_month = datetime.now().month
-    
-    # Default prefixes for different document types
-    default_prefixes = {
-        'invoice': 'INV',
-        'quotation': 'QUO',
-        'receipt': 'REC',
-        'job_order': 'JO',
-        'waybill': 'WB',
-        'expense': 'EXP',
-    }
+        str: The number the document's own sequence will issue next, in the
+        document's own format; the number is not taken
     
-    if not prefix:
-        prefix = default_prefixes.get(doc_type.lower(), 'DOC')
-    
-    # Try to get the model for the document type
-    try:
-        if doc_type.lower() == 'invoice':
-            model = apps.get_model('invoices', 'Invoice')
-            filter_field = 'company'
-        elif doc_type.lower() == 'quotation':
-            model = apps.get_model('quotations', 'Quotation')
-            filter_field = 'company'
-        elif doc_type.lower() == 'receipt':
-            model = apps.get_model('receipts', 'Receipt')
-            filter_field = 'company'
-        elif doc_type.lower() == 'job_order':
-            model = apps.get_model('job_orders', 'JobOrder')
-            filter_field = 'company'
-        elif doc_type.lower() == 'waybill':
-            model = apps.get_model('waybills', 'Waybill')
-            filter_field = 'company'
-        elif doc_type.lower() == 'expense':
-            model = apps.get_model('expenses', 'Expense')
-            filter_field = 'company'
-        else:
-            # Fallback for unknown document types
-            model = None
-    except LookupError:
-        model = None
-    
-    # Generate the auto number
-    if model:
-        # Get the last document number for this company and year
-        last_doc = model.objects.filter(
-            **{filter_field: company_profile},
-            created_at__year=current_year
-        ).order_by('-id').first()
-        
-        if last_doc and hasattr(last_doc, 'number'):
-            # Extract the sequence number from the last document
-            match = re.search(r'(\d+)$', last_doc.number)
-            if match:
-                last_sequence = int(match.group(1))
-                next_sequence = last_sequence + 1
-            else:
-                next_sequence = 1
-        else:
-            next_sequence = 1
-    else:
-        # Fallback: use current timestamp
-        next_sequence = int(datetime.now().timestamp()) % 10000
-    
-    # Format: PREFIX-YYYY-MM-NNNN
-    auto_number = f"{prefix}-{current_year}-{current_month:02d}-{next_sequence:04d}"
-    
-    return auto_number
+    Raises:
+        ValueError: When the document type is not numbered from a sequence
+    """
+    doc_type = doc_type.lower()
+    user_id = company_profile.user_id
+    
+    if doc_type == 'invoice':
+        document = apps.get_model('invoices', 'Invoice')(user_id=user_id)
+        return document.generate_invoice_number(peek=True)
+    if doc_type == 'receipt':
+        return apps.get_model('receipts', 'Receipt')().generate_receipt_no(peek=True)
+    if doc_type == 'quotation':
+        template = apps.get_model('quotations', 'QuotationTemplate')(number_prefix=prefix) if prefix else None
+        document = apps.get_model('quotations', 'Quotation')(user_id=user_id, template=template)
+        return document.generate_quotation_number(peek=True)
+    if doc_type == 'waybill':
+        template = apps.get_model('waybills', 'WaybillTemplate')(number_prefix=prefix or 'WB')
+        document = apps.get_model('waybills', 'Waybill')(user_id=user_id, template=template)
+        return document.generate_waybill_number(peek=True)
+    
+    raise ValueError(f"'{doc_type}' documents are not numbered from a sequence")
 
 
 def format_currency(amount, currency_symbol='$', decimal_places=2, pdf_safe=False):
@@ -236,25 +188,10 @@ def get_company_context(user):
         user: User instance
     
     Returns:
-        dict: Company context data
+        dict: Company context data, cached per request and across workers
     """
-    try:
-        company_profile = user.company_profile
-        return {
-            'company_profile': company_profile,
-            'company_logo': company_profile.logo.url if company_profile.logo else None,
-            'company_signature': company_profile.signature.url if company_profile.signature else None,
-            'currency_symbol': company_profile.currency_symbol,
-            'currency_code': company_profile.currency_code,
-        }
-    except Exception:
-        return {
-            'company_profile': None,
-            'company_logo': None,
-            'company_signature': None,
-            'currency_symbol': '$',
-            'currency_code': 'USD',
-        }
+    from .company_context import get_company_context as get_cached_company_context
+    return get_cached_company_context(user)
 
 
 def calculate_percentage(amount, percentage):
@@ -1,16 +1,18 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.db import connection
 from django.conf import settings
 import json
+import os
 
-from .models import CompanyProfile, BankAccount
+from .models import CompanyProfile, BankAccount, DocumentExport
 from .forms import CompanyProfileForm, BankAccountForm
 from .utils import get_currency_info
+from .currency import change_company_currency
 from apps.rbac.decorators import require_permission, require_role
 
 
@@ -77,12 +79,10 @@ def dashboard(request):
 @login_required
 def company_profile_view(request):
     """Company profile view and edit"""
-    try:
-        company_profile = request.user.company_profile
-        created = False
-    except CompanyProfile.DoesNotExist:
-        company_profile = None
-        created = True
+    # Read the row itself rather than the relation primed from the cached
+    # company context, so the form saves over the current values
+    company_profile = CompanyProfile.objects.filter(user=request.user).first()
+    created = company_profile is None
     
     if request.method == 'POST':
         form = CompanyProfileForm(request.POST, request.FILES, instance=company_profile)
@@ -248,62 +248,29 @@ def update_currency(request):
         except CompanyProfile.DoesNotExist:
             return JsonResponse({'success': False, 'error': 'Company profile not found. Please complete your company profile first.'})
         
-        # Store old currency for comparison
-        old_currency = company_profile.currency_symbol
+        # Update the profile and rewrite stored currency symbols in bulk
+        transactions_updated, migration = change_company_currency(
+            company_profile, currency_code, currency_info['symbol']
+        )
         
-        # Update company profile currency
-        company_profile.currency_code = currency_code
-        company_profile.currency_symbol = currency_info['symbol']
-        company_profile.save()
-        
-        # Update accounting transactions if currency changed
-        transactions_updated = 0
-        job_orders_updated = 0
-        if old_currency != currency_info['symbol']:
-            try:
-                from apps.accounting.models import Transaction
-                # Update all transactions for this company
-                transactions_updated = Transaction.objects.filter(
-                    company=company_profile
-                ).update(currency=currency_info['symbol'])
-            except ImportError:
-                # Accounting app might not be installed
-                pass
-            except Exception as transaction_error:
-                # Log transaction update error but don't fail the currency update
-                print(f"Warning: Failed to update transactions: {transaction_error}")
-                pass
-            
-            # Update job orders if currency changed
-            try:
-                from apps.job_orders.models import Product, Order
-                # Update all products created by users of this company
-                products = Product.objects.filter(created_by__company_profile=company_profile)
-                for product in products:
-                    product.save()  # Trigger save to update currency displays
-                    job_orders_updated += 1
-                
-                # Update all orders for users of this company
-                orders = Order.objects.filter(customer__company_profile=company_profile)
-                for order in orders:
-                    order.save()  # Trigger save to update currency displays
-                    job_orders_updated += 1
-                    
-            except ImportError:
-                # Job orders app might not be installed
-                pass
-            except Exception as job_order_error:
-                # Log job order update error but don't fail the currency update
-                print(f"Warning: Failed to update job orders: {job_order_error}")
-                pass
+        if migration:
+            message = (
+                f'Currency updated to {currency_code} ({currency_info["symbol"]}). '
+                f'Existing transactions are being updated in the background.'
+            )
+        else:
+            message = (
+                f'Currency updated to {currency_code} ({currency_info["symbol"]}). '
+                f'{transactions_updated} transactions updated.'
+            )
         
         return JsonResponse({
             'success': True,
             'currency_code': currency_code,
             'currency_symbol': currency_info['symbol'],
             'transactions_updated': transactions_updated,
-            'job_orders_updated': job_orders_updated,
-            'message': f'Currency updated to {currency_code} ({currency_info["symbol"]}). {transactions_updated} transactions and {job_orders_updated} job orders updated.'
+            'queued': migration is not None,
+            'message': message
         })
         
     except json.JSONDecodeError as e:
@@ -314,3 +281,24 @@ def update_currency(request):
         print(f"Currency update error: {str(e)}")
         print(f"Traceback: {traceback.format_exc()}")
         return JsonResponse({'success': False, 'error': f'Failed to update currency: {str(e)}'})
+
+
+@login_required
+def document_export(request, pk):
+    """Progress and download page of a batch PDF export"""
+    export = get_object_or_404(DocumentExport, pk=pk, user=request.user)
+    context = {
+        'export': export,
+        'document_total': len(export.document_ids),
+        'recent_exports': DocumentExport.objects.filter(user=request.user).exclude(pk=export.pk)[:10],
+    }
+    return render(request, 'core/document_export.html', context)
+
+
+@login_required
+def document_export_download(request, pk):
+    """Download the ZIP of a finished batch PDF export"""
+    export = get_object_or_404(DocumentExport, pk=pk, user=request.user, status='done')
+    if not export.file:
+        raise Http404("Export file not found")
+    return FileResponse(export.file.open('rb'), as_attachment=True, filename=os.path.basename(export.file.name))
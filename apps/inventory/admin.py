@@ -232,16 +232,19 @@ class ImportedInventoryFileAdmin(admin.ModelAdmin):
 
 @admin.register(InventoryExport)
 class InventoryExportAdmin(admin.ModelAdmin):
-    list_display = ['layout', 'format', 'user', 'total_items', 'file_size', 'include_calculations', 'include_branding', 'created_at']
-    list_filter = ['format', 'include_calculations', 'include_branding', 'created_at']
+    list_display = ['layout', 'format', 'user', 'status', 'total_items', 'file_size', 'include_calculations', 'include_branding', 'created_at']
+    list_filter = ['format', 'status', 'include_calculations', 'include_branding', 'created_at']
     search_fields = ['layout__name', 'user__email']
-    readonly_fields = ['created_at', 'file_size']
+    readonly_fields = ['created_at', 'started_at', 'completed_at', 'file_size']
     ordering = ['-created_at']
     
     fieldsets = (
         ('Export Information', {
             'fields': ('user', 'layout', 'format', 'file_path', 'file_size')
         }),
+        ('Processing', {
+            'fields': ('status', 'error', 'started_at', 'completed_at')
+        }),
         ('Configuration', {
             'fields': ('include_calculations', 'include_branding', 'filters', 'export_settings')
         }),
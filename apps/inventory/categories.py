@@ -0,0 +1,110 @@
+"""
+Category auto-assignment for new inventory items.
+
+Suggestions come from a rule table (overridable with the
+``INVENTORY_CATEGORY_RULES`` setting or extended at runtime with
+``register_category_rule``) and are resolved against a cached list of the
+user's category names, so assigning a category costs no queries on a warm
+cache and happens before the item is first inserted.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+DEFAULT_CATEGORY_RULES = [
+    {'match': 'exact', 'pattern': 'Motor Spare parts', 'category': 'Accessories'},
+    {'match': 'exact', 'pattern': 'TV set', 'category': 'Electronics'},
+    {'match': 'exact', 'pattern': 'Smoked Glass', 'category': 'Furniture'},
+    {'match': 'exact', 'pattern': 'TEST ITEM', 'category': 'Office Supplies'},
+    {'match': 'exact', 'pattern': 'Laptop', 'category': 'Electronics'},
+    {'match': 'exact', 'pattern': 'Smartphone', 'category': 'Electronics'},
+    {'match': 'exact', 'pattern': 'T-Shirt', 'category': 'Clothing'},
+    {'match': 'exact', 'pattern': 'Jeans', 'category': 'Clothing'},
+    {'match': 'exact', 'pattern': 'Book', 'category': 'Books'},
+    {'match': 'exact', 'pattern': 'Programming Book', 'category': 'Books'},
+    {'match': 'exact', 'pattern': 'Printer Paper', 'category': 'Office Supplies'},
+    {'match': 'exact', 'pattern': 'Office Chair', 'category': 'Furniture'},
+]
+
+DEFAULT_CATEGORY = getattr(settings, 'INVENTORY_DEFAULT_CATEGORY', 'Office Supplies')
+
+CATEGORY_CACHE_TIMEOUT = 3600
+
+_category_rules = list(getattr(settings, 'INVENTORY_CATEGORY_RULES', DEFAULT_CATEGORY_RULES))
+
+
+def register_category_rule(pattern, category, match='exact'):
+    """Add a rule; ``match`` is 'exact', 'iexact' or 'contains' (case-insensitive)"""
+    _category_rules.append({'match': match, 'pattern': pattern, 'category': category})
+
+
+def _rule_matches(rule, product_name):
+    pattern = rule['pattern']
+    match = rule.get('match', 'exact')
+    if match == 'exact':
+        return product_name == pattern
+    if match == 'iexact':
+        return product_name.lower() == pattern.lower()
+    if match == 'contains':
+        return pattern.lower() in product_name.lower()
+    return False
+
+
+def suggest_category(product_name, category_names):
+    """
+    Pick a category name for a product from the user's ``category_names``.
+
+    The first matching rule wins, then the default category, then the first
+    of the user's categories. Returns None when the user has no categories.
+    """
+    if not category_names:
+        return None
+
+    suggested = DEFAULT_CATEGORY
+    for rule in _category_rules:
+        if _rule_matches(rule, product_name or ''):
+            suggested = rule['category']
+            break
+
+    if suggested in category_names:
+        return suggested
+    return category_names[0]
+
+
+def _cache_key(user_id):
+    return f'inventory_category_names_{user_id}'
+
+
+def get_user_category_names(user_id):
+    """The user's category names in model order, cached until a category changes"""
+    from .models import InventoryCategory
+
+    names = cache.get(_cache_key(user_id))
+    if names is None:
+        names = list(InventoryCategory.objects.filter(user_id=user_id).values_list('name', flat=True))
+        cache.set(_cache_key(user_id), names, CATEGORY_CACHE_TIMEOUT)
+    return names
+
+
+def clear_user_category_names(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def assign_category(item, category_names=None):
+    """Set ``item.data['category']`` in memory if the item has none"""
+    if item.data.get('category'):
+        return
+    if category_names is None:
+        category_names = get_user_category_names(item.user_id)
+    category = suggest_category(item.product_name, category_names)
+    if category:
+        item.data['category'] = category
+
+
+def assign_categories(items):
+    """Assign categories to many unsaved items, loading each user's categories once"""
+    names_by_user = {}
+    for item in items:
+        if item.user_id not in names_by_user:
+            names_by_user[item.user_id] = get_user_category_names(item.user_id)
+        assign_category(item, names_by_user[item.user_id])
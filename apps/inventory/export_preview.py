@@ -0,0 +1,105 @@
+"""
+Export dialog preview: a handful of sample rows plus SQL-side summary figures.
+
+Results are cached per (layout, filters, inventory data version) so reopening
+the dialog with the same choices does not touch the item table at all.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Case, Count, F, FloatField, Q, Sum, When
+from django.db.models.fields.json import KT
+from django.db.models.functions import Cast
+
+from .utils import get_inventory_data_version
+
+
+PREVIEW_ROWS = 10
+PREVIEW_CACHE_TIMEOUT = 600
+
+# Only JSON values that look like plain numbers are cast in SQL
+NUMERIC_PATTERN = r'^-?[0-9]+(\.[0-9]+)?$'
+
+
+def _numeric_key(path):
+    """Cast a JSON key to float, yielding NULL for non-numeric values"""
+    lookup = {f'{path}__regex': NUMERIC_PATTERN}
+    return Case(
+        When(Q(**lookup), then=Cast(KT(path), FloatField())),
+        default=None,
+        output_field=FloatField(),
+    )
+
+
+def get_preview_summary(items):
+    """Item count, grand total, category count and low stock count in one query"""
+    summary = items.annotate(
+        _quantity=_numeric_key('data__quantity_in_stock'),
+        _threshold=_numeric_key('data__minimum_threshold'),
+    ).aggregate(
+        total_items=Count('pk'),
+        total_value=Sum(_numeric_key('calculated_data__total')),
+        categories=Count(KT('data__category__name'), distinct=True),
+        low_stock_count=Count('pk', filter=Q(_quantity__lt=F('_threshold'))),
+    )
+    return {
+        'total_items': summary['total_items'],
+        'total_value': float(summary['total_value'] or 0),
+        'categories': summary['categories'],
+        'low_stock_count': summary['low_stock_count'],
+    }
+
+
+def get_preview_rows(items, limit=PREVIEW_ROWS):
+    """Serialize the first ``limit`` items for the preview table"""
+    preview_data = []
+    for item in items.select_related('status')[:limit]:
+        category_data = item.data.get('category', {})
+        category_name = category_data.get('name', 'Uncategorized') if isinstance(category_data, dict) else 'Uncategorized'
+
+        quantity = item.data.get('quantity_in_stock', 0)
+        minimum_threshold = item.data.get('minimum_threshold', 0)
+        try:
+            is_low_stock = quantity < minimum_threshold
+        except TypeError:
+            is_low_stock = False
+
+        preview_data.append({
+            'id': item.pk,
+            'product_name': item.product_name,
+            'sku_code': item.sku_code,
+            'category': category_name,
+            'quantity': quantity,
+            'unit_price': item.data.get('unit_price', 0),
+            'total_value': item.total_value,
+            'status': item.status.display_name if item.status else 'Active',
+            'is_low_stock': is_low_stock,
+        })
+    return preview_data
+
+
+def get_export_preview(items, layout, filters, limit=PREVIEW_ROWS):
+    """
+    Build (or fetch from cache) the preview payload for the export dialog.
+
+    ``items`` must already have ``filters`` applied; the filters are only
+    used to key the cache.
+    """
+    filters_hash = hashlib.md5(
+        json.dumps(filters, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+    version = get_inventory_data_version(layout.user_id)
+    cache_key = (
+        f'inventory_export_preview_{layout.user_id}_{layout.pk}_'
+        f'{layout.updated_at.timestamp()}_{version}_{limit}_{filters_hash}'
+    )
+
+    preview = cache.get(cache_key)
+    if preview is None:
+        preview = {
+            'preview_data': get_preview_rows(items, limit),
+            'summary': get_preview_summary(items),
+        }
+        cache.set(cache_key, preview, PREVIEW_CACHE_TIMEOUT)
+    return preview
@@ -0,0 +1,152 @@
+"""
+Background inventory PDF exports.
+
+The export form stores its filters on an ``InventoryExport`` and the
+inventory export worker renders the PDF with ``export_inventory_pdf``, so a
+large catalogue never ties up a web request. The finished file is kept in
+default storage and downloaded from the export's status page.
+"""
+import logging
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction as db_transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import InventoryExport, InventoryItem
+from .pdf_export import export_inventory_pdf
+
+logger = logging.getLogger(__name__)
+
+
+EXPORT_BATCH_SIZE = 5
+# A running export older than this was abandoned by a worker that stopped
+STALE_EXPORT_TIMEOUT = timedelta(hours=1)
+
+
+def filter_export_items(items, filters):
+    """Apply the export form's serialized ``filters`` to an item queryset"""
+    if filters.get('item_ids'):
+        items = items.filter(pk__in=filters['item_ids'])
+
+    # Items store their category's name
+    if filters.get('category'):
+        items = items.filter(data__category=filters['category'])
+
+    if filters.get('status_filter'):
+        items = items.filter(status__pk=filters['status_filter'])
+
+    if filters.get('search'):
+        search = filters['search']
+        items = items.filter(
+            Q(product_name__icontains=search) |
+            Q(sku_code__icontains=search) |
+            Q(data__description__icontains=search)
+        )
+
+    if filters.get('min_quantity'):
+        items = items.filter(data__quantity_in_stock__gte=filters['min_quantity'])
+
+    if filters.get('max_quantity'):
+        items = items.filter(data__quantity_in_stock__lte=filters['max_quantity'])
+
+    if filters.get('min_price'):
+        items = items.filter(data__unit_price__gte=filters['min_price'])
+
+    if filters.get('max_price'):
+        items = items.filter(data__unit_price__lte=filters['max_price'])
+
+    if filters.get('date_from'):
+        items = items.filter(created_at__gte=filters['date_from'])
+
+    if filters.get('date_to'):
+        items = items.filter(created_at__lte=filters['date_to'])
+
+    # Handle low stock filter
+    if not filters.get('include_low_stock', True):
+        items = items.exclude(
+            data__quantity_in_stock__lt=F('data__minimum_threshold')
+        )
+    return items
+
+
+def queue_pdf_export(user, layout, filters, include_calculations=True, include_branding=True):
+    """Queue a PDF export of ``layout``'s items matching ``filters``"""
+    return InventoryExport.objects.create(
+        user=user,
+        layout=layout,
+        format='pdf',
+        status='pending',
+        filters=filters,
+        include_calculations=include_calculations,
+        include_branding=include_branding,
+    )
+
+
+def build_pdf_export(export):
+    """Render the export's PDF into default storage and record it on ``export``"""
+    items = filter_export_items(
+        InventoryItem.objects.filter(user=export.user, layout=export.layout), export.filters
+    )
+    output = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+    output.close()
+    try:
+        export.total_items = export_inventory_pdf(
+            items, export.layout, output.name, export.include_calculations, export.include_branding
+        )
+        stamp = timezone.localtime().strftime('%Y%m%d_%H%M%S')
+        name = f"exports/inventory/inventory_export_{export.layout.name.replace(' ', '_')}_{stamp}.pdf"
+        with open(output.name, 'rb') as handle:
+            export.file_path = default_storage.save(name, File(handle))
+        export.file_size = os.path.getsize(output.name)
+    finally:
+        os.remove(output.name)
+
+
+def reclaim_stale_exports(timeout=STALE_EXPORT_TIMEOUT):
+    """Put exports abandoned in ``running`` back in the queue; returns how many"""
+    return InventoryExport.objects.filter(
+        status='running', started_at__lt=timezone.now() - timeout
+    ).update(status='pending', started_at=None)
+
+
+def process_pdf_exports(batch_size=EXPORT_BATCH_SIZE):
+    """
+    Build up to ``batch_size`` pending PDF exports.
+
+    Exports are claimed with SKIP LOCKED where the database supports it, so
+    several workers can run side by side. Returns the number processed.
+    """
+    reclaim_stale_exports()
+    processed = 0
+    while processed < batch_size:
+        with db_transaction.atomic():
+            export = (
+                InventoryExport.objects.select_for_update(skip_locked=True)
+                .filter(status='pending', format='pdf')
+                .order_by('id')
+                .first()
+            )
+            if export is None:
+                break
+            export.status = 'running'
+            export.started_at = timezone.now()
+            export.save(update_fields=['status', 'started_at'])
+
+        try:
+            build_pdf_export(export)
+            export.status = 'done'
+        except Exception as e:
+            logger.exception("Inventory export %s failed", export.pk)
+            export.status = 'failed'
+            export.error = str(e)
+        export.completed_at = timezone.now()
+        export.save(update_fields=[
+            'status', 'file_path', 'file_size', 'total_items', 'error', 'completed_at'
+        ])
+        processed += 1
+    return processed
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.inventory.exports import EXPORT_BATCH_SIZE, process_pdf_exports
+
+
+class Command(BaseCommand):
+    help = 'Render queued inventory PDF exports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EXPORT_BATCH_SIZE,
+            help='Number of exports to build per batch',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running as a worker, polling for new exports',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when nothing is queued (with --loop)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            processed = process_pdf_exports(batch_size)
+            total += processed
+            if processed:
+                self.stdout.write(f'Processed {processed} inventory exports')
+            elif not options['loop']:
+                break
+            else:
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} inventory exports'))
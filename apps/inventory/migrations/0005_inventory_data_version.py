@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_bio_user_birth_date_user_location_and_more'),
+        ('inventory', '0004_export_worker_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryDataVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory_data_version', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+    ]
@@ -572,6 +572,16 @@ class InventoryItem(models.Model):
         if not self.layout.supports_calculations():
             return {}
         
+        calculated = self.compute_totals()
+        self.calculated_data = calculated
+        self.save()
+        return calculated
+    
+    def compute_totals(self) -> Dict[str, Any]:
+        """Compute calculated values in memory without saving the item"""
+        if not self.layout.supports_calculations():
+            return {}
+        
         calculated = {}
         
         # Extract numeric values from data
@@ -593,8 +603,6 @@ class InventoryItem(models.Model):
                 if result is not None:
                     calculated[rule['output_field']] = result
         
-        self.calculated_data = calculated
-        self.save()
         return calculated
     
     def _extract_number(self, value) -> Optional[float]:
@@ -807,6 +815,23 @@ class ImportedInventoryFile(models.Model):
         return f"Import {self.file_name} - {self.status}"
 
 
+class InventoryDataVersion(models.Model):
+    """
+    Version of a user's inventory data.
+    
+    Bumped whenever one of the user's items is saved or deleted, and kept in
+    the database so every process moves to the new version together. Cached
+    derived data such as export previews is keyed by it.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='inventory_data_version'
+    )
+    version = models.PositiveBigIntegerField(default=1)
+    
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
+
+
 class InventoryExport(models.Model):
     """Track exported inventory data"""
     EXPORT_FORMATS = [
@@ -815,6 +840,12 @@ class InventoryExport(models.Model):
         ('pdf', 'PDF'),
         ('json', 'JSON'),
     ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='inventory_exports')
     layout = models.ForeignKey(InventoryLayout, on_delete=models.CASCADE, related_name='exports')
@@ -830,10 +861,20 @@ class InventoryExport(models.Model):
     export_settings = JSONField(default=dict, help_text="Export-specific settings")
     
     total_items = models.PositiveIntegerField(default=0)
+    
+    # Files rendered by the export worker
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='done')
+    error = models.TextField(blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
         verbose_name = 'Inventory Export'
         verbose_name_plural = 'Inventory Exports'
     
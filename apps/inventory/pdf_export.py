@@ -0,0 +1,393 @@
+"""
+Chunked, multi-process PDF export for inventory layouts.
+
+Rows are flattened to plain strings in the parent process (the only place
+that touches the database), split into fixed-size chunks, rendered to
+individual PDF files by a process pool and concatenated into a single file
+on disk. Memory is bounded by the number of chunks in flight rather than by
+the size of the catalogue.
+"""
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.utils import timezone
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+
+from apps.core.branding import get_branding as get_company_branding
+from apps.core.pdf import get_pdf_currency, get_stylesheet
+
+
+# Rows rendered per worker task (roughly 20 A4 pages)
+PDF_CHUNK_ROWS = getattr(settings, 'INVENTORY_PDF_CHUNK_ROWS', 500)
+
+# Worker processes; defaults to every available core
+PDF_WORKERS = getattr(settings, 'INVENTORY_PDF_WORKERS', None) or os.cpu_count() or 1
+
+# Columns rendered as wrapping paragraphs rather than plain strings
+PARAGRAPH_FIELDS = {'product_name', 'sku_code', 'status'}
+
+COLUMN_WIDTHS = {
+    'serial_number': 0.35 * inch,
+    'product_name': 1.8 * inch,
+    'sku_code': 1.2 * inch,
+    'status': 0.8 * inch,
+    'quantity': 0.8 * inch,
+    'unit_price': 1.0 * inch,
+    'total': 1.4 * inch,
+}
+DEFAULT_COLUMN_WIDTH = 0.9 * inch
+
+@lru_cache(maxsize=None)
+def get_pdf_styles():
+    """Paragraph styles shared by every chunk rendered in this process"""
+    styles = get_stylesheet()
+    return {
+        'cell': ParagraphStyle(
+            'CellStyle',
+            fontName='Helvetica',
+            fontSize=8,
+            leading=9,
+            spaceBefore=0,
+            spaceAfter=0,
+            alignment=TA_LEFT,
+            wordWrap='LTR',
+            splitLongWords=True,
+            spaceShrinkage=0.1,
+        ),
+        'company_name': ParagraphStyle('CompanyName', fontSize=16, alignment=TA_CENTER, spaceAfter=10),
+        'company_name_large': ParagraphStyle('CompanyNameLarge', fontSize=18, alignment=TA_CENTER, spaceAfter=10),
+        'company_details': ParagraphStyle('CompanyDetails', fontSize=10, alignment=TA_CENTER, spaceAfter=20),
+        'export_info': ParagraphStyle('ExportInfo', parent=styles['Normal'], fontSize=12, spaceAfter=20, alignment=TA_CENTER),
+        'summary': ParagraphStyle('Summary', parent=styles['Normal'], fontSize=10, alignment=TA_LEFT),
+    }
+
+
+def _init_worker():
+    """Warm the per-process style cache when a pool worker starts"""
+    get_pdf_styles()
+
+
+def get_export_columns(layout, include_calculations=True):
+    """Visible layout columns that are rendered in the export"""
+    columns = []
+    for column in layout.get_visible_columns():
+        if column.get('name') == 'actions':
+            continue
+        if not include_calculations and column.get('name') == 'total':
+            continue
+        columns.append(column)
+    return columns
+
+
+def build_export_rows(items, layout, columns, currency):
+    """
+    Yield one list of plain strings per item.
+
+    Totals are computed in memory from the item data so the export never
+    writes back to the database.
+    """
+    items = items.select_related('status').iterator(chunk_size=PDF_CHUNK_ROWS)
+    for index, item in enumerate(items, 1):
+        # Every item in the export shares the layout; avoid a lookup per row
+        item.layout = layout
+        total_value = item.compute_totals().get('total', 0) or 0
+        row = []
+        for column in columns:
+            field_name = column.get('name')
+            if field_name == 'serial_number':
+                value = str(index)
+            elif field_name == 'status':
+                value = item.status.display_name if item.status else 'Unknown'
+            elif field_name == 'total':
+                value = f"{currency}{total_value:,.2f}"
+            elif field_name == 'unit_price':
+                value = f"{currency}{item.unit_price:,.2f}"
+            else:
+                field_value = item.get_value(field_name)
+                value = '' if field_value is None else str(field_value)
+            row.append(value)
+        yield row, total_value
+
+
+def get_branding(layout):
+    """Plain, picklable company branding for the first chunk"""
+    try:
+        company_profile = layout.user.company_profile
+    except Exception:
+        return None
+
+    logo_path = get_company_branding(company_profile)['logo_path']
+
+    details = []
+    if company_profile.address:
+        details.append(company_profile.address)
+    if company_profile.phone:
+        details.append(f"Phone: {company_profile.phone}")
+    if company_profile.email:
+        details.append(f"Email: {company_profile.email}")
+    if company_profile.website:
+        details.append(f"Website: {company_profile.website}")
+
+    return {
+        'company_name': company_profile.company_name,
+        'logo_path': logo_path,
+        'details': details,
+        'currency_symbol': company_profile.currency_symbol,
+    }
+
+
+def _header_story(branding, generated_at):
+    styles = get_pdf_styles()
+    story = []
+
+    if branding:
+        name = f"<b>{escape(branding['company_name'])}</b>"
+        if branding['logo_path']:
+            header_data = [[
+                Image(branding['logo_path'], width=1.5 * inch, height=1 * inch),
+                Paragraph(name, styles['company_name']),
+            ]]
+        else:
+            header_data = [['', Paragraph(name, styles['company_name_large'])]]
+
+        if branding['details']:
+            details_text = "<br/>".join(escape(detail) for detail in branding['details'])
+            header_data.append(['', Paragraph(details_text, styles['company_details'])])
+
+        header_table = Table(header_data, colWidths=[2 * inch, 4 * inch])
+        header_table.setStyle(TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+            ('TOPPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+        ]))
+        story.append(header_table)
+        story.append(Spacer(1, 20))
+
+    story.append(Paragraph(
+        f"<b>Inventory Export Report</b><br/>Generated on {generated_at}",
+        styles['export_info']
+    ))
+    story.append(Spacer(1, 20))
+    return story
+
+
+def _table_style(has_total_row):
+    style = [
+        # Header styling
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+        ('TOPPADDING', (0, 0), (-1, 0), 6),
+        ('LEFTPADDING', (0, 0), (0, 0), 2),
+        ('RIGHTPADDING', (0, 0), (0, 0), 2),
+        ('LEFTPADDING', (-2, 0), (-2, 0), 3),
+        ('RIGHTPADDING', (-2, 0), (-2, 0), 3),
+
+        # Data rows
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 1), (-1, -1), 'TOP'),
+        ('TOPPADDING', (0, 1), (-1, -1), 2),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 2),
+        ('LEFTPADDING', (0, 1), (-1, -1), 3),
+        ('RIGHTPADDING', (0, 1), (-1, -1), 3),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F8F9FA')]),
+        ('LEFTPADDING', (0, 1), (0, -1), 2),
+        ('RIGHTPADDING', (0, 1), (0, -1), 2),
+
+        # Grid styling
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('LINEBELOW', (0, 0), (-1, 0), 1, colors.black),
+    ]
+
+    if has_total_row:
+        style.extend([
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#E9ECEF')),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, -1), (-1, -1), 9),
+            ('VALIGN', (0, -1), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, -1), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, -1), (-1, -1), 6),
+            ('LEFTPADDING', (0, -1), (-1, -1), 2),
+            ('RIGHTPADDING', (0, -1), (-1, -1), 2),
+            ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
+        ])
+    return style
+
+
+def render_chunk(task):
+    """
+    Render one chunk of rows to a PDF file and return its path.
+
+    Runs inside pool workers, so it only receives plain data and never
+    touches the ORM.
+    """
+    styles = get_pdf_styles()
+    cell_style = styles['cell']
+    field_names = task['field_names']
+
+    story = []
+    if task.get('header'):
+        story.extend(_header_story(task['branding'], task['generated_at']))
+
+    table_data = [task['headers']]
+    for row in task['rows']:
+        table_data.append([
+            Paragraph(escape(value), cell_style) if field_name in PARAGRAPH_FIELDS else value
+            for field_name, value in zip(field_names, row)
+        ])
+
+    total_row = task.get('total_row')
+    if total_row:
+        table_data.append(total_row)
+
+    if len(table_data) > 1:
+        table = Table(table_data, colWidths=task['column_widths'], repeatRows=1)
+        table.setStyle(TableStyle(_table_style(bool(total_row))))
+        story.append(table)
+
+    if task.get('summary'):
+        story.append(Spacer(1, 20))
+        story.append(Paragraph(task['summary'], styles['summary']))
+
+    doc = SimpleDocTemplate(
+        task['path'], pagesize=A4,
+        rightMargin=15, leftMargin=15, topMargin=15, bottomMargin=15
+    )
+    doc.build(story)
+    return task['path']
+
+
+def _concatenate(paths, output_path):
+    """Append chunk PDFs to the output file in order"""
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+    with open(output_path, 'wb') as output:
+        writer.write(output)
+    writer.close()
+
+
+def export_inventory_pdf(items, layout, output_path, include_calculations=True, include_branding=True,
+                         chunk_rows=None, workers=None):
+    """
+    Render an inventory export PDF to ``output_path``.
+
+    Exports that fit in a single chunk are rendered in-process; larger ones
+    are fanned out to a process pool. Returns the number of rows written.
+    """
+    chunk_rows = chunk_rows or PDF_CHUNK_ROWS
+    workers = workers or PDF_WORKERS
+
+    branding = get_branding(layout) if include_branding else None
+    currency = get_pdf_currency(branding['currency_symbol'] if branding else '₦')
+    generated_at = timezone.now().strftime('%B %d, %Y at %H:%M')
+
+    columns = get_export_columns(layout, include_calculations)
+    field_names = [column.get('name') for column in columns]
+    base_task = {
+        'headers': [column.get('display_name', column.get('name')) for column in columns],
+        'field_names': field_names,
+        'column_widths': [COLUMN_WIDTHS.get(name, DEFAULT_COLUMN_WIDTH) for name in field_names],
+        'branding': branding,
+        'generated_at': generated_at,
+    }
+
+    work_dir = tempfile.mkdtemp(prefix='inventory_pdf_')
+    chunk_paths = []
+
+    def make_task(rows, first):
+        path = os.path.join(work_dir, f'chunk_{len(chunk_paths):05d}.pdf')
+        chunk_paths.append(path)
+        return dict(base_task, rows=rows, path=path, header=first)
+
+    def finish_task(task, row_count, total_value):
+        """Attach the grand total row and summary to the final chunk"""
+        show_totals = include_calculations and layout.supports_calculations()
+        if show_totals:
+            task['total_row'] = [
+                f"{currency}{total_value:,.2f}" if name == 'total'
+                else "Grand Total" if name == 'serial_number' else ""
+                for name in field_names
+            ]
+        summary = (
+            "<b>Summary:</b><br/>"
+            f"• Total Items: {row_count}<br/>"
+            f"• Report Generated: {generated_at}<br/>"
+        )
+        if show_totals:
+            summary += f"• Total Inventory Value: {currency}{total_value:,.2f}<br/>"
+        task['summary'] = summary
+        return task
+
+    row_count = 0
+    total_value = 0
+    pending_rows = []
+    # One chunk is held back so the grand total can be attached to it
+    held_task = None
+    executor = None
+    in_flight = deque()
+
+    try:
+        for row, row_total in build_export_rows(items, layout, columns, currency):
+            row_count += 1
+            total_value += row_total
+            pending_rows.append(row)
+            if len(pending_rows) < chunk_rows:
+                continue
+
+            if held_task is not None:
+                if executor is None:
+                    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+                in_flight.append(executor.submit(render_chunk, held_task))
+                # Bound memory by waiting on the oldest chunk once the pool is saturated
+                while len(in_flight) > workers * 2:
+                    in_flight.popleft().result()
+            held_task = make_task(pending_rows, first=not chunk_paths)
+            pending_rows = []
+
+        if pending_rows or held_task is None:
+            if held_task is not None:
+                if executor is None:
+                    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+                in_flight.append(executor.submit(render_chunk, held_task))
+            held_task = make_task(pending_rows, first=not chunk_paths)
+
+        render_chunk(finish_task(held_task, row_count, total_value))
+        while in_flight:
+            in_flight.popleft().result()
+
+        if len(chunk_paths) == 1:
+            shutil.move(chunk_paths[0], output_path)
+        else:
+            _concatenate(chunk_paths, output_path)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        for path in chunk_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        os.rmdir(work_dir)
+
+    return row_count
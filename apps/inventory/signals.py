@@ -1,51 +1,26 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.core.cache import cache
 from .models import InventoryItem, InventoryCategory
+from .categories import assign_category, clear_user_category_names
+from .utils import bump_inventory_data_version
 
-@receiver(post_save, sender=InventoryItem)
-def auto_assign_category(sender, instance, created, **kwargs):
+@receiver(pre_save, sender=InventoryItem)
+def auto_assign_category(sender, instance, raw=False, **kwargs):
+    """
+    Automatically assign a category to inventory items before they are first inserted
+    """
+    if raw or not instance._state.adding or not instance.user_id:
+        return
+    assign_category(instance)
+
+@receiver(post_save, sender=InventoryCategory)
+@receiver(post_delete, sender=InventoryCategory)
+def clear_category_cache(sender, instance, **kwargs):
     """
-    Automatically assign a category to inventory items when they are created
+    Drop the cached category names used for auto-assignment
     """
-    if created and instance.user:
-        # Check if item already has a category
-        if 'category' not in instance.data or not instance.data['category']:
-            # Get user's categories
-            user_categories = InventoryCategory.objects.filter(user=instance.user)
-            
-            if user_categories.exists():
-                # Create a mapping of common product names to categories
-                item_category_mapping = {
-                    'Motor Spare parts': 'Accessories',
-                    'TV set': 'Electronics', 
-                    'Smoked Glass': 'Furniture',
-                    'TEST ITEM': 'Office Supplies',
-                    'Laptop': 'Electronics',
-                    'Smartphone': 'Electronics',
-                    'T-Shirt': 'Clothing',
-                    'Jeans': 'Clothing',
-                    'Book': 'Books',
-                    'Programming Book': 'Books',
-                    'Printer Paper': 'Office Supplies',
-                    'Office Chair': 'Furniture'
-                }
-                
-                # Find a suitable category for this item
-                suggested_category = item_category_mapping.get(instance.product_name, 'Office Supplies')
-                
-                # Check if the suggested category exists
-                category_exists = user_categories.filter(name=suggested_category).exists()
-                if category_exists:
-                    # Update the item's data with the category
-                    instance.data['category'] = suggested_category
-                    instance.save(update_fields=['data'])
-                else:
-                    # Use the first available category
-                    first_category = user_categories.first()
-                    if first_category:
-                        instance.data['category'] = first_category.name
-                        instance.save(update_fields=['data'])
+    clear_user_category_names(instance.user_id)
 
 @receiver(post_save, sender=InventoryItem)
 def clear_inventory_cache(sender, instance, **kwargs):
@@ -67,6 +42,7 @@ def clear_inventory_cache(sender, instance, **kwargs):
         
         for key in cache_keys_to_clear:
             cache.delete(key)
+        bump_inventory_data_version(instance.user_id)
         
         print(f"🧹 Cleared cache for inventory item {instance.id}: {instance.product_name}")
         
@@ -90,6 +66,7 @@ def clear_cache_on_delete(sender, instance, **kwargs):
         
         for key in cache_keys_to_clear:
             cache.delete(key)
+        bump_inventory_data_version(instance.user_id)
         
         print(f"🧹 Cleared cache for deleted inventory item {instance.id}")
         
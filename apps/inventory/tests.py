@@ -0,0 +1,123 @@
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.accounts.models import User
+
+from .export_preview import get_export_preview
+from .exports import filter_export_items
+from .models import (
+    ImportedInventoryFile, InventoryCategory, InventoryDataVersion, InventoryExport, InventoryItem,
+    InventoryLayout, InventoryStatus,
+)
+
+
+class InventoryImportTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser(email='stock@example.com', password='testpass123')
+        self.layout = InventoryLayout.objects.create(user=self.user, name='Stock')
+        self.client.force_login(self.user)
+
+    def import_csv(self, content):
+        response = self.client.post(reverse('inventory:import'), {
+            'file': SimpleUploadedFile('stock.csv', content.encode(), content_type='text/csv'),
+            'file_name': 'stock.csv',
+            'file_type': 'csv',
+            'layout': self.layout.pk,
+        })
+        self.assertEqual(response.status_code, 302)
+        return ImportedInventoryFile.objects.latest('id')
+
+    def test_import_updates_item_with_numeric_sku(self):
+        InventoryItem.objects.create(
+            user=self.user,
+            layout=self.layout,
+            product_name='Old name',
+            sku_code='1001',
+            status=InventoryStatus.objects.create(name='in_stock', display_name='In Stock'),
+        )
+
+        record = self.import_csv('product_name,sku_code,quantity\nNew name,1001,7\n')
+
+        self.assertEqual(record.imported_rows, 1)
+        self.assertEqual(record.failed_rows, 0, record.error_log)
+        item = InventoryItem.objects.get(user=self.user, sku_code='1001')
+        self.assertEqual(item.product_name, 'New name')
+        self.assertEqual(item.data['quantity'], 7)
+
+    def test_import_creates_items_with_categories(self):
+        InventoryCategory.objects.create(user=self.user, name='Electronics')
+        InventoryCategory.objects.create(user=self.user, name='Office Supplies')
+
+        record = self.import_csv(
+            'product_name,sku_code,quantity\n'
+            'Laptop,L-1,2\n'
+            'Stapler,S-1,5\n'
+            'Laptop,L-1,3\n'
+        )
+
+        self.assertEqual(record.imported_rows, 2)
+        laptop = InventoryItem.objects.get(user=self.user, sku_code='L-1')
+        self.assertEqual(laptop.data['category'], 'Electronics')
+        self.assertEqual(laptop.data['quantity'], 3)
+        stapler = InventoryItem.objects.get(user=self.user, sku_code='S-1')
+        self.assertEqual(stapler.data['category'], 'Office Supplies')
+
+
+class InventoryExportFilterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser(email='export@example.com', password='testpass123')
+        self.layout = InventoryLayout.objects.create(user=self.user, name='Stock')
+        self.category = InventoryCategory.objects.create(user=self.user, name='Electronics')
+        InventoryCategory.objects.create(user=self.user, name='Furniture')
+        status = InventoryStatus.objects.create(name='in_stock', display_name='In Stock')
+        for name, sku, category in (('Laptop', 'L-1', 'Electronics'), ('Desk', 'D-1', 'Furniture')):
+            InventoryItem.objects.create(
+                user=self.user, layout=self.layout, product_name=name, sku_code=sku,
+                status=status, data={'category': category},
+            )
+        self.client.force_login(self.user)
+
+    def test_queued_pdf_export_filters_by_category(self):
+        response = self.client.post(reverse('inventory:export'), {
+            'format': 'pdf',
+            'layout': self.layout.pk,
+            'category_filter': self.category.pk,
+            'include_low_stock': 'on',
+        })
+
+        export = InventoryExport.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('inventory:export_status', args=[export.pk]))
+        items = filter_export_items(InventoryItem.objects.filter(user=self.user, layout=self.layout), export.filters)
+        self.assertEqual([item.sku_code for item in items], ['L-1'])
+
+
+class ExportPreviewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='preview@example.com', password='testpass123')
+        self.layout = InventoryLayout.objects.create(user=self.user, name='Stock')
+        self.item = InventoryItem.objects.create(
+            user=self.user,
+            layout=self.layout,
+            product_name='Laptop',
+            sku_code='L-1',
+            status=InventoryStatus.objects.create(name='in_stock', display_name='In Stock'),
+        )
+
+    def preview(self):
+        items = InventoryItem.objects.filter(user=self.user, layout=self.layout)
+        return get_export_preview(items, self.layout, {})
+
+    def test_preview_follows_item_changes(self):
+        self.assertEqual(self.preview()['preview_data'][0]['product_name'], 'Laptop')
+        version = InventoryDataVersion.objects.get(user=self.user).version
+
+        self.item.product_name = 'Notebook'
+        self.item.save()
+
+        self.assertGreater(InventoryDataVersion.objects.get(user=self.user).version, version)
+        self.assertEqual(self.preview()['preview_data'][0]['product_name'], 'Notebook')
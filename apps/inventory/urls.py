@@ -51,6 +51,8 @@ urlpatterns = [
     # Import/Export
     path('import/', views.inventory_import, name='import'),
     path('export/', views.inventory_export, name='export'),
+    path('export/<int:pk>/', views.inventory_export_status, name='export_status'),
+    path('export/<int:pk>/download/', views.inventory_export_download, name='export_download'),
     path('ajax/export-selected/', views.ajax_export_selected, name='ajax_export_selected'),
     path('ajax/export-preview/', views.ajax_export_preview, name='ajax_export_preview'),
     
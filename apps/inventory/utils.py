@@ -237,4 +237,42 @@ def safe_float(value: Union[str, int, float, Decimal], default: float = 0.0) ->
             return float(value)
         return default
     except (ValueError, TypeError):
-        return default 
\ No newline at end of file
+        return default 
+
+def get_inventory_data_version(user_id: int) -> int:
+    """
+    Get the current inventory data version for a user.
+    
+    The version changes whenever one of the user's items is saved or deleted,
+    so it can be embedded in cache keys for derived inventory data. It is
+    stored in the database, so a change made by any process moves every
+    process to the new version.
+    
+    Args:
+        user_id: ID of the inventory owner
+    
+    Returns:
+        Integer version number
+    """
+    from .models import InventoryDataVersion
+    
+    version = InventoryDataVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first()
+    if version is None:
+        version = InventoryDataVersion.objects.get_or_create(user_id=user_id)[0].version
+    return version
+
+
+def bump_inventory_data_version(user_id: int) -> None:
+    """
+    Invalidate cached inventory data for a user by moving to a new version.
+    
+    Runs in the caller's transaction. A missing version row is left for the
+    next read to create, so a user being deleted is never given a new one.
+    
+    Args:
+        user_id: ID of the inventory owner
+    """
+    from django.db.models import F
+    from .models import InventoryDataVersion
+    
+    InventoryDataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1)
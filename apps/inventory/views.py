@@ -1,10 +1,13 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse, Http404
+from django.http import JsonResponse, HttpResponse, Http404, FileResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST, require_GET
 from django.core.paginator import Paginator
+from django.db import transaction as db_transaction
+from django.core.files.storage import default_storage
 from django.db.models import Q, Sum, Count, Avg, F
 from django.utils import timezone
 from django.core.serializers import serialize
@@ -28,6 +31,10 @@ from .models import (
     # Legacy models
     InventoryProduct, InventoryCategory
 )
+from .categories import assign_categories
+from .export_preview import get_export_preview
+from .exports import filter_export_items, queue_pdf_export
+from .utils import bump_inventory_data_version
 from .forms import (
     InventoryItemForm, InventoryLayoutForm, InventoryCustomFieldForm,
     StatusChangeForm, InventoryTransactionForm, InventorySearchForm,
@@ -36,6 +43,8 @@ from .forms import (
     # Legacy forms
     InventoryProductForm, InventoryCategoryForm
 )
+from apps.core.branding import get_branding as get_company_branding
+from apps.core.currency import change_company_currency
 
 
 @login_required
@@ -844,6 +853,48 @@ def layout_detail(request, pk):
 
 
 # Import/Export views
+IMPORT_BATCH_SIZE = 500
+
+
+def import_value(value, default):
+    """A plain Python value for an imported cell; blank cells give ``default``"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return default
+    # numpy scalars are not JSON serialisable
+    return value.item() if hasattr(value, 'item') else value
+
+
+def insert_imported_items(pending, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Insert new items from an import in batches.
+
+    ``pending`` holds (item, source row numbers) pairs. A batch that fails is
+    retried one item at a time, so a bad row only fails itself. Returns the
+    number of items inserted and the error messages of the rest.
+    """
+    pending = list(pending)
+    inserted = 0
+    errors = []
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        try:
+            with db_transaction.atomic():
+                InventoryItem.objects.bulk_create([item for item, _ in batch])
+            inserted += len(batch)
+            continue
+        except Exception:
+            pass
+        for item, rows in batch:
+            item.pk = None
+            try:
+                with db_transaction.atomic():
+                    InventoryItem.objects.bulk_create([item])
+                inserted += 1
+            except Exception as e:
+                errors.append(f"Row {', '.join(str(row) for row in rows)}: {str(e)}")
+    return inserted, errors
+
+
 @login_required
 def inventory_import(request):
     """Import inventory from Excel/CSV with smart column detection"""
@@ -910,14 +961,27 @@ def inventory_import(request):
                 failed_count = 0
                 errors = []
                 
+                # Resolve statuses and existing SKUs once instead of per row
+                statuses = {}
+                sku_column = column_mapping.get('sku_code', '')
+                # SKUs are stored as text; numeric SKU columns arrive as numbers
+                file_skus = {str(sku).strip() for sku in df[sku_column].dropna()} if sku_column in df.columns else set()
+                existing_items = {
+                    item.sku_code: item
+                    for item in InventoryItem.objects.filter(user=request.user, sku_code__in=file_skus)
+                }
+                # New items by SKU, with the file rows that produced them
+                new_items = {}
+                updated_skus = set()
+                
                 for index, row in df.iterrows():
                     try:
-                        # Extract values using mapping
-                        product_name = row.get(column_mapping.get('product_name', ''), '')
-                        sku_code = row.get(column_mapping.get('sku_code', ''), '')
-                        quantity = row.get(column_mapping.get('quantity', ''), 0)
-                        unit_price = row.get(column_mapping.get('unit_price', ''), 0)
-                        status_name = row.get(column_mapping.get('status', ''), 'in_stock')
+                        # Extract values using mapping; pandas hands back numpy values and NaN for blanks
+                        product_name = import_value(row.get(column_mapping.get('product_name', ''), ''), '')
+                        sku_code = str(import_value(row.get(column_mapping.get('sku_code', ''), ''), '')).strip()
+                        quantity = import_value(row.get(column_mapping.get('quantity', ''), 0), 0)
+                        unit_price = import_value(row.get(column_mapping.get('unit_price', ''), 0), 0)
+                        status_name = import_value(row.get(column_mapping.get('status', ''), 'in_stock'), 'in_stock')
                         
                         # Validate required fields
                         if not product_name or not sku_code:
@@ -925,17 +989,19 @@ def inventory_import(request):
                             errors.append(f"Row {index + 1}: Missing product name or SKU")
                             continue
                         
+                        # Item data is stored as JSON; reject values it cannot hold
+                        json.dumps({'quantity': quantity, 'unit_price': unit_price}, allow_nan=False)
+                        
                         # Get or create status
-                        status, _ = InventoryStatus.objects.get_or_create(
-                            name=status_name,
-                            defaults={'display_name': status_name.replace('_', ' ').title()}
-                        )
+                        status = statuses.get(status_name)
+                        if status is None:
+                            status, _ = InventoryStatus.objects.get_or_create(
+                                name=status_name,
+                                defaults={'display_name': str(status_name).replace('_', ' ').title()}
+                            )
+                            statuses[status_name] = status
                         
-                        # Check if item already exists
-                        existing_item = InventoryItem.objects.filter(
-                            user=request.user,
-                            sku_code=sku_code
-                        ).first()
+                        existing_item = existing_items.get(sku_code)
                         
                         if existing_item:
                             # Update existing item
@@ -944,9 +1010,17 @@ def inventory_import(request):
                             existing_item.set_value('unit_price', unit_price)
                             existing_item.status = status
                             existing_item.save()
+                            updated_skus.add(sku_code)
+                        elif sku_code in new_items:
+                            # Later rows for the same SKU overwrite the pending item
+                            item, rows = new_items[sku_code]
+                            item.product_name = product_name
+                            item.status = status
+                            item.data.update({'quantity': quantity, 'unit_price': unit_price})
+                            rows.append(index + 1)
                         else:
-                            # Create new item
-                            item = InventoryItem.objects.create(
+                            # Queue new item for a batched insert
+                            new_items[sku_code] = (InventoryItem(
                                 user=request.user,
                                 layout=layout,
                                 product_name=product_name,
@@ -956,14 +1030,23 @@ def inventory_import(request):
                                     'quantity': quantity,
                                     'unit_price': unit_price
                                 }
-                            )
-                        
-                        imported_count += 1
+                            ), [index + 1])
                         
                     except Exception as e:
                         failed_count += 1
                         errors.append(f"Row {index + 1}: {str(e)}")
                 
+                # Items are counted once however many rows touched them
+                imported_count = len(updated_skus)
+                if new_items:
+                    # bulk_create skips pre_save, so categories are assigned here
+                    assign_categories(item for item, _ in new_items.values())
+                    inserted, insert_errors = insert_imported_items(new_items.values())
+                    imported_count += inserted
+                    failed_count += len(insert_errors)
+                    errors.extend(insert_errors)
+                    bump_inventory_data_version(request.user.id)
+                
                 # Update import record
                 import_record.imported_rows = imported_count
                 import_record.failed_rows = failed_count
@@ -1023,47 +1106,26 @@ def inventory_export(request):
                 include_calculations = form.cleaned_data.get('include_calculations', True)
                 include_branding = form.cleaned_data.get('include_branding', True)
                 
-                # Get items for export
-                items = InventoryItem.objects.filter(user=request.user, layout=layout)
-                
-                # Apply filters
-                if form.cleaned_data.get('category_filter'):
-                    items = items.filter(category=form.cleaned_data['category_filter'])
-                
-                if form.cleaned_data.get('status_filter'):
-                    items = items.filter(status=form.cleaned_data['status_filter'])
-                
-                if form.cleaned_data.get('search'):
-                    search = form.cleaned_data['search']
-                    items = items.filter(
-                        Q(product_name__icontains=search) |
-                        Q(sku_code__icontains=search) |
-                        Q(description__icontains=search)
-                    )
-                
-                if form.cleaned_data.get('min_quantity'):
-                    items = items.filter(data__quantity_in_stock__gte=form.cleaned_data['min_quantity'])
-                
-                if form.cleaned_data.get('max_quantity'):
-                    items = items.filter(data__quantity_in_stock__lte=form.cleaned_data['max_quantity'])
-                
-                if form.cleaned_data.get('min_price'):
-                    items = items.filter(data__unit_price__gte=form.cleaned_data['min_price'])
-                
-                if form.cleaned_data.get('max_price'):
-                    items = items.filter(data__unit_price__lte=form.cleaned_data['max_price'])
-                
-                if form.cleaned_data.get('date_from'):
-                    items = items.filter(created_at__gte=form.cleaned_data['date_from'])
+                # Filters are kept in serializable form so PDF exports can be queued
+                category = form.cleaned_data.get('category_filter')
+                status = form.cleaned_data.get('status_filter')
+                filters = {
+                    'category': category.name if category else None,
+                    'status_filter': status.pk if status else None,
+                    'include_low_stock': form.cleaned_data.get('include_low_stock', True),
+                }
+                for field in ('search', 'min_quantity', 'max_quantity', 'min_price', 'max_price'):
+                    if form.cleaned_data.get(field):
+                        filters[field] = str(form.cleaned_data[field])
+                for field in ('date_from', 'date_to'):
+                    if form.cleaned_data.get(field):
+                        filters[field] = form.cleaned_data[field].isoformat()
                 
-                if form.cleaned_data.get('date_to'):
-                    items = items.filter(created_at__lte=form.cleaned_data['date_to'])
+                if export_format == 'pdf':
+                    export = queue_pdf_export(request.user, layout, filters, include_calculations, include_branding)
+                    return redirect('inventory:export_status', pk=export.pk)
                 
-                # Handle low stock filter
-                if not form.cleaned_data.get('include_low_stock', True):
-                    items = items.exclude(
-                        data__quantity_in_stock__lt=F('data__minimum_threshold')
-                    )
+                items = filter_export_items(InventoryItem.objects.filter(user=request.user, layout=layout), filters)
                 
                 # Generate filename
                 timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
@@ -1073,8 +1135,6 @@ def inventory_export(request):
                     return export_to_excel(items, layout, filename, include_calculations, include_branding)
                 elif export_format == 'csv':
                     return export_to_csv(items, layout, filename, include_calculations)
-                elif export_format == 'pdf':
-                    return export_to_pdf(items, layout, filename, include_calculations, include_branding)
                 else:
                     messages.error(request, 'Unsupported export format')
                     return redirect('inventory:export')
@@ -1093,25 +1153,13 @@ def inventory_export(request):
     
     # Calculate initial summary statistics
     if default_layout:
-        total_items = InventoryItem.objects.filter(user=request.user, layout=default_layout).count()
-        total_value = sum(item.total_value for item in InventoryItem.objects.filter(user=request.user, layout=default_layout))
-        
-        # Count unique categories from data field
-        categories = 0
-        category_names = set()
-        for item in InventoryItem.objects.filter(user=request.user, layout=default_layout):
-            category_data = item.data.get('category', {})
-            if isinstance(category_data, dict) and category_data.get('name'):
-                category_names.add(category_data['name'])
-        categories = len(category_names)
-        
-        # Count low stock items
-        low_stock_count = 0
-        for item in InventoryItem.objects.filter(user=request.user, layout=default_layout):
-            quantity = item.data.get('quantity_in_stock', 0)
-            min_threshold = item.data.get('minimum_threshold', 0)
-            if quantity < min_threshold:
-                low_stock_count += 1
+        summary = get_export_preview(
+            InventoryItem.objects.filter(user=request.user, layout=default_layout), default_layout, {}
+        )['summary']
+        total_items = summary['total_items']
+        total_value = summary['total_value']
+        categories = summary['categories']
+        low_stock_count = summary['low_stock_count']
     else:
         total_items = 0
         total_value = 0
@@ -1132,6 +1180,36 @@ def inventory_export(request):
     return render(request, 'inventory/inventory_export.html', context)
 
 
+@login_required
+def inventory_export_status(request, pk):
+    """Progress and download page of a queued PDF export"""
+    export = get_object_or_404(InventoryExport.objects.select_related('layout'), pk=pk, user=request.user)
+    context = {
+        'export': export,
+        'recent_exports': InventoryExport.objects.filter(
+            user=request.user, format='pdf'
+        ).exclude(pk=export.pk).select_related('layout')[:10],
+        'title': 'Inventory PDF Export',
+    }
+    return render(request, 'inventory/inventory_export_status.html', context)
+
+
+@login_required
+def inventory_export_download(request, pk):
+    """Download the PDF of a finished export"""
+    import os
+    
+    export = get_object_or_404(InventoryExport, pk=pk, user=request.user, status='done')
+    if not export.file_path or not default_storage.exists(export.file_path):
+        raise Http404("Export file not found")
+    return FileResponse(
+        default_storage.open(export.file_path, 'rb'),
+        as_attachment=True,
+        filename=os.path.basename(export.file_path),
+        content_type='application/pdf',
+    )
+
+
 def export_to_excel(items, layout, filename, include_calculations=True, include_branding=True):
     """Export inventory to Excel with formatting and company branding"""
     from openpyxl import Workbook
@@ -1160,10 +1238,9 @@ def export_to_excel(items, layout, filename, include_calculations=True, include_
     # Add branding header if requested
     if include_branding and company_profile:
         # Add company logo if available
-        logo_path = None
-        if company_profile.logo and os.path.exists(company_profile.logo.path):
+        logo_path = get_company_branding(company_profile)['logo_path']
+        if logo_path:
             try:
-                logo_path = company_profile.logo.path
                 # Add logo to Excel (positioned at A1)
                 img = XLImage(logo_path)
                 img.width = 100
@@ -1463,415 +1540,6 @@ def export_to_csv(items, layout, filename, include_calculations=True):
     return response
 
 
-def export_to_pdf(items, layout, filename, include_calculations=True, include_branding=True):
-    """Export inventory to PDF with branding and company details"""
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.lib import colors
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-    import os
-    
-    def get_currency_symbol_for_pdf(currency_symbol):
-        """Get the appropriate currency symbol for PDF display"""
-        if not currency_symbol or currency_symbol.strip() == '':
-            return '₦'  # Default fallback
-        
-        # Clean the symbol
-        currency_symbol = currency_symbol.strip()
-        
-        # Use a more conservative approach - use text representations for better compatibility
-        currency_mapping = {
-            '₦': 'NGN ',  # Naira - use code instead of symbol
-            '$': '$',     # Dollar - works well
-            '€': 'EUR ',  # Euro - use code instead of symbol
-            '£': 'GBP ',  # Pound - use code instead of symbol
-            '¥': 'JPY ',  # Yen - use code instead of symbol
-            '₹': 'INR ',  # Rupee - use code instead of symbol
-            '₽': 'RUB ',  # Ruble - use code instead of symbol
-            '₩': 'KRW ',  # Won - use code instead of symbol
-            '₪': 'ILS ',  # Shekel - use code instead of symbol
-            '₨': 'PKR ',  # Rupee (Pakistani) - use code instead of symbol
-            '₴': 'UAH ',  # Hryvnia - use code instead of symbol
-            '₸': 'KZT ',  # Tenge - use code instead of symbol
-            '₺': 'TRY ',  # Lira - use code instead of symbol
-            '₼': 'AZN ',  # Manat - use code instead of symbol
-            '₾': 'GEL ',  # Lari - use code instead of symbol
-            '₿': 'BTC ',  # Bitcoin - use code instead of symbol
-        }
-        
-        # If the symbol is in our mapping, use the text representation
-        if currency_symbol in currency_mapping:
-            return currency_mapping[currency_symbol]
-        
-        # For currency codes (like 'USD', 'EUR', etc.), add a space for readability
-        if len(currency_symbol) == 3 and currency_symbol.isupper():
-            return f"{currency_symbol} "
-        
-        # For unknown symbols, try to use them directly
-        # If they fail, we'll fall back to a text representation
-        try:
-            # Test if the symbol can be properly encoded
-            test_str = f"{currency_symbol}1000.00"
-            test_str.encode('utf-8')
-            # For safety, use a space after the symbol
-            return f"{currency_symbol} "
-        except UnicodeEncodeError:
-            # If encoding fails, use a text fallback
-            return f"{currency_symbol} "  # Add space for readability
-    
-    def wrap_text_for_pdf(text, max_chars_per_line=30):
-        """Wrap text for better PDF display with more aggressive wrapping"""
-        if not text:
-            return ""
-        
-        text = str(text)
-        if len(text) <= max_chars_per_line:
-            return text
-        
-        # Try to break at spaces first
-        words = text.split()
-        lines = []
-        current_line = ""
-        
-        for word in words:
-            # If adding this word would exceed the limit
-            if len(current_line + " " + word) > max_chars_per_line:
-                if current_line:
-                    lines.append(current_line.strip())
-                    current_line = word
-                else:
-                    # Word is too long, break it more aggressively
-                    if len(word) > max_chars_per_line:
-                        # Break long words more frequently
-                        for i in range(0, len(word), max_chars_per_line - 5):
-                            lines.append(word[i:i + max_chars_per_line - 5])
-                    else:
-                        current_line = word
-            else:
-                if current_line:
-                    current_line += " " + word
-                else:
-                    current_line = word
-        
-        if current_line:
-            lines.append(current_line.strip())
-        
-        return "<br/>".join(lines)
-    
-    # Force recalculation for all items to ensure latest data
-    for item in items:
-        item.calculate_totals()
-        item.refresh_from_db()
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}.pdf"'
-    
-    # Use A4 landscape with optimized margins for better table layout
-    doc = SimpleDocTemplate(response, pagesize=A4, rightMargin=15, leftMargin=15, topMargin=15, bottomMargin=15)
-    story = []
-    
-    styles = getSampleStyleSheet()
-    
-    # Get company profile for branding
-    company_profile = None
-    if include_branding:
-        try:
-            company_profile = layout.user.company_profile
-        except:
-            pass
-    
-    # Add company header with logo
-    if include_branding and company_profile:
-        # Create header table with logo and company details
-        header_data = []
-        
-        # Add logo if available
-        logo_path = None
-        if company_profile.logo and os.path.exists(company_profile.logo.path):
-            try:
-                logo_path = company_profile.logo.path
-            except:
-                pass
-        
-        if logo_path:
-            # Header with logo and company name
-            header_data.append([
-                Image(logo_path, width=1.5*inch, height=1*inch),
-                Paragraph(f"<b>{company_profile.company_name}</b>", 
-                         ParagraphStyle('CompanyName', fontSize=16, alignment=TA_CENTER, spaceAfter=10))
-            ])
-        else:
-            # Header with just company name
-            header_data.append([
-                "",
-                Paragraph(f"<b>{company_profile.company_name}</b>", 
-                         ParagraphStyle('CompanyName', fontSize=18, alignment=TA_CENTER, spaceAfter=10))
-            ])
-        
-        # Add company details
-        company_details = []
-        if company_profile.address:
-            company_details.append(company_profile.address)
-        if company_profile.phone:
-            company_details.append(f"Phone: {company_profile.phone}")
-        if company_profile.email:
-            company_details.append(f"Email: {company_profile.email}")
-        if company_profile.website:
-            company_details.append(f"Website: {company_profile.website}")
-        
-        if company_details:
-            details_text = "<br/>".join(company_details)
-            header_data.append([
-                "",
-                Paragraph(details_text, 
-                         ParagraphStyle('CompanyDetails', fontSize=10, alignment=TA_CENTER, spaceAfter=20))
-            ])
-        
-        # Create header table
-        header_table = Table(header_data, colWidths=[2*inch, 4*inch])
-        header_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-            ('TOPPADDING', (0, 0), (-1, -1), 0),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-        ]))
-        
-        story.append(header_table)
-        story.append(Spacer(1, 20))
-    
-    # Add export info
-    export_info = ParagraphStyle(
-        'ExportInfo',
-        parent=styles['Normal'],
-        fontSize=12,
-        spaceAfter=20,
-        alignment=TA_CENTER
-    )
-    story.append(Paragraph(f"<b>Inventory Export Report</b><br/>Generated on {timezone.now().strftime('%B %d, %Y at %H:%M')}", export_info))
-    story.append(Spacer(1, 20))
-    
-    # Prepare table data with better column structure
-    headers = []
-    column_widths = []
-    
-    for column in layout.get_visible_columns():
-        if column.get('name') == 'actions':
-            continue
-        if not include_calculations and column.get('name') == 'total':
-            continue
-        
-        display_name = column.get('display_name', column.get('name'))
-        headers.append(display_name)
-        
-        # Set appropriate column widths based on content type with better word wrapping support
-        field_name = column.get('name')
-        if field_name == 'serial_number':
-            column_widths.append(0.35*inch)  # Compact but readable for serial numbers
-        elif field_name == 'product_name':
-            column_widths.append(1.8*inch)   # Balanced width for product names
-        elif field_name == 'sku_code':
-            column_widths.append(1.2*inch)   # Compact for SKU codes
-        elif field_name == 'status':
-            column_widths.append(0.8*inch)   # Compact for status
-        elif field_name == 'quantity':
-            column_widths.append(0.8*inch)   # Compact for quantities
-        elif field_name == 'unit_price':
-            column_widths.append(1.0*inch)   # Balanced for prices
-        elif field_name == 'total':
-            column_widths.append(1.4*inch)   # Wider width for totals to accommodate large amounts
-        else:
-            column_widths.append(0.9*inch)   # Compact default width for other fields
-    
-    table_data = [headers]
-    
-    # Define styles for word wrapping with better configuration
-    cell_style = ParagraphStyle(
-        'CellStyle',
-        fontName='Helvetica',
-        fontSize=8,  # Smaller font size for better fit
-        leading=9,   # Reduced line spacing for better fit
-        spaceBefore=0,
-        spaceAfter=0,
-        alignment=0,  # Left align
-        wordWrap='LTR',  # Left-to-right word wrapping
-        splitLongWords=True,  # Split long words if necessary
-        spaceShrinkage=0.1,  # Allow more space reduction
-    )
-    
-    for index, item in enumerate(items, 1):
-        row = []
-        for column in layout.get_visible_columns():
-            if column.get('name') == 'actions':
-                continue
-            if not include_calculations and column.get('name') == 'total':
-                continue
-            
-            field_name = column.get('name')
-            if field_name == 'serial_number':
-                value = str(index)  # Serial number based on position
-            elif field_name == 'product_name':
-                # Use improved text wrapping for product names
-                wrapped_text = wrap_text_for_pdf(item.product_name, max_chars_per_line=25)
-                value = Paragraph(wrapped_text, cell_style)
-            elif field_name == 'sku_code':
-                # Use improved text wrapping for SKU codes
-                wrapped_text = wrap_text_for_pdf(item.sku_code, max_chars_per_line=20)
-                value = Paragraph(wrapped_text, cell_style)
-            elif field_name == 'status':
-                # Use improved text wrapping for status
-                status_text = item.status.display_name if item.status else 'Unknown'
-                wrapped_text = wrap_text_for_pdf(status_text, max_chars_per_line=15)
-                value = Paragraph(wrapped_text, cell_style)
-            elif field_name == 'total':
-                # Use company currency symbol if available
-                raw_currency_symbol = company_profile.currency_symbol if company_profile else '₦'
-                currency_symbol = get_currency_symbol_for_pdf(raw_currency_symbol)
-                value = f"{currency_symbol}{item.total_value:,.2f}"
-            elif field_name == 'unit_price':
-                # Use company currency symbol if available
-                raw_currency_symbol = company_profile.currency_symbol if company_profile else '₦'
-                currency_symbol = get_currency_symbol_for_pdf(raw_currency_symbol)
-                unit_price = item.data.get('unit_price', 0)
-                value = f"{currency_symbol}{unit_price:,.2f}"
-            else:
-                # For other fields, use improved text wrapping
-                field_value = item.get_value(field_name)
-                wrapped_text = wrap_text_for_pdf(field_value, max_chars_per_line=20)
-                value = Paragraph(wrapped_text, cell_style)
-            
-            row.append(value)
-        
-        table_data.append(row)
-    
-    # Add grand total if calculations are included
-    if include_calculations and layout.supports_calculations():
-        raw_currency_symbol = company_profile.currency_symbol if company_profile else '₦'
-        currency_symbol = get_currency_symbol_for_pdf(raw_currency_symbol)
-        total_value = sum(item.total_value for item in items)
-        
-        # Create grand total row with proper formatting
-        total_row = []
-        for i, column in enumerate(layout.get_visible_columns()):
-            if column.get('name') == 'actions':
-                continue
-            if not include_calculations and column.get('name') == 'total':
-                continue
-            
-            field_name = column.get('name')
-            if field_name == 'total':
-                # Format the grand total with proper currency symbol
-                total_row.append(f"{currency_symbol}{total_value:,.2f}")
-            elif field_name == 'serial_number':
-                # Add "Grand Total" text in the first column
-                total_row.append("Grand Total")
-            else:
-                # Empty cells for other columns
-                total_row.append("")
-        
-        table_data.append(total_row)
-    
-    # Create table with proper column widths
-    table = Table(table_data, colWidths=column_widths)
-    
-    # Enhanced table styling with word wrapping support
-    table_style = [
-        # Header styling
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-        ('TOPPADDING', (0, 0), (-1, 0), 6),
-        
-        # Optimized padding for serial number header
-        ('LEFTPADDING', (0, 0), (0, 0), 2),  # Balanced left padding for serial number header
-        ('RIGHTPADDING', (0, 0), (0, 0), 2),  # Balanced right padding for serial number header
-        
-        # Extra padding for total column header
-        ('LEFTPADDING', (-2, 0), (-2, 0), 3),  # Extra left padding for total column header
-        ('RIGHTPADDING', (-2, 0), (-2, 0), 3),  # Extra right padding for total column header
-        
-        # Data rows styling with improved word wrapping support
-        ('BACKGROUND', (0, 1), (-1, -2), colors.white),
-        ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -2), 8),
-        ('ALIGN', (0, 1), (-1, -2), 'LEFT'),
-        ('VALIGN', (0, 1), (-1, -2), 'TOP'),  # TOP alignment for better word wrapping
-        ('TOPPADDING', (0, 1), (-1, -2), 2),
-        ('BOTTOMPADDING', (0, 1), (-1, -2), 2),
-        ('LEFTPADDING', (0, 1), (-1, -2), 3),
-        ('RIGHTPADDING', (0, 1), (-1, -2), 3),
-        
-        # Grid styling
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('LINEBELOW', (0, 0), (-1, 0), 1, colors.black),
-        
-        # Alternating row colors for better readability
-        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.HexColor('#F8F9FA')]),
-        
-        # Optimized padding for serial number column (first column)
-        ('LEFTPADDING', (0, 1), (0, -2), 2),  # Balanced left padding for serial numbers
-        ('RIGHTPADDING', (0, 1), (0, -2), 2),  # Balanced right padding for serial numbers
-        
-        # Extra padding for total column to accommodate large amounts
-        ('LEFTPADDING', (-2, 1), (-2, -2), 3),  # Extra left padding for total column
-        ('RIGHTPADDING', (-2, 1), (-2, -2), 3),  # Extra right padding for total column
-    ]
-    
-    # Style the total row if it exists
-    if include_calculations and layout.supports_calculations():
-        table_style.extend([
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#E9ECEF')),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, -1), (-1, -1), 9),
-            ('ALIGN', (0, -1), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, -1), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, -1), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, -1), (-1, -1), 6),
-            ('LEFTPADDING', (0, -1), (-1, -1), 2),
-            ('RIGHTPADDING', (0, -1), (-1, -1), 2),
-            ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
-        ])
-    
-    table.setStyle(TableStyle(table_style))
-    
-    story.append(table)
-    
-    # Add summary information (removed layout information)
-    story.append(Spacer(1, 20))
-    summary_style = ParagraphStyle(
-        'Summary',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_LEFT
-    )
-    
-    summary_text = f"""
-    <b>Summary:</b><br/>
-    • Total Items: {len(items)}<br/>
-    • Report Generated: {timezone.now().strftime('%B %d, %Y at %H:%M')}<br/>
-    """
-    
-    if include_calculations and layout.supports_calculations():
-        raw_currency_symbol = company_profile.currency_symbol if company_profile else '₦'
-        currency_symbol = get_currency_symbol_for_pdf(raw_currency_symbol)
-        total_value = sum(item.total_value for item in items)
-        summary_text += f"• Total Inventory Value: {currency_symbol}{total_value:,.2f}<br/>"
-    
-    story.append(Paragraph(summary_text, summary_style))
-    
-    doc.build(story)
-    
-    return response
-
-
 @login_required
 def stock_adjustment(request, pk):
     """Stock adjustment form"""
@@ -2657,7 +2325,13 @@ def ajax_export_selected(request):
         elif export_format == 'csv':
             response = export_to_csv(items, layout, filename, include_calculations)
         elif export_format == 'pdf':
-            response = export_to_pdf(items, layout, filename, include_calculations, include_branding)
+            export = queue_pdf_export(
+                request.user, layout, {'item_ids': item_ids}, include_calculations, include_branding
+            )
+            return JsonResponse({
+                'success': True,
+                'status_url': reverse('inventory:export_status', args=[export.pk]),
+            })
         else:
             return JsonResponse({
                 'success': False,
@@ -2877,26 +2551,13 @@ def update_inventory_currency(request):
         if not currency_code or not currency_symbol:
             return JsonResponse({'success': False, 'error': 'Currency code and symbol are required'})
         
-        # Update company profile currency
+        # Update company profile currency. Item values carry no currency of their
+        # own, so only the inventory caches need invalidating, which happens once.
         company_profile = request.user.company_profile
-        company_profile.currency_code = currency_code
-        company_profile.currency_symbol = currency_symbol
-        company_profile.save()
-        
-        # Update all inventory items to trigger recalculation
-        inventory_items = InventoryItem.objects.filter(user=request.user)
-        updated_count = 0
-        
-        for item in inventory_items:
-            # Trigger recalculation to update currency displays
-            item.calculate_totals()
-            updated_count += 1
-        
-        # Update all inventory layouts
-        layouts = InventoryLayout.objects.filter(user=request.user)
-        for layout in layouts:
-            layout.updated_at = timezone.now()
-            layout.save()
+        transactions_updated, migration = change_company_currency(
+            company_profile, currency_code, currency_symbol
+        )
+        layouts_count = InventoryLayout.objects.filter(user=request.user).count()
         
         # Log the currency change
         InventoryLog.objects.create(
@@ -2906,8 +2567,7 @@ def update_inventory_currency(request):
             details={
                 'currency_code': currency_code,
                 'currency_symbol': currency_symbol,
-                'items_updated': updated_count,
-                'layouts_updated': layouts.count(),
+                'transactions_updated': transactions_updated,
                 'updated_at': timezone.now().isoformat()
             }
         )
@@ -2916,9 +2576,10 @@ def update_inventory_currency(request):
             'success': True,
             'currency_code': currency_code,
             'currency_symbol': currency_symbol,
-            'items_updated': updated_count,
-            'layouts_updated': layouts.count(),
-            'message': f'Currency updated successfully. {updated_count} items and {layouts.count()} layouts updated.'
+            'layouts_updated': layouts_count,
+            'transactions_updated': transactions_updated,
+            'queued': migration is not None,
+            'message': f'Currency updated successfully to {currency_code} ({currency_symbol}).'
         })
         
     except Exception as e:
@@ -2989,56 +2650,14 @@ def ajax_export_preview(request):
                 data__quantity_in_stock__lt=F('data__minimum_threshold')
             )
         
-        # Calculate summary statistics
-        total_items = items.count()
-        total_value = sum(item.total_value for item in items)
-        
-        # Get unique categories from data field
-        category_names = set()
-        for item in items:
-            category_data = item.data.get('category', {})
-            if isinstance(category_data, dict) and category_data.get('name'):
-                category_names.add(category_data['name'])
-        categories = len(category_names)
-        
-        # Count low stock items
-        low_stock_count = 0
-        for item in items:
-            quantity = item.data.get('quantity_in_stock', 0)
-            min_threshold = item.data.get('minimum_threshold', 0)
-            if quantity < min_threshold:
-                low_stock_count += 1
-        
-        # Get preview items (first 10)
-        preview_items = items[:10]
-        
-        # Prepare preview data
-        preview_data = []
-        for item in preview_items:
-            category_data = item.data.get('category', {})
-            category_name = category_data.get('name', 'Uncategorized') if isinstance(category_data, dict) else 'Uncategorized'
-            
-            preview_data.append({
-                'id': item.pk,
-                'product_name': item.product_name,
-                'sku_code': item.sku_code,
-                'category': category_name,
-                'quantity': item.data.get('quantity_in_stock', 0),
-                'unit_price': item.data.get('unit_price', 0),
-                'total_value': item.total_value,
-                'status': item.status.display_name if item.status else 'Active',
-                'is_low_stock': item.data.get('quantity_in_stock', 0) < item.data.get('minimum_threshold', 0)
-            })
+        # Sample rows and SQL-side totals, cached per layout, filters and data version
+        filters = {key: value for key, value in data.items() if key != 'layout_id'}
+        preview = get_export_preview(items, layout, filters)
         
         return JsonResponse({
             'success': True,
-            'preview_data': preview_data,
-            'summary': {
-                'total_items': total_items,
-                'total_value': float(total_value),
-                'categories': categories,
-                'low_stock_count': low_stock_count
-            },
+            'preview_data': preview['preview_data'],
+            'summary': preview['summary'],
             'layout': {
                 'name': layout.name,
                 'supports_calculations': layout.supports_calculations()
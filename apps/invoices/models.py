@@ -1,9 +1,13 @@
-from django.db import models, IntegrityError
+from django.db import models, transaction
+from django.db.models import Case, F, Sum, Value, When
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 import re
 
+from apps.core.sequences import next_number, last_issued, peek_number
+
 User = get_user_model()
 
 
@@ -60,7 +64,7 @@ class Invoice(models.Model):
         ('delivered', 'Delivered'),
     ]
     
-    invoice_number = models.CharField(max_length=50, unique=True, editable=False)
+    invoice_number = models.CharField(max_length=50, editable=False)
     invoice_date = models.DateField(auto_now_add=True)
     due_date = models.DateField(null=True, blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='invoices')
@@ -90,6 +94,9 @@ class Invoice(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'invoice_number'], name='invoices_unique_number_per_user'),
+        ]
         indexes = [
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['invoice_number']),
@@ -98,70 +105,47 @@ class Invoice(models.Model):
             models.Index(fields=['due_date']),
         ]
         
+    # Fields written by calculate_totals(), for save(update_fields=...)
+    TOTAL_FIELDS = ['subtotal', 'total_tax', 'grand_total', 'balance_due', 'status', 'updated_at']
+    
     def __str__(self):
         return f"Invoice {self.invoice_number}"
     
     def save(self, *args, **kwargs):
-        if not self.invoice_number:
-            self.invoice_number = self.generate_invoice_number()
+        # Only calculate totals if the invoice already exists (has a primary key)
+        # This prevents errors when creating new invoices
+        if self.pk:
+            self.calculate_totals()
         
-        # Handle potential duplicate invoice numbers with retry mechanism
-        max_retries = 3
-        for retry in range(max_retries):
-            try:
-                # Only calculate totals if the invoice already exists (has a primary key)
-                # This prevents errors when creating new invoices
-                if self.pk:
-                    self.calculate_totals()
-                
-                super().save(*args, **kwargs)
-                break  # Success, exit retry loop
-                
-            except IntegrityError as e:
-                if 'UNIQUE constraint failed: invoices_invoice.invoice_number' in str(e) and retry < max_retries - 1:
-                    # Generate a new invoice number and try again
-                    self.invoice_number = self.generate_invoice_number()
-                    continue
-                else:
-                    # Re-raise the error if it's not a duplicate invoice number or we've exhausted retries
-                    raise
-    
-    def generate_invoice_number(self):
-        """Generate unique invoice number with collision handling"""
-        from datetime import datetime
-        import random
-        year = datetime.now().year
+        # A new number is taken in the same transaction as the insert, so a
+        # failed save does not consume it; post_save handlers (the accounting
+        # outbox) also write in this transaction
+        with transaction.atomic():
+            if not self.invoice_number:
+                self.invoice_number = self.generate_invoice_number()
+            super().save(*args, **kwargs)
+    
+    def generate_invoice_number(self, peek=False):
+        """Take (or with ``peek``, preview) the next number of the user's yearly invoice sequence (INV-YYYY-NNNN)"""
+        year = timezone.localdate().year
         
-        # Try multiple attempts to generate a unique number
-        for attempt in range(10):
-            if attempt == 0:
-                # First try: use count-based approach
-                count = Invoice.objects.filter(
-                    user=self.user,
-                    created_at__year=year
-                ).count() + 1
-                invoice_number = f"INV-{year}-{count:04d}"
-            else:
-                # Subsequent tries: add random component to avoid collisions
-                count = Invoice.objects.filter(
-                    user=self.user,
-                    created_at__year=year
-                ).count() + 1
-                random_suffix = random.randint(1000, 9999)
-                invoice_number = f"INV-{year}-{count:04d}-{random_suffix}"
-            
-            # Check if this number already exists
-            if not Invoice.objects.filter(invoice_number=invoice_number).exists():
-                return invoice_number
+        def seed():
+            pattern = re.compile(rf'^INV-{year}-(\d+)(?:-\d+)?$')
+            numbers = Invoice.objects.filter(
+                user_id=self.user_id,
+                invoice_number__startswith=f"INV-{year}-",
+            ).values_list('invoice_number', flat=True)
+            return last_issued(numbers, pattern)
         
-        # Final fallback: use timestamp
-        import time
-        timestamp = int(time.time() * 1000) % 100000  # Last 5 digits of timestamp
-        return f"INV-{year}-{timestamp}"
-    
-    def calculate_totals(self):
-        """Calculate all totals"""
-        self.subtotal = sum(item.line_total for item in self.items.all())
+        number = (peek_number if peek else next_number)('invoice', user=self.user_id, period=str(year), seed=seed)
+        return f"INV-{year}-{number:04d}"
+    
+    def calculate_totals(self, items=None):
+        """Calculate all totals, from ``items`` when given instead of the saved line items"""
+        if items is None:
+            self.subtotal = self.items.aggregate(total=Sum('line_total'))['total'] or Decimal('0')
+        else:
+            self.subtotal = sum(item.line_total for item in items)
         
         # Handle percentage-based tax calculation
         if hasattr(self, '_tax_rate') and self._tax_rate:
@@ -178,6 +162,39 @@ class Invoice(models.Model):
         else:
             self.status = 'partial'
     
+    def record_payments(self, amount_paid):
+        """
+        Set ``amount_paid`` and move ``balance_due`` and ``status`` with it.
+
+        Written with one UPDATE against the stored grand total, so the line
+        items are not re-totalled and no ``post_save`` is sent; the instance
+        is updated to match.
+        """
+        if amount_paid == 0:
+            status = Value('unpaid')
+        else:
+            status = Case(
+                When(grand_total__lte=amount_paid, then=Value('paid')),
+                default=Value('partial'),
+            )
+        now = timezone.now()
+        Invoice.objects.filter(pk=self.pk).update(
+            amount_paid=amount_paid,
+            balance_due=F('grand_total') - amount_paid,
+            status=status,
+            updated_at=now,
+        )
+        
+        self.amount_paid = amount_paid
+        self.balance_due = self.grand_total - amount_paid
+        if amount_paid == 0:
+            self.status = 'unpaid'
+        elif amount_paid >= self.grand_total:
+            self.status = 'paid'
+        else:
+            self.status = 'partial'
+        self.updated_at = now
+    
     @staticmethod
     def parse_number(value):
         """Parse smart number inputs like ₦3k, 7.5%, -500, '80 nires', '45n', 'N 20'"""
@@ -243,8 +260,11 @@ class InvoiceItem(models.Model):
         display_text = self.product_service or self.description or "Item"
         return f"{display_text} - {self.invoice.invoice_number}"
     
-    def save(self, *args, **kwargs):
+    def calculate_line_total(self):
         self.line_total = self.quantity * self.unit_price
+    
+    def save(self, *args, **kwargs):
+        self.calculate_line_total()
         super().save(*args, **kwargs)
         # Don't automatically recalculate here to avoid conflicts during bulk saves
         # Let the view handle the recalculation after all items are processed
@@ -15,6 +15,7 @@ urlpatterns = [
     path('<int:pk>/print/', views.invoice_print, name='print'),
     path('export/excel/', views.export_excel, name='export_excel'),
     path('export/pdf/', views.export_pdf, name='export_pdf'),
+    path('export/pdf-zip/', views.export_pdf_zip, name='export_pdf_zip'),
     
     # Invoice Template URLs
     path('templates/', views.template_list, name='template_list'),
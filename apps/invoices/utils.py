@@ -1,13 +1,52 @@
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from io import BytesIO
+from functools import lru_cache
 from django.conf import settings
 import os
 
+from apps.core.pdf import get_pdf_currency, get_stylesheet
+
+
+@lru_cache(maxsize=None)
+def get_invoice_pdf_styles():
+    """Paragraph styles for invoice PDFs, built once per process"""
+    styles = get_stylesheet()
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            textColor=colors.HexColor('#2c3e50'),
+            alignment=TA_CENTER
+        ),
+        'header': ParagraphStyle(
+            'CustomHeader',
+            parent=styles['Heading2'],
+            fontSize=14,
+            spaceAfter=12,
+            textColor=colors.HexColor('#34495e')
+        ),
+        'normal': ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=10,
+            spaceAfter=6
+        ),
+        'footer': ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=12,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor('#7f8c8d')
+        ),
+    }
+
 
 def generate_invoice_pdf(invoice):
     """Generate PDF for invoice with company branding"""
@@ -15,30 +54,14 @@ def generate_invoice_pdf(invoice):
     doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch)
     
     # Get styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        textColor=colors.HexColor('#2c3e50'),
-        alignment=TA_CENTER
-    )
-    
-    header_style = ParagraphStyle(
-        'CustomHeader',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceAfter=12,
-        textColor=colors.HexColor('#34495e')
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=6
-    )
+    styles = get_invoice_pdf_styles()
+    title_style = styles['title']
+    header_style = styles['header']
+    normal_style = styles['normal']
+    
+    # Currency text Helvetica can draw, e.g. 'NGN ' for the Naira sign
+    company = getattr(invoice.user, 'company_profile', None)
+    currency = get_pdf_currency(company.currency_symbol if company else '₦')
     
     # Build content
     content = []
@@ -90,8 +113,8 @@ def generate_invoice_pdf(invoice):
             item.product_service or '[No Product/Service]',
             item.description or '[No Description]',
             str(item.quantity),
-            f"₦{item.unit_price:,.2f}",
-            f"₦{item.line_total:,.2f}"
+            f"{currency}{item.unit_price:,.2f}",
+            f"{currency}{item.line_total:,.2f}"
         ])
     
     items_table = Table(items_data, colWidths=[1.5*inch, 1.5*inch, 0.7*inch, 1.15*inch, 1.15*inch])
@@ -123,15 +146,15 @@ def generate_invoice_pdf(invoice):
     
     # Totals Table
     totals_data = [
-        ['Subtotal:', f"₦{invoice.subtotal:,.2f}"],
-        ['Tax:', f"₦{invoice.total_tax:,.2f}"],
-        ['Discount:', f"-₦{invoice.total_discount:,.2f}"],
-        ['Shipping:', f"₦{invoice.shipping_fee:,.2f}"],
-        ['Other Charges:', f"₦{invoice.other_charges:,.2f}"],
+        ['Subtotal:', f"{currency}{invoice.subtotal:,.2f}"],
+        ['Tax:', f"{currency}{invoice.total_tax:,.2f}"],
+        ['Discount:', f"-{currency}{invoice.total_discount:,.2f}"],
+        ['Shipping:', f"{currency}{invoice.shipping_fee:,.2f}"],
+        ['Other Charges:', f"{currency}{invoice.other_charges:,.2f}"],
         ['', ''],  # Separator
-        ['Grand Total:', f"₦{invoice.grand_total:,.2f}"],
-        ['Amount Paid:', f"₦{invoice.amount_paid:,.2f}"],
-        ['Balance Due:', f"₦{invoice.balance_due:,.2f}"],
+        ['Grand Total:', f"{currency}{invoice.grand_total:,.2f}"],
+        ['Amount Paid:', f"{currency}{invoice.amount_paid:,.2f}"],
+        ['Balance Due:', f"{currency}{invoice.balance_due:,.2f}"],
     ]
     
     totals_table = Table(totals_data, colWidths=[2*inch, 2*inch])
@@ -170,13 +193,7 @@ def generate_invoice_pdf(invoice):
     # Footer
     content.append(Spacer(1, 30))
     footer_text = "Thank you for your business!"
-    content.append(Paragraph(footer_text, ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=12,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#7f8c8d')
-    )))
+    content.append(Paragraph(footer_text, styles['footer']))
     
     # Build PDF
     doc.build(content)
@@ -1,6 +1,8 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_http_methods
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Q
 from django.core.paginator import Paginator
 from django.http import HttpResponse, JsonResponse
@@ -14,9 +16,12 @@ from xhtml2pdf import pisa
 from django.template.loader import render_to_string
 from django.http import HttpResponse
 from apps.core.models import CompanyProfile
-import os
+from apps.core.utils import get_company_context
+from apps.core.branding import get_branding
+from apps.core.pdf_cache import PDFSource, pdf_fingerprint, branding_parts, serve_pdf_source
+from apps.core.document_exports import queue_document_export
+from apps.core.line_items import collect_item_rows, validate_line_items, bulk_create_line_items
 import urllib.parse
-import base64
 
 
 def get_filtered_invoices(request):
@@ -80,35 +85,12 @@ def invoice_list(request):
 
 def get_invoice_context(invoice, user):
     """Get context data for invoice rendering"""
-    # Get company profile data for display
-    company_profile = None
-    company_logo = None
-    company_signature = None
-    default_bank_account = None
-    
-    try:
-        from apps.core.models import CompanyProfile, BankAccount
-        company_profile = CompanyProfile.objects.get(user=user)
-        
-        if company_profile.logo:
-            company_logo = company_profile.logo.url
-        if company_profile.signature:
-            company_signature = company_profile.signature.url
-            
-        # Get default bank account
-        default_bank_account = BankAccount.objects.filter(
-            company=company_profile, 
-            is_default=True
-        ).first()
-        
-        # If no default, get the first bank account
-        if not default_bank_account:
-            default_bank_account = BankAccount.objects.filter(
-                company=company_profile
-            ).first()
-            
-    except CompanyProfile.DoesNotExist:
-        pass
+    # Company profile, branding and default bank account, cached per request and across workers
+    company_context = get_company_context(user)
+    company_profile = company_context['company_profile']
+    company_logo = company_context['company_logo']
+    company_signature = company_context['company_signature']
+    default_bank_account = company_context['default_bank_account']
     
     # Get user account details for receipts
     user_profile = {
@@ -201,85 +183,45 @@ def invoice_create(request):
             if default_template:
                 invoice.template = default_template
         
-        # Save invoice first to get an ID
-        invoice.save()
-        
-        # Process dynamic items
-        subtotal = 0
-        items_data = {}
-        
-        # Collect all item data from POST
-        for key, value in request.POST.items():
-            if key.startswith('items[') and '][' in key:
-                # Parse items[1][description] format
-                item_index = key.split('[')[1].split(']')[0]
-                field_name = key.split('[')[2].split(']')[0]
-                
-                if item_index not in items_data:
-                    items_data[item_index] = {}
-                items_data[item_index][field_name] = value
-        
-        # Create invoice items
-        created_items = []
-        for index, item_data in items_data.items():
-            # Get all item fields
-            product_service = item_data.get('product_service', '').strip()
-            description = item_data.get('description', '').strip()
+        # Build the items in memory; they are inserted together once the invoice exists
+        items = []
+        for item_data in collect_item_rows(request.POST).values():
             quantity = item_data.get('quantity', '').strip()
             unit_price = item_data.get('unit_price', '').strip()
             
             # Create item if we have quantity or price (even without description)
             if quantity or unit_price:
-                print(f"DEBUG: Creating item - product_service: '{product_service}', description: '{description}', qty: '{quantity}', price: '{unit_price}'")
-                
-                # Ensure we save the text content properly
-                parsed_quantity = Invoice.parse_number(quantity or '0')
-                parsed_price = Invoice.parse_number(unit_price or '0')
-                
-                item = InvoiceItem.objects.create(
+                item = InvoiceItem(
                     invoice=invoice,
-                    product_service=product_service or '',
-                    description=description or '',
-                    quantity=Decimal(str(parsed_quantity)),
-                    unit_price=parsed_price
+                    product_service=item_data.get('product_service', '').strip(),
+                    description=item_data.get('description', '').strip(),
+                    quantity=Decimal(str(Invoice.parse_number(quantity or '0'))),
+                    unit_price=Invoice.parse_number(unit_price or '0'),
                 )
-                subtotal += item.line_total
-                
-                print(f"DEBUG: Saved item - ID: {item.id}, product_service: '{item.product_service}', description: '{item.description}', qty: {item.quantity}, price: {item.unit_price}, total: {item.line_total}")
+                item.calculate_line_total()
+                items.append(item)
         
-        # Update invoice with calculated subtotal and totals
-        invoice.subtotal = subtotal
-        invoice.calculate_totals()
-        invoice.save()
+        errors = validate_line_items(items, exclude=['invoice'])
+        if errors:
+            for error in errors:
+                messages.error(request, error)
+            return redirect('invoices:create')
+        
+        # Totals come from the in-memory items, so the invoice is written once
+        with transaction.atomic():
+            invoice.calculate_totals(items)
+            invoice.save()
+            bulk_create_line_items(items)
         
         messages.success(request, f'Invoice {invoice.invoice_number} created successfully!')
         return redirect('invoices:detail', pk=invoice.pk)
     
     # GET request - show the dynamic form
     # Get company profile data
-    company_profile = None
-    company_logo = None
-    
-    try:
-        from apps.core.models import CompanyProfile, BankAccount
-        company_profile = CompanyProfile.objects.get(user=request.user)
-        if company_profile.logo:
-            company_logo = company_profile.logo.url
-            
-        # Get default bank account
-        default_bank_account = BankAccount.objects.filter(
-            company=company_profile, 
-            is_default=True
-        ).first()
-        
-        # If no default, get the first bank account
-        if not default_bank_account:
-            default_bank_account = BankAccount.objects.filter(
-                company=company_profile
-            ).first()
-            
-    except CompanyProfile.DoesNotExist:
-        default_bank_account = None
+    company_context = get_company_context(request.user)
+    company_profile = company_context['company_profile']
+    company_logo = company_context['company_logo']
+    default_bank_account = company_context['default_bank_account']
     
     # Get user's invoice templates
     templates = InvoiceTemplate.objects.filter(user=request.user)
@@ -363,9 +305,8 @@ def invoice_edit(request, pk):
             
             print(f"Valid items saved: {len(valid_items)}")
             
-            # Recalculate totals after all items are saved
-            invoice.calculate_totals()
-            invoice.save()
+            # save() totals the saved items in the database; only the totals are written
+            invoice.save(update_fields=Invoice.TOTAL_FIELDS)
             
             print(f"Final invoice totals - Subtotal: {invoice.subtotal}, Grand Total: {invoice.grand_total}")
             
@@ -457,46 +398,37 @@ def invoice_delete_ajax(request, pk):
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
 
+def invoice_pdf_source(invoice, user):
+    """The cacheable PDF of an invoice"""
+    def render_html():
+        # Get the same context as the detail view, with images embedded
+        context = get_invoice_context(invoice, user)
+        branding = get_branding(context.get('company_profile'))
+        context['company_logo'] = branding['company_logo_base64']
+        context['company_signature'] = branding['company_signature_base64']
+        
+        return render_to_string('invoices/invoice_pdf.html', context)
+    
+    fingerprint = pdf_fingerprint(
+        'invoices/invoice_pdf.html',
+        invoice,
+        invoice.items.all(),
+        InvoiceTemplate.objects.filter(user=user),
+        *branding_parts(user),
+    )
+    return PDFSource('invoice', invoice.pk, f"invoice_{invoice.invoice_number}.pdf", fingerprint, render_html)
+
+
 @login_required
 def invoice_pdf(request, pk):
-    """Export invoice as PDF"""
+    """Export invoice as PDF, served from the PDF cache while the invoice is unchanged"""
     invoice = get_object_or_404(Invoice, pk=pk, user=request.user)
     
     try:
-        # Import xhtml2pdf for HTML to PDF conversion
-        from xhtml2pdf import pisa
-        from django.template.loader import render_to_string
-        from io import BytesIO
-        
-        # Get the same context as the detail view
-        context = get_invoice_context(invoice, request.user)
-        
-        # Build absolute URLs for images
-        if context.get('company_logo'):
-            context['company_logo'] = request.build_absolute_uri(context['company_logo'])
-        if context.get('company_signature'):
-            context['company_signature'] = request.build_absolute_uri(context['company_signature'])
-            
-        # Debug: Print context values
-        print(f"PDF Context Debug:")
-        print(f"Currency Symbol: {context.get('currency_symbol')}")
-        print(f"Company Logo: {context.get('company_logo')}")
-        print(f"Invoice Grand Total: {invoice.grand_total}")
-        
-        # Render HTML template
-        html_string = render_to_string('invoices/invoice_pdf.html', context)
-        
-        # Create PDF from HTML
-        result = BytesIO()
-        pdf = pisa.pisaDocument(BytesIO(html_string.encode("UTF-8")), result)
-        
-        if not pdf.err:
-            # Create response
-            response = HttpResponse(result.getvalue(), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="invoice_{invoice.invoice_number}.pdf"'
-            return response
-        else:
+        response = serve_pdf_source(request, invoice_pdf_source(invoice, request.user))
+        if response is None:
             return HttpResponse("Error generating PDF", content_type="text/plain", status=500)
+        return response
         
     except ImportError:
         # Fallback to old method if xhtml2pdf is not available
@@ -862,20 +794,8 @@ def export_excel(request):
 @login_required
 def export_pdf(request):
     invoices = get_filtered_invoices(request)
-    company_logo_base64 = None
-    try:
-        company_profile = CompanyProfile.objects.get(user=request.user)
-        if company_profile.logo and hasattr(company_profile.logo, 'path') and os.path.isfile(company_profile.logo.path):
-            try:
-                with open(company_profile.logo.path, 'rb') as img_file:
-                    company_logo_base64 = 'data:image/png;base64,' + base64.b64encode(img_file.read()).decode('utf-8')
-            except Exception as e:
-                company_logo_base64 = None
-        else:
-            company_logo_base64 = None
-    except CompanyProfile.DoesNotExist:
-        company_profile = None
-        company_logo_base64 = None
+    company_profile = CompanyProfile.objects.filter(user=request.user).first()
+    company_logo_base64 = get_branding(company_profile)['company_logo_base64']
     html_string = render_to_string('invoices/invoice_list_export_pdf.html', {
         'invoices': invoices,
         'company_profile': company_profile,
@@ -887,3 +807,11 @@ def export_pdf(request):
     if pisa_status.err:
         return HttpResponse('We had some errors <pre>' + html_string + '</pre>')
     return response
+
+
+@login_required
+@require_http_methods(["POST"])
+def export_pdf_zip(request):
+    """Queue the filtered (or selected) invoices for a ZIP of individual PDFs"""
+    export = queue_document_export(request.user, 'invoice', get_filtered_invoices(request), request.POST.getlist('ids'))
+    return redirect('core:document_export', pk=export.pk)
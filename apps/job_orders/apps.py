@@ -5,6 +5,3 @@ class JobOrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.job_orders'
     verbose_name = 'JobOrders'
-    
-    def ready(self):
-        import apps.job_orders.signals
\ No newline at end of file
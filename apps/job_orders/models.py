@@ -1,6 +1,6 @@
 import random
 import string
-from django.db import models
+from django.db import models, transaction
 from apps.accounts.models import User
 from django.utils import timezone
 from django.contrib.humanize.templatetags.humanize import intcomma
@@ -171,7 +171,9 @@ class Product(models.Model):
             self.job_order = generate_job_order()
         self.calculate_total()
         self.calculate_cycle_time()
-        super().save(*args, **kwargs)
+        # post_save handlers (the accounting outbox) write in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def calculate_total(self):
         if self.price is not None and self.order_quantity is not None:
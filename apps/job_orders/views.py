@@ -15,6 +15,7 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 from .models import Product, Order, Leave, ProductStatusHistory, Customer, Store, StoreInventory, StockMovement, Waybill, Receipt, Invoice
 from .forms import ProductForm, OrderForm, LeaveForm, CustomerForm, StoreForm, StoreInventoryForm, StockMovementForm, WaybillForm, ReceiptForm, InvoiceForm, ProductStatusHistoryForm
+from apps.core.currency import change_company_currency
 from django.contrib.admin.views.decorators import staff_member_required
 from django.core.paginator import Paginator
 from django.db.models import Q, Count, Sum, Avg, Min, Max
@@ -585,52 +586,20 @@ def update_job_order_currency(request):
         if not currency_code or not currency_symbol:
             return JsonResponse({'success': False, 'error': 'Currency code and symbol are required'})
         
-        # Update company profile currency
+        # Job orders take their currency from the company profile, so only the
+        # profile and the stored accounting transactions need updating
         company_profile = request.user.company_profile
-        company_profile.currency_code = currency_code
-        company_profile.currency_symbol = currency_symbol
-        company_profile.save()
-        
-        # Update all job order products to trigger recalculation
-        products = Product.objects.filter(created_by=request.user)
-        updated_products = 0
-        
-        for product in products:
-            # Trigger save to update currency displays
-            product.save()
-            updated_products += 1
-        
-        # Update all orders
-        orders = Order.objects.filter(customer=request.user)
-        updated_orders = 0
-        
-        for order in orders:
-            # Trigger save to update currency displays
-            order.save()
-            updated_orders += 1
-        
-        # Update accounting transactions if they exist
-        transactions_updated = 0
-        try:
-            from apps.accounting.models import Transaction
-            transactions_updated = Transaction.objects.filter(
-                company=company_profile,
-                source_app='job_order'
-            ).update(currency=currency_symbol)
-        except ImportError:
-            # Accounting app might not be installed
-            pass
-        except Exception as e:
-            print(f"Warning: Failed to update job order transactions: {e}")
+        transactions_updated, migration = change_company_currency(
+            company_profile, currency_code, currency_symbol
+        )
         
         return JsonResponse({
             'success': True,
             'currency_code': currency_code,
             'currency_symbol': currency_symbol,
-            'products_updated': updated_products,
-            'orders_updated': updated_orders,
             'transactions_updated': transactions_updated,
-            'message': f'Successfully updated job order currency to {currency_code} ({currency_symbol}). {updated_products} products, {updated_orders} orders, and {transactions_updated} transactions updated.'
+            'queued': migration is not None,
+            'message': f'Successfully updated job order currency to {currency_code} ({currency_symbol}).'
         })
         
     except json.JSONDecodeError as e:
@@ -1,9 +1,10 @@
-from django.db import models, IntegrityError
+from django.db import models, IntegrityError, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 from apps.core.models import CompanyProfile
 from apps.clients.models import Client
+from apps.core.sequences import next_number, last_issued, peek_number
 import re
 
 User = get_user_model()
@@ -111,9 +112,6 @@ class Quotation(models.Model):
         return f"Quotation {self.quotation_number} - {client_name}"
     
     def save(self, *args, **kwargs):
-        if not self.quotation_number:
-            self.quotation_number = self.generate_quotation_number()
-        
         # Set default values from company profile if not set
         if not self.pk:  # Only for new quotations
             try:
@@ -128,39 +126,39 @@ class Quotation(models.Model):
             except:
                 pass
         
-        super().save(*args, **kwargs)
+        if self.quotation_number:
+            super().save(*args, **kwargs)
+        else:
+            # The number is taken in the same transaction as the insert, so a
+            # failed save does not leave a gap in the sequence
+            with transaction.atomic():
+                self.quotation_number = self.generate_quotation_number()
+                super().save(*args, **kwargs)
         self.calculate_totals()
     
-    def generate_quotation_number(self):
-        """Generate unique quotation number based on user and sequence"""
+    def generate_quotation_number(self, peek=False):
+        """Take (or with ``peek``, preview) the next number of the user's sequence for the template prefix (PREFIX-NNNNNN)"""
         prefix = "QT"
         if self.template and self.template.number_prefix:
             prefix = self.template.number_prefix
         
-        # Get the last quotation number for this user
-        last_quotation = Quotation.objects.filter(
-            user=self.user,
-            quotation_number__startswith=prefix
-        ).order_by('-quotation_number').first()
+        def seed():
+            pattern = re.compile(rf'^{re.escape(prefix)}-?(\d+)$')
+            numbers = Quotation.objects.filter(
+                user_id=self.user_id,
+                quotation_number__startswith=prefix,
+            ).values_list('quotation_number', flat=True)
+            return last_issued(numbers, pattern)
         
-        if last_quotation and last_quotation.quotation_number:
-            # Extract the number part and increment
-            try:
-                number_part = last_quotation.quotation_number[len(prefix):]
-                if number_part.startswith('-'):
-                    number_part = number_part[1:]
-                next_number = int(number_part) + 1
-            except (ValueError, IndexError):
-                next_number = 1
-        else:
-            next_number = 1
-        
-        return f"{prefix}-{next_number:06d}"
+        number = (peek_number if peek else next_number)(f'quotation:{prefix}', user=self.user_id, seed=seed)
+        return f"{prefix}-{number:06d}"
     
-    def calculate_totals(self):
-        """Calculate all totals based on line items"""
+    def calculate_totals(self, items=None):
+        """Calculate all totals based on line items, or on ``items`` when given"""
         # Calculate subtotal from line items
-        subtotal = sum(item.line_total for item in self.items.all())
+        if items is None:
+            items = self.items.all()
+        subtotal = sum(item.line_total for item in items)
         self.subtotal = subtotal
         
         # Calculate grand total
@@ -224,9 +222,12 @@ class QuotationItem(models.Model):
     def __str__(self):
         return f"{self.product_service or self.description} - {self.quotation.quotation_number}"
     
+    def calculate_line_total(self):
+        self.line_total = self.quantity * self.unit_price
+    
     def save(self, *args, **kwargs):
         # Calculate line total
-        self.line_total = self.quantity * self.unit_price
+        self.calculate_line_total()
         super().save(*args, **kwargs)
         
         # Recalculate quotation totals without triggering save again
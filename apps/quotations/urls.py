@@ -18,6 +18,7 @@ urlpatterns = [
     path('<int:pk>/print/', views.quotation_print, name='quotation_print'),
     path('export/excel/', views.quotation_export_excel, name='quotation_export_excel'),
     path('export/pdf/', views.quotation_export_pdf, name='quotation_export_pdf'),
+    path('export/pdf-zip/', views.quotation_export_pdf_zip, name='quotation_export_pdf_zip'),
     path('<int:pk>/export/excel/', views.quotation_export_excel, name='quotation_export_excel_single'),
     
     # Status and actions
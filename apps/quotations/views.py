@@ -1,6 +1,8 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_http_methods
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Q, Sum, Count
 from django.core.paginator import Paginator
 from django.http import HttpResponse, JsonResponse
@@ -10,13 +12,15 @@ from decimal import Decimal
 from .models import Quotation, QuotationItem, QuotationTemplate
 from .forms import QuotationForm, QuotationItemFormSet, QuotationFilterForm, QuotationTemplateForm
 from apps.clients.models import Client
-from apps.core.models import CompanyProfile, format_currency, number_to_words
+from apps.core.models import format_currency, number_to_words
 from apps.core.utils import get_company_context
+from apps.core.branding import get_branding
+from apps.core.pdf_cache import PDFSource, pdf_fingerprint, branding_parts, serve_pdf_source
+from apps.core.document_exports import queue_document_export
+from apps.core.line_items import bulk_create_line_items
 import openpyxl
 from xhtml2pdf import pisa
 from io import BytesIO
-import os
-import base64
 import json
 from django.utils import timezone
 
@@ -129,32 +133,16 @@ def quotation_list(request):
 
 def get_quotation_context(quotation, user):
     """Get context data for quotation rendering"""
-    # Get company profile data for display
-    company_profile = None
-    company_logo = None
-    company_signature = None
-    default_bank_account = None
-    
-    try:
-        from apps.core.models import BankAccount
-        company_profile = CompanyProfile.objects.get(user=user)
-        
-        if company_profile.logo:
-            company_logo = company_profile.logo.url
-        if company_profile.signature:
-            company_signature = company_profile.signature.url
-            
-        # Get default bank account
-        default_bank_account = BankAccount.objects.filter(
-            company=company_profile, 
-            is_default=True
-        ).first()
-    except:
-        pass
+    # Company profile, branding and default bank account, cached per request and across workers
+    company_context = get_company_context(user)
+    company_profile = company_context['company_profile']
+    company_logo = company_context['company_logo']
+    company_signature = company_context['company_signature']
+    default_bank_account = company_context['default_bank_account']
     
     # Format currency and numbers
-    currency_symbol = getattr(company_profile, 'currency_symbol', '$') if company_profile else '$'
-    currency_code = getattr(company_profile, 'currency_code', 'USD') if company_profile else 'USD'
+    currency_symbol = company_context['currency_symbol']
+    currency_code = company_context['currency_code']
     total_words = number_to_words(quotation.grand_total, currency_name=currency_code)
     formatted_total = format_currency(quotation.grand_total, currency_symbol)
     
@@ -196,12 +184,14 @@ def quotation_create(request):
         if form.is_valid() and formset.is_valid():
             quotation = form.save(commit=False)
             quotation.user = request.user
-            quotation.save()
             
-            formset.instance = quotation
-            formset.save()
-            
-            quotation.calculate_totals()
+            # The formset has validated every line; insert them together and
+            # total the quotation once from the same in-memory lines
+            with transaction.atomic():
+                quotation.save()
+                formset.instance = quotation
+                items = bulk_create_line_items(formset.save(commit=False))
+                quotation.calculate_totals(items)
             messages.success(request, f'Quotation {quotation.quotation_number} created successfully!')
             return redirect('quotations:quotation_detail', pk=quotation.pk)
     else:
@@ -292,45 +282,58 @@ def quotation_delete_ajax(request, pk):
     return JsonResponse({'success': False, 'message': 'Invalid request method'})
 
 
-@login_required
-def quotation_pdf(request, pk):
-    """Generate PDF for a quotation"""
-    quotation = get_object_or_404(Quotation, pk=pk, user=request.user)
-    context = get_quotation_context(quotation, request.user)
-    
+def quotation_pdf_source(quotation, user):
+    """The cacheable PDF of a quotation"""
     # Get template
     template = quotation.template
     if not template:
-        template = QuotationTemplate.objects.filter(user=request.user, is_default=True).first()
+        template = QuotationTemplate.objects.filter(user=user, is_default=True).first()
         if not template:
             template = QuotationTemplate.objects.create(
-                user=request.user,
+                user=user,
                 name="Default Template",
                 is_default=True,
                 primary_color="#1976d2",
                 secondary_color="#f8f9fa"
             )
     
-    context['template'] = template
-    
-    # Get company context for currency
-    company_context = get_company_context(request.user)
-    context.update({
-        'user_currency_symbol': company_context['currency_symbol'],
-        'user_currency_code': company_context['currency_code'],
-    })
+    def render_html():
+        context = get_quotation_context(quotation, user)
+        context['template'] = template
+        # Images are embedded, xhtml2pdf cannot fetch media URLs
+        branding = get_branding(context.get('company_profile'))
+        context['company_logo'] = branding['company_logo_base64']
+        context['company_signature'] = branding['company_signature_base64']
+        
+        # Get company context for currency
+        company_context = get_company_context(user)
+        context.update({
+            'user_currency_symbol': company_context['currency_symbol'],
+            'user_currency_code': company_context['currency_code'],
+        })
+        return render_to_string('quotations/quotation_pdf.html', context)
+    
+    fingerprint = pdf_fingerprint(
+        'quotations/quotation_pdf.html',
+        quotation,
+        quotation.items.all(),
+        quotation.client,
+        template,
+        *branding_parts(user),
+    )
+    return PDFSource('quotation', quotation.pk, f"quotation_{quotation.quotation_number}.pdf", fingerprint, render_html)
+
+
+@login_required
+def quotation_pdf(request, pk):
+    """Generate PDF for a quotation, served from the PDF cache while it is unchanged"""
+    quotation = get_object_or_404(Quotation, pk=pk, user=request.user)
     
     try:
-        html_string = render_to_string('quotations/quotation_pdf.html', context)
-        result = BytesIO()
-        pdf = pisa.pisaDocument(BytesIO(html_string.encode("UTF-8")), result)
-        
-        if not pdf.err:
-            response = HttpResponse(result.getvalue(), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="quotation_{quotation.quotation_number}.pdf"'
-            return response
-        else:
+        response = serve_pdf_source(request, quotation_pdf_source(quotation, request.user))
+        if response is None:
             return HttpResponse("Error generating PDF", content_type="text/plain", status=500)
+        return response
     except Exception as e:
         return HttpResponse(f"Error generating PDF: {str(e)}", content_type="text/plain", status=500)
 
@@ -563,41 +566,47 @@ def convert_to_invoice(request, pk):
         try:
             from apps.invoices.models import Invoice, InvoiceItem
             
-            # Create invoice
-            invoice = Invoice.objects.create(
-                user=request.user,
-                client=quotation.client,
-                invoice_date=timezone.now().date(),
-                due_date=timezone.now().date() + timezone.timedelta(days=30),
-                subtotal=quotation.subtotal,
-                total_tax=quotation.total_tax,
-                total_discount=quotation.total_discount,
-                shipping_fee=quotation.shipping_fee,
-                other_charges=quotation.other_charges,
-                grand_total=quotation.grand_total,
-                notes=f"Converted from quotation {quotation.quotation_number}",
-                status='unpaid'
-            )
-            
-            # Copy line items
-            for item in quotation.items.all():
-                InvoiceItem.objects.create(
-                    invoice=invoice,
-                    product_service=item.product_service,
-                    description=item.description,
-                    quantity=item.quantity,
-                    unit_price=item.unit_price,
-                    line_total=item.line_total
+            with transaction.atomic():
+                # Create invoice
+                client = quotation.client
+                invoice = Invoice.objects.create(
+                    user=request.user,
+                    client_name=client.name if client else '',
+                    client_email=client.email if client else '',
+                    client_phone=client.phone if client else '',
+                    client_address=client.address if client else '',
+                    invoice_date=timezone.now().date(),
+                    due_date=timezone.now().date() + timezone.timedelta(days=30),
+                    subtotal=quotation.subtotal,
+                    total_tax=quotation.total_tax,
+                    total_discount=quotation.total_discount,
+                    shipping_fee=quotation.shipping_fee,
+                    other_charges=quotation.other_charges,
+                    grand_total=quotation.grand_total,
+                    notes=f"Converted from quotation {quotation.quotation_number}",
+                    status='unpaid'
                 )
             
-            # Update quotation
-            quotation.converted_invoice = invoice
-            quotation.conversion_date = timezone.now()
-            quotation.status = 'accepted'
-            quotation.save()
+                # Copy line items
+                bulk_create_line_items([
+                    InvoiceItem(
+                        invoice=invoice,
+                        product_service=item.product_service,
+                        description=item.description,
+                        quantity=item.quantity,
+                        unit_price=item.unit_price,
+                    )
+                    for item in quotation.items.all()
+                ])
+            
+                # Update quotation
+                quotation.converted_invoice = invoice
+                quotation.conversion_date = timezone.now()
+                quotation.status = 'accepted'
+                quotation.save()
             
             messages.success(request, f'Quotation converted to invoice {invoice.invoice_number} successfully!')
-            return redirect('invoices:invoice_detail', pk=invoice.pk)
+            return redirect('invoices:detail', pk=invoice.pk)
             
         except Exception as e:
             messages.error(request, f'Error converting quotation: {str(e)}')
@@ -685,34 +694,37 @@ def quotation_duplicate(request, pk):
     
     if request.method == 'POST':
         try:
-            # Create new quotation
-            new_quotation = Quotation.objects.create(
-                user=request.user,
-                template=quotation.template,
-                valid_until=quotation.valid_until,
-                client=quotation.client,
-                subtotal=quotation.subtotal,
-                total_tax=quotation.total_tax,
-                total_discount=quotation.total_discount,
-                shipping_fee=quotation.shipping_fee,
-                other_charges=quotation.other_charges,
-                grand_total=quotation.grand_total,
-                terms=quotation.terms,
-                notes=quotation.notes,
-                status='draft'
-            )
-            
-            # Copy line items
-            for item in quotation.items.all():
-                QuotationItem.objects.create(
-                    quotation=new_quotation,
-                    product_service=item.product_service,
-                    description=item.description,
-                    quantity=item.quantity,
-                    unit_price=item.unit_price,
-                    line_total=item.line_total
+            with transaction.atomic():
+                # Create new quotation
+                new_quotation = Quotation.objects.create(
+                    user=request.user,
+                    template=quotation.template,
+                    valid_until=quotation.valid_until,
+                    client=quotation.client,
+                    subtotal=quotation.subtotal,
+                    total_tax=quotation.total_tax,
+                    total_discount=quotation.total_discount,
+                    shipping_fee=quotation.shipping_fee,
+                    other_charges=quotation.other_charges,
+                    grand_total=quotation.grand_total,
+                    terms=quotation.terms,
+                    notes=quotation.notes,
+                    status='draft'
                 )
             
+                # Copy line items and total the copy from them
+                items = bulk_create_line_items([
+                    QuotationItem(
+                        quotation=new_quotation,
+                        product_service=item.product_service,
+                        description=item.description,
+                        quantity=item.quantity,
+                        unit_price=item.unit_price,
+                    )
+                    for item in quotation.items.all()
+                ])
+                new_quotation.calculate_totals(items)
+            
             messages.success(request, f'Quotation duplicated successfully! New quotation: {new_quotation.quotation_number}')
             return redirect('quotations:quotation_detail', pk=new_quotation.pk)
             
@@ -825,11 +837,7 @@ def quotation_export_pdf(request):
         currency_symbol = '$'
         if company_profile:
             currency_symbol = getattr(company_profile, 'currency_symbol', '$')
-            if company_profile.logo:
-                logo_path = company_profile.logo.path
-                if os.path.isfile(logo_path):
-                    with open(logo_path, 'rb') as img_file:
-                        company_logo_base64 = 'data:image/png;base64,' + base64.b64encode(img_file.read()).decode('utf-8')
+            company_logo_base64 = get_branding(company_profile)['company_logo_base64']
     except:
         company_profile = None
         company_logo_base64 = None
@@ -1048,3 +1056,11 @@ def test_quotation_state(request):
             'success': False,
             'message': f'Error: {str(e)}'
         })
+
+
+@login_required
+@require_http_methods(["POST"])
+def quotation_export_pdf_zip(request):
+    """Queue the filtered (or selected) quotations for a ZIP of individual PDFs"""
+    export = queue_document_export(request.user, 'quotation', get_filtered_quotations(request), request.POST.getlist('ids'))
+    return redirect('core:document_export', pk=export.pk)
@@ -2,6 +2,7 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from django.urls import reverse
 from django.utils.deprecation import MiddlewareMixin
+from apps.core.company_context import get_company_context
 from .managers import PermissionChecker, UserRoleManager
 
 
@@ -13,10 +14,10 @@ class RBACMiddleware(MiddlewareMixin):
     def process_request(self, request):
         """Add user role information to request context"""
         if request.user.is_authenticated:
-            # Get user's company and roles
-            company = None
-            if hasattr(request.user, 'company_profile'):
-                company = request.user.company_profile
+            # Get user's company and roles; the cached company context also
+            # primes request.user.company_profile for the rest of the request
+            company = get_company_context(request.user)['company_profile']
+            if company is not None:
                 request.user_company = company
             
             # Get user's active roles
@@ -1,13 +1,14 @@
 from django.db import models
+from django.db.models import Sum
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 from django.utils import timezone
 from apps.invoices.models import Invoice
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-import time
-import random
-from django.db.utils import IntegrityError
+import re
+from django.db import transaction
+from apps.core.sequences import next_number, last_issued, peek_number
 
 User = get_user_model()
 
@@ -43,62 +44,46 @@ class Receipt(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='receipts_created')
 
     def save(self, *args, **kwargs):
-        if not self.receipt_no:
-            for _ in range(5):
+        # A new number is taken in the same transaction as the insert, so a
+        # failed save does not consume it; post_save handlers (the accounting
+        # outbox) also write in this transaction
+        with transaction.atomic():
+            if not self.receipt_no:
                 self.receipt_no = self.generate_receipt_no()
-                try:
-                    super().save(*args, **kwargs)
-                    return
-                except IntegrityError:
-                    continue
-            raise IntegrityError("Could not generate a unique receipt number after several attempts.")
-        else:
             super().save(*args, **kwargs)
 
-    def generate_receipt_no(self):
-        """Generate a unique receipt number (REC-YYYYMMDD-XXXX)"""
-        from django.utils import timezone
-        date_str = timezone.now().strftime("%Y%m%d")
-        for attempt in range(10):
-            count = Receipt.objects.filter(date_received=timezone.now().date()).count() + 1
-            random_part = random.randint(100, 999)
-            receipt_no = f"REC-{date_str}-{count:03d}-{random_part}"
-            if not Receipt.objects.filter(receipt_no=receipt_no).exists():
-                return receipt_no
-        # Fallback: use timestamp
-        return f"REC-{date_str}-{int(time.time() * 1000) % 100000}"
+    def generate_receipt_no(self, peek=False):
+        """Take (or with ``peek``, preview) the next number of the shared daily receipt sequence (REC-YYYYMMDD-NNNN)"""
+        date_str = timezone.localdate().strftime("%Y%m%d")
+
+        def seed():
+            pattern = re.compile(rf'^REC-{date_str}-(\d+)(?:-\d+)?$')
+            numbers = Receipt.objects.filter(
+                receipt_no__startswith=f"REC-{date_str}-",
+            ).values_list('receipt_no', flat=True)
+            return last_issued(numbers, pattern)
+
+        # Receipt numbers are unique across all tenants, so the sequence is shared
+        number = (peek_number if peek else next_number)('receipt', period=date_str, seed=seed)
+        return f"REC-{date_str}-{number:04d}"
 
     def __str__(self):
         return f"Receipt {self.receipt_no} for {self.client_name}"
 
 
+def update_invoice_payments(invoice):
+    """
+    Total the invoice's receipts in the database and record them on the
+    invoice with one UPDATE of its payment fields
+    """
+    total_received = invoice.receipts.aggregate(total=Sum('amount_received'))['total'] or Decimal('0')
+    invoice.record_payments(total_received)
+
+
 @receiver(post_save, sender=Receipt)
 def update_invoice_on_receipt_save(sender, instance, created, **kwargs):
-    invoice = instance.invoice
-    # Recalculate all receipts for this invoice
-    total_received = sum(r.amount_received for r in invoice.receipts.all())
-    invoice.amount_paid = total_received
-    invoice.balance_due = invoice.grand_total - total_received
-    # Update status
-    if invoice.amount_paid == 0:
-        invoice.status = 'unpaid'
-    elif invoice.amount_paid >= invoice.grand_total:
-        invoice.status = 'paid'
-    else:
-        invoice.status = 'partial'
-    invoice.save()
+    update_invoice_payments(instance.invoice)
 
 @receiver(post_delete, sender=Receipt)
 def update_invoice_on_receipt_delete(sender, instance, **kwargs):
-    invoice = instance.invoice
-    total_received = sum(r.amount_received for r in invoice.receipts.all())
-    invoice.amount_paid = total_received
-    invoice.balance_due = invoice.grand_total - total_received
-    # Update status
-    if invoice.amount_paid == 0:
-        invoice.status = 'unpaid'
-    elif invoice.amount_paid >= invoice.grand_total:
-        invoice.status = 'paid'
-    else:
-        invoice.status = 'partial'
-    invoice.save()
+    update_invoice_payments(instance.invoice)
@@ -15,4 +15,5 @@ urlpatterns = [
     path('<int:receipt_id>/email/', views.receipt_email_view, name='email'),
     path('export/excel/', views.export_excel, name='export_excel'),
     path('export/pdf/', views.export_pdf, name='export_pdf'),
+    path('export/pdf-zip/', views.export_pdf_zip, name='export_pdf_zip'),
 ]
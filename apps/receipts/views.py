@@ -1,5 +1,6 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.views.decorators.http import require_http_methods
 from django.contrib import messages
 from django.urls import reverse
 from django.http import HttpResponse, HttpResponseForbidden
@@ -13,11 +14,12 @@ from django.template.loader import render_to_string
 from xhtml2pdf import pisa
 from django.template.loader import render_to_string
 from django.http import HttpResponse
-import os
 import urllib.parse
 from apps.core.models import CompanyProfile
 from apps.core.utils import get_company_context
-import base64
+from apps.core.branding import get_branding
+from apps.core.pdf_cache import PDFSource, pdf_fingerprint, branding_parts, serve_pdf_source
+from apps.core.document_exports import queue_document_export
 
 # Staff check
 def staff_required(view_func):
@@ -201,41 +203,43 @@ def receipt_print_view(request, receipt_id):
     }
     return render(request, 'receipts/receipt_print.html', context)
 
+def receipt_pdf_source(receipt, user):
+    """The cacheable PDF of a receipt"""
+    def render_html():
+        # Get company context for currency from current user
+        company_context = get_company_context(user)
+        # Images are embedded, xhtml2pdf cannot fetch media URLs
+        branding = get_branding(company_context['company_profile'])
+        context = {
+            'receipt': receipt, 
+            'company_profile': company_context['company_profile'], 
+            'company_logo': branding['company_logo_base64'], 
+            'company_signature': branding['company_signature_base64'],
+            'user_currency_symbol': company_context['currency_symbol'],
+            'user_currency_code': company_context['currency_code'],
+        }
+        return render_to_string('receipts/receipt_pdf_template.html', context)
+    
+    fingerprint = pdf_fingerprint(
+        'receipts/receipt_pdf_template.html',
+        receipt,
+        receipt.invoice,
+        *branding_parts(user),
+    )
+    return PDFSource('receipt', receipt.pk, f"receipt_{receipt.receipt_no}.pdf", fingerprint, render_html)
+
 @login_required
 def receipt_pdf_view(request, receipt_id):
-    """Export receipt as PDF with status display."""
+    """Export receipt as PDF with status display, served from the PDF cache while it is unchanged."""
     receipt = get_object_or_404(Receipt, pk=receipt_id, created_by=request.user)
     
-    # Get company context for currency from current user
-    company_context = get_company_context(request.user)
-    company_profile = company_context['company_profile']
-    company_logo = company_context['company_logo']
-    company_signature = company_context['company_signature']
-    
-    context = {
-        'receipt': receipt, 
-        'company_profile': company_profile, 
-        'company_logo': company_logo, 
-        'company_signature': company_signature,
-        'user_currency_symbol': company_context['currency_symbol'],
-        'user_currency_code': company_context['currency_code'],
-    }
-    
     try:
-        from xhtml2pdf import pisa
-        from django.template.loader import render_to_string
-        from io import BytesIO
-        html_string = render_to_string('receipts/receipt_pdf_template.html', context)
-        result = BytesIO()
-        pdf = pisa.pisaDocument(BytesIO(html_string.encode("UTF-8")), result)
-        if not pdf.err:
-            response = HttpResponse(result.getvalue(), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="receipt_{receipt.receipt_no}.pdf"'
-            return response
-        else:
-            return HttpResponse("Error generating PDF", content_type="text/plain", status=500)
+        response = serve_pdf_source(request, receipt_pdf_source(receipt, request.user))
     except ImportError:
         return HttpResponse("xhtml2pdf is not installed. Please install it: pip install xhtml2pdf", content_type="text/plain", status=500)
+    if response is None:
+        return HttpResponse("Error generating PDF", content_type="text/plain", status=500)
+    return response
 
 @login_required
 def receipt_email_view(request, receipt_id):
@@ -273,20 +277,8 @@ def export_excel(request):
 @login_required
 def export_pdf(request):
     receipts = get_filtered_receipts(request)
-    company_logo_base64 = None
-    try:
-        company_profile = CompanyProfile.objects.get(user=request.user)
-        if company_profile.logo and hasattr(company_profile.logo, 'path') and os.path.isfile(company_profile.logo.path):
-            try:
-                with open(company_profile.logo.path, 'rb') as img_file:
-                    company_logo_base64 = 'data:image/png;base64,' + base64.b64encode(img_file.read()).decode('utf-8')
-            except Exception as e:
-                company_logo_base64 = None
-        else:
-            company_logo_base64 = None
-    except CompanyProfile.DoesNotExist:
-        company_profile = None
-        company_logo_base64 = None
+    company_profile = CompanyProfile.objects.filter(user=request.user).first()
+    company_logo_base64 = get_branding(company_profile)['company_logo_base64']
     
     # Get company context for currency
     company_context = get_company_context(request.user)
@@ -306,3 +298,11 @@ def export_pdf(request):
     if pisa_status.err:
         return HttpResponse('We had some errors <pre>' + html_string + '</pre>')
     return response
+
+
+@login_required
+@require_http_methods(["POST"])
+def export_pdf_zip(request):
+    """Queue the filtered (or selected) receipts for a ZIP of individual PDFs"""
+    export = queue_document_export(request.user, 'receipt', get_filtered_receipts(request), request.POST.getlist('ids'))
+    return redirect('core:document_export', pk=export.pk)
@@ -5,3 +5,6 @@ class WaybillsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.waybills'
     verbose_name = 'Waybills'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
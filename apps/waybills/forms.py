@@ -69,82 +69,18 @@ class DynamicWaybillForm(forms.ModelForm):
     
     def _add_custom_fields(self):
         """Add custom fields based on template configuration"""
-        custom_fields = self.template.get_default_custom_fields()
-        
-        for section_key, section_config in custom_fields.items():
-            if section_config.get('type') == 'section':
-                # Add section fields
-                for field_key, field_config in section_config.get('fields', {}).items():
-                    field_name = f"custom_{section_key}_{field_key}"
-                    
-                    # Create form field based on type
-                    if field_config.get('type') == 'textarea':
-                        field = forms.CharField(
-                            required=field_config.get('required', False),
-                            widget=forms.Textarea(attrs={
-                                'class': 'form-control',
-                                'rows': 3,
-                                'placeholder': field_config.get('placeholder', ''),
-                                'data-section': section_key,
-                                'data-field': field_key,
-                            }),
-                            label=field_config.get('label', field_key.title()),
-                            help_text=field_config.get('help_text', ''),
-                        )
-                    elif field_config.get('type') == 'number':
-                        field = forms.CharField(
-                            required=field_config.get('required', False),
-                            widget=forms.TextInput(attrs={
-                                'class': 'form-control',
-                                'placeholder': field_config.get('placeholder', ''),
-                                'data-section': section_key,
-                                'data-field': field_key,
-                            }),
-                            label=field_config.get('label', field_key.title()),
-                            help_text=field_config.get('help_text', ''),
-                        )
-                    elif field_config.get('type') == 'date':
-                        field = forms.DateField(
-                            required=field_config.get('required', False),
-                            widget=forms.DateInput(attrs={
-                                'type': 'date',
-                                'class': 'form-control',
-                                'data-section': section_key,
-                                'data-field': field_key,
-                            }),
-                            label=field_config.get('label', field_key.title()),
-                            help_text=field_config.get('help_text', ''),
-                        )
-                    else:  # Default to text
-                        field = forms.CharField(
-                            required=field_config.get('required', False),
-                            widget=forms.TextInput(attrs={
-                                'class': 'form-control',
-                                'placeholder': field_config.get('placeholder', ''),
-                                'data-section': section_key,
-                                'data-field': field_key,
-                            }),
-                            label=field_config.get('label', field_key.title()),
-                            help_text=field_config.get('help_text', ''),
-                        )
-                    
-                    self.fields[field_name] = field
+        for field in self.template.schema.fields:
+            self.fields[field.name] = field.form_field()
     
     def clean(self):
         """Process custom field data"""
         cleaned_data = super().clean()
         
         if self.template:
-            custom_data = {}
-            custom_fields = self.template.get_default_custom_fields()
-            
-            for section_key, section_config in custom_fields.items():
-                if section_config.get('type') == 'section':
-                    custom_data[section_key] = {}
-                    for field_key, field_config in section_config.get('fields', {}).items():
-                        field_name = f"custom_{section_key}_{field_key}"
-                        if field_name in cleaned_data:
-                            custom_data[section_key][field_key] = cleaned_data[field_name]
+            custom_data = {section.key: {} for section in self.template.schema.sections}
+            for field in self.template.schema.fields:
+                if field.name in cleaned_data:
+                    custom_data[field.section][field.key] = cleaned_data[field.name]
             
             cleaned_data['custom_data'] = custom_data
         
@@ -177,6 +113,13 @@ class WaybillFilterForm(forms.Form):
             'placeholder': 'Search waybills...'
         })
     )
+    receiver = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Receiver...'
+        })
+    )
     status = forms.ChoiceField(
         choices=STATUS_CHOICES,
         required=False,
@@ -260,49 +203,14 @@ class WaybillFieldTemplateForm(forms.ModelForm):
 def create_dynamic_item_form(template):
     """Create a dynamic form class for waybill items based on template"""
     
-    columns = template.get_default_table_columns()
+    columns = template.schema.columns
     
     class DynamicWaybillItemForm(forms.Form):
         def __init__(self, *args, **kwargs):
             super().__init__(*args, **kwargs)
             
             for column in columns:
-                field_name = column['name']
-                field_type = column.get('type', 'text')
-                
-                if field_type == 'number':
-                    field = forms.CharField(
-                        required=False,
-                        widget=forms.TextInput(attrs={
-                            'class': 'form-control item-field',
-                            'placeholder': column.get('placeholder', ''),
-                            'data-column': field_name,
-                        }),
-                        label=column.get('label', field_name.title()),
-                    )
-                elif field_type == 'textarea':
-                    field = forms.CharField(
-                        required=False,
-                        widget=forms.Textarea(attrs={
-                            'class': 'form-control item-field',
-                            'rows': 2,
-                            'placeholder': column.get('placeholder', ''),
-                            'data-column': field_name,
-                        }),
-                        label=column.get('label', field_name.title()),
-                    )
-                else:  # Default to text
-                    field = forms.CharField(
-                        required=False,
-                        widget=forms.TextInput(attrs={
-                            'class': 'form-control item-field',
-                            'placeholder': column.get('placeholder', ''),
-                            'data-column': field_name,
-                        }),
-                        label=column.get('label', field_name.title()),
-                    )
-                
-                self.fields[field_name] = field
+                self.fields[column.name] = column.form_field()
     
     return DynamicWaybillItemForm
 
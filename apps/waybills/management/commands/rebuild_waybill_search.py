@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.waybills.models import Waybill, WaybillTemplate
+from apps.waybills.search import rebuild_search_projection
+
+
+class Command(BaseCommand):
+    help = 'Recompute the waybill search columns from custom data and template schemas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--template-id',
+            type=int,
+            help='Only rebuild waybills of a specific template ID',
+        )
+
+    def handle(self, *args, **options):
+        waybills = Waybill.objects.all()
+        template_id = options.get('template_id')
+        if template_id:
+            if not WaybillTemplate.objects.filter(id=template_id).exists():
+                raise CommandError(f"Template with ID {template_id} not found")
+            waybills = waybills.filter(template_id=template_id)
+
+        updated = rebuild_search_projection(waybills)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search columns of {updated} waybills'))
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waybills', '0003_merge_20250709_1603'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='waybill',
+            name='waybill_number',
+            field=models.CharField(editable=False, max_length=50),
+        ),
+        migrations.AddConstraint(
+            model_name='waybill',
+            constraint=models.UniqueConstraint(fields=('user', 'waybill_number'), name='waybills_unique_number_per_user'),
+        ),
+    ]
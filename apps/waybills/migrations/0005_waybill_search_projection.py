@@ -0,0 +1,171 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:28
+
+from django.db import migrations, models
+
+
+SEARCH_INDEX_NAME = 'waybills_search_idx'
+PROJECTION_FIELDS = ['sender_name', 'receiver_name', 'destination', 'reference', 'search_document']
+
+# Frozen copies of the waybill search rules as of this migration, so later
+# changes to apps.waybills.schema do not change what it does
+SEARCH_COLUMNS = {
+    'sender_name': ('sender_name', 'sender'),
+    'receiver_name': ('receiver_name', 'recipient_name', 'receiver'),
+    'destination': ('destination', 'delivery_address'),
+    'reference': ('reference', 'reference_number', 'tracking_number', 'order_number'),
+}
+SEARCH_COLUMN_LENGTH = 200
+NON_SEARCHABLE_SECTIONS = {'user_preferences'}
+# (section, key, search column) of the default template fields that fill a search column
+DEFAULT_FIELDS = [
+    ('sender_info', 'sender_name', None),
+    ('receiver_info', 'receiver_name', None),
+    ('shipment_info', 'destination', None),
+]
+
+
+def template_search_fields(custom_fields):
+    """{search column: (section, key)} of a template's fields"""
+    if custom_fields:
+        fields = [
+            (section_key, field_key, field_config.get('search') if isinstance(field_config, dict) else None)
+            for section_key, section_config in custom_fields.items()
+            if isinstance(section_config, dict) and section_config.get('type') == 'section'
+            for field_key, field_config in (section_config.get('fields') or {}).items()
+        ]
+    else:
+        fields = DEFAULT_FIELDS
+
+    search_fields = {}
+    for column, keys in SEARCH_COLUMNS.items():
+        field = next((f for f in fields if f[2] == column), None)
+        if field is None:
+            field = next((f for key in keys for f in fields if f[1] == key), None)
+        if field is not None:
+            search_fields[column] = field[:2]
+    return search_fields
+
+
+def search_projection(search_fields, custom_data):
+    """The search columns and ``search_document`` of one waybill's ``custom_data``"""
+    custom_data = custom_data if isinstance(custom_data, dict) else {}
+    projection = {}
+    for column, keys in SEARCH_COLUMNS.items():
+        value = ''
+        if column in search_fields:
+            section, key = search_fields[column]
+            section_data = custom_data.get(section)
+            if isinstance(section_data, dict):
+                value = section_data.get(key) or ''
+        if not value:
+            value = next((custom_data[key] for key in keys if isinstance(custom_data.get(key), str) and custom_data[key]), '')
+        projection[column] = str(value).strip()[:SEARCH_COLUMN_LENGTH]
+
+    words = []
+    for key, value in custom_data.items():
+        if key in NON_SEARCHABLE_SECTIONS:
+            continue
+        for entry in (value.values() if isinstance(value, dict) else [value]):
+            if isinstance(entry, (str, int, float)) and not isinstance(entry, bool) and str(entry).strip():
+                words.append(str(entry).strip())
+    projection['search_document'] = ' '.join(words)
+    return projection
+
+
+def backfill_search_projection(apps, schema_editor):
+    """Fill the search columns of existing waybills from their templates' fields"""
+    Waybill = apps.get_model('waybills', 'Waybill')
+    templates = {}
+    batch = []
+    for waybill in Waybill.objects.select_related('template').only(
+        'custom_data', 'template__custom_fields'
+    ).iterator(chunk_size=1000):
+        search_fields = templates.get(waybill.template_id)
+        if search_fields is None:
+            search_fields = templates[waybill.template_id] = template_search_fields(waybill.template.custom_fields)
+        for field, value in search_projection(search_fields, waybill.custom_data).items():
+            setattr(waybill, field, value)
+        batch.append(waybill)
+        if len(batch) >= 1000:
+            Waybill.objects.bulk_update(batch, PROJECTION_FIELDS)
+            batch = []
+    Waybill.objects.bulk_update(batch, PROJECTION_FIELDS)
+
+
+def _search_index():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return GinIndex(
+        SearchVector(
+            'waybill_number', 'sender_name', 'receiver_name', 'destination', 'reference',
+            'search_document', 'notes', config='simple',
+        ),
+        name=SEARCH_INDEX_NAME,
+    )
+
+
+def add_search_index(apps, schema_editor):
+    """Full-text index backing waybill search; PostgreSQL only"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.add_index(apps.get_model('waybills', 'Waybill'), _search_index())
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('waybills', 'Waybill'), _search_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('waybills', '0004_waybill_number_per_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waybill',
+            name='destination',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='waybill',
+            name='receiver_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='waybill',
+            name='reference',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='waybill',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='waybill',
+            name='sender_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name='waybill',
+            index=models.Index(fields=['user', 'receiver_name'], name='waybills_user_receiver_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waybill',
+            index=models.Index(fields=['user', 'sender_name'], name='waybills_user_sender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waybill',
+            index=models.Index(fields=['user', 'destination'], name='waybills_user_destination_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waybill',
+            index=models.Index(fields=['user', 'reference'], name='waybills_user_reference_idx'),
+        ),
+        migrations.RunPython(backfill_search_projection, migrations.RunPython.noop),
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
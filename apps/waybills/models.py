@@ -1,10 +1,14 @@
-from django.db import models, IntegrityError
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 import re
 import json
 
+from apps.core.sequences import next_number, last_issued, peek_number
+from .schema import get_template_schema
+
 User = get_user_model()
 
 
@@ -51,52 +55,18 @@ class WaybillTemplate(models.Model):
             WaybillTemplate.objects.filter(user=self.user, is_default=True).update(is_default=False)
         super().save(*args, **kwargs)
     
+    @property
+    def schema(self):
+        """Compiled fields and item columns of this version of the template"""
+        return get_template_schema(self)
+    
     def get_default_custom_fields(self):
         """Return default custom fields if none are set"""
-        if not self.custom_fields:
-            return {
-                'sender_info': {
-                    'label': 'Sender Information',
-                    'type': 'section',
-                    'fields': {
-                        'sender_name': {'label': 'Sender Name', 'type': 'text', 'required': True},
-                        'sender_phone': {'label': 'Sender Phone', 'type': 'text', 'required': False},
-                        'sender_address': {'label': 'Sender Address', 'type': 'textarea', 'required': False},
-                    }
-                },
-                'receiver_info': {
-                    'label': 'Receiver Information',
-                    'type': 'section',
-                    'fields': {
-                        'receiver_name': {'label': 'Receiver Name', 'type': 'text', 'required': True},
-                        'receiver_phone': {'label': 'Receiver Phone', 'type': 'text', 'required': False},
-                        'receiver_address': {'label': 'Receiver Address', 'type': 'textarea', 'required': False},
-                    }
-                },
-                'shipment_info': {
-                    'label': 'Shipment Details',
-                    'type': 'section',
-                    'fields': {
-                        'destination': {'label': 'Destination', 'type': 'text', 'required': True},
-                        'vehicle_number': {'label': 'Vehicle Number', 'type': 'text', 'required': False},
-                        'driver_name': {'label': 'Driver Name', 'type': 'text', 'required': False},
-                        'driver_phone': {'label': 'Driver Phone', 'type': 'text', 'required': False},
-                    }
-                }
-            }
-        return self.custom_fields
+        return self.schema.custom_fields
     
     def get_default_table_columns(self):
         """Return default table columns if none are set"""
-        if not self.table_columns:
-            return [
-                {'name': 'product_service', 'label': 'Product / Service', 'type': 'text', 'width': '25%'},
-                {'name': 'description', 'label': 'Description', 'type': 'text', 'width': '35%'},
-                {'name': 'quantity', 'label': 'Quantity', 'type': 'number', 'width': '12%'},
-                {'name': 'weight', 'label': 'Weight (kg)', 'type': 'number', 'width': '10%'},
-                {'name': 'condition', 'label': 'Condition', 'type': 'text', 'width': '10%'},
-            ]
-        return self.table_columns
+        return self.schema.table_columns
 
 
 class Waybill(models.Model):
@@ -113,7 +83,7 @@ class Waybill(models.Model):
         ('awaiting_pickup', 'Awaiting Pickup'),
     ]
     
-    waybill_number = models.CharField(max_length=50, unique=True, editable=False)
+    waybill_number = models.CharField(max_length=50, editable=False)
     waybill_date = models.DateField(auto_now_add=True)
     delivery_date = models.DateField(null=True, blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waybills')
@@ -126,75 +96,76 @@ class Waybill(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     notes = models.TextField(blank=True)
     
+    # Search projection of custom_data, filled from the template schema on save
+    sender_name = models.CharField(max_length=200, blank=True, default='', editable=False)
+    receiver_name = models.CharField(max_length=200, blank=True, default='', editable=False)
+    destination = models.CharField(max_length=200, blank=True, default='', editable=False)
+    reference = models.CharField(max_length=200, blank=True, default='', editable=False)
+    search_document = models.TextField(blank=True, default='', editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    SEARCH_PROJECTION_FIELDS = ['sender_name', 'receiver_name', 'destination', 'reference', 'search_document']
+    
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'waybill_number'], name='waybills_unique_number_per_user'),
+        ]
         indexes = [
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['waybill_number']),
             models.Index(fields=['status']),
             models.Index(fields=['waybill_date']),
             models.Index(fields=['template', 'user']),
+            models.Index(fields=['user', 'receiver_name'], name='waybills_user_receiver_idx'),
+            models.Index(fields=['user', 'sender_name'], name='waybills_user_sender_idx'),
+            models.Index(fields=['user', 'destination'], name='waybills_user_destination_idx'),
+            models.Index(fields=['user', 'reference'], name='waybills_user_reference_idx'),
         ]
         
     def __str__(self):
         return f"Waybill {self.waybill_number}"
     
     def save(self, *args, **kwargs):
-        if not self.waybill_number:
-            self.waybill_number = self.generate_waybill_number()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'custom_data' in update_fields:
+            self.update_search_projection()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(self.SEARCH_PROJECTION_FIELDS)
         
-        # Handle potential duplicate waybill numbers with retry mechanism
-        max_retries = 3
-        for retry in range(max_retries):
-            try:
-                super().save(*args, **kwargs)
-                break  # Success, exit retry loop
-                
-            except IntegrityError as e:
-                if 'UNIQUE constraint failed: waybills_waybill.waybill_number' in str(e) and retry < max_retries - 1:
-                    # Generate a new waybill number and try again
-                    self.waybill_number = self.generate_waybill_number()
-                    continue
-                else:
-                    # Re-raise the error if it's not a duplicate waybill number or we've exhausted retries
-                    raise
-    
-    def generate_waybill_number(self):
-        """Generate unique waybill number with collision handling"""
-        from datetime import datetime
-        import random
-        year = datetime.now().year
+        if self.waybill_number:
+            super().save(*args, **kwargs)
+            return
+        
+        # The number is taken in the same transaction as the insert, so a
+        # failed save does not leave a gap in the sequence
+        with transaction.atomic():
+            self.waybill_number = self.generate_waybill_number()
+            super().save(*args, **kwargs)
+    
+    def generate_waybill_number(self, peek=False):
+        """Take (or with ``peek``, preview) the next number of the user's yearly waybill sequence (PREFIX-YYYY-NNNN)"""
+        year = timezone.localdate().year
         prefix = self.template.number_prefix if self.template else 'WB'
         
-        # Try multiple attempts to generate a unique number
-        for attempt in range(10):
-            if attempt == 0:
-                # First try: use count-based approach
-                count = Waybill.objects.filter(
-                    user=self.user,
-                    created_at__year=year
-                ).count() + 1
-                waybill_number = f"{prefix}-{year}-{count:04d}"
-            else:
-                # Subsequent tries: add random component to avoid collisions
-                count = Waybill.objects.filter(
-                    user=self.user,
-                    created_at__year=year
-                ).count() + 1
-                random_suffix = random.randint(1000, 9999)
-                waybill_number = f"{prefix}-{year}-{count:04d}-{random_suffix}"
-            
-            # Check if this number already exists
-            if not Waybill.objects.filter(waybill_number=waybill_number).exists():
-                return waybill_number
+        def seed():
+            # Every prefix shares the user's sequence
+            pattern = re.compile(rf'^.+-{year}-(\d+)(?:-\d+)?$')
+            numbers = Waybill.objects.filter(
+                user_id=self.user_id,
+                waybill_number__contains=f"-{year}-",
+            ).values_list('waybill_number', flat=True)
+            return last_issued(numbers, pattern)
         
-        # Final fallback: use timestamp
-        import time
-        timestamp = int(time.time() * 1000) % 100000  # Last 5 digits of timestamp
-        return f"{prefix}-{year}-{timestamp}"
+        number = (peek_number if peek else next_number)('waybill', user=self.user_id, period=str(year), seed=seed)
+        return f"{prefix}-{year}-{number:04d}"
+    
+    def update_search_projection(self):
+        """Copy the searchable values of custom_data into the search columns"""
+        for field, value in self.template.schema.search_projection(self.custom_data).items():
+            setattr(self, field, value)
     
     def get_custom_field_value(self, section, field_name, default=''):
         """Get value for a custom field"""
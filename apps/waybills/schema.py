@@ -0,0 +1,366 @@
+"""
+Compiled waybill template schemas.
+
+A template's ``custom_fields`` sections and ``table_columns`` (or the
+defaults used when it has none) are compiled once into a ``WaybillSchema``:
+the flat list of form fields with their POST names, validators and
+defaults, and the item table columns with their accessors. Schemas are kept
+per process, keyed by template and ``updated_at``, so every edit of a
+template compiles a new schema and the form, the POST parser, the live
+preview and the print/PDF layout all read the same one without walking the
+JSON again. Treat schemas as read-only.
+
+Views that cache a user's template instances key them by a per-user
+version that moves whenever one of the user's templates is saved or
+deleted, so a cached instance always carries its current ``updated_at``.
+"""
+import threading
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from typing import Any, NamedTuple
+
+from django import forms
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+SCHEMA_CACHE_SIZE = 512
+
+DEFAULT_CUSTOM_FIELDS = {
+    'sender_info': {
+        'label': 'Sender Information',
+        'type': 'section',
+        'fields': {
+            'sender_name': {'label': 'Sender Name', 'type': 'text', 'required': True},
+            'sender_phone': {'label': 'Sender Phone', 'type': 'text', 'required': False},
+            'sender_address': {'label': 'Sender Address', 'type': 'textarea', 'required': False},
+        }
+    },
+    'receiver_info': {
+        'label': 'Receiver Information',
+        'type': 'section',
+        'fields': {
+            'receiver_name': {'label': 'Receiver Name', 'type': 'text', 'required': True},
+            'receiver_phone': {'label': 'Receiver Phone', 'type': 'text', 'required': False},
+            'receiver_address': {'label': 'Receiver Address', 'type': 'textarea', 'required': False},
+        }
+    },
+    'shipment_info': {
+        'label': 'Shipment Details',
+        'type': 'section',
+        'fields': {
+            'destination': {'label': 'Destination', 'type': 'text', 'required': True},
+            'vehicle_number': {'label': 'Vehicle Number', 'type': 'text', 'required': False},
+            'driver_name': {'label': 'Driver Name', 'type': 'text', 'required': False},
+            'driver_phone': {'label': 'Driver Phone', 'type': 'text', 'required': False},
+        }
+    }
+}
+
+DEFAULT_TABLE_COLUMNS = [
+    {'name': 'product_service', 'label': 'Product / Service', 'type': 'text', 'width': '25%'},
+    {'name': 'description', 'label': 'Description', 'type': 'text', 'width': '35%'},
+    {'name': 'quantity', 'label': 'Quantity', 'type': 'number', 'width': '12%'},
+    {'name': 'weight', 'label': 'Weight (kg)', 'type': 'number', 'width': '10%'},
+    {'name': 'condition', 'label': 'Condition', 'type': 'text', 'width': '10%'},
+]
+
+# Waybill search columns and the field keys that fill them, in order of
+# preference; a field can also name its column with ``"search": "<column>"``
+SEARCH_COLUMNS = {
+    'sender_name': ('sender_name', 'sender'),
+    'receiver_name': ('receiver_name', 'recipient_name', 'receiver'),
+    'destination': ('destination', 'delivery_address'),
+    'reference': ('reference', 'reference_number', 'tracking_number', 'order_number'),
+}
+SEARCH_COLUMN_LENGTH = 200
+
+# custom_data entries that are settings rather than entered values
+NON_SEARCHABLE_SECTIONS = {'user_preferences'}
+
+
+def _check_number(value):
+    try:
+        Decimal(str(value).replace(',', ''))
+    except InvalidOperation:
+        raise ValidationError('Enter a number.')
+
+
+def _check_date(value):
+    try:
+        valid = parse_date(str(value)) is not None
+    except ValueError:
+        valid = False
+    if not valid:
+        raise ValidationError('Enter a valid date (YYYY-MM-DD).')
+
+
+TYPE_VALIDATORS = {
+    'number': _check_number,
+    'date': _check_date,
+}
+
+
+class SchemaField(NamedTuple):
+    """One custom field of a template section"""
+    section: str
+    key: str
+    name: str
+    label: str
+    type: str
+    required: bool
+    placeholder: str
+    help_text: str
+    default: Any
+    search: Any = None
+
+    def value(self, data, current=None):
+        """
+        The posted value, from ``custom_<section>_<key>`` or the bare
+        ``<key>`` of the edit form; ``current`` or the default when absent.
+        """
+        if self.name in data:
+            return data.get(self.name)
+        if self.key in data:
+            return data.get(self.key)
+        return self.default if current is None else current
+
+    def validate(self, value):
+        """Raise ``ValidationError`` when ``value`` is missing or not of the field's type"""
+        if value is None or str(value).strip() == '':
+            if self.required:
+                raise ValidationError('This field is required.')
+            return
+        validator = TYPE_VALIDATORS.get(self.type)
+        if validator:
+            validator(value)
+
+    def form_field(self):
+        """A new Django form field for this field"""
+        attrs = {
+            'class': 'form-control',
+            'placeholder': self.placeholder,
+            'data-section': self.section,
+            'data-field': self.key,
+        }
+        options = {
+            'required': self.required,
+            'label': self.label,
+            'help_text': self.help_text,
+            'initial': self.default,
+        }
+        if self.type == 'textarea':
+            return forms.CharField(widget=forms.Textarea(attrs=dict(attrs, rows=3)), **options)
+        if self.type == 'date':
+            del attrs['placeholder']
+            return forms.DateField(widget=forms.DateInput(attrs=dict(attrs, type='date')), **options)
+        return forms.CharField(widget=forms.TextInput(attrs=attrs), **options)
+
+
+class SchemaSection(NamedTuple):
+    key: str
+    label: str
+    fields: tuple
+
+
+class SchemaColumn(NamedTuple):
+    """One column of the template's item table"""
+    name: str
+    label: str
+    type: str
+    width: str
+    placeholder: str
+    default: Any
+
+    def value(self, item_data):
+        """The cell value of an item's ``item_data``"""
+        if isinstance(item_data, dict):
+            value = item_data.get(self.name)
+            if value not in (None, ''):
+                return value
+        return self.default
+
+    def form_field(self):
+        """A new Django form field for this column of an item row"""
+        attrs = {
+            'class': 'form-control item-field',
+            'placeholder': self.placeholder,
+            'data-column': self.name,
+        }
+        if self.type == 'textarea':
+            widget = forms.Textarea(attrs=dict(attrs, rows=2))
+        else:
+            widget = forms.TextInput(attrs=attrs)
+        return forms.CharField(required=False, widget=widget, label=self.label)
+
+
+class WaybillSchema:
+    """
+    The compiled fields and item columns of one version of a template.
+
+    ``custom_columns`` holds only the columns the template defines itself;
+    print layouts fall back to their own default table when it is empty.
+    """
+
+    def __init__(self, custom_fields, table_columns):
+        self.custom_fields = custom_fields or DEFAULT_CUSTOM_FIELDS
+        self.table_columns = table_columns or DEFAULT_TABLE_COLUMNS
+
+        sections = []
+        for section_key, section_config in self.custom_fields.items():
+            if not isinstance(section_config, dict) or section_config.get('type') != 'section':
+                continue
+            fields = tuple(
+                SchemaField(
+                    section=section_key,
+                    key=field_key,
+                    name=f"custom_{section_key}_{field_key}",
+                    label=field_config.get('label', field_key.title()),
+                    type=field_config.get('type', 'text'),
+                    required=bool(field_config.get('required', False)),
+                    placeholder=field_config.get('placeholder', ''),
+                    help_text=field_config.get('help_text', ''),
+                    default=field_config.get('default', ''),
+                    search=field_config.get('search'),
+                )
+                for field_key, field_config in (section_config.get('fields') or {}).items()
+            )
+            sections.append(SchemaSection(section_key, section_config.get('label', section_key.title()), fields))
+        self.sections = tuple(sections)
+        self.fields = tuple(field for section in self.sections for field in section.fields)
+
+        self.columns = tuple(
+            SchemaColumn(
+                name=column['name'],
+                label=column.get('label', column['name'].title()),
+                type=column.get('type', 'text'),
+                width=column.get('width', ''),
+                placeholder=column.get('placeholder', ''),
+                default=column.get('default', ''),
+            )
+            for column in self.table_columns
+            if isinstance(column, dict) and column.get('name')
+        )
+        self.custom_columns = self.columns if table_columns else ()
+
+        self.search_fields = {}
+        for column, keys in SEARCH_COLUMNS.items():
+            field = next((f for f in self.fields if f.search == column), None)
+            if field is None:
+                field = next((f for key in keys for f in self.fields if f.key == key), None)
+            if field is not None:
+                self.search_fields[column] = field
+
+    def parse_custom_data(self, data, current=None):
+        """
+        ``{section: {field: value}}`` of every schema field in ``data`` (a
+        QueryDict or dict). Fields not posted keep their value in the
+        ``current`` custom data, if given.
+        """
+        current = current or {}
+        custom_data = {section.key: {} for section in self.sections}
+        for field in self.fields:
+            section_data = current.get(field.section)
+            previous = section_data.get(field.key) if isinstance(section_data, dict) else None
+            custom_data[field.section][field.key] = field.value(data, previous)
+        return custom_data
+
+    def validate_custom_data(self, custom_data):
+        """Messages such as ``"Sender Name: This field is required."`` for invalid values"""
+        errors = []
+        for field in self.fields:
+            try:
+                field.validate((custom_data.get(field.section) or {}).get(field.key))
+            except ValidationError as e:
+                errors.extend(f"{field.label}: {message}" for message in e.messages)
+        return errors
+
+    def search_projection(self, custom_data):
+        """
+        Waybill search columns for ``custom_data``, plus ``search_document``:
+        every entered value, for full-text search.
+
+        Waybills saved before their template defined sections keep their
+        values at the top level of ``custom_data``; those are read too.
+        """
+        custom_data = custom_data if isinstance(custom_data, dict) else {}
+        projection = {}
+        for column, keys in SEARCH_COLUMNS.items():
+            value = ''
+            field = self.search_fields.get(column)
+            if field is not None:
+                section_data = custom_data.get(field.section)
+                if isinstance(section_data, dict):
+                    value = section_data.get(field.key) or ''
+            if not value:
+                value = next((custom_data[key] for key in keys if isinstance(custom_data.get(key), str) and custom_data[key]), '')
+            projection[column] = str(value).strip()[:SEARCH_COLUMN_LENGTH]
+
+        words = []
+        for key, value in custom_data.items():
+            if key in NON_SEARCHABLE_SECTIONS:
+                continue
+            for entry in (value.values() if isinstance(value, dict) else [value]):
+                if isinstance(entry, (str, int, float)) and not isinstance(entry, bool) and str(entry).strip():
+                    words.append(str(entry).strip())
+        projection['search_document'] = ' '.join(words)
+        return projection
+
+    def item_values(self, item_data, columns=None):
+        """An item's cell values, in column order"""
+        return [column.value(item_data) for column in (self.columns if columns is None else columns)]
+
+
+_schemas = OrderedDict()
+_schemas_lock = threading.Lock()
+
+
+def compile_schema(custom_fields, table_columns):
+    return WaybillSchema(custom_fields, table_columns)
+
+
+def get_template_schema(template):
+    """
+    The compiled schema of ``template``.
+
+    Shared per process by primary key and ``updated_at``, so a template
+    loaded with ``only()`` whose version was compiled before does not even
+    load its deferred JSON fields. Unsaved templates are compiled each time.
+    """
+    if template.pk is None or template.updated_at is None:
+        return compile_schema(template.custom_fields, template.table_columns)
+
+    key = (template.pk, template.updated_at)
+    with _schemas_lock:
+        schema = _schemas.get(key)
+        if schema is not None:
+            _schemas.move_to_end(key)
+            return schema
+
+    schema = compile_schema(template.custom_fields, template.table_columns)
+    with _schemas_lock:
+        _schemas[key] = schema
+        while len(_schemas) > SCHEMA_CACHE_SIZE:
+            _schemas.popitem(last=False)
+    return schema
+
+
+def get_templates_version(user_id):
+    """Version of a user's waybill templates, for caches of template instances"""
+    # Seed with the current time so an evicted counter never reuses an old version
+    return cache.get_or_set(f'waybill_templates_version_{user_id}', int(timezone.now().timestamp()), None)
+
+
+def bump_templates_version(user_id):
+    """Invalidate cached template instances of a user once the current transaction commits"""
+    def bump():
+        key = f'waybill_templates_version_{user_id}'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(timezone.now().timestamp()), None)
+
+    transaction.on_commit(bump)
@@ -0,0 +1,78 @@
+"""
+Waybill search over the projection columns ``Waybill.save()`` fills from
+custom_data.
+
+On PostgreSQL every word of a search term is matched as a prefix of a
+token, served by the GIN index on the same search vector, so partly typed
+names and numbers ("Acm", "WB-2026-00") still match; a field filter such
+as the receiver narrows with the full-text index first and then checks the
+column itself. Other backends fall back to substring matching over the
+projection columns.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+
+SEARCH_CONFIG = 'simple'
+PROJECTION_BATCH_SIZE = 1000
+SEARCH_FIELDS = (
+    'waybill_number', 'sender_name', 'receiver_name', 'destination', 'reference', 'search_document', 'notes',
+)
+
+
+def _full_text(queryset, query):
+    from django.contrib.postgres.search import SearchVector
+
+    return queryset.annotate(
+        search=SearchVector(*SEARCH_FIELDS, config=SEARCH_CONFIG)
+    ).filter(search=query)
+
+
+def _prefix_query(words):
+    """Every word as a prefix, so partly typed names and numbers still use the index"""
+    from django.contrib.postgres.search import SearchQuery
+
+    prefixes = ' & '.join(f'{word}:*' for word in words)
+    return SearchQuery(prefixes, config=SEARCH_CONFIG, search_type='raw')
+
+
+def search_waybills(queryset, term):
+    """Filter waybills by a free-text search over their number, projection columns and notes"""
+    words = re.findall(r'\w+', term)
+    if connection.vendor == 'postgresql' and words:
+        return _full_text(queryset, _prefix_query(words))
+
+    match = Q()
+    for field in SEARCH_FIELDS:
+        match |= Q(**{f'{field}__icontains': term})
+    return queryset.filter(match)
+
+
+def filter_waybills_by(queryset, field, term):
+    """Filter waybills whose projection column ``field`` contains ``term``"""
+    words = re.findall(r'\w+', term)
+    if connection.vendor == 'postgresql' and words:
+        queryset = _full_text(queryset, _prefix_query(words))
+    return queryset.filter(**{f'{field}__icontains': term})
+
+
+def rebuild_search_projection(waybills, batch_size=PROJECTION_BATCH_SIZE):
+    """
+    Recompute the search columns of ``waybills``, for example after a
+    template's fields were renamed. Returns the number of waybills updated.
+    """
+    from .models import Waybill
+
+    updated = 0
+    batch = []
+    for waybill in waybills.select_related('template').iterator(chunk_size=batch_size):
+        waybill.update_search_projection()
+        batch.append(waybill)
+        if len(batch) >= batch_size:
+            Waybill.objects.bulk_update(batch, Waybill.SEARCH_PROJECTION_FIELDS)
+            updated += len(batch)
+            batch = []
+    Waybill.objects.bulk_update(batch, Waybill.SEARCH_PROJECTION_FIELDS)
+    return updated + len(batch)
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import WaybillTemplate
+from .schema import bump_templates_version
+
+
+@receiver(post_save, sender=WaybillTemplate)
+@receiver(post_delete, sender=WaybillTemplate)
+def invalidate_template_caches(sender, instance, **kwargs):
+    """Cached template lists and instances of the owner are stale after any change"""
+    bump_templates_version(instance.user_id)
@@ -20,6 +20,7 @@ urlpatterns = [
     # Export endpoints
     path('export/excel/', views.export_excel, name='export_excel'),
     path('export/pdf/', views.export_pdf, name='export_pdf'),
+    path('export/pdf-zip/', views.export_pdf_zip, name='export_pdf_zip'),
     
     # Template management
     path('templates/', views.template_list, name='template_list'),
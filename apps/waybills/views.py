@@ -1,9 +1,12 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_http_methods
 from django.contrib import messages
-from django.db.models import Q
+from django.db import transaction
 from django.core.paginator import Paginator
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
 from django.views.decorators.cache import cache_page
 from django.core.cache import cache
 from decimal import Decimal
@@ -19,31 +22,46 @@ from django.http import HttpResponse
 from django.template.loader import render_to_string
 # from weasyprint import HTML
 from xhtml2pdf import pisa
-import os
 import urllib.parse
 from apps.core.models import CompanyProfile
-import base64
+from apps.core.utils import get_company_context
+from apps.core.branding import get_branding
+from apps.core.pdf_cache import PDFSource, pdf_fingerprint, branding_parts, serve_cached_pdf
+from apps.core.document_exports import queue_document_export
+from apps.core.line_items import collect_item_rows, bulk_create_line_items
+from .schema import get_templates_version
+from .search import search_waybills, filter_waybills_by
+from io import BytesIO
 
 
-@login_required
-def waybill_list(request):
-    """List all waybills with filtering and pagination"""
+TEMPLATE_CACHE_TIMEOUT = 1800
+
+# Template fields used by the create and edit pages and the live preview
+TEMPLATE_LIST_FIELDS = [
+    'id', 'user_id', 'name', 'is_default', 'primary_color', 'secondary_color', 'text_color',
+    'document_title', 'updated_at',
+]
+
+
+def get_filtered_waybills(request):
+    """Get filtered waybills based on search parameters"""
     waybills = Waybill.objects.select_related('template', 'user').filter(user=request.user)
     filter_form = WaybillFilterForm(request.GET, user=request.user)
     
     if filter_form.is_valid():
         search = filter_form.cleaned_data.get('search')
+        receiver = filter_form.cleaned_data.get('receiver')
         status = filter_form.cleaned_data.get('status')
         template = filter_form.cleaned_data.get('template')
         date_from = filter_form.cleaned_data.get('date_from')
         date_to = filter_form.cleaned_data.get('date_to')
         
+        # Searches read the indexed projection columns rather than custom_data
         if search:
-            waybills = waybills.filter(
-                Q(waybill_number__icontains=search) |
-                Q(custom_data__icontains=search) |
-                Q(notes__icontains=search)
-            )
+            waybills = search_waybills(waybills, search)
+        
+        if receiver:
+            waybills = filter_waybills_by(waybills, 'receiver_name', receiver)
         
         if status:
             waybills = waybills.filter(status=status)
@@ -57,6 +75,16 @@ def waybill_list(request):
         if date_to:
             waybills = waybills.filter(waybill_date__lte=date_to)
     
+    return waybills
+
+
+@login_required
+def waybill_list(request):
+    """List all waybills with filtering and pagination"""
+    # Names shown in the list come from the projection columns
+    waybills = get_filtered_waybills(request).defer('custom_data', 'search_document')
+    filter_form = WaybillFilterForm(request.GET, user=request.user)
+    
     # Pagination
     paginator = Paginator(waybills, 25)
     page_number = request.GET.get('page')
@@ -81,47 +109,12 @@ def waybill_list(request):
 
 def get_waybill_context(waybill, user):
     """Get context data for waybill rendering"""
-    # Use cache for company profile data to avoid repeated queries
-    cache_key = f'company_profile_{user.id}'
-    cached_profile_data = cache.get(cache_key)
-    
-    if cached_profile_data:
-        company_profile, company_logo, company_signature, default_bank_account = cached_profile_data
-    else:
-        # Get company profile data for display
-        company_profile = None
-        company_logo = None
-        company_signature = None
-        default_bank_account = None
-        
-        try:
-            from apps.core.models import CompanyProfile, BankAccount
-            
-            # Optimize: Get company profile with prefetched bank accounts in one query
-            company_profile = CompanyProfile.objects.select_related().get(user=user)
-            
-            if company_profile.logo:
-                company_logo = company_profile.logo.url
-            if company_profile.signature:
-                company_signature = company_profile.signature.url
-                
-            # Get default bank account
-            default_bank_account = BankAccount.objects.filter(
-                company=company_profile, 
-                is_default=True
-            ).first()
-            
-            # If no default, get the first bank account
-            if not default_bank_account:
-                default_bank_account = BankAccount.objects.filter(
-                    company=company_profile
-                ).first()
-            
-            # Cache the profile data for 5 minutes
-            cache.set(cache_key, (company_profile, company_logo, company_signature, default_bank_account), 300)
-                
-        except Exception as e:
-            pass
+    # Company profile, branding and default bank account, cached per request and across workers
+    company_context = get_company_context(user)
+    company_profile = company_context['company_profile']
+    company_logo = company_context['company_logo']
+    company_signature = company_context['company_signature']
+    default_bank_account = company_context['default_bank_account']
     
     # Get user account details
     user_profile = {
@@ -132,8 +125,15 @@ def get_waybill_context(waybill, user):
         'website': getattr(user, 'website', None),
     }
     
+    # Item cells read through the template's compiled columns
+    schema = waybill.template.schema
+    table_columns = schema.custom_columns
+    item_rows = [(item, schema.item_values(item.item_data, table_columns)) for item in waybill.items.all()]
+    
     return {
         'waybill': waybill,
+        'table_columns': table_columns,
+        'item_rows': item_rows,
         'company_profile': company_profile,
         'company_logo': company_logo,
         'company_signature': company_signature,
@@ -142,6 +142,41 @@ def get_waybill_context(waybill, user):
     }
 
 
+def build_waybill_items(waybill, rows):
+    """
+    Unsaved items for the non-empty ``rows`` (``{index: item_data}``).
+
+    Rows keep their posted index as ``row_order``; a row without a usable
+    index goes after the rows before it, as ``WaybillItem.save()`` would
+    place it.
+    """
+    items = []
+    last_order = 0
+    for index, item_data in rows.items():
+        if not any(value and str(value).strip() for value in item_data.values()):
+            continue
+        row_order = int(index) if str(index).isdigit() else 0
+        if not row_order:
+            row_order = last_order + 1
+        last_order = max(last_order, row_order)
+        items.append(WaybillItem(waybill=waybill, item_data=item_data, row_order=row_order))
+    return items
+
+
+def get_cached_templates(user, refresh=False):
+    """
+    The user's templates, default first, with the fields the create and edit
+    pages show. Cached under the user's template version, so the instances
+    always carry the ``updated_at`` their compiled schema is keyed by.
+    """
+    cache_key = f'waybill_templates_{user.id}_{get_templates_version(user.id)}'
+    templates = None if refresh else cache.get(cache_key)
+    if templates is None:
+        templates = list(WaybillTemplate.objects.filter(user=user).only(*TEMPLATE_LIST_FIELDS).order_by('-is_default', 'name'))
+        cache.set(cache_key, templates, TEMPLATE_CACHE_TIMEOUT)
+    return templates
+
+
 @login_required
 def waybill_detail(request, pk):
     """View waybill details"""
@@ -294,7 +329,7 @@ def waybill_create_simple(request):
     
     if request.method == 'POST':
         # Handle form submission
-        from .models import WaybillTemplate, Waybill, WaybillItem
+        from .models import WaybillTemplate, Waybill
         
         template_id = request.POST.get('template_id')
         try:
@@ -308,46 +343,30 @@ def waybill_create_simple(request):
                     is_default=True
                 )
         
-        # Create waybill
-        waybill = Waybill.objects.create(
-            user=request.user,
-            template=selected_template,
-            delivery_date=request.POST.get('delivery_date') or None,
-            status=request.POST.get('status', 'pending'),
-            notes=request.POST.get('notes', ''),
-            custom_data={
-                'sender_info': {
-                    'sender_name': request.POST.get('custom_sender_info_sender_name', ''),
-                    'sender_phone': request.POST.get('custom_sender_info_sender_phone', ''),
-                },
-                'receiver_info': {
-                    'receiver_name': request.POST.get('custom_receiver_info_receiver_name', ''),
-                    'receiver_phone': request.POST.get('custom_receiver_info_receiver_phone', ''),
-                },
-                'shipment_info': {
-                    'destination': request.POST.get('custom_shipment_info_destination', ''),
-                    'vehicle_number': request.POST.get('custom_shipment_info_vehicle_number', ''),
+        # Create waybill and its items together
+        with transaction.atomic():
+            waybill = Waybill.objects.create(
+                user=request.user,
+                template=selected_template,
+                delivery_date=request.POST.get('delivery_date') or None,
+                status=request.POST.get('status', 'pending'),
+                notes=request.POST.get('notes', ''),
+                custom_data={
+                    'sender_info': {
+                        'sender_name': request.POST.get('custom_sender_info_sender_name', ''),
+                        'sender_phone': request.POST.get('custom_sender_info_sender_phone', ''),
+                    },
+                    'receiver_info': {
+                        'receiver_name': request.POST.get('custom_receiver_info_receiver_name', ''),
+                        'receiver_phone': request.POST.get('custom_receiver_info_receiver_phone', ''),
+                    },
+                    'shipment_info': {
+                        'destination': request.POST.get('custom_shipment_info_destination', ''),
+                        'vehicle_number': request.POST.get('custom_shipment_info_vehicle_number', ''),
+                    }
                 }
-            }
-        )
-        
-        # Create items
-        items_data = {}
-        for key, value in request.POST.items():
-            if key.startswith('items[') and '][' in key:
-                item_index = key.split('[')[1].split(']')[0]
-                field_name = key.split('[')[2].split(']')[0]
-                if item_index not in items_data:
-                    items_data[item_index] = {}
-                items_data[item_index][field_name] = value
-        
-        for index, item_data in items_data.items():
-            if any(value and str(value).strip() for value in item_data.values()):
-                WaybillItem.objects.create(
-                    waybill=waybill,
-                    item_data=item_data,
-                    row_order=int(index)
-                )
+            )
+            bulk_create_line_items(build_waybill_items(waybill, collect_item_rows(request.POST)))
         
         from django.contrib import messages
         messages.success(request, f'Waybill {waybill.waybill_number} created successfully!')
@@ -413,25 +432,11 @@ def waybill_create_instant(request):
                 pass
         
         waybill.custom_data = custom_data
-        waybill.save()
         
-        # Process items quickly
-        items_data = {}
-        for key, value in request.POST.items():
-            if key.startswith('items[') and '][' in key:
-                item_index = key.split('[')[1].split(']')[0]
-                field_name = key.split('[')[2].split(']')[0]
-                if item_index not in items_data:
-                    items_data[item_index] = {}
-                items_data[item_index][field_name] = value
-        
-        for index, item_data in items_data.items():
-            if any(value and str(value).strip() for value in item_data.values()):
-                WaybillItem.objects.create(
-                    waybill=waybill,
-                    item_data=item_data,
-                    row_order=int(index)
-                )
+        # Save the waybill and its items together
+        with transaction.atomic():
+            waybill.save()
+            bulk_create_line_items(build_waybill_items(waybill, collect_item_rows(request.POST)))
         
         messages.success(request, f'Waybill {waybill.waybill_number} created successfully!')
         return redirect('waybills:detail', pk=waybill.pk)
@@ -522,57 +527,26 @@ def waybill_create_test(request):
 @login_required
 def waybill_create(request):
     """Create new waybill with dynamic preview - ULTRA OPTIMIZED"""
-    # PERFORMANCE OPTIMIZATION 1: Aggressive caching with longer TTL
-    cache_key = f'waybill_templates_v2_{request.user.id}'
-    templates = cache.get(cache_key)
-    
-    if templates is None:
-        # Optimized query: only fetch essential fields, use defer for heavy fields
-        templates = list(WaybillTemplate.objects.filter(user=request.user).only(
-            'id', 'name', 'is_default', 'primary_color', 'secondary_color'
-        ).order_by('-is_default', 'name'))
-        cache.set(cache_key, templates, 1800)  # Cache for 30 minutes
-    
-    # PERFORMANCE OPTIMIZATION 2: Default template with persistent caching
-    default_template_cache_key = f'default_waybill_template_v2_{request.user.id}'
-    default_template = cache.get(default_template_cache_key)
-    
-    if default_template is None:
-        if not templates:
-            # Create default template with minimal required fields
-            default_template = WaybillTemplate.objects.create(
-                user=request.user,
-                name="Default Waybill",
-                description="Default waybill template",
-                is_default=True,
-                primary_color='#FF5900',
-                secondary_color='#f8f9fa'
-            )
-            templates = [default_template]
-            cache.set(cache_key, templates, 1800)
-        else:
-            default_template = next((t for t in templates if t.is_default), templates[0] if templates else None)
-        
-        if default_template:
-            cache.set(default_template_cache_key, default_template, 1800)
-    
-    # PERFORMANCE OPTIMIZATION 3: Lazy template loading
-    template_id = request.GET.get('template_id') or (default_template.id if default_template else None)
-    selected_template = default_template  # Use cached default by default
+    # Template list cached per user and template version; only the fields the
+    # page shows are loaded, the compiled schema covers the field definitions
+    templates = get_cached_templates(request.user)
+    if not templates:
+        WaybillTemplate.objects.create(
+            user=request.user,
+            name="Default Waybill",
+            description="Default waybill template",
+            is_default=True,
+            primary_color='#FF5900',
+            secondary_color='#f8f9fa'
+        )
+        templates = get_cached_templates(request.user, refresh=True)
     
-    if template_id and str(template_id) != str(default_template.id if default_template else None):
-        # Only query if different from default
-        template_detail_cache_key = f'waybill_template_detail_{template_id}_{request.user.id}'
-        selected_template = cache.get(template_detail_cache_key)
-        
-        if selected_template is None:
-            try:
-                selected_template = WaybillTemplate.objects.only(
-                    'id', 'name', 'primary_color', 'secondary_color', 'custom_fields', 'table_columns'
-                ).get(id=template_id, user=request.user)
-                cache.set(template_detail_cache_key, selected_template, 1800)
-            except WaybillTemplate.DoesNotExist:
-                selected_template = default_template
+    default_template = next((t for t in templates if t.is_default), templates[0])
+    template_id = request.GET.get('template_id')
+    selected_template = next(
+        (t for t in templates if str(t.id) == str(template_id)), default_template
+    ) if template_id else default_template
+    schema = selected_template.schema
     
     if request.method == 'POST':
         # Handle dynamic form data
@@ -585,15 +559,7 @@ def waybill_create(request):
         waybill.notes = request.POST.get('notes', '')
         
         # Process custom field data
-        custom_data = {}
-        custom_fields = selected_template.get_default_custom_fields()
-        
-        for section_key, section_config in custom_fields.items():
-            if section_config.get('type') == 'section':
-                custom_data[section_key] = {}
-                for field_key, field_config in section_config.get('fields', {}).items():
-                    field_name = f"custom_{section_key}_{field_key}"
-                    custom_data[section_key][field_key] = request.POST.get(field_name, '')
+        custom_data = schema.parse_custom_data(request.POST)
         
         # Add user preferences to custom_data
         user_preferences = {
@@ -605,9 +571,6 @@ def waybill_create(request):
         
         waybill.custom_data = custom_data
         
-        # Save waybill first to get an ID
-        waybill.save()
-        
         # Process dynamic items - handle both formats
         items_data = {}
         
@@ -623,29 +586,12 @@ def waybill_create(request):
         
         # Fallback to old format - collect all item data from POST
         if not items_data:
-            for key, value in request.POST.items():
-                if key.startswith('items[') and '][' in key:
-                    # Parse items[1][description] format
-                    item_index = key.split('[')[1].split(']')[0]
-                    field_name = key.split('[')[2].split(']')[0]
-                    
-                    if item_index not in items_data:
-                        items_data[item_index] = {}
-                    items_data[item_index][field_name] = value
+            items_data = collect_item_rows(request.POST)
         
-        # Create waybill items
-        created_items = []
-        for index, item_data in items_data.items():
-            # Check if item has any meaningful data
-            has_data = any(value and str(value).strip() for value in item_data.values())
-            
-            if has_data:
-                item = WaybillItem.objects.create(
-                    waybill=waybill,
-                    item_data=item_data,
-                    row_order=int(index) if index.isdigit() else 0
-                )
-                created_items.append(item)
+        # Save the waybill and its items together
+        with transaction.atomic():
+            waybill.save()
+            bulk_create_line_items(build_waybill_items(waybill, items_data))
         
         # Check if this is an AJAX request
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or 'application/json' in request.headers.get('Accept', ''):
@@ -662,29 +608,10 @@ def waybill_create(request):
     
     # GET request - show the dynamic form
     # Load company profile and bank account data for the template
-    company_profile = None
-    company_logo = None
-    default_bank_account = None
-    
-    try:
-        from apps.core.models import CompanyProfile, BankAccount
-        
-        # Get company profile
-        company_profile = CompanyProfile.objects.get(user=request.user)
-        
-        # Get default bank account
-        default_bank_account = BankAccount.objects.filter(
-            company=company_profile,
-            is_default=True
-        ).first()
-        
-        if not default_bank_account:
-            default_bank_account = BankAccount.objects.filter(company=company_profile).first()
-            
-    except CompanyProfile.DoesNotExist:
-        pass
-    except Exception as e:
-        print(f"Error loading company data: {e}")
+    company_context = get_company_context(request.user)
+    company_profile = company_context['company_profile']
+    company_logo = company_context['company_logo']
+    default_bank_account = company_context['default_bank_account']
     
     context = {
         'title': 'Create Waybill',
@@ -715,60 +642,21 @@ def waybill_edit(request, pk):
         waybill.status = request.POST.get('status', waybill.status)
         waybill.notes = request.POST.get('notes', '')
 
-        # Map flat form fields to nested custom_data structure
-        custom_data = {}
-        custom_data['sender_info'] = {
-            'sender_name': request.POST.get('sender_name', ''),
-            'sender_phone': request.POST.get('sender_phone', ''),
-            'sender_address': request.POST.get('sender_address', ''),
-        }
-        custom_data['receiver_info'] = {
-            'receiver_name': request.POST.get('receiver_name', ''),
-            'receiver_phone': request.POST.get('receiver_phone', ''),
-            'receiver_address': request.POST.get('receiver_address', ''),
-        }
-        custom_data['shipment_info'] = {
-            'destination': request.POST.get('destination', ''),
-            'vehicle_number': request.POST.get('vehicle_number', ''),
-            'driver_name': request.POST.get('driver_name', ''),
-            'driver_phone': request.POST.get('driver_phone', ''),
-        }
+        # Map the posted fields (flat names on this form) onto the template's sections;
+        # fields the form does not show keep their saved values
+        custom_data = waybill.template.schema.parse_custom_data(request.POST, current=waybill.custom_data)
         user_preferences = {
             'show_bank_details': request.POST.get('show-bank-details') == 'on',
             'show_company_details': request.POST.get('show-company-details') == 'on',
         }
         custom_data['user_preferences'] = user_preferences
         waybill.custom_data = custom_data
-        waybill.save()
-        
-        # Clear existing items and recreate
-        waybill.items.all().delete()
         
-        # Process dynamic items
-        items_data = {}
-        
-        # Collect all item data from POST
-        for key, value in request.POST.items():
-            if key.startswith('items[') and '][' in key:
-                # Parse items[1][description] format
-                item_index = key.split('[')[1].split(']')[0]
-                field_name = key.split('[')[2].split(']')[0]
-                
-                if item_index not in items_data:
-                    items_data[item_index] = {}
-                items_data[item_index][field_name] = value
-        
-        # Create waybill items
-        for index, item_data in items_data.items():
-            # Check if item has any meaningful data
-            has_data = any(value and str(value).strip() for value in item_data.values())
-            
-            if has_data:
-                WaybillItem.objects.create(
-                    waybill=waybill,
-                    item_data=item_data,
-                    row_order=int(index)
-                )
+        # Clear existing items and recreate, so a failed insert keeps the old lines
+        with transaction.atomic():
+            waybill.save()
+            waybill.items.all().delete()
+            bulk_create_line_items(build_waybill_items(waybill, collect_item_rows(request.POST)))
         
         messages.success(request, f'Waybill {waybill.waybill_number} updated successfully!')
         return redirect('waybills:list')
@@ -776,13 +664,8 @@ def waybill_edit(request, pk):
     # GET request - show edit form
     context = get_waybill_context(waybill, request.user)
     
-    # Add edit-specific context - use cache for templates
-    template_cache_key = f'user_templates_{request.user.id}'
-    templates = cache.get(template_cache_key)
-    
-    if templates is None:
-        templates = list(WaybillTemplate.objects.filter(user=request.user))
-        cache.set(template_cache_key, templates, 300)  # Cache for 5 minutes
+    # Add edit-specific context - templates cached per template version
+    templates = get_cached_templates(request.user)
     
     # Prepare robust form_data and existing_items for the template
     form_data = {
@@ -847,6 +730,26 @@ def waybill_delete_ajax(request, pk):
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
 
+def waybill_pdf_source(waybill, user):
+    """The cacheable PDF of a waybill, rendered from its print layout"""
+    def render_html():
+        context = get_waybill_context(waybill, user)
+        # Images are embedded, xhtml2pdf cannot fetch media URLs
+        branding = get_branding(context.get('company_profile'))
+        context['company_logo'] = branding['company_logo_base64']
+        context['company_signature'] = branding['company_signature_base64']
+        return render_to_string('waybills/waybill_print.html', context)
+    
+    fingerprint = pdf_fingerprint(
+        'waybills/waybill_print.html',
+        waybill,
+        waybill.items.all(),
+        waybill.template,
+        *branding_parts(user),
+    )
+    return PDFSource('waybill', waybill.pk, f"waybill_{waybill.waybill_number}.pdf", fingerprint, render_html)
+
+
 @login_required
 def waybill_print(request, pk):
     """Print-friendly waybill view"""
@@ -1023,6 +926,94 @@ def api_save_template_config(request, pk):
         return JsonResponse({'success': False, 'error': str(e)})
 
 
+FORM_FALLBACK_HTML = '<input type="text" name="sender_name" class="form-control" placeholder="Sender Name"><input type="text" name="receiver_name" class="form-control" placeholder="Receiver Name">'
+
+PREVIEW_FALLBACK_HTML = '<div style="border:2px solid #e91e63;border-radius:12px;padding:24px;text-align:center;min-height:400px;display:flex;align-items:center;justify-content:center"><div><h3 style="color:#e91e63">Select a Template</h3><p>Choose a template to see preview</p></div></div>'
+
+
+def template_fragment_response(request, template, render_html):
+    """
+    HTML rendered from one version of a template. The ETag is the template
+    version, so the browser revalidates every time and gets a 304 until the
+    template is edited.
+    """
+    etag = f'"waybill-template-{template.pk}-{template.updated_at.timestamp()}"'
+    if request.META.get('HTTP_IF_NONE_MATCH', '').strip() == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(render_html())
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def render_form_content(template):
+    """Entry inputs for every field of the template's compiled schema"""
+    color = template.primary_color or "#e91e63"
+    sections = []
+    for number, section in enumerate(template.schema.sections):
+        inputs = []
+        for field in section.fields:
+            placeholder = field.placeholder or field.label
+            required = mark_safe(' required') if field.required else ''
+            if field.type == 'textarea':
+                inputs.append(format_html(
+                    '<textarea name="{}" class="form-control" rows="2" placeholder="{}"{}>{}</textarea>',
+                    field.name, placeholder, required, field.default,
+                ))
+            else:
+                input_type = 'date' if field.type == 'date' else 'text'
+                inputs.append(format_html(
+                    '<input type="{}" name="{}" class="form-control" placeholder="{}" value="{}"{}>',
+                    input_type, field.name, placeholder, field.default, required,
+                ))
+        sections.append(format_html(
+            '<div style="background:#f8f9fa;padding:16px;border-radius:8px;border-left:4px solid {}{}">'
+            '<h6 style="color:{};margin:0 0 12px 0">{}</h6>{}</div>',
+            color, ';margin-top:15px' if number else '', color, section.label, mark_safe(''.join(inputs)),
+        ))
+    return ''.join(sections)
+
+
+def render_preview_content(template):
+    """Preview of the template's sections and item columns with placeholder values"""
+    color = template.primary_color or "#e91e63"
+    schema = template.schema
+    sections = format_html_join(
+        '',
+        '<div style="background:#f8f9fa;padding:16px;border-radius:8px;border-left:4px solid {}">'
+        '<h5 style="color:{};margin:0 0 12px 0;font-size:16px">{}</h5>'
+        '<div style="font-size:14px;color:#666">{}</div></div>',
+        (
+            (color, color, section.label, format_html_join('', '<div>{}</div>', ((field.label,) for field in section.fields)))
+            for section in schema.sections
+        ),
+    )
+    headers = format_html_join(
+        '', '<th style="padding:12px 8px;text-align:left;border:1px solid #ddd">{}</th>',
+        ((column.label,) for column in schema.columns),
+    )
+    cells = format_html_join(
+        '', '<td style="padding:10px 8px;border:1px solid #ddd">{}</td>',
+        ((column.default or '-',) for column in schema.columns),
+    )
+    return format_html(
+        '<div style="border:2px solid {color};border-radius:12px;padding:24px;background:#fff;min-height:400px">'
+        '<div style="text-align:center;margin-bottom:30px;border-bottom:3px solid {color};padding-bottom:20px">'
+        '<h2 style="color:{color};margin:0;font-size:28px;font-weight:700">{title}</h2>'
+        '<div style="background:#f8f9fa;padding:8px 16px;margin-top:10px;display:inline-block;border-radius:20px">'
+        '<strong>WB-PREVIEW</strong></div></div>'
+        '<div style="display:grid;grid-template-columns:1fr 1fr;gap:20px;margin-bottom:25px">{sections}</div>'
+        '<div style="margin-bottom:25px"><h5 style="color:{color};margin:0 0 12px 0;font-size:16px">Items</h5>'
+        '<table style="width:100%;border-collapse:collapse;font-size:14px">'
+        '<thead><tr style="background:{color};color:#fff">{headers}</tr></thead>'
+        '<tbody><tr>{cells}</tr></tbody></table></div>'
+        '<div style="margin-top:30px;padding-top:20px;border-top:2px solid {color};text-align:center;font-size:12px;color:#666">'
+        '<div>Live preview of your waybill template</div></div></div>',
+        color=color, title=template.document_title or "WAYBILL", sections=sections, headers=headers, cells=cells,
+    )
+
+
 @login_required
 def api_form_content(request):
     """API endpoint to load form content dynamically - INSTANT"""
@@ -1030,40 +1021,13 @@ def api_form_content(request):
     
     # Ultra-fast minimal response
     if not template_id:
-        return HttpResponse('<input type="text" name="sender_name" class="form-control" placeholder="Sender Name"><input type="text" name="receiver_name" class="form-control" placeholder="Receiver Name">')
+        return HttpResponse(FORM_FALLBACK_HTML)
     
-    # Get template with minimal data only
-    try:
-        template = WaybillTemplate.objects.only('id', 'name', 'primary_color').get(id=template_id, user=request.user)
-        
-        # Return minimal HTML directly - no template rendering for speed
-        html = f'''
-        <div style="background:#f8f9fa;padding:16px;border-radius:8px;border-left:4px solid {template.primary_color or "#e91e63"}">
-            <h6 style="color:{template.primary_color or "#e91e63"};margin:0 0 12px 0">Sender Information</h6>
-            <input type="text" name="custom_sender_info_sender_name" class="form-control" placeholder="Sender Name" required>
-            <input type="text" name="custom_sender_info_sender_phone" class="form-control" placeholder="Sender Phone">
-            <textarea name="custom_sender_info_sender_address" class="form-control" rows="2" placeholder="Sender Address"></textarea>
-        </div>
-        <div style="background:#f8f9fa;padding:16px;border-radius:8px;border-left:4px solid {template.primary_color or "#e91e63"};margin-top:15px">
-            <h6 style="color:{template.primary_color or "#e91e63"};margin:0 0 12px 0">Receiver Information</h6>
-            <input type="text" name="custom_receiver_info_receiver_name" class="form-control" placeholder="Receiver Name" required>
-            <input type="text" name="custom_receiver_info_receiver_phone" class="form-control" placeholder="Receiver Phone">
-            <textarea name="custom_receiver_info_receiver_address" class="form-control" rows="2" placeholder="Receiver Address"></textarea>
-        </div>
-        <div style="background:#f8f9fa;padding:16px;border-radius:8px;border-left:4px solid {template.primary_color or "#e91e63"};margin-top:15px">
-            <h6 style="color:{template.primary_color or "#e91e63"};margin:0 0 12px 0">Shipment Details</h6>
-            <input type="text" name="custom_shipment_info_destination" class="form-control" placeholder="Destination" required>
-            <input type="text" name="custom_shipment_info_vehicle_number" class="form-control" placeholder="Vehicle Number">
-            <input type="text" name="custom_shipment_info_driver_name" class="form-control" placeholder="Driver Name">
-        </div>
-        '''
-        
-        response = HttpResponse(html)
-        response['Cache-Control'] = 'public, max-age=3600'  # Cache for 1 hour
-        return response
-        
-    except WaybillTemplate.DoesNotExist:
-        return HttpResponse('<input type="text" name="sender_name" class="form-control" placeholder="Sender Name"><input type="text" name="receiver_name" class="form-control" placeholder="Receiver Name">')
+    # Fields come from the compiled schema of the template's current version
+    template = next((t for t in get_cached_templates(request.user) if str(t.id) == template_id), None)
+    if template is None:
+        return HttpResponse(FORM_FALLBACK_HTML)
+    return template_fragment_response(request, template, lambda: render_form_content(template))
 
 
 @login_required
@@ -1071,124 +1035,41 @@ def api_preview_content(request):
     """API endpoint to load preview content dynamically - INSTANT"""
     template_id = request.GET.get('template_id')
     
-    # Ultra-fast preview without complex queries
-    try:
-        template = WaybillTemplate.objects.only('id', 'name', 'primary_color', 'document_title').get(id=template_id, user=request.user)
-        
-        # Return minimal preview HTML directly
-        html = f'''
-        <div style="border:2px solid {template.primary_color or "#e91e63"};border-radius:12px;padding:24px;background:#fff;min-height:400px">
-            <div style="text-align:center;margin-bottom:30px;border-bottom:3px solid {template.primary_color or "#e91e63"};padding-bottom:20px">
-                <h2 style="color:{template.primary_color or "#e91e63"};margin:0;font-size:28px;font-weight:700">{template.document_title or "WAYBILL"}</h2>
-                <div style="background:#f8f9fa;padding:8px 16px;margin-top:10px;display:inline-block;border-radius:20px">
-                    <strong>WB-PREVIEW</strong>
-                </div>
-            </div>
-            
-            <div style="display:grid;grid-template-columns:1fr 1fr;gap:20px;margin-bottom:25px">
-                <div style="background:#f8f9fa;padding:16px;border-radius:8px;border-left:4px solid {template.primary_color or "#e91e63"}">
-                    <h5 style="color:{template.primary_color or "#e91e63"};margin:0 0 12px 0;font-size:16px">From (Sender)</h5>
-                    <div style="font-size:14px;color:#666">
-                        <div><strong>Sample Sender Name</strong></div>
-                        <div>+1 (555) 123-4567</div>
-                        <div>123 Sender Street, City</div>
-                    </div>
-                </div>
-                
-                <div style="background:#f8f9fa;padding:16px;border-radius:8px;border-left:4px solid {template.primary_color or "#e91e63"}">
-                    <h5 style="color:{template.primary_color or "#e91e63"};margin:0 0 12px 0;font-size:16px">To (Receiver)</h5>
-                    <div style="font-size:14px;color:#666">
-                        <div><strong>Sample Receiver Name</strong></div>
-                        <div>+1 (555) 987-6543</div>
-                        <div>456 Receiver Ave, City</div>
-                    </div>
-                </div>
-            </div>
-            
-            <div style="margin-bottom:25px">
-                <h5 style="color:{template.primary_color or "#e91e63"};margin:0 0 12px 0;font-size:16px">Items</h5>
-                <table style="width:100%;border-collapse:collapse;font-size:14px">
-                    <thead>
-                        <tr style="background:{template.primary_color or "#e91e63"};color:#fff">
-                            <th style="padding:12px 8px;text-align:left;border:1px solid #ddd">Product</th>
-                            <th style="padding:12px 8px;text-align:left;border:1px solid #ddd">Description</th>
-                            <th style="padding:12px 8px;text-align:center;border:1px solid #ddd">Qty</th>
-                            <th style="padding:12px 8px;text-align:center;border:1px solid #ddd">Weight</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        <tr>
-                            <td style="padding:10px 8px;border:1px solid #ddd">Electronics</td>
-                            <td style="padding:10px 8px;border:1px solid #ddd">Sample electronic devices</td>
-                            <td style="padding:10px 8px;border:1px solid #ddd;text-align:center">5</td>
-                            <td style="padding:10px 8px;border:1px solid #ddd;text-align:center">2.5 kg</td>
-                        </tr>
-                    </tbody>
-                </table>
-            </div>
-            
-            <div style="margin-top:30px;padding-top:20px;border-top:2px solid {template.primary_color or "#e91e63"};text-align:center;font-size:12px;color:#666">
-                <div>Live preview of your waybill template</div>
-            </div>
-        </div>
-        '''
-        
-        response = HttpResponse(html)
-        response['Cache-Control'] = 'public, max-age=3600'  # Cache for 1 hour
-        return response
-        
-    except WaybillTemplate.DoesNotExist:
-        return HttpResponse('<div style="border:2px solid #e91e63;border-radius:12px;padding:24px;text-align:center;min-height:400px;display:flex;align-items:center;justify-content:center"><div><h3 style="color:#e91e63">Select a Template</h3><p>Choose a template to see preview</p></div></div>')
+    # Sections and columns come from the compiled schema of the template's current version
+    template = next((t for t in get_cached_templates(request.user) if str(t.id) == template_id), None)
+    if template is None:
+        return HttpResponse(PREVIEW_FALLBACK_HTML)
+    return template_fragment_response(request, template, lambda: render_preview_content(template))
 
 
 @login_required 
 def api_company_profile(request):
     """API endpoint to load company profile data lazily - ULTRA OPTIMIZED"""
-    # PERFORMANCE OPTIMIZATION: Aggressive caching for company profile
-    profile_cache_key = f'company_profile_optimized_{request.user.id}'
-    cached_data = cache.get(profile_cache_key)
-    
-    if cached_data:
-        return JsonResponse(cached_data)
-    
-    try:
-        from apps.core.models import CompanyProfile, BankAccount
-        
-        # Single optimized query with select_related
-        company_profile = CompanyProfile.objects.select_related('user').get(user=request.user)
-        
-        # Get default bank account in one query
-        default_bank_account = BankAccount.objects.filter(
-            company=company_profile, 
-            is_default=True
-        ).first() or BankAccount.objects.filter(company=company_profile).first()
-        
-        profile_data = {
-            'success': True,
-            'company_name': company_profile.company_name,
-            'company_logo': company_profile.logo.url if company_profile.logo else None,
-            'company_signature': company_profile.signature.url if company_profile.signature else None,
-            'phone': company_profile.phone,
-            'email': company_profile.email,
-            'address': company_profile.address,
-            'website': company_profile.website,
-            'bank_account': {
-                'bank_name': default_bank_account.bank_name,
-                'account_name': default_bank_account.account_name,
-                'account_number': default_bank_account.account_number,
-            } if default_bank_account else None
-        }
-        
-        # Cache for 1 hour
-        cache.set(profile_cache_key, profile_data, 3600)
-        
-        return JsonResponse(profile_data)
-        
-    except Exception as e:
+    # The shared company context is cached across requests and invalidated on every change
+    company_context = get_company_context(request.user)
+    company_profile = company_context['company_profile']
+    default_bank_account = company_context['default_bank_account']
+    if company_profile is None:
         return JsonResponse({
             'success': False,
-            'error': str(e)
+            'error': 'CompanyProfile matching query does not exist.'
         })
+    
+    return JsonResponse({
+        'success': True,
+        'company_name': company_profile.company_name,
+        'company_logo': company_context['company_logo'],
+        'company_signature': company_context['company_signature'],
+        'phone': company_profile.phone,
+        'email': company_profile.email,
+        'address': company_profile.address,
+        'website': company_profile.website,
+        'bank_account': {
+            'bank_name': default_bank_account.bank_name,
+            'account_name': default_bank_account.account_name,
+            'account_number': default_bank_account.account_number,
+        } if default_bank_account else None
+    })
 
 
 @login_required
@@ -1299,13 +1180,17 @@ def export_excel(request):
     ws.title = "Waybills"
     headers = ["Waybill #", "Sender", "Receiver", "Date", "Status"]
     ws.append(headers)
-    for waybill in Waybill.objects.filter(user=request.user):
+    status_labels = dict(Waybill.STATUS_CHOICES)
+    rows = get_filtered_waybills(request).values_list(
+        'waybill_number', 'sender_name', 'receiver_name', 'waybill_date', 'status'
+    )
+    for waybill_number, sender_name, receiver_name, waybill_date, status in rows.iterator():
         ws.append([
-            waybill.waybill_number,
-            waybill.custom_data.get('sender_info', {}).get('sender_name', ''),
-            waybill.custom_data.get('receiver_info', {}).get('receiver_name', ''),
-            waybill.waybill_date.strftime("%Y-%m-%d"),
-            waybill.get_status_display(),
+            waybill_number,
+            sender_name,
+            receiver_name,
+            waybill_date.strftime("%Y-%m-%d"),
+            status_labels.get(status, status),
         ])
     response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     response['Content-Disposition'] = 'attachment; filename=waybills.xlsx'
@@ -1314,29 +1199,33 @@ def export_excel(request):
 
 @login_required
 def export_pdf(request):
-    waybills = Waybill.objects.filter(user=request.user)
-    company_logo_base64 = None
-    try:
-        company_profile = CompanyProfile.objects.get(user=request.user)
-        if company_profile.logo and hasattr(company_profile.logo, 'path') and os.path.isfile(company_profile.logo.path):
-            try:
-                with open(company_profile.logo.path, 'rb') as img_file:
-                    company_logo_base64 = 'data:image/png;base64,' + base64.b64encode(img_file.read()).decode('utf-8')
-            except Exception as e:
-                company_logo_base64 = None
-        else:
-            company_logo_base64 = None
-    except CompanyProfile.DoesNotExist:
-        company_profile = None
-        company_logo_base64 = None
-    html_string = render_to_string('waybills/waybill_list_export_pdf.html', {
-        'waybills': waybills,
-        'company_profile': company_profile,
-        'company_logo_base64': company_logo_base64,
-    })
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename=waybills.pdf'
-    pisa_status = pisa.CreatePDF(html_string, dest=response)
-    if pisa_status.err:
-        return HttpResponse('We had some errors <pre>' + html_string + '</pre>')
+    """Export the filtered waybills as PDF, served from the PDF cache while none of them changed"""
+    waybills = get_filtered_waybills(request).select_related(None).only(
+        'waybill_number', 'sender_name', 'receiver_name', 'waybill_date', 'status', 'updated_at'
+    )
+    company_profile = CompanyProfile.objects.filter(user=request.user).first()
+    company_logo_base64 = get_branding(company_profile)['company_logo_base64']
+
+    def render_pdf():
+        html_string = render_to_string('waybills/waybill_list_export_pdf.html', {
+            'waybills': waybills,
+            'company_profile': company_profile,
+            'company_logo_base64': company_logo_base64,
+        })
+        result = BytesIO()
+        pisa_status = pisa.CreatePDF(html_string, dest=result)
+        return None if pisa_status.err else result.getvalue()
+
+    fingerprint = pdf_fingerprint('waybills/waybill_list_export_pdf.html', waybills, company_profile)
+    response = serve_cached_pdf(request, 'waybill_export', request.user.pk, fingerprint, render_pdf, 'waybills.pdf')
+    if response is None:
+        return HttpResponse('We had some errors generating the PDF', content_type='text/plain', status=500)
     return response
+
+
+@login_required
+@require_http_methods(["POST"])
+def export_pdf_zip(request):
+    """Queue the filtered (or selected) waybills for a ZIP of individual PDFs"""
+    export = queue_document_export(request.user, 'waybill', get_filtered_waybills(request), request.POST.getlist('ids'))
+    return redirect('core:document_export', pk=export.pk)
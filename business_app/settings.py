@@ -203,6 +203,15 @@ SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Rendered PDF cache. Set PDF_SENDFILE_HEADER to X-Sendfile (Apache) or
+# X-Accel-Redirect (nginx, serving PDF_SENDFILE_URL from PDF_CACHE_ROOT as an
+# internal location) to let the web server stream cached files.
+PDF_CACHE_ROOT = MEDIA_ROOT / 'pdf_cache'
+PDF_SENDFILE_HEADER = config('PDF_SENDFILE_HEADER', default='')
+PDF_SENDFILE_URL = config('PDF_SENDFILE_URL', default='/protected/pdf_cache/')
+# Rendering processes per batch PDF export; 0 uses every CPU
+PDF_EXPORT_WORKERS = config('PDF_EXPORT_WORKERS', default=0, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
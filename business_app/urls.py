@@ -24,7 +24,7 @@ urlpatterns = [
     # path('api/inventory/', include('apps.inventory.api_urls')),
     path('api/clients/', include('apps.clients.api_urls')),
     path('api/inventory/', include('apps.inventory.api_urls')),
-    # path('api/accounting/', include('apps.accounting.api_urls')),
+    path('api/accounting/', include('apps.accounting.api_urls')),
     path('invoices/', include('apps.invoices.urls')),
     path('receipts/', include(('apps.receipts.urls', 'receipts'), namespace='receipts')),
     path('waybills/', include('apps.waybills.urls')),